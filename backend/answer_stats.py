@@ -0,0 +1,156 @@
+"""Per-question answer analytics, aggregated in memory and flushed with ``$inc``.
+
+Clients send answer events in batches: question id, the chosen option, whether
+it was correct and the time taken. Nothing is written per event. Each instance
+adds the events to one tally per question: answers, correct answers, total
+time, a count per option and a histogram of answer times. A scheduled job
+flushes the tallies with one unordered ``bulk_write`` of ``$inc`` upserts into
+``answer_stats``, one document per question, and starts new ones. Instances
+flush independently; the increments simply add up.
+
+Options are shuffled in every quiz, so the ids clients see (A-D) differ from
+run to run. Events carry the chosen option's text instead, which is mapped back
+to the option's key in the sheet. An event without an option is counted under
+``none`` (the time ran out).
+
+Memory is bounded by the question bank: events for question ids that are not
+in the current content are dropped, so there is at most one tally per
+question. A failed flush merges its tallies back, to be written with the next
+one.
+"""
+import bisect
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from pymongo import UpdateOne
+
+# Upper bounds of the answer time histogram buckets; the last bucket is open
+TIME_BOUNDS_MS = [1000, 2000, 3000, 5000, 8000, 12000, 20000, 30000]
+# Longer answers (a player who left the app open) count as this long in the total
+MAX_TIME_MS = 60000
+NO_OPTION = "none"
+
+
+class QuestionTally:
+    __slots__ = ("answers", "correct", "time_ms", "options", "histogram")
+
+    def __init__(self):
+        self.answers = 0
+        self.correct = 0
+        self.time_ms = 0
+        self.options: Counter = Counter()
+        self.histogram = [0] * (len(TIME_BOUNDS_MS) + 1)
+
+    def merge(self, other: "QuestionTally"):
+        self.answers += other.answers
+        self.correct += other.correct
+        self.time_ms += other.time_ms
+        self.options.update(other.options)
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+
+    def increments(self) -> Dict[str, int]:
+        inc = {"answers": self.answers, "correct": self.correct, "time_ms": self.time_ms}
+        inc.update((f"options.{key}", n) for key, n in self.options.items())
+        inc.update((f"time_histogram.{i}", n) for i, n in enumerate(self.histogram) if n)
+        return inc
+
+
+class AnswerStats:
+    def __init__(self):
+        self._tallies: Dict[str, QuestionTally] = {}
+        self.recorded = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.flushed_events = 0
+        self.failed_flushes = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._tallies)
+
+    def record(self, events: Iterable[Any], option_keys: Mapping[str, Mapping[str, str]]) -> int:
+        """Add ``events`` to the tallies; returns how many were accepted.
+
+        ``option_keys`` maps each question id of the current content to its
+        options' texts and keys. Events for other questions are dropped.
+        """
+        tallies = self._tallies
+        accepted = 0
+        for event in events:
+            keys = option_keys.get(event.question_id)
+            if keys is None:
+                self.dropped += 1
+                continue
+            tally = tallies.get(event.question_id)
+            if tally is None:
+                tally = tallies[event.question_id] = QuestionTally()
+            tally.answers += 1
+            if event.correct:
+                tally.correct += 1
+            time_ms = min(event.time_ms, MAX_TIME_MS)
+            tally.time_ms += time_ms
+            tally.histogram[bisect.bisect_left(TIME_BOUNDS_MS, time_ms)] += 1
+            key = NO_OPTION if event.option is None else keys.get(event.option)
+            if key is not None:
+                tally.options[key] += 1
+            accepted += 1
+        self.recorded += accepted
+        return accepted
+
+    async def flush(self, collection) -> int:
+        """Write the tallies since the last flush; returns the number of questions written."""
+        tallies, self._tallies = self._tallies, {}
+        if not tallies:
+            return 0
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne({"_id": question_id}, {"$inc": tally.increments(), "$set": {"updated_at": now}}, upsert=True)
+            for question_id, tally in tallies.items()
+        ]
+        try:
+            await collection.bulk_write(operations, ordered=False)
+        except BaseException:
+            # Keep the counts for the next flush, with whatever arrived meanwhile
+            self.failed_flushes += 1
+            for question_id, tally in tallies.items():
+                current = self._tallies.setdefault(question_id, QuestionTally())
+                current.merge(tally)
+            raise
+        self.flushes += 1
+        self.flushed_events += sum(tally.answers for tally in tallies.values())
+        return len(operations)
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "pending_questions": self.pending,
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "flushed_events": self.flushed_events,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+def summarize(doc: Optional[Mapping[str, Any]], options: Mapping[str, str]) -> Dict[str, Any]:
+    """Stats of one question from its ``answer_stats`` document (``None`` if never answered).
+
+    ``options`` maps the question's option keys to their texts.
+    """
+    doc = doc or {}
+    answers = doc.get("answers", 0)
+    counts = doc.get("options", {})
+    histogram = doc.get("time_histogram", {})
+    return {
+        "answers": answers,
+        "correct_rate": round(doc.get("correct", 0) / answers, 4) if answers else None,
+        "avg_time_ms": round(doc.get("time_ms", 0) / answers) if answers else None,
+        "options": [{"key": key, "text": text, "count": counts.get(key, 0)} for key, text in options.items()],
+        "unanswered": counts.get(NO_OPTION, 0),
+        "time_histogram": [histogram.get(str(i), 0) for i in range(len(TIME_BOUNDS_MS) + 1)],
+    }
+
+
+def histogram_bounds() -> List[Optional[int]]:
+    """Upper bound of each histogram bucket, in ms (``None`` for the open last one)."""
+    return [*TIME_BOUNDS_MS, None]
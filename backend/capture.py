@@ -0,0 +1,189 @@
+"""Opt-in capture of sanitized API traffic, replayed locally by ``perf/replay.py``.
+
+With ``TRAFFIC_CAPTURE_DIR`` set, ``CaptureMiddleware`` records one JSON line
+per sampled API request: time, method, route template, path, query
+parameters, the request body and its shape, status, duration and response
+size. Real traffic mixes (leaderboard polling against quiz fetches, legacy
+endpoint usage, batch sizes) can then be replayed against a local build.
+
+Nothing written identifies a player. Player names and run ids, in the path,
+the query or the body, are replaced with keyed pseudonyms (HMAC-SHA256 with
+``TRAFFIC_CAPTURE_SALT``). They stay stable within a capture, so repeat
+players and retried runs still show up. Headers and client addresses are never
+recorded, and neither are admin routes or requests that matched no route.
+Bodies over ``max_body`` bytes keep only their shape.
+
+Lines go through a bounded queue to a background thread, which writes them to
+``capture.jsonl`` and rotates it at ``max_bytes``, keeping ``backups`` older
+files. The event loop never waits on the disk. When the writer falls behind,
+lines are dropped and counted.
+"""
+import hmac
+import json
+import logging
+import os
+import queue
+import random
+import time
+from hashlib import sha256
+from logging.handlers import QueueListener, RotatingFileHandler
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode
+
+logger = logging.getLogger(__name__)
+
+# Fields (path parameters, query parameters, body keys) replaced with pseudonyms
+PSEUDONYMIZED = frozenset({"player_name", "player_names", "run_id"})
+EXCLUDED_PREFIXES = ("/api/admin/",)
+
+
+def body_shape(value: Any) -> Any:
+    """Structure of a JSON value: type names, and ``[length, item shape]`` for lists."""
+    if isinstance(value, dict):
+        return {key: body_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [len(value), body_shape(value[0])] if value else [0]
+    if value is None:
+        return "null"
+    return type(value).__name__
+
+
+class TrafficCapture:
+    def __init__(self, directory: str, max_bytes: int = 64 * 2**20, backups: int = 5, sample_rate: float = 1.0,
+                 max_body: int = 64 * 1024, salt: Optional[str] = None, queue_size: int = 10_000):
+        self.sample_rate = sample_rate
+        self.max_body = max_body
+        self._key = (salt or os.urandom(16).hex()).encode("utf-8")
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "capture.jsonl")
+        handler = RotatingFileHandler(self.path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._listener = QueueListener(self._queue, handler)
+        self._listener.start()
+        self.captured = 0
+        self.dropped = 0
+
+    def sampled(self) -> bool:
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def pseudonym(self, value: str) -> str:
+        return "p_" + hmac.new(self._key, value.encode("utf-8"), sha256).hexdigest()[:12]
+
+    def sanitize(self, value: Any, key: Optional[str] = None) -> Any:
+        if key in PSEUDONYMIZED:
+            if isinstance(value, str):
+                return self.pseudonym(value)
+            if isinstance(value, list):
+                return [self.pseudonym(v) if isinstance(v, str) else v for v in value]
+        if isinstance(value, dict):
+            return {k: self.sanitize(v, k) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self.sanitize(v) for v in value]
+        return value
+
+    def record(self, entry: Dict[str, Any]):
+        """Queue one entry for the writer thread; dropped if the queue is full."""
+        # Records are queued directly: logging.disable() or a logger level must not turn capture off
+        record = logging.makeLogRecord({"msg": json.dumps(entry, ensure_ascii=False, separators=(",", ":"))})
+        try:
+            self._queue.put_nowait(record)
+            self.captured += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        self._listener.stop()
+
+    def metrics(self) -> Dict[str, int]:
+        return {"captured": self.captured, "dropped": self.dropped, "pending": self._queue.qsize()}
+
+
+def capture_from_env() -> Optional[TrafficCapture]:
+    """``TrafficCapture`` configured from ``TRAFFIC_CAPTURE_*``, or ``None`` (the default: off)."""
+    directory = os.environ.get("TRAFFIC_CAPTURE_DIR")
+    if not directory:
+        return None
+    return TrafficCapture(
+        directory,
+        max_bytes=int(float(os.environ.get("TRAFFIC_CAPTURE_MAX_MB", "64")) * 2**20),
+        backups=int(os.environ.get("TRAFFIC_CAPTURE_FILES", "5")),
+        sample_rate=float(os.environ.get("TRAFFIC_CAPTURE_SAMPLE_RATE", "1.0")),
+        salt=os.environ.get("TRAFFIC_CAPTURE_SALT"),
+    )
+
+
+class CaptureMiddleware:
+    """Record sampled ``/api/`` requests with ``TrafficCapture``; outermost, so timings include every middleware."""
+
+    def __init__(self, app, capture: TrafficCapture):
+        self.app = app
+        self.capture = capture
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if (scope["type"] != "http" or not path.startswith("/api/") or path.startswith(EXCLUDED_PREFIXES)
+                or not self.capture.sampled()):
+            await self.app(scope, receive, send)
+            return
+
+        capture = self.capture
+        body = bytearray()
+        response = {"status": 0, "bytes": 0}
+        started = time.time()
+        start = time.perf_counter()
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                # The app reads whole bodies anyway (and limits their size); keep a copy for the shape
+                body.extend(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+                if not message.get("more_body", False):
+                    response["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            try:
+                entry = self.entry(scope, bytes(body), response, started)
+                if entry is not None:
+                    capture.record(entry)
+            except Exception as e:
+                logger.warning(f"Traffic capture failed: {e}")
+
+    def entry(self, scope, body: bytes, response: Dict[str, Any], started: float) -> Optional[Dict[str, Any]]:
+        route = scope.get("route")
+        template = getattr(route, "path", None)
+        if template is None:
+            return None  # unmatched paths may carry anything
+        capture = self.capture
+        params = {k: capture.sanitize(v, k) for k, v in scope.get("path_params", {}).items()}
+        query = [(k, capture.sanitize(v, k)) for k, v in parse_qsl(scope.get("query_string", b"").decode("latin-1"))]
+        entry: Dict[str, Any] = {
+            "ts": round(started, 4),
+            "method": scope["method"],
+            "route": template,
+            "path": route.path_format.format(**params) if params else template,
+            "query": urlencode(query),
+            "status": response["status"],
+            "duration_ms": response.get("duration_ms", round((time.time() - started) * 1000, 3)),
+            "response_bytes": response["bytes"],
+        }
+        if body:
+            entry["body_bytes"] = len(body)
+            try:
+                value = json.loads(body)
+            except ValueError:
+                return entry
+            entry["shape"] = body_shape(value)
+            if len(body) <= capture.max_body:
+                entry["body"] = capture.sanitize(value)
+        return entry
@@ -0,0 +1,178 @@
+"""Response compression.
+
+``CompressionMiddleware`` compresses per-request JSON bodies (shuffled quizzes,
+leaderboards) on the fly with the best encoding the client accepts. Bodies that
+only change with the content version are wrapped in ``PrecompressedBody``, which
+compresses each encoding once at a higher level and keeps the bytes; the
+middleware leaves responses that already carry ``Content-Encoding`` alone.
+
+The densest levels are slow (brotli 11 takes a third of a second for a full
+content bundle), so they never run on the event loop. The first request for an
+encoding gets the body compressed at the on-the-fly level, kept until a worker
+thread has produced the dense variant.
+
+Brotli is used when the ``brotli`` package is installed, otherwise only gzip is
+offered.
+"""
+import asyncio
+import gzip
+import logging
+import os
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))
+
+# Levels for on-the-fly compression favour CPU; precompressed bodies are
+# compressed once per content version, so they use the densest setting.
+ONLINE_LEVELS = {"br": 4, "gzip": 6}
+PRECOMPRESSED_LEVELS = {"br": 11, "gzip": 9}
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def supported_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the preferred supported encoding from an Accept-Encoding header."""
+    if not accept_encoding:
+        return None
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in supported_encodings():
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=ONLINE_LEVELS["br"] if level is None else level)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=ONLINE_LEVELS["gzip"] if level is None else level, mtime=0)
+    raise ValueError(f"Unsupported encoding {encoding}")
+
+
+class PrecompressedBody:
+    """Identity bytes plus lazily computed, cached compressed variants."""
+
+    __slots__ = ("identity", "_encoded", "_pending")
+
+    def __init__(self, identity: bytes):
+        self.identity = identity
+        self._encoded: Dict[str, bytes] = {}
+        # Dense compressions running in worker threads, by encoding
+        self._pending: Dict[str, asyncio.Task] = {}
+
+    def encoded(self, encoding: Optional[str]) -> bytes:
+        if encoding is None or len(self.identity) < MIN_SIZE:
+            return self.identity
+        body = self._encoded.get(encoding)
+        if body is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                # No event loop to keep responsive
+                body = self._encoded[encoding] = compress(self.identity, encoding, PRECOMPRESSED_LEVELS[encoding])
+                return body
+            body = self._encoded[encoding] = compress(self.identity, encoding)
+            task = self._pending[encoding] = loop.create_task(
+                asyncio.to_thread(compress, self.identity, encoding, PRECOMPRESSED_LEVELS[encoding])
+            )
+            task.add_done_callback(lambda t, e=encoding: self._densified(e, t))
+        return body
+
+    def _densified(self, encoding: str, task: asyncio.Task):
+        del self._pending[encoding]
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            # The on-the-fly variant stays
+            logger.warning(f"Precompressing {encoding} failed: {task.exception()}")
+            return
+        self._encoded[encoding] = task.result()
+
+    async def wait(self):
+        """Until the dense variants being compressed are in place."""
+        await asyncio.gather(*self._pending.values(), return_exceptions=True)
+
+
+def precompressed_response(request: Request, body: PrecompressedBody, status_code: int = 200,
+                           headers: Optional[Dict[str, str]] = None,
+                           media_type: str = "application/json") -> Response:
+    encoding = negotiate(request.headers.get("accept-encoding")) if len(body.identity) >= MIN_SIZE else None
+    response = Response(content=body.encoded(encoding), status_code=status_code,
+                        headers=headers, media_type=media_type)
+    response.headers["Vary"] = "Accept-Encoding"
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+
+class CompressionMiddleware:
+    """Compress uncompressed responses of at least ``minimum_size`` bytes."""
+
+    def __init__(self, app, minimum_size: int = MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        chunks = []
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(chunks)
+            headers = MutableHeaders(raw=start_message["headers"])
+            content_type = headers.get("content-type", "")
+            if (len(body) >= self.minimum_size and "content-encoding" not in headers
+                    and content_type.startswith(COMPRESSIBLE_TYPES)):
+                body = compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
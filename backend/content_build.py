@@ -0,0 +1,251 @@
+"""Content building off the event loop.
+
+Parsing both sheets and building the question bank takes hundreds of
+milliseconds for a large sheet, all of it pure Python that holds the GIL.
+Done on the event loop, every request in flight waits for it. Here it runs in
+a worker process instead (``ContentBuildPool``). The sheets go in as the raw
+bytes Sheets sent (pickling a large ``str`` holds the GIL while it re-encodes
+it) and a single snapshot buffer (see ``snapshot.py``) comes back: one
+``bytes`` object crosses the pipe each way instead of a pickled object graph,
+and the loop only decodes the snapshot's small header before swapping it in.
+
+``CONTENT_BUILD_MODE`` picks where builds run: ``process`` (default), ``thread``
+or ``inline``. A pool that cannot start, or whose worker dies, falls back to a
+thread.
+
+Nothing here imports ``server``, so the worker process only loads this module
+and ``snapshot.py``.
+"""
+import asyncio
+import logging
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Union
+
+from snapshot import encode_snapshot
+
+logger = logging.getLogger(__name__)
+
+BUILD_MODES = ("process", "thread", "inline")
+
+
+def parse_csv(csv_text: str) -> List[Dict[str, str]]:
+    """Parse CSV text into list of dictionaries"""
+    lines = csv_text.strip().split('\n')
+    if len(lines) < 2:
+        return []
+    
+    headers = [h.strip().lower().replace(' ', '_') for h in lines[0].split(',')]
+    rows = []
+    
+    for line in lines[1:]:
+        values = []
+        current = ""
+        in_quotes = False
+        
+        for char in line:
+            if char == '"':
+                in_quotes = not in_quotes
+            elif char == ',' and not in_quotes:
+                values.append(current.strip())
+                current = ""
+            else:
+                current += char
+        values.append(current.strip())
+        
+        if len(values) >= len(headers):
+            row = {headers[i]: values[i] for i in range(len(headers))}
+            rows.append(row)
+    
+    return rows
+
+
+
+def build_episodes(rows: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """Build the sorted episode list from parsed sheet rows"""
+    episodes = []
+    for row in rows:
+        try:
+            # Try different column name variations
+            episode_id = int(row.get('episode_id') or row.get('id') or row.get('bölüm_no') or row.get('bolum_no') or 0)
+            episode_name = row.get('episode_name') or row.get('name') or row.get('bölüm_adı') or row.get('bolum_adi') or f"{episode_id}. Bölüm"
+            is_locked = (row.get('is_locked') or row.get('durum') or 'açık').lower() in ['kilitli', 'locked', 'true', '1']
+            description = row.get('description') or row.get('açıklama') or row.get('aciklama') or ''
+            
+            if episode_id > 0:
+                episode = {
+                    'id': episode_id,
+                    'name': episode_name,
+                    'question_count': 25,
+                    'is_locked': is_locked,
+                    'description': description
+                }
+                episodes.append(episode)
+        except Exception as e:
+            logger.warning(f"Error parsing episode row: {e}, row: {row}")
+            continue
+    
+    # Ensure we have at least 14 episodes (fill missing ones)
+    existing_ids = {e['id'] for e in episodes}
+    for i in range(1, 15):
+        if i not in existing_ids:
+            episodes.append({
+                'id': i,
+                'name': f"{i}. Bölüm",
+                'question_count': 25,
+                'is_locked': False,
+                'description': ''
+            })
+    
+    episodes.sort(key=lambda e: e['id'])
+    return episodes
+
+
+
+def build_questions(rows: List[Dict[str, str]]) -> Dict[int, List[Dict]]:
+    """Build raw question dicts grouped by episode from parsed sheet rows"""
+    questions_by_episode: Dict[int, List[Dict]] = {}
+    id_counts: Dict[str, int] = {}
+    
+    for row in rows:
+        try:
+            # Try different column name variations for episode
+            episode_id = int(
+                row.get('episode_id') or row.get('episode') or 
+                row.get('bölüm') or row.get('bolum') or 1
+            )
+            
+            # Try different column names for difficulty and points
+            difficulty_raw = row.get('difficulty') or row.get('zorluk') or 'orta'
+            difficulty = difficulty_raw.lower()
+            if difficulty in ['easy', 'kolay']:
+                points = 10
+                difficulty = 'kolay'
+            elif difficulty in ['hard', 'zor']:
+                points = 50
+                difficulty = 'zor'
+            else:
+                points = 20
+                difficulty = 'orta'
+            
+            # Override with explicit points if provided
+            if row.get('points') or row.get('puan'):
+                try:
+                    points = int(row.get('points') or row.get('puan'))
+                except:
+                    pass
+            
+            # Get correct answer - try different column names
+            correct_raw = (
+                row.get('correct_answer') or row.get('correct') or 
+                row.get('doğru_cevap') or row.get('dogru_cevap') or 'A'
+            )
+            correct_answer = correct_raw.strip().upper()
+            
+            text = row.get('question') or row.get('text') or row.get('soru') or ''
+            question = {
+                # Rows without an id get one derived from their content, so it stays
+                # stable across refreshes (content versions and bundle deltas rely on it)
+                'id': (
+                    row.get('question_id') or row.get('id') or row.get('soru_id') or
+                    str(uuid.uuid5(uuid.NAMESPACE_URL, f"{episode_id}:{text}"))
+                ),
+                'text': text,
+                'options': {
+                    'A': row.get('option_a') or row.get('a') or '',
+                    'B': row.get('option_b') or row.get('b') or '',
+                    'C': row.get('option_c') or row.get('c') or '',
+                    'D': row.get('option_d') or row.get('d') or ''
+                },
+                'correct_answer': correct_answer,
+                'difficulty': difficulty,
+                'points': points,
+                'episode_id': episode_id
+            }
+            
+            if question['text'] and any(question['options'].values()):
+                # Two rows with the same text in one episode (or a repeated sheet id) would
+                # share an id; later repeats get the occurrence number appended, in sheet order
+                base_id = question['id']
+                id_counts[base_id] = id_counts.get(base_id, 0) + 1
+                if id_counts[base_id] > 1:
+                    question['id'] = f"{base_id}-{id_counts[base_id]}"
+                    logger.warning(f"Duplicate question id {base_id}, using {question['id']}")
+                if episode_id not in questions_by_episode:
+                    questions_by_episode[episode_id] = []
+                questions_by_episode[episode_id].append(question)
+        except Exception as e:
+            logger.warning(f"Error parsing question row: {e}, row: {row}")
+            continue
+    
+    return questions_by_episode
+
+
+def _text(csv: Union[str, bytes]) -> str:
+    return csv.decode("utf-8") if isinstance(csv, bytes) else csv
+
+
+def build_snapshot(episodes_csv: Union[str, bytes], questions_csv: Union[str, bytes], version: int = 0) -> bytes:
+    """Parse both sheets (text or UTF-8 bytes) and encode the result as one snapshot buffer."""
+    episodes = build_episodes(parse_csv(_text(episodes_csv)))
+    questions_by_episode = build_questions(parse_csv(_text(questions_csv)))
+    return encode_snapshot(version, episodes, questions_by_episode)
+
+
+class ContentBuildPool:
+    """Runs ``build_snapshot`` away from the event loop.
+
+    One worker process is enough: builds are rare and callers already share
+    a single in-flight build. It is spawned (not forked, the app has driver
+    threads running) on the first build and kept for the next ones.
+    """
+
+    def __init__(self, mode: str = "process"):
+        if mode not in BUILD_MODES:
+            raise ValueError(f"Unknown content build mode {mode!r}, expected one of {', '.join(BUILD_MODES)}")
+        self.mode = mode
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.builds = 0
+        self.fallbacks = 0
+        self.last_build_ms: Optional[float] = None
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    async def build(self, episodes_csv: Union[str, bytes], questions_csv: Union[str, bytes]) -> bytes:
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        data = None
+        if self.mode == "process":
+            try:
+                data = await loop.run_in_executor(self._process_pool(), build_snapshot, episodes_csv, questions_csv)
+            except (BrokenProcessPool, OSError) as e:
+                logger.warning(f"Content build worker failed ({e!r}), building in a thread")
+                self.shutdown()
+                self.fallbacks += 1
+        if data is None:
+            if self.mode == "inline":
+                data = build_snapshot(episodes_csv, questions_csv)
+            else:
+                data = await loop.run_in_executor(None, build_snapshot, episodes_csv, questions_csv)
+        self.builds += 1
+        self.last_build_ms = (time.perf_counter() - start) * 1000
+        return data
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "builds": self.builds,
+            "fallbacks": self.fallbacks,
+            "last_build_ms": round(self.last_build_ms, 1) if self.last_build_ms is not None else None,
+        }
@@ -0,0 +1,91 @@
+"""Versioned content bundles for client-side caching.
+
+A bundle carries every episode and question of one content version in a
+compact row format::
+
+    {"format": 1, "version": "...", "base": null,
+     "episodes": [...], "fields": [...], "questions": [[...], ...]}
+
+When the client names the version it already has (``since``) and that version
+is still in the in-memory history, the bundle is a delta against it instead,
+with ``added``, ``changed`` and ``removed`` (question ids). Unknown or expired
+``since`` values get a full bundle. Bodies are built once per
+``(since, version)`` pair and kept pre-compressed.
+"""
+import json
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from cachetools import LRUCache
+
+from compression import PrecompressedBody
+
+BUNDLE_FORMAT = 1
+QUESTION_FIELDS = ["id", "episode_id", "text", "a", "b", "c", "d", "correct", "difficulty", "points"]
+
+
+def question_row(q: Dict) -> Tuple:
+    options = q["options"]
+    return (
+        q["id"], q["episode_id"], q["text"],
+        options.get("A", ""), options.get("B", ""), options.get("C", ""), options.get("D", ""),
+        q["correct_answer"], q["difficulty"], q["points"],
+    )
+
+
+def _encode(obj):
+    # Episodes may arrive as pydantic models; they are only dumped when a body is built
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _dumps(payload: Dict[str, Any]) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=_encode).encode("utf-8")
+
+
+class BundleBuilder:
+    def __init__(self, history_size: int = 5, cache_size: int = 32):
+        self.history_size = history_size
+        # version -> {question id: row}, oldest first
+        self._history: "OrderedDict[str, Dict[str, Tuple]]" = OrderedDict()
+        self._bodies: LRUCache = LRUCache(maxsize=cache_size)
+
+    def _rows(self, version: str, questions_by_episode: Dict[int, Any]) -> Dict[str, Tuple]:
+        rows = self._history.get(version)
+        if rows is None:
+            rows = {}
+            for episode_id in sorted(questions_by_episode):
+                for q in questions_by_episode[episode_id]:
+                    rows[q["id"]] = question_row(q)
+            self._history[version] = rows
+            while len(self._history) > self.history_size:
+                self._history.popitem(last=False)
+        return rows
+
+    def bundle(self, version: str, episodes: List[Any],
+               questions_by_episode: Dict[int, Any], since: Optional[str] = None) -> PrecompressedBody:
+        """Full bundle, or a delta when ``since`` is a version still in history."""
+        base = since if since and since != version and since in self._history else None
+        key = (base, version)
+        body = self._bodies.get(key)
+        if body is not None:
+            return body
+
+        rows = self._rows(version, questions_by_episode)
+        payload: Dict[str, Any] = {
+            "format": BUNDLE_FORMAT,
+            "version": version,
+            "base": base,
+            "episodes": episodes,
+            "fields": QUESTION_FIELDS,
+        }
+        if base is None:
+            payload["questions"] = list(rows.values())
+        else:
+            old = self._history[base]
+            payload["added"] = [row for qid, row in rows.items() if qid not in old]
+            payload["changed"] = [row for qid, row in rows.items() if qid in old and old[qid] != row]
+            payload["removed"] = [qid for qid in old if qid not in rows]
+        body = self._bodies[key] = PrecompressedBody(_dumps(payload))
+        return body
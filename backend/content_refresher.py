@@ -0,0 +1,62 @@
+"""Content refresher for multi-worker deployments.
+
+Run exactly one of these next to the uvicorn workers. It fetches both sheets,
+builds the episode list and question bank once, and publishes a memory-mapped
+snapshot into ``CONTENT_SNAPSHOT_DIR`` whenever the content changes. Workers
+started with the same ``CONTENT_SNAPSHOT_DIR`` pick up new versions on their
+own, without restarting.
+
+    CONTENT_SNAPSHOT_DIR=/var/run/tasacak python content_refresher.py --interval 300
+    CONTENT_SNAPSHOT_DIR=/var/run/tasacak uvicorn server:app --workers 4
+"""
+import argparse
+import asyncio
+import logging
+import os
+
+# This process serves no requests, so it builds in line rather than in a worker
+os.environ.setdefault("CONTENT_BUILD_MODE", "inline")
+
+from server import fetch_content  # noqa: E402
+from snapshot import MappedSnapshot, check_content, publish_snapshot  # noqa: E402
+
+logger = logging.getLogger("content_refresher")
+
+
+async def refresh_once(directory: str):
+    """Fetch both sheets and publish a snapshot if the content changed (and is not empty)."""
+    data = await fetch_content()
+    check_content(MappedSnapshot.from_bytes(data))
+    path = publish_snapshot(directory, data)
+    if path is None:
+        logger.info("Content unchanged, keeping current snapshot")
+    return path
+
+
+async def run(directory: str, interval: float):
+    while True:
+        try:
+            await refresh_once(directory)
+        except Exception as e:
+            # Workers keep serving the last published snapshot
+            logger.error(f"Content refresh failed: {e}")
+        await asyncio.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=os.environ.get("CONTENT_SNAPSHOT_DIR"))
+    parser.add_argument("--interval", type=float, default=300.0, help="seconds between Sheets fetches")
+    parser.add_argument("--once", action="store_true", help="publish one snapshot and exit")
+    args = parser.parse_args()
+    if not args.dir:
+        parser.error("--dir or CONTENT_SNAPSHOT_DIR is required")
+
+    if args.once:
+        asyncio.run(refresh_once(args.dir))
+    else:
+        asyncio.run(run(args.dir, args.interval))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Fleet-wide content coherence through MongoDB.
+
+Every instance started with ``CONTENT_SOURCE=mongo`` serves the newest version
+stored in the ``content_snapshots`` collection instead of keeping its own
+Sheets timer. One leader, elected with the ``content_refresh`` lease, fetches
+Sheets every ``refresh_interval`` seconds (or when a refresh is requested) and
+inserts a new version when the content changed. The others notice the new
+version by polling the indexed ``version`` field, or sooner through a change
+stream when the deployment supports one.
+
+The unique index on ``version`` is created with the app's other indexes on
+startup; until they exist (``ready()``), an instance loads versions but does
+not publish any. Content without episodes or questions is never published.
+
+Versions are stored as zlib-compressed snapshot buffers (see ``snapshot.py``),
+so an instance loads a new version with one document read and serves it without
+rebuilding the question bank.
+
+The poll runs as the ``content_sync`` job of the app's scheduler (see
+``scheduler.py``); the change stream triggers it early.
+
+The lease is short, so a dead leader is replaced within seconds. A refresh
+(Sheets fetch with its 30 s timeout, then the build) can take longer, so the
+leader renews the lease while it runs. A failed fetch is recorded on the lease
+(``last_failure_at``), and the next attempt waits ``retry_interval`` instead
+of hitting Sheets on every poll while it is down.
+"""
+import asyncio
+import logging
+import zlib
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional
+
+from bson import Binary
+from pymongo.errors import DuplicateKeyError
+
+from lease import MongoLease
+from scheduler import Scheduler
+from snapshot import MappedSnapshot, check_content, restamp_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Fetches Sheets and returns the built content as a snapshot buffer (any version)
+ContentBuilder = Callable[[], Awaitable[bytes]]
+
+KEEP_VERSIONS = 5
+
+
+class ContentSync:
+    def __init__(self, db, build_content: ContentBuilder, poll_interval: float = 5.0,
+                 refresh_interval: float = 300.0, use_change_stream: bool = False,
+                 ready: Callable[[], bool] = lambda: True, retry_interval: float = 30.0):
+        self.db = db
+        self.ready = ready
+        self.build_content = build_content
+        self.poll_interval = poll_interval
+        self.refresh_interval = refresh_interval
+        self.retry_interval = min(retry_interval, refresh_interval)
+        self.use_change_stream = use_change_stream
+        self.lease = MongoLease(db.leases, "content_refresh", ttl=max(3 * poll_interval, 15.0))
+        self.current: Optional[MappedSnapshot] = None
+        self.scheduler: Optional[Scheduler] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self, scheduler: Scheduler):
+        try:
+            await self.check_version()
+        except Exception as e:
+            logger.warning(f"Could not load content from MongoDB yet: {e}")
+        self.scheduler = scheduler
+        scheduler.every("content_sync", self.poll_interval, self.tick, run_at_start=True,
+                        timeout=max(self.lease.ttl, 60.0))
+        if self.use_change_stream:
+            self._tasks.append(asyncio.create_task(self._watch()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.lease.release()
+
+    @property
+    def version(self) -> int:
+        return self.current.version if self.current else 0
+
+    async def check_version(self) -> bool:
+        """Load the newest stored version if it is ahead of ours."""
+        latest = await self.db.content_snapshots.find_one(
+            {}, projection={"version": 1}, sort=[("version", -1)]
+        )
+        if not latest or latest["version"] <= self.version:
+            return False
+        return await self.load(latest["version"])
+
+    async def load(self, version: int) -> bool:
+        doc = await self.db.content_snapshots.find_one({"version": version})
+        if not doc:
+            return False
+        snapshot = MappedSnapshot.from_bytes(zlib.decompress(doc["payload"]), path=f"mongo:v{version}")
+        if snapshot.version > self.version:
+            self.current = snapshot
+            logger.info(f"Serving content version {snapshot.version} ({snapshot.count} questions)")
+        return True
+
+    async def request_refresh(self) -> bool:
+        """Ask the leader for an immediate Sheets fetch; refresh here if we lead."""
+        if self.ready() and await self.lease.acquire():
+            await self.refresh()
+            return True
+        await self.lease.update({"refresh_requested_at": datetime.utcnow()})
+        return False
+
+    async def refresh(self) -> bool:
+        """Fetch Sheets and store a new version if the content changed (leader only)."""
+        renewal = asyncio.create_task(self._renew_lease())
+        try:
+            return await self._refresh()
+        finally:
+            renewal.cancel()
+            await asyncio.gather(renewal, return_exceptions=True)
+
+    async def _renew_lease(self):
+        while True:
+            await asyncio.sleep(self.lease.ttl / 3)
+            await self.lease.acquire()
+
+    async def _refresh(self) -> bool:
+        try:
+            data = await self.build_content()
+            digest = check_content(MappedSnapshot.from_bytes(data)).digest
+        except Exception:
+            await self.lease.update({"last_failure_at": datetime.utcnow(), "refresh_requested_at": None})
+            raise
+        # Recorded on the lease so a newly elected leader does not refetch early
+        await self.lease.update({"last_fetch_at": datetime.utcnow(), "last_failure_at": None,
+                                 "refresh_requested_at": None})
+        if not self.lease.held:
+            return False  # lost the lease meanwhile; the new leader publishes
+
+        latest = await self.db.content_snapshots.find_one(
+            {}, projection={"version": 1, "digest": 1}, sort=[("version", -1)]
+        )
+        if latest and latest["digest"] == digest:
+            if latest["version"] > self.version:
+                await self.load(latest["version"])
+            return False
+
+        version = (latest["version"] if latest else 0) + 1
+        data = restamp_snapshot(data, version)
+        try:
+            await self.db.content_snapshots.insert_one({
+                "version": version,
+                "digest": digest,
+                "created_at": datetime.utcnow(),
+                "created_by": self.lease.holder,
+                "payload": Binary(zlib.compress(data, 6)),
+            })
+        except DuplicateKeyError:
+            # A previous leader published the same version number first
+            await self.check_version()
+            return False
+        self.current = MappedSnapshot.from_bytes(data, path=f"mongo:v{version}")
+        logger.info(f"Published content version {version} ({len(data)} bytes, digest {digest})")
+        await self.db.content_snapshots.delete_many({"version": {"$lte": version - KEEP_VERSIONS}})
+        return True
+
+    async def tick(self):
+        await self.check_version()
+        # Versions are unique only once the index exists
+        if not self.ready() or not await self.lease.acquire():
+            return
+        lease_doc = self.lease.document or {}
+        now = datetime.utcnow()
+        failed = lease_doc.get("last_failure_at")
+        if failed is not None and (now - failed).total_seconds() < self.retry_interval:
+            return
+        last_fetch = lease_doc.get("last_fetch_at")
+        due = last_fetch is None or (now - last_fetch).total_seconds() >= self.refresh_interval
+        if due or lease_doc.get("refresh_requested_at") is not None or self.current is None:
+            await self.refresh()
+
+    async def _watch(self):
+        """Run the poll job as soon as another instance inserts a version."""
+        try:
+            async with self.db.content_snapshots.watch([{"$match": {"operationType": "insert"}}]) as stream:
+                async for _ in stream:
+                    self.scheduler.trigger("content_sync")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Content change stream unavailable, polling every {self.poll_interval}s: {e}")
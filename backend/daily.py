@@ -0,0 +1,67 @@
+"""Daily challenge: one shared quiz per day.
+
+The quiz for a day is generated from a seed derived from the day and the
+content version, so every instance builds the same questions in the same order.
+The first build of a day is pinned in MongoDB (``daily_quizzes``), and every
+instance serves that one for the rest of the day, even after a content refresh.
+Each instance loads it once per day, on the first request or in the
+``daily_warm`` job that runs just before midnight. The result is kept as a
+pre-serialized body, and every later request for that day is a cache hit.
+Concurrent first requests share one load (single-flight).
+
+Days follow Europe/Istanbul time.
+"""
+import asyncio
+import hashlib
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+from zoneinfo import ZoneInfo
+
+from cachetools import LRUCache
+
+TIMEZONE = ZoneInfo("Europe/Istanbul")
+
+
+def today(now: Optional[datetime] = None) -> date:
+    return (now or datetime.now(TIMEZONE)).astimezone(TIMEZONE).date()
+
+
+def daily_seed(day: date, version: str) -> int:
+    return int(hashlib.sha256(f"{day.isoformat()}:{version}".encode()).hexdigest()[:16], 16)
+
+
+class DailyQuizCache:
+    """Built daily quizzes keyed by day, with single-flight builds."""
+
+    def __init__(self, maxsize: int = 4):
+        self._entries: LRUCache = LRUCache(maxsize=maxsize)
+        self._building: Dict[date, asyncio.Future] = {}
+        self.builds = 0
+
+    async def get(self, day: date, build: Callable[[], Awaitable[Any]]) -> Any:
+        key = day
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+        pending = self._building.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._building[key] = future
+        try:
+            entry = await build()
+            self.builds += 1
+            self._entries[key] = entry
+            future.set_result(entry)
+            return entry
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters get the error; nobody else needs to retrieve it
+            future.exception()
+            raise
+        finally:
+            del self._building[key]
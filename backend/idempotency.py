@@ -0,0 +1,145 @@
+"""Idempotent score submissions keyed by client-generated run ids.
+
+Clients may send a ``run_id`` with a score: any string generated once per
+finished run, such as a UUID. The first submission of a run is processed and
+its response stored. Retries of the same run get that response back and write
+nothing.
+
+Recent runs stay in a bounded in-memory LRU, so a burst of retries reaching
+the same instance costs no database access. Duplicates that arrive while the
+first submission is still being processed wait for its response. Every run is
+also claimed in the ``score_runs`` collection (``_id`` is the run key) before
+it is processed; a TTL index removes claims after ``SCORE_RUN_TTL`` seconds.
+The claim catches retries that land on another instance or arrive after a
+restart, including ones racing the original submission.
+
+A claim without a response whose ``claimed_at`` is older than ``stale_after``
+belongs to an instance that died mid-run (crash, OOM kill, deploy) and will
+never answer. A retry takes it over with a conditional ``find_one_and_update``
+and processes the run itself, so the score is not lost until the TTL.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from cachetools import LRUCache
+from pymongo.errors import DuplicateKeyError
+
+Response = Dict[str, Any]
+
+
+class RunInProgress(Exception):
+    """Another instance is still processing this run."""
+
+
+def run_key(scope: str, player_name: str, run_id: str) -> str:
+    return f"{scope}:{player_name}:{run_id}"
+
+
+class IdempotencyStore:
+    def __init__(self, maxsize: int = 10000, wait_timeout: float = 5.0, poll_interval: float = 0.05,
+                 stale_after: Optional[float] = None):
+        self._responses: LRUCache = LRUCache(maxsize=maxsize)
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        # Long enough for any live submission to finish; defaults to a few wait timeouts
+        self.stale_after = stale_after if stale_after is not None else 6 * wait_timeout
+        self.processed = 0
+        self.taken_over = 0
+        self.memory_hits = 0
+        self.joined = 0
+        self.stored_hits = 0
+
+    async def run(self, collection, key: str, handler: Callable[[], Awaitable[Response]],
+                  admit: Optional[Callable[[], Awaitable[None]]] = None) -> Response:
+        """Return the response of run ``key``, calling ``handler`` only for its first submission.
+
+        ``admit`` (e.g. a rate limit check) runs only when this call will process
+        the run, so retries answered from memory are not charged for it.
+        """
+        response = self._responses.get(key)
+        if response is not None:
+            self.memory_hits += 1
+            return response
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.joined += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            if admit is not None:
+                await admit()
+            response = await self._claim(collection, key, handler)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # retrieved, even if nobody else was waiting
+            raise
+        else:
+            future.set_result(response)
+            self._responses[key] = response
+            return response
+        finally:
+            del self._pending[key]
+
+    async def _claim(self, collection, key: str, handler: Callable[[], Awaitable[Response]]) -> Response:
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            claimed_at = datetime.utcnow()
+            try:
+                await collection.insert_one({"_id": key, "created_at": claimed_at, "claimed_at": claimed_at})
+            except DuplicateKeyError:
+                doc = await collection.find_one({"_id": key})
+                if doc is not None and "response" in doc:
+                    self.stored_hits += 1
+                    return doc["response"]
+                if doc is None:
+                    continue  # the first attempt failed and released its claim
+                if await self._take_over(collection, doc, claimed_at):
+                    break
+                if time.monotonic() >= deadline:
+                    raise RunInProgress(key)
+                await asyncio.sleep(self.poll_interval)
+                continue
+            break
+
+        try:
+            response = await handler()
+        except BaseException:
+            # Release the claim so the client's retry is processed (unless another retry took it over)
+            await asyncio.shield(collection.delete_one({"_id": key, "claimed_at": claimed_at}))
+            raise
+        await collection.update_one({"_id": key}, {"$set": {"response": response}})
+        self.processed += 1
+        return response
+
+    async def _take_over(self, collection, doc: Dict[str, Any], claimed_at: datetime) -> bool:
+        """Move a stale response-less claim to this attempt; False if it is live or another retry won"""
+        field = "claimed_at" if "claimed_at" in doc else "created_at"  # claims from before claimed_at
+        if doc[field] > claimed_at - timedelta(seconds=self.stale_after):
+            return False
+        taken = await collection.find_one_and_update(
+            {"_id": doc["_id"], field: doc[field], "response": {"$exists": False}},
+            {"$set": {"claimed_at": claimed_at}},
+        )
+        if taken is None:
+            return False
+        self.taken_over += 1
+        return True
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "cached": len(self._responses),
+            "pending": len(self._pending),
+            "processed": self.processed,
+            "memory_hits": self.memory_hits,
+            "joined": self.joined,
+            "stored_hits": self.stored_hits,
+            "taken_over": self.taken_over,
+        }
@@ -0,0 +1,142 @@
+"""Index migration, run in the background on startup.
+
+The wanted indexes of each collection are compared with ``index_information()``
+and only the missing ones are created, in one ``create_indexes`` call per
+collection, so a restart against an indexed database costs one read per
+collection. The app serves traffic meanwhile; queries just run without an index
+until it is built.
+
+An index whose keys already exist with other options (or under another name) is
+left alone and reported, since creating it would fail.
+
+Collections that need creation options (a time-series collection) are created
+first, when missing, as an insert or an index would create them without. A
+server that rejects the options (time-series needs MongoDB 5.0) is logged, and
+the collection is then created as a regular one.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import IndexModel
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Options that make two indexes on the same keys different
+_INDEX_OPTIONS = ("unique", "expireAfterSeconds", "sparse", "partialFilterExpression")
+
+
+def _key(spec) -> Tuple[Tuple[str, Any], ...]:
+    items = spec.items() if hasattr(spec, "items") else spec
+    # The server may report directions as floats
+    return tuple((field, direction if isinstance(direction, str) else int(direction)) for field, direction in items)
+
+
+def _options(spec: Dict[str, Any]) -> Dict[str, Any]:
+    return {option: spec[option] for option in _INDEX_OPTIONS if spec.get(option) not in (None, False)}
+
+
+async def ensure_indexes(db, wanted: Dict[str, List[IndexModel]]) -> Dict[str, List[str]]:
+    """Create the missing indexes of every collection in ``wanted`` (concurrently)."""
+    report: Dict[str, List[str]] = {"created": [], "existing": [], "conflicts": []}
+
+    async def migrate(collection_name: str, models: List[IndexModel]):
+        collection = db[collection_name]
+        existing = {_key(info["key"]): info for info in (await collection.index_information()).values()}
+        missing = []
+        for model in models:
+            spec = model.document
+            label = f"{collection_name}.{spec['name']}"
+            current = existing.get(_key(spec["key"]))
+            if current is None:
+                missing.append(model)
+            elif _options(current) == _options(spec):
+                report["existing"].append(label)
+            else:
+                logger.warning(f"Index {label} exists with different options: {_options(current)}")
+                report["conflicts"].append(label)
+        if missing:
+            names = await collection.create_indexes(missing)
+            report["created"].extend(f"{collection_name}.{name}" for name in names)
+
+    await asyncio.gather(*(migrate(name, models) for name, models in wanted.items()))
+    return report
+
+
+async def ensure_collections(db, options: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Create the collections of ``options`` that do not exist yet, with their options."""
+    existing = set(await db.list_collection_names())
+    created = []
+    for name, collection_options in options.items():
+        if name in existing:
+            continue
+        try:
+            await db.create_collection(name, **collection_options)
+        except CollectionInvalid:
+            continue  # created meanwhile, e.g. by another instance
+        except OperationFailure as e:
+            logger.warning(f"Collection {name} created without its options {list(collection_options)}: {e}")
+            continue
+        created.append(name)
+    return created
+
+
+class IndexMigration:
+    """Runs ``ensure_indexes`` until it succeeds, backing off between attempts."""
+
+    def __init__(self, db, wanted: Dict[str, List[IndexModel]], collections: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.db = db
+        self.wanted = wanted
+        self.collections = collections or {}
+        self.collections_ready = not self.collections
+        self.status = "pending"
+        self.attempts = 0
+        self.report: Optional[Dict[str, List[str]]] = None
+        self.last_error: Optional[str] = None
+        self.duration_ms: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status == "done"
+
+    async def run(self, retry_delay: float = 1.0, max_delay: float = 60.0):
+        start = time.perf_counter()
+        delay = retry_delay
+        while True:
+            self.attempts += 1
+            self.status = "running"
+            try:
+                if not self.collections_ready:
+                    created = await ensure_collections(self.db, self.collections)
+                    self.collections_ready = True
+                    if created:
+                        logger.info(f"Created collections {', '.join(created)}")
+                self.report = await ensure_indexes(self.db, self.wanted)
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.status = "retrying"
+                self.last_error = str(e)
+                logger.warning(f"Index migration failed (attempt {self.attempts}), retrying in {delay:.0f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, max_delay)
+        self.status = "done"
+        self.last_error = None
+        self.duration_ms = round((time.perf_counter() - start) * 1000, 3)
+        logger.info(
+            f"Index migration done in {self.duration_ms} ms: {len(self.report['created'])} created, "
+            f"{len(self.report['existing'])} existing, {len(self.report['conflicts'])} conflicting"
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "collections_ready": self.collections_ready,
+            "attempts": self.attempts,
+            "duration_ms": self.duration_ms,
+            "last_error": self.last_error,
+            **({k: len(v) for k, v in self.report.items()} if self.report else {}),
+        }
@@ -0,0 +1,65 @@
+"""Leader lease stored in MongoDB.
+
+One document per lease name in the ``leases`` collection records the holder and
+an expiry. ``acquire()`` both takes a free or expired lease and renews one this
+instance already holds, so callers simply call it on every tick.
+"""
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+INSTANCE_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+class MongoLease:
+    def __init__(self, collection, name: str, ttl: float = 30.0, holder: str = INSTANCE_ID):
+        self.collection = collection
+        self.name = name
+        self.ttl = ttl
+        self.holder = holder
+        self.held = False
+        self.document: Optional[Dict[str, Any]] = None
+
+    async def acquire(self) -> bool:
+        """Take or renew the lease; the lease document is kept in ``document``."""
+        now = datetime.utcnow()
+        try:
+            self.document = await self.collection.find_one_and_update(
+                {"_id": self.name, "$or": [
+                    {"expires_at": {"$lt": now}},
+                    {"expires_at": {"$exists": False}},
+                    {"holder": self.holder},
+                ]},
+                {"$set": {"holder": self.holder, "expires_at": now + timedelta(seconds=self.ttl)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Held by someone else and not yet expired
+            self.document = None
+        was_held, self.held = self.held, self.document is not None
+        if self.held and not was_held:
+            logger.info(f"Acquired lease '{self.name}' as {self.holder}")
+        elif was_held and not self.held:
+            logger.info(f"Lost lease '{self.name}'")
+        return self.held
+
+    async def update(self, fields: Dict[str, Any]):
+        """Set extra fields on the lease document regardless of who holds it."""
+        await self.collection.update_one({"_id": self.name}, {"$set": fields}, upsert=True)
+
+    async def release(self):
+        if self.held:
+            await self.collection.update_one(
+                {"_id": self.name, "holder": self.holder},
+                {"$set": {"expires_at": datetime.utcnow()}},
+            )
+            self.held = False
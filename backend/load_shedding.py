@@ -0,0 +1,177 @@
+"""Per-route concurrency limits with bounded wait queues.
+
+Every API route belongs to a budget (``RouteLimits`` maps method and path
+prefix to one). A budget runs at most ``limit`` requests at once. Up to
+``queue_size`` more wait in FIFO order for at most ``queue_timeout`` seconds.
+Past that a request is rejected straight away with 503 and ``Retry-After``,
+before any routing, parsing or database work. When MongoDB or Google Sheets
+slows down, requests therefore stop piling up in the event loop. Cheap
+in-memory routes have their own budget, so slow score writes cannot take their
+slots.
+
+Budgets are set in ``server.py``. ``ROUTE_BUDGETS`` (``name=limit:queue[:timeout]``
+pairs, comma separated) overrides them.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+
+class Overloaded(Exception):
+    def __init__(self, budget: str, retry_after: int):
+        super().__init__(f"Budget {budget} is full")
+        self.budget = budget
+        self.retry_after = retry_after
+
+
+class RouteBudget:
+    def __init__(self, name: str, limit: int, queue_size: int, queue_timeout: float = 2.0, retry_after: int = 1):
+        if limit < 1 or queue_size < 0:
+            raise ValueError(f"Budget {name} needs limit >= 1 and queue_size >= 0")
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.max_active = 0
+        self.max_waiting = 0
+        self.wait_total_ms = 0.0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _admit(self):
+        self.active += 1
+        self.admitted += 1
+        self.max_active = max(self.max_active, self.active)
+
+    async def acquire(self):
+        if self.active < self.limit and not self._waiters:
+            self._admit()
+            return
+        if len(self._waiters) >= self.queue_size:
+            self.rejected += 1
+            raise Overloaded(self.name, self.retry_after)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        self.max_waiting = max(self.max_waiting, len(self._waiters))
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up: pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise Overloaded(self.name, self.retry_after) from None
+            raise
+        finally:
+            self.wait_total_ms += (time.perf_counter() - start) * 1000
+
+    def release(self):
+        # Hand the slot straight to the oldest waiter, so newcomers cannot jump the queue
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.admitted += 1
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_active": self.max_active,
+            "max_waiting": self.max_waiting,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "wait_avg_ms": round(self.wait_total_ms / self.queued, 3) if self.queued else None,
+        }
+
+
+class RouteLimits:
+    """Ordered ``(method, path prefix, budget)`` rules; the first match wins.
+
+    A ``None`` method matches any method and a ``None`` budget leaves the route
+    unlimited.
+    """
+
+    def __init__(self, budgets: Iterable[RouteBudget], rules: List[Tuple[Optional[str], str, Optional[str]]]):
+        self.budgets = {b.name: b for b in budgets}
+        self.rules = rules
+        for _, _, name in rules:
+            if name is not None and name not in self.budgets:
+                raise ValueError(f"Unknown budget {name!r}")
+
+    def match(self, method: str, path: str) -> Optional[RouteBudget]:
+        for rule_method, prefix, name in self.rules:
+            if (rule_method is None or rule_method == method) and path.startswith(prefix):
+                return self.budgets[name] if name is not None else None
+        return None
+
+    def configure(self, overrides: str):
+        """Apply ``name=limit:queue[:timeout]`` overrides."""
+        for item in filter(None, (part.strip() for part in overrides.split(","))):
+            name, _, spec = item.partition("=")
+            budget = self.budgets.get(name.strip())
+            values = spec.split(":")
+            if budget is None or len(values) not in (2, 3):
+                raise ValueError(f"Invalid route budget {item!r}")
+            budget.limit, budget.queue_size = int(values[0]), int(values[1])
+            if len(values) == 3:
+                budget.queue_timeout = float(values[2])
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        return {name: budget.as_dict() for name, budget in self.budgets.items()}
+
+
+class LoadSheddingMiddleware:
+    """Admit each request through its route's budget or reject it with 503."""
+
+    def __init__(self, app, limits: RouteLimits):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        budget = self.limits.match(scope["method"], scope["path"])
+        if budget is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await budget.acquire()
+        except Overloaded as e:
+            response = JSONResponse(
+                {"detail": "Sunucu şu anda çok yoğun, lütfen biraz sonra tekrar deneyin"},
+                status_code=503,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            budget.release()
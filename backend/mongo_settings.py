@@ -0,0 +1,253 @@
+"""MongoDB client settings and connection pool metrics.
+
+``MongoSettings.from_env()`` reads typed settings from ``MONGO_*`` environment
+variables (see ``ENV``), validating them at startup rather than on the first
+query. Only the options whose variable is set are passed to the driver, so
+unset ones keep the driver defaults and whatever ``MONGO_URL`` specifies. They
+cover:
+
+- the connection pool and timeouts of the main client;
+- wire compression;
+- an optional second client with its own pool (``MONGO_READ_POOL_SIZE``) for
+  leaderboard and stats reads, so a burst of score writes cannot hold every
+  connection while reads wait;
+- the read preference of those reads, e.g. ``nearest`` with a bounded
+  ``MONGO_LEADERBOARD_MAX_STALENESS`` (at least 90 seconds, as MongoDB requires);
+- the write concern of score writes.
+
+``PoolMetrics`` is a pymongo connection pool listener that counts checkouts and
+measures how long each one waited for a connection.
+"""
+import os
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Mapping, Optional, Tuple, Union
+
+from pymongo import WriteConcern, monitoring
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+MIN_MAX_STALENESS = 90
+
+
+@dataclass(frozen=True)
+class MongoSettings:
+    max_pool_size: Optional[int] = None
+    min_pool_size: Optional[int] = None
+    max_idle_time_ms: Optional[int] = None
+    wait_queue_timeout_ms: Optional[int] = None
+    connect_timeout_ms: Optional[int] = None
+    server_selection_timeout_ms: Optional[int] = None
+    socket_timeout_ms: Optional[int] = None
+    compressors: Tuple[str, ...] = ()
+    zlib_compression_level: Optional[int] = None
+    read_pool_size: int = 0
+    leaderboard_read_preference: str = "primary"
+    leaderboard_max_staleness: Optional[int] = None
+    score_write_concern: Union[str, int] = "majority"
+    score_wtimeout_ms: Optional[int] = 5000
+    score_journal: Optional[bool] = None
+
+    # Environment variable of each setting
+    ENV = {
+        "max_pool_size": "MONGO_MAX_POOL_SIZE",
+        "min_pool_size": "MONGO_MIN_POOL_SIZE",
+        "max_idle_time_ms": "MONGO_MAX_IDLE_TIME_MS",
+        "wait_queue_timeout_ms": "MONGO_WAIT_QUEUE_TIMEOUT_MS",
+        "connect_timeout_ms": "MONGO_CONNECT_TIMEOUT_MS",
+        "server_selection_timeout_ms": "MONGO_SERVER_SELECTION_TIMEOUT_MS",
+        "socket_timeout_ms": "MONGO_SOCKET_TIMEOUT_MS",
+        "compressors": "MONGO_COMPRESSORS",
+        "zlib_compression_level": "MONGO_ZLIB_COMPRESSION_LEVEL",
+        "read_pool_size": "MONGO_READ_POOL_SIZE",
+        "leaderboard_read_preference": "MONGO_LEADERBOARD_READ_PREFERENCE",
+        "leaderboard_max_staleness": "MONGO_LEADERBOARD_MAX_STALENESS",
+        "score_write_concern": "MONGO_SCORE_WRITE_CONCERN",
+        "score_wtimeout_ms": "MONGO_SCORE_WTIMEOUT_MS",
+        "score_journal": "MONGO_SCORE_JOURNAL",
+    }
+
+    def __post_init__(self):
+        if self.max_pool_size is not None and self.max_pool_size < 1:
+            raise ValueError("MONGO_MAX_POOL_SIZE must be at least 1")
+        if self.min_pool_size is not None and not 0 <= self.min_pool_size <= (self.max_pool_size or self.min_pool_size):
+            raise ValueError("MongoDB pool sizes need 0 <= min_pool_size <= max_pool_size")
+        if self.read_pool_size < 0:
+            raise ValueError("MONGO_READ_POOL_SIZE cannot be negative")
+        if self.leaderboard_read_preference not in READ_PREFERENCES:
+            raise ValueError(f"Unknown read preference {self.leaderboard_read_preference!r}, "
+                             f"expected one of {', '.join(READ_PREFERENCES)}")
+        if self.leaderboard_max_staleness is not None:
+            if self.leaderboard_read_preference == "primary":
+                raise ValueError("Max staleness cannot be combined with the primary read preference")
+            if self.leaderboard_max_staleness < MIN_MAX_STALENESS:
+                raise ValueError(f"Max staleness must be at least {MIN_MAX_STALENESS} seconds")
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = os.environ) -> "MongoSettings":
+        values: Dict[str, Any] = {}
+        for name, variable in cls.ENV.items():
+            raw = environ.get(variable, "").strip()
+            if not raw:
+                continue
+            try:
+                values[name] = _parse(name, raw)
+            except ValueError:
+                raise ValueError(f"Invalid value for {variable}: {raw!r}") from None
+        return cls(**values)
+
+    def client_options(self, max_pool_size: Optional[int] = None) -> Dict[str, Any]:
+        """Keyword arguments for ``AsyncIOMotorClient``: only the settings that were given."""
+        pool_size = max_pool_size or self.max_pool_size
+        min_pool_size = self.min_pool_size
+        if min_pool_size is not None and pool_size is not None:
+            min_pool_size = min(min_pool_size, pool_size)
+        optional = {
+            "maxPoolSize": pool_size,
+            "minPoolSize": min_pool_size,
+            "connectTimeoutMS": self.connect_timeout_ms,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+            "maxIdleTimeMS": self.max_idle_time_ms,
+            "waitQueueTimeoutMS": self.wait_queue_timeout_ms,
+            "socketTimeoutMS": self.socket_timeout_ms,
+            "zlibCompressionLevel": self.zlib_compression_level,
+        }
+        options: Dict[str, Any] = {k: v for k, v in optional.items() if v is not None}
+        if self.compressors:
+            options["compressors"] = ",".join(self.compressors)
+        return options
+
+    def leaderboard_reads(self):
+        """Read preference of leaderboard and stats queries."""
+        preference = READ_PREFERENCES[self.leaderboard_read_preference]
+        if preference is Primary:
+            return Primary()
+        return preference(max_staleness=self.leaderboard_max_staleness or -1)
+
+    def score_writes(self) -> WriteConcern:
+        """Write concern of score writes."""
+        return WriteConcern(w=self.score_write_concern, wtimeout=self.score_wtimeout_ms, j=self.score_journal)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _parse(name: str, raw: str) -> Any:
+    if name == "compressors":
+        return tuple(c.strip() for c in raw.split(",") if c.strip())
+    if name == "leaderboard_read_preference":
+        return raw
+    if name == "score_write_concern":
+        return int(raw) if raw.isdigit() else raw
+    if name == "score_journal":
+        if raw.lower() not in ("1", "0", "true", "false"):
+            raise ValueError(raw)
+        return raw.lower() in ("1", "true")
+    return int(raw)
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Checkouts, connections and checkout wait times of one client's pools.
+
+    pymongo calls the listener from the thread doing the checkout (Motor's
+    executor threads), so the start of each checkout is kept thread-locally.
+    """
+
+    WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.checkouts = 0
+        self.checkout_failures: Counter = Counter()
+        self.in_use = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.connections = 0
+        self.connections_created = 0
+        self.pool_clears = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.wait_histogram = [0] * (len(self.WAIT_BUCKETS_MS) + 1)
+
+    def _checkout_done(self) -> float:
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        self.waiting -= 1
+        return (time.perf_counter() - started) * 1000 if started is not None else 0.0
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            waited = self._checkout_done()
+            self.checkouts += 1
+            self.in_use += 1
+            self.wait_total_ms += waited
+            self.wait_max_ms = max(self.wait_max_ms, waited)
+            bucket = next((i for i, b in enumerate(self.WAIT_BUCKETS_MS) if waited <= b), len(self.WAIT_BUCKETS_MS))
+            self.wait_histogram[bucket] += 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self._checkout_done()
+            self.checkout_failures[str(event.reason)] += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections += 1
+            self.connections_created += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections -= 1
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            labels = [f"<={b}ms" for b in self.WAIT_BUCKETS_MS] + [f">{self.WAIT_BUCKETS_MS[-1]}ms"]
+            return {
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "in_use": self.in_use,
+                "waiting": self.waiting,
+                "max_waiting": self.max_waiting,
+                "connections": self.connections,
+                "connections_created": self.connections_created,
+                "pool_clears": self.pool_clears,
+                "wait_avg_ms": round(self.wait_total_ms / self.checkouts, 3) if self.checkouts else None,
+                "wait_max_ms": round(self.wait_max_ms, 3),
+                "wait_histogram": dict(zip(labels, self.wait_histogram)),
+            }
@@ -0,0 +1,102 @@
+"""Global ranks from in-memory score arrays, for group leaderboards.
+
+Ranking a group of players one by one takes a ``count_documents`` per player.
+Instead, ``RankIndex`` keeps every score of a board in one sorted array,
+loaded with a single projected ``find`` and kept for ``max_age`` seconds. A
+player's rank is then a bisect: the number of strictly higher scores plus one,
+the same rank the single-player leaderboard endpoints give. Concurrent
+requests for a board that is loading wait for the same load.
+
+Scores are stored as 8-byte integers. Building the array runs in a thread, so
+requests keep being served meanwhile. Ranks may lag the board by up to
+``max_age``; the group's own scores are read fresh.
+
+Only the top ``max_scores`` scores of a board are kept: loading a whole board
+of a million players every ``max_age`` seconds, on every instance, would move
+far more data than the ranks are worth. On a larger board ``rank`` returns
+None below the lowest kept score, and the caller counts those ranks itself.
+"""
+import asyncio
+import bisect
+import time
+from array import array
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional
+
+from cachetools import LRUCache
+
+
+class BoardRanks:
+    __slots__ = ("scores", "loaded_at", "complete")
+
+    def __init__(self, scores: Iterable[int], loaded_at: float, max_scores: Optional[int] = None):
+        scores = sorted(scores)
+        self.complete = max_scores is None or len(scores) <= max_scores
+        self.scores = array("q", scores if self.complete else scores[len(scores) - max_scores:])
+        self.loaded_at = loaded_at
+
+    @property
+    def total(self) -> Optional[int]:
+        """Scores on the board; None when only the top of it was kept."""
+        return len(self.scores) if self.complete else None
+
+    def rank(self, score: int) -> Optional[int]:
+        """1 + the number of scores strictly higher than ``score``; None if below the kept top."""
+        if not self.complete and (not self.scores or score < self.scores[0]):
+            return None
+        return len(self.scores) - bisect.bisect_right(self.scores, score) + 1
+
+
+class RankIndex:
+    def __init__(self, max_age: float = 30.0, maxsize: int = 64, max_scores: Optional[int] = 100_000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_age = max_age
+        self.max_scores = max_scores
+        self.clock = clock
+        self._boards: LRUCache = LRUCache(maxsize=maxsize)
+        self._loading: Dict[Hashable, asyncio.Future] = {}
+        self.loads = 0
+
+    async def get(self, key: Hashable, load: Callable[[], Awaitable[Iterable[int]]]) -> BoardRanks:
+        """Ranks of board ``key``, from ``load()`` if missing or older than ``max_age``.
+
+        ``load`` returns the board's scores, ideally sorted: all of them, or at
+        least its top ``max_scores + 1`` so a larger board can be told apart.
+        """
+        board: Optional[BoardRanks] = self._boards.get(key)
+        if board is not None and self.clock() - board.loaded_at < self.max_age:
+            return board
+        pending = self._loading.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            scores = await load()
+            # Sorting and packing a large board takes a while: not on the event loop
+            board = await asyncio.to_thread(BoardRanks, scores, self.clock(), self.max_scores)
+            self.loads += 1
+            self._boards[key] = board
+            future.set_result(board)
+            return board
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters get the error; nobody else needs to retrieve it
+            future.exception()
+            raise
+        finally:
+            del self._loading[key]
+
+    def clear(self):
+        self._boards.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "boards": len(self._boards),
+            "scores": sum(len(board.scores) for board in self._boards.values()),
+            "truncated": sum(not board.complete for board in self._boards.values()),
+            "loads": self.loads,
+        }
@@ -0,0 +1,288 @@
+"""Token-bucket rate limits on score writes, per player and per client IP.
+
+Each rule (``scores.player``, ``scores.ip``, ...) allows ``rate`` requests per
+second on average and bursts of up to ``burst``. Client IPs are checked by
+``RateLimitMiddleware`` before routing. Player names are only known once the
+body is parsed, so handlers check them with ``RateLimiter.check``.
+
+``TokenBuckets`` keeps every key's bucket in one bounded dict. A bucket is
+stored as a single float, in the GCRA form of a token bucket: the time at
+which it will be full again. Every access moves the key to the end of the
+dict, and the least recently used keys are evicted beyond ``maxsize``. An
+evicted key starts again with a full bucket. A client would need to rotate
+through more than ``maxsize`` keys to benefit, and its IP bucket still
+applies.
+
+With a ``collection`` (``RATE_LIMIT_STORE=mongo``) the limits also hold across
+instances. Requests the local bucket allows are counted in fixed windows in
+MongoDB, with one ``find_one_and_update`` per request. A key over its
+fleet-wide allowance is blocked in the local bucket until its window ends.
+Rejections therefore never touch the database: the local bucket rejects them
+first.
+
+Limits are set in ``server.py``. ``RATE_LIMITS`` (``rule=rate:burst`` pairs,
+comma separated, or ``off``) overrides them.
+"""
+import math
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ReturnDocument, UpdateOne
+from starlette.responses import JSONResponse
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    rate: float  # requests per second, on average
+    burst: int
+
+    @property
+    def interval(self) -> float:
+        return 1.0 / self.rate
+
+
+class RateLimited(Exception):
+    def __init__(self, rule: str, retry_after: float):
+        super().__init__(f"Rate limit {rule} exceeded")
+        self.rule = rule
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBuckets:
+    """Token buckets of many keys, bounded to the ``maxsize`` most recently used."""
+
+    def __init__(self, maxsize: int = 100_000, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._full_at: Dict[str, float] = {}
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._full_at)
+
+    def _store(self, key: str, full_at: float):
+        self._full_at[key] = full_at
+        if len(self._full_at) > self.maxsize:
+            del self._full_at[next(iter(self._full_at))]
+            self.evicted += 1
+
+    def take(self, key: str, limit: RateLimit) -> float:
+        """Take a token; returns 0 on success, else the seconds until one is available."""
+        now = self.clock()
+        full_at = max(self._full_at.pop(key, now), now)
+        # Each request adds one interval; the bucket is empty once that reaches burst intervals
+        taken = full_at + limit.interval
+        if taken - now > limit.burst * limit.interval:
+            self._store(key, full_at)
+            return taken - now - limit.burst * limit.interval
+        self._store(key, taken)
+        return 0.0
+
+    def peek(self, key: str, limit: RateLimit) -> float:
+        """What ``take`` would return, without taking anything."""
+        now = self.clock()
+        full_at = max(self._full_at.get(key, now), now)
+        return max(0.0, full_at + limit.interval - now - limit.burst * limit.interval)
+
+    def give_back(self, key: str, limit: RateLimit):
+        """Return a token taken by ``take``."""
+        full_at = self._full_at.get(key)
+        if full_at is not None:
+            self._full_at[key] = full_at - limit.interval
+
+    def block(self, key: str, limit: RateLimit, seconds: float):
+        """Empty the bucket for ``seconds`` more."""
+        now = self.clock()
+        self._full_at.pop(key, None)
+        self._store(key, now + seconds + limit.burst * limit.interval)
+
+
+class RateLimiter:
+    def __init__(self, limits: Dict[str, RateLimit], maxsize: int = 100_000,
+                 collection: Optional[Callable[[], Any]] = None, window: float = 60.0,
+                 ip_header: Optional[str] = None, peer_ip: bool = False,
+                 clock: Callable[[], float] = time.monotonic):
+        self.limits = dict(limits)
+        self.buckets = TokenBuckets(maxsize, clock)
+        self.collection = collection
+        self.window = window
+        self.ip_header = ip_header.lower() if ip_header else None
+        self.peer_ip = peer_ip
+        self.allowed: Counter = Counter()
+        self.rejected: Counter = Counter()
+        self.shared_rejected: Counter = Counter()
+
+    def configure(self, overrides: str):
+        """Apply ``rule=rate:burst`` overrides; ``off`` removes every limit."""
+        if overrides.strip() == "off":
+            self.limits.clear()
+            return
+        for item in filter(None, (part.strip() for part in overrides.split(","))):
+            name, _, spec = item.partition("=")
+            values = spec.split(":")
+            if name.strip() not in self.limits or len(values) != 2:
+                raise ValueError(f"Invalid rate limit {item!r}")
+            self.limits[name.strip()] = RateLimit(float(values[0]), int(values[1]))
+
+    async def check(self, rule: str, key: str):
+        """Count one request of ``key`` under ``rule``; raises ``RateLimited`` past the limit."""
+        limit = self.limits.get(rule)
+        if limit is None:
+            return
+        bucket = f"{rule}:{key}"
+        wait = self.buckets.take(bucket, limit)
+        if wait:
+            self.rejected[rule] += 1
+            raise RateLimited(rule, wait)
+        if self.collection is not None:
+            wait = await self._check_shared(bucket, limit)
+            if wait:
+                self.buckets.block(bucket, limit, wait)
+                self.shared_rejected[rule] += 1
+                raise RateLimited(rule, wait)
+        self.allowed[rule] += 1
+
+    async def check_all(self, rule: str, keys: Iterable[str]):
+        """``check`` for many keys at once, all or nothing: past the limit, no key is charged.
+
+        With a shared store the keys are counted with one ``bulk_write`` and one
+        read, however many there are, instead of one round trip per key.
+        """
+        limit = self.limits.get(rule)
+        keys = list(dict.fromkeys(keys))
+        if limit is None or not keys:
+            return
+        if len(keys) == 1:
+            return await self.check(rule, keys[0])
+        buckets = [f"{rule}:{key}" for key in keys]
+        wait = max(self.buckets.peek(bucket, limit) for bucket in buckets)
+        if wait:
+            self.rejected[rule] += 1
+            raise RateLimited(rule, wait)
+        for bucket in buckets:
+            self.buckets.take(bucket, limit)
+        if self.collection is not None:
+            over = await self._check_shared_many(buckets, limit)
+            if over:
+                for bucket in buckets:
+                    if bucket in over:
+                        self.buckets.block(bucket, limit, over[bucket])
+                    else:
+                        self.buckets.give_back(bucket, limit)
+                self.shared_rejected[rule] += 1
+                raise RateLimited(rule, max(over.values()))
+        self.allowed[rule] += len(buckets)
+
+    async def _check_shared(self, bucket: str, limit: RateLimit) -> float:
+        now = time.time()
+        window_start = now - now % self.window
+        doc = await self.collection().find_one_and_update(
+            {"_id": f"{bucket}:{int(window_start)}"},
+            {"$inc": {"n": 1}, "$setOnInsert": {
+                "expires_at": datetime.utcfromtimestamp(window_start) + timedelta(seconds=2 * self.window),
+            }},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        allowance = limit.burst + limit.rate * self.window
+        if doc is not None and doc.get("n", 0) > allowance:
+            return window_start + self.window - now
+        return 0.0
+
+    async def _check_shared_many(self, buckets: List[str], limit: RateLimit) -> Dict[str, float]:
+        """Count one request per bucket; the buckets over their allowance, with their waits.
+
+        When any bucket is over, every count is taken back.
+        """
+        now = time.time()
+        window_start = now - now % self.window
+        ids = {f"{bucket}:{int(window_start)}": bucket for bucket in buckets}
+        expires_at = datetime.utcfromtimestamp(window_start) + timedelta(seconds=2 * self.window)
+        collection = self.collection()
+        await collection.bulk_write([
+            UpdateOne({"_id": _id}, {"$inc": {"n": 1}, "$setOnInsert": {"expires_at": expires_at}}, upsert=True)
+            for _id in ids
+        ], ordered=False)
+        allowance = limit.burst + limit.rate * self.window
+        over = {
+            ids[doc["_id"]]: window_start + self.window - now
+            for doc in await collection.find({"_id": {"$in": list(ids)}}).to_list(length=None)
+            if doc.get("n", 0) > allowance
+        }
+        if over:
+            await collection.bulk_write([UpdateOne({"_id": _id}, {"$inc": {"n": -1}}) for _id in ids], ordered=False)
+        return over
+
+    def client_ip(self, scope) -> Optional[str]:
+        """Client address for the IP rules; None when neither ``ip_header`` nor ``peer_ip`` is set.
+
+        Behind a proxy the socket peer is the proxy itself, shared by every
+        player, so it is only trusted when ``peer_ip`` says there is none.
+        """
+        if self.ip_header:
+            for name, value in scope.get("headers") or ():
+                if name.decode("latin-1") == self.ip_header:
+                    # The last hop is the one added by our own proxy
+                    return value.decode("latin-1").split(",")[-1].strip()
+        elif not self.peer_ip:
+            return None
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def reset(self):
+        """Forget every bucket and counter (all buckets start full again)."""
+        self.buckets = TokenBuckets(self.buckets.maxsize, self.buckets.clock)
+        self.allowed.clear()
+        self.rejected.clear()
+        self.shared_rejected.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "limits": {name: {"rate": l.rate, "burst": l.burst} for name, l in self.limits.items()},
+            "keys": len(self.buckets),
+            "evicted": self.buckets.evicted,
+            "shared": self.collection is not None,
+            "client_ip": self.ip_header or ("peer" if self.peer_ip else None),
+            "allowed": dict(self.allowed),
+            "rejected": dict(self.rejected),
+            "shared_rejected": dict(self.shared_rejected),
+        }
+
+
+def too_many_requests(e: RateLimited) -> JSONResponse:
+    return JSONResponse(
+        {"detail": "Çok fazla istek gönderildi, lütfen biraz bekleyin"},
+        status_code=429,
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+class RateLimitMiddleware:
+    """Checks the client IP's bucket of the first matching ``(method, path prefix, rule)``.
+
+    A ``None`` rule leaves the matching routes unlimited. Without a known
+    client IP (see ``RateLimiter.client_ip``) nothing is checked here.
+    """
+
+    def __init__(self, app, limiter: RateLimiter, rules: List[Tuple[str, str, Optional[str]]]):
+        self.app = app
+        self.limiter = limiter
+        self.rules = rules
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            for method, prefix, rule in self.rules:
+                if scope["method"] == method and scope["path"].startswith(prefix):
+                    ip = self.limiter.client_ip(scope) if rule is not None else None
+                    if ip is None:
+                        break
+                    try:
+                        await self.limiter.check(f"{rule}.ip", ip)
+                    except RateLimited as e:
+                        await too_many_requests(e)(scope, receive, send)
+                        return
+                    break
+        await self.app(scope, receive, send)
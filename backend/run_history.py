@@ -0,0 +1,183 @@
+"""Run history: every processed score submission, kept in the ``runs`` collection.
+
+Score boards keep only each player's best, so this is the only record of the
+other runs. A run is appended to ``RunLog``'s in-memory buffer once its
+submission has been processed; the request never waits for it. A background
+writer inserts the buffer with unordered ``insert_many`` calls of up to
+``max_batch`` runs, as soon as that many are waiting or ``flush_interval``
+seconds after the first one. If MongoDB is unreachable the runs stay buffered,
+up to ``max_buffer``; past that the oldest are dropped and counted.
+
+``runs`` is a time-series collection (MongoDB 5.0+), created by the index
+migration with ``runs_collection_options``. The player name is the meta field,
+so a player's runs share buckets, and raw runs expire after
+``RUN_HISTORY_TTL_DAYS``. Charts read per-day rollups (``run_rollups``, one
+document per player and day) rather than raw runs. The ``run_rollup`` job
+recomputes the rollups of the last ``RUN_ROLLUP_DAYS`` days (Europe/Istanbul)
+from the raw runs. Recomputing whole days keeps the job idempotent, and late
+runs are included in their day.
+"""
+import asyncio
+import logging
+from collections import deque
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from daily import TIMEZONE
+
+logger = logging.getLogger(__name__)
+
+
+def runs_collection_options(ttl_days: int) -> Dict[str, Any]:
+    """``create_collection`` options of ``runs``."""
+    return {
+        "timeseries": {"timeField": "ts", "metaField": "player", "granularity": "hours"},
+        "expireAfterSeconds": ttl_days * 24 * 3600,
+    }
+
+
+class RunLog:
+    def __init__(self, collection: Callable[[], Any], max_batch: int = 1000, flush_interval: float = 2.0,
+                 max_buffer: int = 100_000, ready: Callable[[], bool] = lambda: True):
+        self.collection = collection
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.ready = ready
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._full = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self.appended = 0
+        self.written = 0
+        self.inserts = 0
+        self.dropped = 0
+        self.failures = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def append(self, run: Dict[str, Any]):
+        self._buffer.append(run)
+        self.appended += 1
+        self._trim()
+        loop = asyncio.get_running_loop()
+        if self._writer is None or self._writer.done() or self._writer.get_loop() is not loop:
+            self._full = asyncio.Event()
+            self._writer = loop.create_task(self._write_loop())
+        if len(self._buffer) >= self.max_batch:
+            self._full.set()
+
+    def _trim(self):
+        while len(self._buffer) > self.max_buffer:
+            self._buffer.popleft()
+            self.dropped += 1
+
+    async def _write_loop(self):
+        delay = self.flush_interval
+        while self._buffer:
+            if len(self._buffer) < self.max_batch:
+                self._full.clear()
+                try:
+                    await asyncio.wait_for(self._full.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+            if not self.ready():
+                await asyncio.sleep(self.flush_interval)
+                continue
+            try:
+                await self.flush()
+                delay = self.flush_interval
+            except Exception as e:
+                logger.warning(f"Run history insert failed, {len(self._buffer)} runs kept: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60.0)
+
+    async def flush(self):
+        """Insert every buffered run now."""
+        while self._buffer:
+            batch = [self._buffer.popleft() for _ in range(min(self.max_batch, len(self._buffer)))]
+            try:
+                await self.collection().insert_many(batch, ordered=False)
+            except BaseException:
+                # Back to the front, in order; the oldest go first if that overflows
+                self.failures += 1
+                self._buffer.extendleft(reversed(batch))
+                self._trim()
+                raise
+            self.inserts += 1
+            self.written += len(batch)
+
+    async def close(self):
+        if self._writer is not None and not self._writer.done():
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+        await self.flush()
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "pending": self.pending,
+            "appended": self.appended,
+            "written": self.written,
+            "inserts": self.inserts,
+            "dropped": self.dropped,
+            "failures": self.failures,
+        }
+
+
+def day_bounds(day: date) -> Tuple[datetime, datetime]:
+    """Start and end of an Europe/Istanbul day, as naive UTC datetimes (as stored)."""
+    start = datetime.combine(day, dtime(), TIMEZONE).astimezone(timezone.utc).replace(tzinfo=None)
+    end = datetime.combine(day + timedelta(days=1), dtime(), TIMEZONE).astimezone(timezone.utc).replace(tzinfo=None)
+    return start, end
+
+
+def rollup_id(player: str, day: date) -> str:
+    return f"{player}|{day.isoformat()}"
+
+
+async def rollup_day(runs, day: date) -> List[UpdateOne]:
+    """Rollup updates of every player who played on ``day``, from one aggregation."""
+    start, end = day_bounds(day)
+    rows = await runs.aggregate([
+        {"$match": {"ts": {"$gte": start, "$lt": end}}},
+        {"$group": {
+            "_id": {"player": "$player", "mode": "$mode"},
+            "runs": {"$sum": 1},
+            "score_sum": {"$sum": "$score"},
+            "best": {"$max": "$score"},
+        }},
+    ]).to_list(length=None)
+    by_player: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        player, mode = row["_id"]["player"], row["_id"]["mode"]
+        rollup = by_player.setdefault(player, {"player": player, "day": day.isoformat(), "modes": {}})
+        rollup["modes"][mode] = {"runs": row["runs"], "score_sum": row["score_sum"], "best": row["best"]}
+    operations = []
+    for player, rollup in by_player.items():
+        modes = rollup["modes"].values()
+        rollup.update(
+            runs=sum(m["runs"] for m in modes),
+            score_sum=sum(m["score_sum"] for m in modes),
+            best=max(m["best"] for m in modes),
+        )
+        operations.append(UpdateOne({"_id": rollup_id(player, day)}, {"$set": rollup}, upsert=True))
+    return operations
+
+
+def summarize_rollup(doc: Dict[str, Any]) -> Dict[str, Any]:
+    def stats(values: Dict[str, Any]) -> Dict[str, Any]:
+        return {"runs": values["runs"], "avg_score": round(values["score_sum"] / values["runs"], 1),
+                "best": values["best"]}
+
+    return {"day": doc["day"], **stats(doc), "modes": {mode: stats(v) for mode, v in doc.get("modes", {}).items()}}
+
+
+def summarize_run(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in doc.items() if k not in ("_id", "player")}
+
+
+def days_back(today: date, count: int) -> Iterable[date]:
+    return (today - timedelta(days=n) for n in range(count))
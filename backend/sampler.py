@@ -0,0 +1,260 @@
+"""Difficulty-stratified question sampling.
+
+``QuestionIndex`` groups the positions of a question list (one episode, or all
+episodes chained for mixed mode) by difficulty once per content version. Each
+bucket is an ``array`` of ints, so the bank itself is never copied. Snapshot
+slices stay lazily decoded apart from the one pass that reads difficulties.
+
+``sample`` then picks ``k`` questions in O(k): Floyd's algorithm draws distinct
+positions from each bucket without touching the rest of it. The target is
+either an explicit mix (``{"kolay": 10, "orta": 10, "zor": 5}``), a named
+difficulty curve, or by default the bank's own proportions. When a bucket is
+too small, its shortfall moves to the nearest difficulty that still has
+questions. With a curve, the result is ordered along it (easy questions first
+for ``ramp``). Passing the same seeded ``random.Random`` gives the same quiz.
+
+Given a player's seen-set (anything supporting ``in`` on bank-wide positions,
+see ``seen.py``), unseen questions come first: from the same difficulty, then
+from the nearest one, and only then questions already seen. Unseen questions
+are found by rejection sampling, which stays O(k) while most of a bucket is
+unseen; a bucket that is mostly seen is scanned once instead.
+"""
+import random
+from array import array
+from bisect import bisect_right
+from typing import Container, Dict, List, Optional, Sequence
+
+DIFFICULTIES = ("kolay", "orta", "zor")
+
+# Where a bucket's shortfall goes, nearest difficulty first
+FALLBACK_ORDER = {
+    "kolay": ("orta", "zor"),
+    "orta": ("kolay", "zor"),
+    "zor": ("orta", "kolay"),
+}
+
+# Share of kolay / orta / zor at the start and end of the quiz; the mix is
+# interpolated linearly in between
+CURVES = {
+    "flat": ((1 / 3, 1 / 3, 1 / 3), (1 / 3, 1 / 3, 1 / 3)),
+    "ramp": ((0.8, 0.2, 0.0), (0.0, 0.3, 0.7)),
+    "gentle": ((0.6, 0.4, 0.0), (0.2, 0.5, 0.3)),
+}
+
+
+class ChainedQuestions(Sequence):
+    """Read-only view of several question lists as one, without copying them."""
+
+    __slots__ = ("_parts", "_starts", "_length")
+
+    def __init__(self, parts: Sequence[Sequence[Dict]]):
+        self._parts = list(parts)
+        self._starts = []
+        total = 0
+        for part in self._parts:
+            self._starts.append(total)
+            total += len(part)
+        self._length = total
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        part = bisect_right(self._starts, index) - 1
+        return self._parts[part][index - self._starts[part]]
+
+
+class QuestionIndex:
+    """Per-difficulty buckets of positions into one question list.
+
+    ``offset`` is the position of the list's first question in the whole bank,
+    which is what seen-sets are keyed on.
+    """
+
+    def __init__(self, questions: Sequence[Dict], offset: int = 0):
+        self.questions = questions
+        self.offset = offset
+        self.buckets: Dict[str, array] = {d: array("I") for d in DIFFICULTIES}
+        for position in range(len(questions)):
+            difficulty = questions[position].get("difficulty", "orta")
+            self.buckets.get(difficulty, self.buckets["orta"]).append(position)
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def sizes(self) -> Dict[str, int]:
+        return {d: len(b) for d, b in self.buckets.items()}
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """Parse ``"kolay:10,orta:10,zor:5"`` into a target mix."""
+    mix: Dict[str, int] = {}
+    for item in value.split(","):
+        name, sep, count = item.strip().partition(":")
+        name = name.strip().lower()
+        if not sep or name not in DIFFICULTIES:
+            raise ValueError(f"Invalid mix entry {item!r}")
+        try:
+            mix[name] = int(count)
+        except ValueError:
+            raise ValueError(f"Invalid count in mix entry {item!r}") from None
+        if mix[name] < 0:
+            raise ValueError(f"Negative count in mix entry {item!r}")
+    if not any(mix.values()):
+        raise ValueError(f"Mix {value!r} asks for no questions")
+    return mix
+
+
+def _apportion(weights: Sequence[float], k: int) -> List[int]:
+    """Split ``k`` proportionally to ``weights`` (largest remainder)."""
+    total = sum(weights)
+    if total <= 0 or k <= 0:
+        return [0] * len(weights)
+    exact = [w * k / total for w in weights]
+    counts = [int(x) for x in exact]
+    by_remainder = sorted(range(len(weights)), key=lambda i: exact[i] - counts[i], reverse=True)
+    for i in by_remainder[:k - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+def proportional_mix(index: QuestionIndex, k: int) -> Dict[str, int]:
+    sizes = index.sizes()
+    return dict(zip(DIFFICULTIES, _apportion([sizes[d] for d in DIFFICULTIES], k)))
+
+
+def curve_slots(curve: str, k: int) -> List[str]:
+    """Target difficulty for each of ``k`` positions along a named curve."""
+    if curve not in CURVES:
+        raise ValueError(f"Unknown difficulty curve {curve!r}")
+    start, end = CURVES[curve]
+    slots = []
+    due = [0.0] * len(DIFFICULTIES)
+    for i in range(k):
+        t = i / (k - 1) if k > 1 else 0.0
+        # Accumulate the curve's share per difficulty and serve the one most behind
+        for d, (s, e) in enumerate(zip(start, end)):
+            due[d] += s + (e - s) * t
+        d = max(range(len(DIFFICULTIES)), key=lambda j: due[j])
+        due[d] -= 1.0
+        slots.append(DIFFICULTIES[d])
+    return slots
+
+
+def sample_positions(n: int, k: int, rng: random.Random) -> List[int]:
+    """``k`` distinct positions from ``range(n)`` in O(k) (Floyd's algorithm)."""
+    chosen = set()
+    for j in range(n - k, n):
+        t = rng.randrange(j + 1)
+        chosen.add(j if t in chosen else t)
+    return list(chosen)
+
+
+def _pick_unseen(bucket: array, count: int, rng: random.Random, seen: Container[int],
+                 offset: int, exclude: Container[int] = ()) -> List[int]:
+    """Up to ``count`` bucket indexes of unseen questions, not in ``exclude``."""
+    n = len(bucket)
+    tried = set()
+    unseen: List[int] = []
+    for _ in range(4 * count):
+        if len(unseen) == count or len(tried) == n:
+            break
+        i = rng.randrange(n)
+        if i in tried:
+            continue
+        tried.add(i)
+        if i not in exclude and offset + bucket[i] not in seen:
+            unseen.append(i)
+    if len(unseen) < count:
+        # Mostly seen: one pass over the rest of the bucket
+        rest = [i for i in range(n) if i not in tried and i not in exclude and offset + bucket[i] not in seen]
+        unseen.extend(rng.sample(rest, min(count - len(unseen), len(rest))))
+    return unseen
+
+
+def resolve_mix(index: QuestionIndex, target: Dict[str, int]) -> Dict[str, int]:
+    """Clamp a target mix to the bucket sizes, moving shortfalls to neighbours."""
+    sizes = index.sizes()
+    counts = {d: min(target.get(d, 0), sizes[d]) for d in DIFFICULTIES}
+    for difficulty in DIFFICULTIES:
+        missing = target.get(difficulty, 0) - counts[difficulty]
+        for other in FALLBACK_ORDER[difficulty]:
+            if missing <= 0:
+                break
+            extra = min(missing, sizes[other] - counts[other])
+            counts[other] += extra
+            missing -= extra
+    return counts
+
+
+def _pick_preferring_unseen(index: QuestionIndex, counts: Dict[str, int], rng: random.Random,
+                            seen: Container[int], picked: Dict[str, List[int]]):
+    """Fill ``picked`` per ``counts``: unseen questions of the same difficulty, then
+    unseen ones of the nearest difficulty, and only then questions already seen."""
+    chosen = {d: [] for d in DIFFICULTIES}
+    missing = {}
+    for difficulty, count in counts.items():
+        chosen[difficulty] = _pick_unseen(index.buckets[difficulty], count, rng, seen, index.offset)
+        missing[difficulty] = count - len(chosen[difficulty])
+    for difficulty in DIFFICULTIES:
+        for other in FALLBACK_ORDER[difficulty]:
+            if missing[difficulty] <= 0:
+                break
+            extra = _pick_unseen(index.buckets[other], missing[difficulty], rng, seen, index.offset,
+                                 exclude=set(chosen[other]))
+            chosen[other].extend(extra)
+            missing[difficulty] -= len(extra)
+    for difficulty in DIFFICULTIES:
+        bucket = index.buckets[difficulty]
+        if missing[difficulty] > 0:
+            taken = set(chosen[difficulty])
+            rest = [i for i in range(len(bucket)) if i not in taken]
+            chosen[difficulty].extend(rng.sample(rest, min(missing[difficulty], len(rest))))
+        picked[difficulty] = [bucket[i] for i in chosen[difficulty]]
+
+
+def sample(index: QuestionIndex, k: int, rng: Optional[random.Random] = None,
+           mix: Optional[Dict[str, int]] = None, curve: Optional[str] = None,
+           seen: Optional[Container[int]] = None) -> List[Dict]:
+    """Pick up to ``k`` questions from ``index``; ``mix`` may ask for fewer."""
+    rng = rng or random
+    if mix is not None:
+        k = min(k, sum(mix.values()))
+        if k < sum(mix.values()):
+            mix = dict(zip(DIFFICULTIES, _apportion([mix.get(d, 0) for d in DIFFICULTIES], k)))
+    k = min(k, len(index))
+    slots = curve_slots(curve, k) if curve else None
+    if mix is None:
+        mix = {d: slots.count(d) for d in DIFFICULTIES} if slots else proportional_mix(index, k)
+    counts = resolve_mix(index, mix)
+
+    picked: Dict[str, List[int]] = {}
+    if seen is None:
+        for difficulty, count in counts.items():
+            bucket = index.buckets[difficulty]
+            picked[difficulty] = [bucket[i] for i in sample_positions(len(bucket), count, rng)]
+    else:
+        _pick_preferring_unseen(index, counts, rng, seen, picked)
+    for difficulty in DIFFICULTIES:
+        rng.shuffle(picked[difficulty])
+
+    if slots is None:
+        positions = [p for difficulty in DIFFICULTIES for p in picked[difficulty]]
+        rng.shuffle(positions)
+    else:
+        # Fill each slot from its own difficulty, then with whatever replaced it
+        positions = []
+        for difficulty in slots:
+            source = difficulty if picked[difficulty] else next(
+                (d for d in FALLBACK_ORDER[difficulty] if picked[d]), None
+            )
+            if source is not None:
+                positions.append(picked[source].pop())
+        positions.extend(p for difficulty in DIFFICULTIES for p in picked[difficulty])
+    return [index.questions[p] for p in positions]
@@ -0,0 +1,262 @@
+"""In-process async job scheduler.
+
+Jobs are coroutines run every ``interval`` seconds or on a cron expression
+(``minute hour day month weekday``, evaluated in a given timezone). Each run can
+be delayed by random jitter and is cancelled after ``timeout`` seconds. Every
+job keeps its own metrics, which the admin API exposes.
+
+``singleton=True`` jobs run on one instance of the fleet only. Each run first
+takes or renews the ``job:<name>`` lease in MongoDB (see ``lease.py``), so the
+leader keeps the job until it stops renewing. The time of the last run is
+stored on the lease document. A newly elected leader therefore continues the
+schedule instead of running the job again right away.
+"""
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from zoneinfo import ZoneInfo
+
+from lease import INSTANCE_ID, MongoLease
+
+logger = logging.getLogger(__name__)
+
+JobFunc = Callable[[], Awaitable[Any]]
+
+_CRON_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+
+def _parse_cron_field(value: str, low: int, high: int) -> Set[int]:
+    result: Set[int] = set()
+    for part in value.split(","):
+        body, _, step = part.partition("/")
+        if body == "*":
+            start, end = low, high
+        elif "-" in body:
+            start, end = (int(x) for x in body.split("-", 1))
+        else:
+            start = end = int(body)
+            if step:
+                end = high
+        if start < low or end > high or start > end:
+            raise ValueError(f"Cron field {part!r} out of range {low}-{high}")
+        result.update(range(start, end + 1, int(step) if step else 1))
+    return result
+
+
+class Cron:
+    """Five-field cron expression; weekday 0 is Sunday (7 is accepted as well)."""
+
+    def __init__(self, expression: str, tz: str = "UTC"):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        fields[4] = ",".join("0" if p == "7" else p for p in fields[4].split(","))
+        self.expression = expression
+        self.tz = ZoneInfo(tz)
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            _parse_cron_field(f, low, high) for f, (low, high) in zip(fields, _CRON_RANGES)
+        )
+        # Standard cron: with both day fields restricted, either one matching is enough
+        self._any_day = fields[2] == "*" or fields[4] == "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.isoweekday() % 7) in self.weekdays
+        return (day_ok and weekday_ok) if self._any_day else (day_ok or weekday_ok)
+
+    def next_after(self, after: datetime) -> datetime:
+        """First matching minute strictly after ``after`` (returned in the cron's timezone)."""
+        moment = after.astimezone(self.tz).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 4)
+        while moment < limit:
+            if moment.month not in self.months or not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+            elif moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f"Cron expression never fires: {self.expression!r}")
+
+
+@dataclass
+class JobMetrics:
+    runs: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    skipped: int = 0
+    running: bool = False
+    last_started_at: Optional[datetime] = None
+    last_duration_ms: Optional[float] = None
+    max_duration_ms: float = 0.0
+    total_duration_ms: float = 0.0
+    last_error: Optional[str] = None
+    next_run_at: Optional[datetime] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = dict(self.__dict__)
+        data["avg_duration_ms"] = round(self.total_duration_ms / self.runs, 3) if self.runs else None
+        return data
+
+
+@dataclass
+class Job:
+    name: str
+    func: JobFunc
+    interval: Optional[float] = None
+    cron: Optional[Cron] = None
+    jitter: float = 0.0
+    timeout: Optional[float] = None
+    singleton: bool = False
+    run_at_start: bool = False
+    lease: Optional[MongoLease] = None
+    metrics: JobMetrics = field(default_factory=JobMetrics)
+    wakeup: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def next_delay(self) -> float:
+        if self.cron is not None:
+            now = datetime.now(self.cron.tz)
+            delay = (self.cron.next_after(now) - now).total_seconds()
+        else:
+            delay = self.interval
+        return delay + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+
+class Scheduler:
+    def __init__(self, leases=None, holder: str = INSTANCE_ID):
+        """``leases`` is the MongoDB collection holding singleton job leases."""
+        self.leases = leases
+        self.holder = holder
+        self.jobs: Dict[str, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._running: Set[asyncio.Task] = set()
+        self._started = False
+
+    def every(self, name: str, interval: float, func: JobFunc, **options) -> Job:
+        return self._add(Job(name, func, interval=interval, **options))
+
+    def cron(self, name: str, expression: str, func: JobFunc, tz: str = "UTC", **options) -> Job:
+        return self._add(Job(name, func, cron=Cron(expression, tz), **options))
+
+    def _add(self, job: Job) -> Job:
+        if job.name in self.jobs:
+            raise ValueError(f"Job {job.name!r} already registered")
+        if job.singleton:
+            if self.leases is None:
+                raise ValueError(f"Singleton job {job.name!r} needs a leases collection")
+            # Long enough to span one period plus the run, so the leader keeps it
+            period = job.interval if job.interval is not None else 3600.0
+            job.lease = MongoLease(self.leases, f"job:{job.name}", ttl=period * 2 + (job.timeout or 60.0),
+                                   holder=self.holder)
+        self.jobs[job.name] = job
+        if self._started:
+            self._tasks.append(asyncio.create_task(self._loop(job)))
+        return job
+
+    def start(self):
+        self._started = True
+        self._tasks = [asyncio.create_task(self._loop(job)) for job in self.jobs.values()]
+
+    def trigger(self, name: str):
+        """Run a job now instead of waiting for its next slot."""
+        self.jobs[name].wakeup.set()
+
+    async def stop(self, grace: float = 5.0):
+        """Stop scheduling; give running jobs ``grace`` seconds, then cancel them."""
+        self._started = False
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._running:
+            _, pending = await asyncio.wait(self._running, timeout=grace)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        for job in self.jobs.values():
+            if job.lease is not None:
+                try:
+                    await job.lease.release()
+                except Exception as e:
+                    logger.warning(f"Could not release lease for job {job.name}: {e}")
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        return {name: job.metrics.as_dict() for name, job in self.jobs.items()}
+
+    async def _loop(self, job: Job):
+        first = True
+        while True:
+            if not (first and job.run_at_start):
+                delay = job.next_delay()
+                job.metrics.next_run_at = datetime.utcnow() + timedelta(seconds=delay)
+                try:
+                    await asyncio.wait_for(job.wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+            first = False
+            triggered = job.wakeup.is_set()
+            job.wakeup.clear()
+            # Shielded from the loop's cancellation so stop() can let it finish
+            task = asyncio.create_task(self.run(job, force=triggered))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+            await asyncio.shield(task)
+
+    async def _should_run(self, job: Job, force: bool) -> bool:
+        if job.lease is None:
+            return True
+        if not await job.lease.acquire():
+            return False
+        last_run = (job.lease.document or {}).get("last_run_at")
+        if force or job.interval is None or last_run is None:
+            return True
+        # Another leader may have run it recently
+        return (datetime.utcnow() - last_run).total_seconds() >= job.interval * 0.9
+
+    async def run(self, job: Job, force: bool = False) -> bool:
+        """Run ``job`` once (subject to its lease); returns whether it ran."""
+        metrics = job.metrics
+        try:
+            if not await self._should_run(job, force):
+                metrics.skipped += 1
+                return False
+        except Exception as e:
+            metrics.failures += 1
+            metrics.last_error = f"lease: {e}"
+            logger.error(f"Job {job.name}: could not take lease: {e}")
+            return False
+
+        metrics.running = True
+        metrics.last_started_at = datetime.utcnow()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(job.func(), timeout=job.timeout)
+            metrics.last_error = None
+        except asyncio.TimeoutError:
+            metrics.timeouts += 1
+            metrics.last_error = f"timed out after {job.timeout}s"
+            logger.error(f"Job {job.name} timed out after {job.timeout}s")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            metrics.failures += 1
+            metrics.last_error = str(e)
+            logger.error(f"Job {job.name} failed: {e}")
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            metrics.running = False
+            metrics.runs += 1
+            metrics.last_duration_ms = round(elapsed, 3)
+            metrics.max_duration_ms = round(max(metrics.max_duration_ms, elapsed), 3)
+            metrics.total_duration_ms += elapsed
+        if job.lease is not None:
+            try:
+                await job.lease.update({"last_run_at": metrics.last_started_at})
+            except Exception as e:
+                logger.warning(f"Job {job.name}: could not record run on lease: {e}")
+        return True
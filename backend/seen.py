@@ -0,0 +1,112 @@
+"""Per-player seen-sets for "unseen first" quizzes.
+
+A seen-set is a bitmap over the question positions of one content version
+(episodes in id order, questions in sheet order). That is one bit per question,
+or 1.25 KB per player at 10,000 questions.
+
+In MongoDB the bitmap lives in the ``seen_sets`` collection, one document per
+player (``_id`` is the player name), under ``seen_<content version>``. Keeping
+it off the score documents means leaderboard reads never carry it. It is a
+sub-document of 64-bit words keyed by word index, and only the words that
+contain a seen question are stored. Recording a run is an upserted
+``$bit: or`` on the touched words, so it needs no read and is safe under
+concurrent submissions. Sets from older content versions are ignored on load
+and unset on the next write.
+"""
+from typing import Dict, Iterable, Optional
+
+from bson import Int64
+from cachetools import LRUCache
+
+WORD_BITS = 64
+FIELD_PREFIX = "seen_"
+
+
+def field_name(version: str) -> str:
+    return f"{FIELD_PREFIX}{version}"
+
+
+def _signed(word: int) -> int:
+    # Mongo longs are signed; the top bit of a word maps to a negative value
+    return word - (1 << WORD_BITS) if word >= 1 << (WORD_BITS - 1) else word
+
+
+class SeenSet:
+    """Bitmap of seen question positions for one player and content version."""
+
+    __slots__ = ("version", "bits")
+
+    def __init__(self, version: str, size: int):
+        self.version = version
+        self.bits = bytearray((size + 7) // 8)
+
+    def __contains__(self, position: int) -> bool:
+        byte = position >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] & (1 << (position & 7)))
+
+    def __len__(self) -> int:
+        return sum(bin(b).count("1") for b in self.bits)
+
+    def add(self, position: int):
+        byte = position >> 3
+        if byte < len(self.bits):
+            self.bits[byte] |= 1 << (position & 7)
+
+    @classmethod
+    def from_words(cls, version: str, size: int, words: Optional[Dict[str, int]]) -> "SeenSet":
+        seen = cls(version, size)
+        for index, word in (words or {}).items():
+            word = int(word) & ((1 << WORD_BITS) - 1)
+            start = int(index) * (WORD_BITS // 8)
+            chunk = word.to_bytes(WORD_BITS // 8, "little")
+            seen.bits[start:start + len(chunk)] = chunk[:max(0, len(seen.bits) - start)]
+        return seen
+
+
+def word_masks(positions: Iterable[int]) -> Dict[int, int]:
+    masks: Dict[int, int] = {}
+    for position in positions:
+        index = position // WORD_BITS
+        masks[index] = masks.get(index, 0) | (1 << (position % WORD_BITS))
+    return masks
+
+
+def seen_update(version: str, positions: Iterable[int], stale_fields: Iterable[str] = ()) -> Dict:
+    """Update operators that record ``positions`` as seen; merge into another update."""
+    field = field_name(version)
+    update: Dict = {}
+    masks = word_masks(positions)
+    if masks:
+        update["$bit"] = {f"{field}.{index}": {"or": Int64(_signed(mask))} for index, mask in masks.items()}
+    stale = [f for f in stale_fields if f != field]
+    if stale:
+        update["$unset"] = {f: "" for f in stale}
+    return update
+
+
+class SeenStore:
+    """Seen-sets loaded from ``seen_sets``, cached per player in memory."""
+
+    def __init__(self, cache_size: int = 10000):
+        self._cache: LRUCache = LRUCache(maxsize=cache_size)
+        # Players whose documents still carry sets from older versions
+        self._stale: LRUCache = LRUCache(maxsize=cache_size)
+
+    async def get(self, collection, player_name: str, version: str, size: int) -> SeenSet:
+        seen = self._cache.get(player_name)
+        if seen is not None and seen.version == version:
+            return seen
+        doc = await collection.find_one({"_id": player_name}) or {}
+        field = field_name(version)
+        self._stale[player_name] = [k for k in doc if k.startswith(FIELD_PREFIX) and k != field]
+        seen = self._cache[player_name] = SeenSet.from_words(version, size, doc.get(field))
+        return seen
+
+    def record(self, player_name: str, version: str, positions: Iterable[int]) -> Dict:
+        """Mark ``positions`` seen in the cache and return the matching update operators."""
+        positions = list(positions)
+        seen = self._cache.get(player_name)
+        if seen is not None and seen.version == version:
+            for position in positions:
+                seen.add(position)
+        return seen_update(version, positions, self._stale.pop(player_name, ()))
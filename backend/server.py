@@ -1,4 +1,5 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Request, Response
+from fastapi.responses import JSONResponse, ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -6,34 +7,157 @@ import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pymongo import IndexModel, ReturnDocument, UpdateOne
+from typing import List, Literal, Optional, Dict, Any, Tuple
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 import httpx
 import random
-from cachetools import TTLCache
+import asyncio
+import hashlib
+import json
+from collections import Counter
+from cachetools import LRUCache, TTLCache
+from tracing import tracer, span, traced, traced_database, TracingMiddleware, TracedRoute
+from snapshot import MappedSnapshot, SnapshotReader, check_content
+from content_sync import ContentSync
+from scheduler import Scheduler
+from indexes import IndexMigration
+from mongo_settings import MongoSettings, PoolMetrics
+from load_shedding import LoadSheddingMiddleware, RouteBudget, RouteLimits
+from rate_limit import RateLimit, RateLimited, RateLimiter, RateLimitMiddleware
+from idempotency import IdempotencyStore, RunInProgress, run_key
+from answer_stats import AnswerStats, histogram_bounds, summarize as summarize_answers
+from run_history import RunLog, days_back, rollup_day, runs_collection_options, summarize_rollup, summarize_run
+from rank_index import RankIndex
+from capture import CaptureMiddleware, capture_from_env
+from compression import CompressionMiddleware, PrecompressedBody, precompressed_response
+from content_bundle import BundleBuilder
+from sampler import ChainedQuestions, QuestionIndex, parse_mix, sample
+from seen import SeenSet, SeenStore
+import content_build
+import daily
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+mongo_settings = MongoSettings.from_env()
+pool_metrics = {"main": PoolMetrics()}
+client = AsyncIOMotorClient(mongo_url, **mongo_settings.client_options(), event_listeners=[pool_metrics["main"]])
 db = client[os.environ['DB_NAME']]
+# Leaderboard and stats reads get their own pool when MONGO_READ_POOL_SIZE is set
+read_client = None
+read_db = None
+if mongo_settings.read_pool_size:
+    pool_metrics["reads"] = PoolMetrics()
+    read_client = AsyncIOMotorClient(
+        mongo_url, **mongo_settings.client_options(mongo_settings.read_pool_size),
+        event_listeners=[pool_metrics["reads"]],
+    )
+    read_db = read_client[os.environ['DB_NAME']]
+if tracer.enabled:
+    db = traced_database(db)
+    read_db = traced_database(read_db) if read_db is not None else None
+LEADERBOARD_READ_PREFERENCE = mongo_settings.leaderboard_reads()
+SCORE_WRITE_CONCERN = mongo_settings.score_writes()
 
-# Create the main app
-app = FastAPI()
+# Create the main app; responses are encoded with orjson (UTF-8, datetimes as ISO 8601)
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api", route_class=TracedRoute)
 
 # Google Sheets Configuration
 SHEET_ID = "1txXN5xN_W4OaLL2FVm6QM5TzbUeb4KMWKWYK55GvOIc"
+SHEETS_BASE_URL = os.environ.get("SHEETS_BASE_URL", "https://docs.google.com")
 EPISODES_GID = "0"
 QUESTIONS_GID = "1459380949"
 
-# Cache with 5 minute TTL
-cache = TTLCache(maxsize=100, ttl=300)
+# Last good content built from Google Sheets. Not in a TTL cache: only a
+# successful reload replaces it, so it keeps being served through a Sheets outage
+_sheets_snapshot: Optional[MappedSnapshot] = None
+# Episode models of recent content versions, by snapshot digest
+_episode_lists: LRUCache = LRUCache(maxsize=4)
+
+def forget_sheets_content():
+    """Drop the Sheets content, so the next request loads it again"""
+    global _sheets_snapshot
+    _sheets_snapshot = None
+
+# Multi-worker mode: content_refresher.py publishes memory-mapped snapshots
+# here and every worker reads them instead of fetching Google Sheets itself
+CONTENT_SNAPSHOT_DIR = os.environ.get("CONTENT_SNAPSHOT_DIR")
+snapshot_reader = SnapshotReader(CONTENT_SNAPSHOT_DIR) if CONTENT_SNAPSHOT_DIR else None
+
+# Multi-instance mode: CONTENT_SOURCE=mongo shares versioned content through the
+# content_snapshots collection; created on startup
+CONTENT_SOURCE = os.environ.get("CONTENT_SOURCE", "sheets")
+content_sync: Optional[ContentSync] = None
+
+# Sheets are parsed and built in a worker process, off the event loop (see content_build.py)
+content_builds = content_build.ContentBuildPool(os.environ.get("CONTENT_BUILD_MODE", "process"))
+
+# Periodic jobs (content refresh, reconciliation, snapshots); created on startup
+scheduler: Optional[Scheduler] = None
+
+# Startup work that runs in the background while the app already serves
+index_migration: Optional[IndexMigration] = None
+content_warmup: Optional[asyncio.Task] = None
+startup_tasks: List[asyncio.Task] = []
+
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+# Concurrency budgets per route group (see load_shedding.py). In-memory content
+# and quiz routes keep their own budget, so slow MongoDB writes cannot starve them
+route_limits = RouteLimits(
+    [
+        RouteBudget("content", limit=200, queue_size=400, queue_timeout=1.0),
+        RouteBudget("leaderboard", limit=48, queue_size=96),
+        RouteBudget("scores", limit=32, queue_size=64),
+        RouteBudget("default", limit=64, queue_size=128),
+    ],
+    [
+        (None, "/api/admin/", None),
+        ("GET", "/api/episodes", "content"),
+        ("GET", "/api/content/", "content"),
+        ("GET", "/api/quiz/", "content"),
+        ("GET", "/api/leaderboard", "leaderboard"),
+        ("GET", "/api/player/", "leaderboard"),
+        ("POST", "/api/score/", "scores"),
+        ("POST", "/api/leaderboard/", "leaderboard"),  # group boards (reads)
+        ("POST", "/api/leaderboard", "scores"),
+        (None, "/api/", "default"),
+    ],
+)
+route_limits.configure(os.environ.get("ROUTE_BUDGETS", ""))
+
+# Token-bucket limits on score writes (see rate_limit.py): per client IP before
+# routing, per player in the handlers. Generous per IP, as players share NATs.
+# IP limits need RATE_LIMIT_IP_HEADER behind a proxy, or RATE_LIMIT_PEER_IP=1 without one
+RATE_LIMIT_STORE = os.environ.get("RATE_LIMIT_STORE", "memory")
+if RATE_LIMIT_STORE not in ("memory", "mongo"):
+    raise ValueError(f"Unknown RATE_LIMIT_STORE {RATE_LIMIT_STORE!r}, expected memory or mongo")
+rate_limiter = RateLimiter(
+    {
+        "scores.player": RateLimit(rate=0.2, burst=10),
+        "scores.ip": RateLimit(rate=5, burst=100),
+        "score_batch.player": RateLimit(rate=0.05, burst=3),
+        "score_batch.ip": RateLimit(rate=0.5, burst=10),
+    },
+    maxsize=int(os.environ.get("RATE_LIMIT_KEYS", "100000")),
+    collection=(lambda: db.rate_limits) if RATE_LIMIT_STORE == "mongo" else None,
+    ip_header=os.environ.get("RATE_LIMIT_IP_HEADER"),
+    peer_ip=os.environ.get("RATE_LIMIT_PEER_IP") == "1",
+)
+rate_limiter.configure(os.environ.get("RATE_LIMITS", ""))
+RATE_LIMITED_ROUTES = [
+    ("POST", "/api/score/batch", "score_batch"),
+    ("POST", "/api/score/", "scores"),
+    ("POST", "/api/leaderboard/", None),  # group boards are reads
+    ("POST", "/api/leaderboard", "scores"),
+]
 
 # Configure logging
 logging.basicConfig(
@@ -69,7 +193,9 @@ class QuizResponse(BaseModel):
     questions: List[Question]
     total_questions: int
     max_possible_score: int
-    mode: str = "episode"  # "episode" or "mixed"
+    mode: str = "episode"  # "episode", "mixed" or "daily"
+    content_version: Optional[str] = None
+    day: Optional[str] = None  # daily challenge date (Europe/Istanbul)
 
 # Score submission models
 class ScoreSubmit(BaseModel):
@@ -77,6 +203,11 @@ class ScoreSubmit(BaseModel):
     score: int
     correct_count: int = 0
     speed_bonus: int = 0
+    # Questions of this run, recorded in the player's seen-set ("unseen first" quizzes)
+    question_ids: Optional[List[str]] = None
+    content_version: Optional[str] = None
+    # Generated by the client once per run; retries with the same id are not processed again
+    run_id: Optional[str] = Field(None, max_length=64)
 
 class EpisodeScoreSubmit(ScoreSubmit):
     episode_id: int
@@ -84,6 +215,40 @@ class EpisodeScoreSubmit(ScoreSubmit):
 class MixedScoreSubmit(ScoreSubmit):
     questions_answered: int = 0
 
+class DailyScoreSubmit(ScoreSubmit):
+    day: Optional[str] = None  # defaults to today (Europe/Istanbul)
+
+# Results accepted by one POST /api/score/batch
+BATCH_SCORE_LIMIT = int(os.environ.get("BATCH_SCORE_LIMIT", "500"))
+
+class BatchScoreItem(BaseModel):
+    mode: Literal["episode", "mixed"]
+    player_name: str
+    score: int
+    correct_count: int = 0
+    speed_bonus: int = 0
+    episode_id: Optional[int] = None  # episode mode
+    questions_answered: int = 0  # mixed mode
+    question_ids: Optional[List[str]] = None
+    content_version: Optional[str] = None
+
+class BatchScoreSubmit(BaseModel):
+    items: List[BatchScoreItem] = Field(..., min_length=1, max_length=BATCH_SCORE_LIMIT)
+    run_id: Optional[str] = Field(None, max_length=64)
+
+# Answer analytics events accepted by one POST /api/analytics/answers
+ANSWER_BATCH_LIMIT = int(os.environ.get("ANSWER_BATCH_LIMIT", "500"))
+
+class AnswerEvent(BaseModel):
+    question_id: str = Field(..., max_length=64)
+    # Text of the chosen option (option ids are shuffled per quiz); None when time ran out
+    option: Optional[str] = Field(None, max_length=500)
+    correct: bool
+    time_ms: int = Field(..., ge=0)
+
+class AnswerBatch(BaseModel):
+    events: List[AnswerEvent] = Field(..., min_length=1, max_length=ANSWER_BATCH_LIMIT)
+
 # Leaderboard response models
 class LeaderboardEntry(BaseModel):
     rank: int
@@ -97,189 +262,151 @@ class LeaderboardResponse(BaseModel):
     player_score: Optional[int] = None
     total_players: int = 0
 
+# Players ranked by one POST /api/leaderboard/{board}/group
+GROUP_LEADERBOARD_LIMIT = int(os.environ.get("GROUP_LEADERBOARD_LIMIT", "500"))
+
+class GroupLeaderboardRequest(BaseModel):
+    player_names: List[str] = Field(..., min_length=1, max_length=GROUP_LEADERBOARD_LIMIT)
+    day: Optional[str] = None  # daily board only; defaults to today (Europe/Istanbul)
+
+class GroupLeaderboardResponse(BaseModel):
+    entries: List[Dict[str, Any]]
+    unranked: List[str] = []  # requested players without a score on this board
+    total_players: int = 0
+
 # === GOOGLE SHEETS FUNCTIONS ===
 
-async def fetch_csv_from_sheets(gid: str) -> str:
-    """Fetch CSV data from Google Sheets"""
-    url = f"https://docs.google.com/spreadsheets/d/{SHEET_ID}/export?format=csv&gid={gid}"
-    async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as http_client:
-        response = await http_client.get(url)
-        response.raise_for_status()
-        return response.text
+async def fetch_csv_from_sheets(gid: str) -> bytes:
+    """Fetch CSV data from Google Sheets (undecoded: the build pool decodes it off the event loop)"""
+    url = f"{SHEETS_BASE_URL}/spreadsheets/d/{SHEET_ID}/export?format=csv&gid={gid}"
+    with span("sheets.fetch", gid=gid):
+        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as http_client:
+            response = await http_client.get(url)
+            response.raise_for_status()
+            return response.content
 
 def parse_csv(csv_text: str) -> List[Dict[str, str]]:
     """Parse CSV text into list of dictionaries"""
-    lines = csv_text.strip().split('\n')
-    if len(lines) < 2:
-        return []
-    
-    headers = [h.strip().lower().replace(' ', '_') for h in lines[0].split(',')]
-    rows = []
-    
-    for line in lines[1:]:
-        values = []
-        current = ""
-        in_quotes = False
-        
-        for char in line:
-            if char == '"':
-                in_quotes = not in_quotes
-            elif char == ',' and not in_quotes:
-                values.append(current.strip())
-                current = ""
-            else:
-                current += char
-        values.append(current.strip())
-        
-        if len(values) >= len(headers):
-            row = {headers[i]: values[i] for i in range(len(headers))}
-            rows.append(row)
-    
-    return rows
+    with span("parse_csv", bytes=len(csv_text)):
+        return content_build.parse_csv(csv_text)
 
-async def get_episodes_data() -> List[Episode]:
-    """Get episodes from Google Sheets with caching"""
-    cache_key = "episodes"
-    if cache_key in cache:
-        return cache[cache_key]
-    
+def build_episodes(rows: List[Dict[str, str]]) -> List[Episode]:
+    """Build the sorted episode list from parsed sheet rows"""
+    return [Episode(**e) for e in content_build.build_episodes(rows)]
+
+build_questions = content_build.build_questions
+
+def current_snapshot():
+    """Content snapshot being served: shared (multi-worker or multi-instance mode) or built from Sheets"""
+    if content_sync is not None and content_sync.current is not None:
+        return content_sync.current
+    if snapshot_reader is not None:
+        snapshot = snapshot_reader.current()
+        if snapshot is not None:
+            return snapshot
+    return _sheets_snapshot
+
+async def fetch_content() -> bytes:
+    """Fetch both sheets concurrently and build them into a snapshot buffer in the build pool"""
+    episodes_csv, questions_csv = await asyncio.gather(
+        fetch_csv_from_sheets(EPISODES_GID),
+        fetch_csv_from_sheets(QUESTIONS_GID),
+    )
+    with span("build_content", mode=content_builds.mode, bytes=len(episodes_csv) + len(questions_csv)):
+        return await content_builds.build(episodes_csv, questions_csv)
+
+async def wait_for_content_warmup():
+    """Requests arriving during startup share the warm-up fetch instead of starting their own"""
+    if content_warmup is not None and not content_warmup.done():
+        await asyncio.wait([content_warmup])
+
+# In-flight Sheets load shared by every request that finds the cache empty
+_sheets_load: Optional[asyncio.Task] = None
+
+async def load_sheets_content():
+    """Load content from Sheets once for all waiting requests; None if that fails"""
+    global _sheets_load
+    if _sheets_load is None or _sheets_load.done():
+        _sheets_load = asyncio.create_task(reload_sheets_content())
     try:
-        csv_text = await fetch_csv_from_sheets(EPISODES_GID)
-        rows = parse_csv(csv_text)
-        
-        logger.info(f"Parsed {len(rows)} episode rows")
-        if rows:
-            logger.info(f"First row keys: {list(rows[0].keys())}")
-        
-        episodes = []
-        for row in rows:
-            try:
-                # Try different column name variations
-                episode_id = int(row.get('episode_id') or row.get('id') or row.get('bölüm_no') or row.get('bolum_no') or 0)
-                episode_name = row.get('episode_name') or row.get('name') or row.get('bölüm_adı') or row.get('bolum_adi') or f"{episode_id}. Bölüm"
-                is_locked = (row.get('is_locked') or row.get('durum') or 'açık').lower() in ['kilitli', 'locked', 'true', '1']
-                description = row.get('description') or row.get('açıklama') or row.get('aciklama') or ''
-                
-                if episode_id > 0:
-                    episode = Episode(
-                        id=episode_id,
-                        name=episode_name,
-                        question_count=25,
-                        is_locked=is_locked,
-                        description=description
-                    )
-                    episodes.append(episode)
-            except Exception as e:
-                logger.warning(f"Error parsing episode row: {e}, row: {row}")
-                continue
-        
-        # Ensure we have at least 14 episodes (fill missing ones)
-        existing_ids = {e.id for e in episodes}
-        for i in range(1, 15):
-            if i not in existing_ids:
-                episodes.append(Episode(
-                    id=i,
-                    name=f"{i}. Bölüm",
-                    question_count=25,
-                    is_locked=False
-                ))
-        
-        episodes.sort(key=lambda e: e.id)
-        cache[cache_key] = episodes  # No limit - show all episodes from sheets
-        return episodes
+        return await asyncio.shield(_sheets_load)
     except Exception as e:
-        logger.error(f"Error fetching episodes: {e}")
+        logger.error(f"Error loading content from Sheets: {e}")
+        return None
+
+@traced("get_episodes_data")
+async def get_episodes_data() -> List[Episode]:
+    """Get episodes from Google Sheets with caching"""
+    await wait_for_content_warmup()
+    snapshot = current_snapshot() or await load_sheets_content()
+    if snapshot is None:
         return [Episode(id=i, name=f"{i}. Bölüm", question_count=25) for i in range(1, 15)]
+    episodes = _episode_lists.get(snapshot.digest)
+    if episodes is None:
+        episodes = _episode_lists[snapshot.digest] = [Episode(**e) for e in snapshot.episodes]  # No limit - show all episodes from sheets
+    return episodes
 
+@traced("get_questions_data")
 async def get_questions_data() -> Dict[int, List[Dict]]:
     """Get all questions from Google Sheets with caching"""
-    cache_key = "questions"
-    if cache_key in cache:
-        return cache[cache_key]
-    
-    try:
-        csv_text = await fetch_csv_from_sheets(QUESTIONS_GID)
-        rows = parse_csv(csv_text)
-        
-        logger.info(f"Parsed {len(rows)} question rows")
-        if rows:
-            logger.info(f"First question row keys: {list(rows[0].keys())}")
-        
-        questions_by_episode: Dict[int, List[Dict]] = {}
-        
-        for row in rows:
-            try:
-                # Try different column name variations for episode
-                episode_id = int(
-                    row.get('episode_id') or row.get('episode') or 
-                    row.get('bölüm') or row.get('bolum') or 1
-                )
-                
-                # Try different column names for difficulty and points
-                difficulty_raw = row.get('difficulty') or row.get('zorluk') or 'orta'
-                difficulty = difficulty_raw.lower()
-                if difficulty in ['easy', 'kolay']:
-                    points = 10
-                    difficulty = 'kolay'
-                elif difficulty in ['hard', 'zor']:
-                    points = 50
-                    difficulty = 'zor'
-                else:
-                    points = 20
-                    difficulty = 'orta'
-                
-                # Override with explicit points if provided
-                if row.get('points') or row.get('puan'):
-                    try:
-                        points = int(row.get('points') or row.get('puan'))
-                    except:
-                        pass
-                
-                # Get correct answer - try different column names
-                correct_raw = (
-                    row.get('correct_answer') or row.get('correct') or 
-                    row.get('doğru_cevap') or row.get('dogru_cevap') or 'A'
-                )
-                correct_answer = correct_raw.strip().upper()
-                
-                question = {
-                    'id': row.get('question_id') or row.get('id') or row.get('soru_id') or str(uuid.uuid4()),
-                    'text': row.get('question') or row.get('text') or row.get('soru') or '',
-                    'options': {
-                        'A': row.get('option_a') or row.get('a') or '',
-                        'B': row.get('option_b') or row.get('b') or '',
-                        'C': row.get('option_c') or row.get('c') or '',
-                        'D': row.get('option_d') or row.get('d') or ''
-                    },
-                    'correct_answer': correct_answer,
-                    'difficulty': difficulty,
-                    'points': points,
-                    'episode_id': episode_id
-                }
-                
-                if question['text'] and any(question['options'].values()):
-                    if episode_id not in questions_by_episode:
-                        questions_by_episode[episode_id] = []
-                    questions_by_episode[episode_id].append(question)
-            except Exception as e:
-                logger.warning(f"Error parsing question row: {e}, row: {row}")
-                continue
-        
-        logger.info(f"Loaded questions for episodes: {list(questions_by_episode.keys())}")
-        for ep, qs in questions_by_episode.items():
-            logger.info(f"Episode {ep}: {len(qs)} questions")
-        
-        cache[cache_key] = questions_by_episode
-        return questions_by_episode
-    except Exception as e:
-        logger.error(f"Error fetching questions: {e}")
+    await wait_for_content_warmup()
+    snapshot = current_snapshot() or await load_sheets_content()
+    if snapshot is None:
         return {}
+    return snapshot.questions_by_episode()
+
+def get_content_version() -> Optional[str]:
+    """Version of the content being served; changes whenever episodes or questions change"""
+    snapshot = current_snapshot()
+    return snapshot.digest if snapshot is not None else None
+
+def serialize_episodes(episodes: List[Episode]) -> bytes:
+    """Render the episode list once; reused until the episode list changes"""
+    return json.dumps(
+        [e.model_dump() for e in episodes], ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
 
-def transform_question(q: Dict) -> Question:
+# Pre-serialized (and lazily pre-compressed) /api/episodes body, keyed on the
+# identity of the cached episode list
+_episodes_payload: Dict[str, Any] = {"source": None, "body": PrecompressedBody(b""), "etag": ""}
+
+def get_episodes_payload(episodes: List[Episode]) -> Dict[str, Any]:
+    if _episodes_payload["source"] is not episodes:
+        body = serialize_episodes(episodes)
+        _episodes_payload.update(
+            source=episodes,
+            body=PrecompressedBody(body),
+            etag=f'"ep-{hashlib.sha256(body).hexdigest()[:16]}"',
+        )
+    return _episodes_payload
+
+# Offline content bundles (full and deltas), kept for the last few content versions
+bundle_builder = BundleBuilder()
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for this header)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return etag in tags or f"W/{etag}" in tags
+
+CONTENT_CACHE_CONTROL = "public, max-age=60, must-revalidate"
+
+def cached_response(request: Request, body: PrecompressedBody, etag: str, version: Optional[str]) -> Response:
+    headers = {"ETag": etag, "Cache-Control": CONTENT_CACHE_CONTROL}
+    if version:
+        headers["X-Content-Version"] = version
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return precompressed_response(request, body, headers=headers)
+
+def transform_question(q: Dict, rng: random.Random = random) -> Question:
     """Transform a raw question dict to Question model with shuffled options"""
     option_keys = ['A', 'B', 'C', 'D']
     options_list = [(key, q['options'][key]) for key in option_keys if q['options'].get(key)]
-    random.shuffle(options_list)
+    rng.shuffle(options_list)
     
     correct_text = q['options'].get(q['correct_answer'], '')
     correct_id = 'A'
@@ -297,6 +424,125 @@ def transform_question(q: Dict) -> Question:
         points=q['points']
     )
 
+# Per-difficulty buckets for each episode and for mixed mode (key None), plus the
+# bank-wide position of each question id; rebuilt when the question bank object changes
+_question_indexes: Dict[str, Any] = {"source": None, "indexes": {}, "positions": None, "option_keys": None}
+
+def _reset_question_indexes(questions_data: Dict[int, Any]):
+    if _question_indexes["source"] is not questions_data:
+        _question_indexes.update(source=questions_data, indexes={}, positions=None, option_keys=None)
+
+def get_question_index(questions_data: Dict[int, Any], episode_id: Optional[int]) -> QuestionIndex:
+    _reset_question_indexes(questions_data)
+    indexes = _question_indexes["indexes"]
+    if episode_id not in indexes:
+        episode_ids = sorted(questions_data)
+        if episode_id is None:
+            questions, offset = ChainedQuestions([questions_data[e] for e in episode_ids]), 0
+        else:
+            questions = questions_data.get(episode_id, [])
+            offset = sum(len(questions_data[e]) for e in episode_ids if e < episode_id)
+        with span("build_question_index", episode_id=episode_id or 0):
+            indexes[episode_id] = QuestionIndex(questions, offset)
+    return indexes[episode_id]
+
+def get_question_positions(questions_data: Dict[int, Any]) -> Dict[str, int]:
+    """Bank-wide position of every question id (the seen-set bit for that question)"""
+    _reset_question_indexes(questions_data)
+    if _question_indexes["positions"] is None:
+        bank = get_question_index(questions_data, None).questions
+        _question_indexes["positions"] = {bank[i]["id"]: i for i in range(len(bank))}
+    return _question_indexes["positions"]
+
+def get_option_keys(questions_data: Dict[int, Any]) -> Dict[str, Dict[str, str]]:
+    """Option key (A-D) of every option text, per question id"""
+    _reset_question_indexes(questions_data)
+    if _question_indexes["option_keys"] is None:
+        _question_indexes["option_keys"] = {
+            q["id"]: {text: key for key, text in q["options"].items() if text}
+            for questions in questions_data.values() for q in questions
+        }
+    return _question_indexes["option_keys"]
+
+# In-memory cache of seen-sets; the sets themselves live in seen_sets
+seen_store = SeenStore(int(os.environ.get("SEEN_CACHE_SIZE", "10000")))
+
+async def load_seen(player_name: Optional[str], questions_data: Dict[int, Any]) -> Optional[SeenSet]:
+    version = get_content_version()
+    if not player_name or version is None:
+        return None
+    size = len(get_question_index(questions_data, None))
+    with span("load_seen"):
+        return await seen_store.get(db.seen_sets, player_name, version, size)
+
+async def seen_changes(data: ScoreSubmit) -> Dict:
+    """Update operators recording the submitted run's questions as seen (may be empty)"""
+    if not data.question_ids:
+        return {}
+    questions_data = await get_questions_data()
+    version = get_content_version()
+    if version is None or data.content_version not in (None, version):
+        # Positions are only meaningful for the version the quiz came from
+        return {}
+    positions = get_question_positions(questions_data)
+    return seen_store.record(
+        data.player_name, version, (positions[q] for q in data.question_ids if q in positions)
+    )
+
+async def save_seen(player_name: str, seen_update: Dict):
+    """Write the operators from `seen_changes` (nothing when there are none)"""
+    if seen_update:
+        await db.seen_sets.update_one({"_id": player_name}, seen_update, upsert=True)
+
+def sample_questions(questions_data: Dict[int, Any], episode_id: Optional[int], count: int,
+                     mix: Optional[str], curve: Optional[str], seed: Optional[int],
+                     seen: Optional[SeenSet] = None) -> List[Question]:
+    """Stratified sample by difficulty, transformed; reproducible when seeded"""
+    rng = random.Random(seed) if seed is not None else random
+    try:
+        target = parse_mix(mix) if mix is not None else None
+        with span("sample_questions", count=count):
+            selected = sample(get_question_index(questions_data, episode_id), count, rng, target, curve, seen)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Geçersiz zorluk dağılımı: {e}")
+    with span("transform_questions", count=len(selected)):
+        return [transform_question(q, rng) for q in selected]
+
+def check_question_count(count: Optional[int]):
+    if count is not None and count < 1:
+        raise HTTPException(status_code=400, detail="Soru sayısı en az 1 olmalı")
+
+def max_possible_score(questions: List[Question]) -> int:
+    """Sum of question points plus the maximum speed bonus (5) per question"""
+    return sum(q.points for q in questions) + (len(questions) * 5)
+
+def format_leaderboard_entries(entries: List[Dict], extra_fields: tuple = ()) -> List[Dict[str, Any]]:
+    """Format score documents (already sorted) as ranked leaderboard entries"""
+    formatted = []
+    for i, entry in enumerate(entries):
+        item = {
+            "rank": i + 1,
+            "player_name": entry.get("player_name", "Anonim"),
+            "score": entry.get("score", 0)
+        }
+        for field in extra_fields:
+            item[field] = entry.get(field, 0)
+        formatted.append(item)
+    return formatted
+
+# Hot routes build their responses as plain data and return them encoded: FastAPI
+# would otherwise validate them against their response_model again and run
+# jsonable_encoder over them. The response models still document them.
+def model_response(model: BaseModel) -> Response:
+    """A response model, encoded by pydantic without a second validation"""
+    return Response(model.model_dump_json(), media_type="application/json")
+
+def leaderboard_body(entries: List[Dict[str, Any]], player_rank: Optional[int], player_score: Optional[int],
+                     total_players: int) -> Dict[str, Any]:
+    """LeaderboardResponse fields, for ORJSONResponse"""
+    return {"entries": entries, "player_rank": player_rank, "player_score": player_score,
+            "total_players": total_players}
+
 # === API ENDPOINTS ===
 
 @api_router.get("/")
@@ -304,18 +550,49 @@ async def root():
     return {"message": "Taşacak Bu Deniz Quiz API", "version": "2.0"}
 
 @api_router.get("/episodes", response_model=List[Episode])
-async def get_episodes():
-    """Get all 14 episodes"""
-    return await get_episodes_data()
+async def get_episodes(request: Request):
+    """Get all 14 episodes (pre-serialized per content version, supports If-None-Match)"""
+    payload = get_episodes_payload(await get_episodes_data())
+    return cached_response(request, payload["body"], payload["etag"], get_content_version())
+
+@api_router.get("/content/version")
+async def get_content_version_info(request: Request):
+    """Current content version, for clients that cache episodes and questions"""
+    await asyncio.gather(get_episodes_data(), get_questions_data())
+    version = get_content_version()
+    body = PrecompressedBody(json.dumps({"version": version}).encode("utf-8"))
+    return cached_response(request, body, f'"cv-{version}"', version)
+
+@api_router.get("/content/bundle")
+async def get_content_bundle(request: Request, since: Optional[str] = None):
+    """All episodes and questions of the current version, or a delta against `since`"""
+    episodes, questions_data = await asyncio.gather(get_episodes_data(), get_questions_data())
+    version = get_content_version()
+    if version is None:
+        raise HTTPException(status_code=503, detail="İçerik henüz hazır değil")
+    if since == version:
+        return Response(status_code=304, headers={"X-Content-Version": version})
+    with span("content_bundle", since=since or ""):
+        body = bundle_builder.bundle(version, episodes, questions_data, since)
+    return cached_response(request, body, f'"cb-{version}-{since or "full"}"', version)
 
 @api_router.get("/quiz/episode/{episode_id}", response_model=QuizResponse)
-async def get_episode_quiz(episode_id: int, count: int = 25):
-    """Get quiz questions for a specific episode (25 questions)"""
+async def get_episode_quiz(episode_id: int, count: int = 25, mix: Optional[str] = None,
+                           curve: Optional[str] = None, seed: Optional[int] = None,
+                           unseen: bool = False, player_name: Optional[str] = None):
+    """Get quiz questions for a specific episode (25 questions)
+
+    `mix` sets the difficulty counts (e.g. `kolay:10,orta:10,zor:5`), `curve` orders
+    them along a difficulty curve (`ramp`, `gentle`, `flat`); by default the
+    episode's own difficulty proportions are used. `seed` makes the quiz reproducible.
+    With `unseen=true` and `player_name`, questions the player has not seen come first.
+    """
+    check_question_count(count)
     # Get episodes dynamically from Google Sheets
     episodes = await get_episodes_data()
-    valid_episode_ids = [e.id for e in episodes if not e.is_locked]
+    episode = next((e for e in episodes if e.id == episode_id), None)
     
-    if episode_id not in valid_episode_ids:
+    if episode is None or episode.is_locked:
         raise HTTPException(status_code=400, detail=f"Geçersiz veya kilitli bölüm ID")
     
     questions_data = await get_questions_data()
@@ -325,62 +602,236 @@ async def get_episode_quiz(episode_id: int, count: int = 25):
         raise HTTPException(status_code=404, detail="Bu bölüm için soru bulunamadı")
     
     # Select up to 25 questions
-    selected = random.sample(episode_questions, min(count, len(episode_questions), 25))
+    seen = await load_seen(player_name, questions_data) if unseen else None
+    quiz_questions = sample_questions(questions_data, episode_id, min(count, 25), mix, curve, seed, seen)
+    max_score = max_possible_score(quiz_questions)  # Include speed bonus
     
-    quiz_questions = [transform_question(q) for q in selected]
-    max_score = sum(q.points for q in quiz_questions) + (len(quiz_questions) * 5)  # Include speed bonus
-    
-    episodes = await get_episodes_data()
-    episode = next((e for e in episodes if e.id == episode_id), None)
-    
-    return QuizResponse(
+    return model_response(QuizResponse(
         episode_id=episode_id,
-        episode_name=episode.name if episode else f"{episode_id}. Bölüm",
+        episode_name=episode.name,
         questions=quiz_questions,
         total_questions=len(quiz_questions),
         max_possible_score=max_score,
-        mode="episode"
-    )
+        mode="episode",
+        content_version=get_content_version()
+    ))
 
 @api_router.get("/quiz/mixed", response_model=QuizResponse)
-async def get_mixed_quiz():
-    """Get mixed quiz with all questions from all episodes (endless mode)"""
+async def get_mixed_quiz(count: Optional[int] = None, mix: Optional[str] = None,
+                         curve: Optional[str] = None, seed: Optional[int] = None,
+                         unseen: bool = False, player_name: Optional[str] = None):
+    """Get mixed quiz with all questions from all episodes (endless mode)
+
+    Accepts the same `mix`, `curve`, `seed` and `unseen` parameters as the episode quiz;
+    `count` limits the number of questions (default: all of them). Like the offline
+    bundle's mixed mode, it draws from every episode, locked ones included.
+    """
+    check_question_count(count)
     questions_data = await get_questions_data()
+    total = sum(len(qs) for qs in questions_data.values())
     
-    all_questions = []
-    for episode_questions in questions_data.values():
-        all_questions.extend(episode_questions)
-    
-    if not all_questions:
+    if not total:
         raise HTTPException(status_code=404, detail="Soru bulunamadı")
     
-    # Shuffle all questions
-    random.shuffle(all_questions)
-    
-    quiz_questions = [transform_question(q) for q in all_questions]
-    max_score = sum(q.points for q in quiz_questions) + (len(quiz_questions) * 5)
+    seen = await load_seen(player_name, questions_data) if unseen else None
+    quiz_questions = sample_questions(questions_data, None, total if count is None else count, mix, curve, seed, seen)
+    max_score = max_possible_score(quiz_questions)
     
-    return QuizResponse(
+    return model_response(QuizResponse(
         episode_id=None,
         episode_name="Karışık Mod",
         questions=quiz_questions,
         total_questions=len(quiz_questions),
         max_possible_score=max_score,
-        mode="mixed"
+        mode="mixed",
+        content_version=get_content_version()
+    ))
+
+# === DAILY CHALLENGE ===
+
+DAILY_QUESTION_COUNT = int(os.environ.get("DAILY_QUESTION_COUNT", "20"))
+# Pinned daily quizzes outlive their day by long enough for runs that crossed midnight
+DAILY_QUIZ_TTL = int(os.environ.get("DAILY_QUIZ_TTL", str(3 * 24 * 3600)))
+daily_quizzes = daily.DailyQuizCache()
+
+async def get_daily_quiz_payload(day) -> Dict[str, Any]:
+    """Pre-serialized daily quiz for `day`, built once per day and pinned in MongoDB
+
+    The first build of the day is stored in `daily_quizzes`; every instance
+    serves that one afterwards, so a content refresh later in the day does not
+    change the quiz players compete on.
+    """
+    async def build():
+        pinned = await db.daily_quizzes.find_one({"_id": day.isoformat()})
+        if pinned is None:
+            pinned = await pin_daily_quiz(day)
+        body = PrecompressedBody(bytes(pinned["body"]))
+        return {"body": body, "etag": f'"dq-{day.isoformat()}-{pinned["version"]}"', "version": pinned["version"]}
+    
+    return await daily_quizzes.get(day, build)
+
+async def pin_daily_quiz(day) -> Dict[str, Any]:
+    """Build the daily quiz from the current content; the first one stored for `day` wins"""
+    _, questions_data = await asyncio.gather(get_episodes_data(), get_questions_data())
+    version = get_content_version()
+    if not questions_data or version is None:
+        raise HTTPException(status_code=404, detail="Soru bulunamadı")
+    with span("build_daily_quiz", day=day.isoformat()):
+        quiz_questions = sample_questions(
+            questions_data, None, DAILY_QUESTION_COUNT, None, "ramp", daily.daily_seed(day, version)
+        )
+        body = QuizResponse(
+            episode_id=None,
+            episode_name="Günün Meydan Okuması",
+            questions=quiz_questions,
+            total_questions=len(quiz_questions),
+            max_possible_score=max_possible_score(quiz_questions),
+            mode="daily",
+            content_version=version,
+            day=day.isoformat()
+        ).model_dump_json().encode("utf-8")
+    return await db.daily_quizzes.find_one_and_update(
+        {"_id": day.isoformat()},
+        {"$setOnInsert": {"version": version, "body": body, "created_at": datetime.utcnow()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
     )
 
+async def warm_daily_quiz(day):
+    await get_daily_quiz_payload(day)
+
+def parse_daily_day(value: Optional[str]):
+    """Validate a daily challenge date: today, or yesterday for runs that crossed midnight"""
+    today = daily.today()
+    if value is None:
+        return today
+    try:
+        day = datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Geçersiz tarih")
+    if (today - day).days not in (0, 1):
+        raise HTTPException(status_code=400, detail="Bu günün meydan okuması kapandı")
+    return day
+
 # === SCORE & LEADERBOARD ENDPOINTS ===
 
-@api_router.post("/score/episode")
-async def submit_episode_score(data: EpisodeScoreSubmit):
-    """Submit score for episode mode - keeps best score only"""
-    collection = db.episode_scores
-    
-    # Check if player has existing score for this episode
-    existing = await collection.find_one({
-        "player_name": data.player_name,
-        "episode_id": data.episode_id
+# Leaderboard player totals live in the `counters` collection: incremented when a
+# player's first score on a board is inserted, recomputed by the counter_resync job
+def board_counter(collection_name: str, scope: Any = None) -> str:
+    return collection_name if scope is None else f"{collection_name}:{scope}"
+
+def score_collection(name: str):
+    """Collection for score writes, with the configured write concern"""
+    return db.get_collection(name, write_concern=SCORE_WRITE_CONCERN)
+
+def read_collection(name: str):
+    """Collection for leaderboard and stats reads: read pool and read preference, when configured"""
+    return (read_db if read_db is not None else db).get_collection(name, read_preference=LEADERBOARD_READ_PREFERENCE)
+
+def counter_board(counter: str) -> Tuple[str, Dict[str, Any]]:
+    """Collection and filter of the board a counter counts (the inverse of `board_counter`)"""
+    collection_name, _, scope = counter.partition(":")
+    if collection_name == "episode_scores":
+        return collection_name, {"episode_id": int(scope)}
+    if collection_name == "daily_scores":
+        return collection_name, {"day": scope}
+    return collection_name, {}
+
+async def seed_counter(name: str, collection=None, filter: Optional[Dict[str, Any]] = None) -> int:
+    """Create a missing counter by counting its board; the count includes the caller's own insert
+
+    `$max`, so concurrent seeds settle on the highest (latest) count and never undo an increment.
+    """
+    if collection is None:
+        collection_name, filter = counter_board(name)
+        collection = db[collection_name]
+    total = await collection.count_documents(filter)
+    await db.counters.update_one({"_id": name}, {"$max": {"value": total}}, upsert=True)
+    return total
+
+async def increment_counter(name: str):
+    # No upsert: a counter created by $inc would start from 1, not from the players already there
+    result = await db.counters.update_one({"_id": name}, {"$inc": {"value": 1}})
+    if result.matched_count == 0:
+        await seed_counter(name)
+
+async def increment_counters(counts: Dict[str, int]):
+    """`increment_counter` for several counters: one bulk write, plus a seed per missing counter"""
+    result = await db.counters.bulk_write([
+        UpdateOne({"_id": name}, {"$inc": {"value": count}}) for name, count in counts.items()
+    ], ordered=False)
+    if result.matched_count < len(counts):
+        existing = {
+            doc["_id"] for doc in await db.counters.find({"_id": {"$in": list(counts)}}, {"_id": 1}).to_list(length=None)
+        }
+        await asyncio.gather(*(seed_counter(name) for name in counts if name not in existing))
+
+async def count_players(collection, filter: Dict[str, Any], counter: str) -> int:
+    """Players on a board, from its counter (counted once if the counter is missing)"""
+    doc = await read_collection("counters").find_one({"_id": counter})
+    if doc is not None:
+        return doc.get("value", 0)
+    return await seed_counter(counter, collection, filter)
+
+# Responses of recent score submissions by run id (see idempotency.py); the
+# score_runs claims expire after SCORE_RUN_TTL seconds
+SCORE_RUN_TTL = int(os.environ.get("SCORE_RUN_TTL", str(24 * 3600)))
+score_runs = IdempotencyStore(int(os.environ.get("SCORE_RUN_CACHE_SIZE", "10000")))
+
+async def limit_players(rule: str, player_names):
+    """Charge every player's bucket of `rule`, or none of them; 429 past the limit"""
+    try:
+        await rate_limiter.check_all(f"{rule}.player", player_names)
+    except RateLimited as e:
+        raise HTTPException(status_code=429, detail="Çok fazla skor gönderildi, lütfen biraz bekleyin",
+                            headers={"Retry-After": str(e.retry_after)})
+
+async def once_per_run(scope: str, player_names: List[str], run_id: Optional[str], handler, rule: str = "scores"):
+    """Run a score submission's handler, or return its stored response if this run was already submitted
+
+    Only submissions that get processed are charged to the players' rate limits.
+    """
+    async def admit():
+        await limit_players(rule, player_names)
+
+    if not run_id:
+        await admit()
+        return await handler()
+    key = run_key(scope, player_names[0], run_id)
+    try:
+        return await score_runs.run(score_collection("score_runs"), key, handler, admit)
+    except RunInProgress:
+        raise HTTPException(status_code=409, detail="Bu skor hâlâ kaydediliyor, lütfen tekrar deneyin")
+
+# Every processed run is appended to the run history (see run_history.py), off the request path
+RUN_HISTORY_TTL_DAYS = int(os.environ.get("RUN_HISTORY_TTL_DAYS", "365"))
+RUN_HISTORY_LATEST = 20
+run_log = RunLog(
+    lambda: db.runs,
+    ready=lambda: index_migration is None or index_migration.collections_ready,
+)
+
+def record_run(mode: str, data, **fields):
+    run_log.append({
+        "ts": datetime.utcnow(), "player": data.player_name, "mode": mode, "score": data.score,
+        "correct_count": data.correct_count, "speed_bonus": data.speed_bonus, **fields,
     })
+
+async def save_best_score(collection, key: Dict[str, Any], data: ScoreSubmit,
+                          extra_fields: Optional[Dict[str, Any]] = None, counter: Optional[str] = None):
+    """Keep the best score per `key` in `collection`; returns (is_new_record, best_score)
+
+    `counter` names the board's player counter, bumped when the first score is inserted.
+    """
+    fields = {
+        "score": data.score,
+        "correct_count": data.correct_count,
+        "speed_bonus": data.speed_bonus,
+        **(extra_fields or {}),
+    }
+    
+    # Check if player has an existing score
+    existing = await collection.find_one(key)
     
     is_new_record = False
     
@@ -389,92 +840,247 @@ async def submit_episode_score(data: EpisodeScoreSubmit):
         if data.score > existing.get("score", 0):
             await collection.update_one(
                 {"_id": existing["_id"]},
-                {"$set": {
-                    "score": data.score,
-                    "correct_count": data.correct_count,
-                    "speed_bonus": data.speed_bonus,
-                    "timestamp": datetime.utcnow()
-                }}
+                {"$set": {**fields, "timestamp": datetime.utcnow()}}
             )
             is_new_record = True
     else:
         # Insert new score
         await collection.insert_one({
             "id": str(uuid.uuid4()),
-            "player_name": data.player_name,
-            "episode_id": data.episode_id,
-            "score": data.score,
-            "correct_count": data.correct_count,
-            "speed_bonus": data.speed_bonus,
+            **key,
+            **fields,
             "timestamp": datetime.utcnow()
         })
         is_new_record = True
+        if counter:
+            await increment_counter(counter)
     
-    # Update global score
-    await update_global_score(data.player_name)
+    # Get player's best
+    best = await collection.find_one(key)
+    return is_new_record, (best.get("score", data.score) if best else data.score)
+
+@api_router.get("/quiz/daily", response_model=QuizResponse)
+async def get_daily_quiz(request: Request):
+    """Today's daily challenge: the same quiz for every player (Europe/Istanbul day)"""
+    payload = await get_daily_quiz_payload(daily.today())
+    return cached_response(request, payload["body"], payload["etag"], payload["version"])
+
+@api_router.post("/score/episode")
+async def submit_episode_score(data: EpisodeScoreSubmit):
+    """Submit score for episode mode - keeps best score only"""
+    return await once_per_run("episode", [data.player_name], data.run_id, lambda: save_episode_score(data))
+
+async def save_episode_score(data: EpisodeScoreSubmit):
+    is_new_record, best_score = await save_best_score(
+        score_collection("episode_scores"),
+        {"player_name": data.player_name, "episode_id": data.episode_id},
+        data,
+        counter=board_counter("episode_scores", data.episode_id),
+    )
     
-    # Get player's best for this episode
-    best = await collection.find_one({
-        "player_name": data.player_name,
-        "episode_id": data.episode_id
-    })
+    # Update global score; the seen-set (if any) is written alongside
+    await asyncio.gather(
+        update_global_score(data.player_name),
+        save_seen(data.player_name, await seen_changes(data)),
+    )
+    record_run("episode", data, episode_id=data.episode_id)
     
     return {
         "success": True,
         "is_new_record": is_new_record,
-        "best_score": best.get("score", data.score) if best else data.score
+        "best_score": best_score
     }
 
 @api_router.post("/score/mixed")
 async def submit_mixed_score(data: MixedScoreSubmit):
     """Submit score for mixed mode - keeps best run only"""
-    collection = db.mixed_scores
-    
-    # Check if player has existing score
-    existing = await collection.find_one({"player_name": data.player_name})
-    
-    is_new_record = False
-    
-    if existing:
-        # Update only if new score is higher
-        if data.score > existing.get("score", 0):
-            await collection.update_one(
-                {"_id": existing["_id"]},
-                {"$set": {
-                    "score": data.score,
-                    "correct_count": data.correct_count,
-                    "speed_bonus": data.speed_bonus,
-                    "questions_answered": data.questions_answered,
-                    "timestamp": datetime.utcnow()
-                }}
-            )
-            is_new_record = True
-    else:
-        # Insert new score
-        await collection.insert_one({
-            "id": str(uuid.uuid4()),
-            "player_name": data.player_name,
-            "score": data.score,
-            "correct_count": data.correct_count,
-            "speed_bonus": data.speed_bonus,
-            "questions_answered": data.questions_answered,
-            "timestamp": datetime.utcnow()
-        })
-        is_new_record = True
+    return await once_per_run("mixed", [data.player_name], data.run_id, lambda: save_mixed_score(data))
+
+async def save_mixed_score(data: MixedScoreSubmit):
+    # The seen-set update (if any) runs alongside the score write
+    (is_new_record, best_score), _ = await asyncio.gather(
+        save_best_score(
+            score_collection("mixed_scores"),
+            {"player_name": data.player_name},
+            data,
+            {"questions_answered": data.questions_answered},
+            counter=board_counter("mixed_scores"),
+        ),
+        save_seen(data.player_name, await seen_changes(data)),
+    )
+    record_run("mixed", data, questions_answered=data.questions_answered)
     
-    # Get player's best
-    best = await collection.find_one({"player_name": data.player_name})
+    return {
+        "success": True,
+        "is_new_record": is_new_record,
+        "best_score": best_score
+    }
+
+@api_router.post("/score/daily")
+async def submit_daily_score(data: DailyScoreSubmit):
+    """Submit score for the daily challenge - keeps best score per day"""
+    return await once_per_run("daily", [data.player_name], data.run_id, lambda: save_daily_score(data))
+
+async def save_daily_score(data: DailyScoreSubmit):
+    day = parse_daily_day(data.day)
+    is_new_record, best_score = await save_best_score(
+        score_collection("daily_scores"),
+        {"player_name": data.player_name, "day": day.isoformat()},
+        data,
+        counter=board_counter("daily_scores", day.isoformat()),
+    )
+    record_run("daily", data, day=day.isoformat())
     
     return {
         "success": True,
         "is_new_record": is_new_record,
-        "best_score": best.get("score", data.score) if best else data.score
+        "best_score": best_score
+    }
+
+@api_router.post("/score/batch")
+async def submit_score_batch(data: BatchScoreSubmit):
+    """Submit many episode and mixed results at once, e.g. runs played offline
+
+    `results` follows the order of `items`: what each submission would have
+    returned had they been sent one by one.
+    """
+    for item in data.items:
+        if item.mode == "episode" and item.episode_id is None:
+            raise HTTPException(status_code=400, detail="Bölüm skoru için episode_id gerekli")
+    players = list(dict.fromkeys(item.player_name for item in data.items))
+    return await once_per_run("batch", players, data.run_id, lambda: save_score_batch(data.items), rule="score_batch")
+
+# Key fields of each score board written by a batch
+BATCH_BOARD_KEYS = {"episode_scores": ("player_name", "episode_id"), "mixed_scores": ("player_name",)}
+
+def batch_board(item: BatchScoreItem) -> Tuple[str, Tuple]:
+    if item.mode == "episode":
+        return "episode_scores", (item.player_name, item.episode_id)
+    return "mixed_scores", (item.player_name,)
+
+async def save_score_batch(items: List[BatchScoreItem]) -> Dict[str, Any]:
+    """Reduce the results to the best per board and player, then write each collection once"""
+    # Current bests: one query per collection
+    queries = {}
+    episode_ids = sorted({item.episode_id for item in items if item.mode == "episode"})
+    if episode_ids:
+        players = sorted({item.player_name for item in items if item.mode == "episode"})
+        queries["episode_scores"] = {"player_name": {"$in": players}, "episode_id": {"$in": episode_ids}}
+    mixed_players = sorted({item.player_name for item in items if item.mode == "mixed"})
+    if mixed_players:
+        queries["mixed_scores"] = {"player_name": {"$in": mixed_players}}
+    found = await asyncio.gather(*(
+        score_collection(name).find(query).to_list(length=None) for name, query in queries.items()
+    ))
+    existing = {
+        (name, tuple(doc.get(field) for field in BATCH_BOARD_KEYS[name])): doc
+        for name, docs in zip(queries, found)
+        for doc in docs
+    }
+    
+    # Replay the submissions in order against the running best of each key
+    best = {board: doc.get("score", 0) for board, doc in existing.items()}
+    winners: Dict[Tuple[str, Tuple], BatchScoreItem] = {}
+    results = []
+    for item in items:
+        board = batch_board(item)
+        is_new_record = board not in best or item.score > best[board]
+        if is_new_record:
+            best[board] = item.score
+            winners[board] = item
+        results.append({"is_new_record": is_new_record, "best_score": best[board]})
+    
+    now = datetime.utcnow()
+    operations: Dict[str, List[UpdateOne]] = {"episode_scores": [], "mixed_scores": []}
+    counters: Dict[str, List[str]] = {"episode_scores": [], "mixed_scores": []}  # per operation
+    # Conditional updates of the inserts, per operation (None for updates)
+    fallbacks: Dict[str, List[Optional[UpdateOne]]] = {"episode_scores": [], "mixed_scores": []}
+    for (name, key), item in winners.items():
+        key_fields = dict(zip(BATCH_BOARD_KEYS[name], key))
+        fields = {"score": item.score, "correct_count": item.correct_count, "speed_bonus": item.speed_bonus, "timestamp": now}
+        if name == "mixed_scores":
+            fields["questions_answered"] = item.questions_answered
+        doc = existing.get((name, key))
+        # Conditional, so a higher score written meanwhile is kept
+        conditional = UpdateOne({**key_fields, "score": {"$lt": item.score}}, {"$set": fields})
+        if doc is None:
+            operations[name].append(UpdateOne(key_fields, {"$setOnInsert": {"id": str(uuid.uuid4()), **fields}}, upsert=True))
+            fallbacks[name].append(conditional)
+        else:
+            operations[name].append(conditional)
+            fallbacks[name].append(None)
+        counters[name].append(board_counter(name, key[1] if name == "episode_scores" else None))
+    
+    names = [name for name, ops in operations.items() if ops]
+    written = await asyncio.gather(*(score_collection(name).bulk_write(operations[name], ordered=False) for name in names))
+    # An insert that found a document (another submission inserted it meanwhile) becomes a conditional update
+    retries = {
+        name: [op for index, op in enumerate(fallbacks[name]) if op is not None and index not in result.upserted_ids]
+        for name, result in zip(names, written)
     }
+    await asyncio.gather(*(
+        score_collection(name).bulk_write(ops, ordered=False) for name, ops in retries.items() if ops
+    ))
+    # Board counters of the inserted keys, found by operation index
+    new_players = [counters[name][index] for name, result in zip(names, written) for index in result.upserted_ids]
+    new_players += await update_global_scores(
+        {name for (board, (name, *_)) in winners if board == "episode_scores"}, items
+    )
+    if new_players:
+        await increment_counters(Counter(new_players))
+    for item in items:
+        if item.mode == "episode":
+            record_run("episode", item, episode_id=item.episode_id)
+        else:
+            record_run("mixed", item, questions_answered=item.questions_answered)
+    
+    return {"success": True, "results": results}
+
+async def update_global_scores(players: set, items: List[BatchScoreItem]) -> List[str]:
+    """Recompute the global scores of `players` in one bulk write, alongside one for the batch's seen questions
+
+    Returns the global_scores counter once per player document inserted.
+    """
+    version = get_content_version()
+    seen_ids: Dict[str, List[str]] = {}
+    for item in items:
+        if item.question_ids and item.content_version in (None, version):
+            seen_ids.setdefault(item.player_name, []).extend(item.question_ids)
+    seen_updates = {
+        name: await seen_changes(ScoreSubmit(player_name=name, score=0, question_ids=ids))
+        for name, ids in seen_ids.items()
+    }
+    
+    totals = {name: [0, 0] for name in players}
+    if players:
+        for doc in await db.episode_scores.find({"player_name": {"$in": sorted(players)}}).to_list(length=None):
+            totals[doc["player_name"]][0] += doc.get("score", 0)
+            totals[doc["player_name"]][1] += 1
+    
+    now = datetime.utcnow()
+    operations = [
+        UpdateOne({"player_name": name},
+                  {"$set": {"score": total_score, "episodes_completed": episodes_completed, "timestamp": now}},
+                  upsert=True)
+        for name, (total_score, episodes_completed) in totals.items()
+    ]
+    seen_operations = [
+        UpdateOne({"_id": name}, update, upsert=True) for name, update in seen_updates.items() if update
+    ]
+    writes = []
+    if operations:
+        writes.append(score_collection("global_scores").bulk_write(operations, ordered=False))
+    if seen_operations:
+        writes.append(db.seen_sets.bulk_write(seen_operations, ordered=False))
+    written = await asyncio.gather(*writes)
+    if not operations:
+        return []
+    return [board_counter("global_scores")] * len(written[0].upserted_ids)
 
 async def update_global_score(player_name: str):
     """Calculate and update global score (sum of all episode best scores)"""
     episode_collection = db.episode_scores
-    global_collection = db.global_scores
+    global_collection = score_collection("global_scores")
     
     # Get all episode scores for this player
     cursor = episode_collection.find({"player_name": player_name})
@@ -485,37 +1091,29 @@ async def update_global_score(player_name: str):
     episodes_completed = len(episode_scores)
     
     # Update or insert global score
-    await global_collection.update_one(
-        {"player_name": player_name},
-        {"$set": {
-            "score": total_score,
-            "episodes_completed": episodes_completed,
-            "timestamp": datetime.utcnow()
-        }},
-        upsert=True
-    )
+    update = {"$set": {
+        "score": total_score,
+        "episodes_completed": episodes_completed,
+        "timestamp": datetime.utcnow()
+    }}
+    result = await global_collection.update_one({"player_name": player_name}, update, upsert=True)
+    if result.upserted_id is not None:
+        await increment_counter(board_counter("global_scores"))
 
 @api_router.get("/leaderboard/general", response_model=LeaderboardResponse)
 async def get_general_leaderboard(player_name: Optional[str] = None):
     """Get general leaderboard (sum of episode best scores)"""
-    collection = db.global_scores
+    collection = read_collection("global_scores")
     
     # Get top 50
     cursor = collection.find().sort("score", -1).limit(50)
     entries = await cursor.to_list(length=50)
     
     # Get total count
-    total = await collection.count_documents({})
+    total = await count_players(collection, {}, board_counter("global_scores"))
     
     # Format entries
-    formatted = []
-    for i, entry in enumerate(entries):
-        formatted.append({
-            "rank": i + 1,
-            "player_name": entry.get("player_name", "Anonim"),
-            "score": entry.get("score", 0),
-            "episodes_completed": entry.get("episodes_completed", 0)
-        })
+    formatted = format_leaderboard_entries(entries, ("episodes_completed",))
     
     # Find player rank
     player_rank = None
@@ -528,16 +1126,14 @@ async def get_general_leaderboard(player_name: Optional[str] = None):
             higher_count = await collection.count_documents({"score": {"$gt": player_score}})
             player_rank = higher_count + 1
     
-    return LeaderboardResponse(
-        entries=formatted,
-        player_rank=player_rank,
-        player_score=player_score,
-        total_players=total
-    )
+    return ORJSONResponse(leaderboard_body(formatted, player_rank, player_score, total))
 
 @api_router.get("/leaderboard/episode/{episode_id}", response_model=LeaderboardResponse)
 async def get_episode_leaderboard(episode_id: int, player_name: Optional[str] = None):
     """Get leaderboard for specific episode"""
+    return ORJSONResponse(await episode_leaderboard(episode_id, player_name))
+
+async def episode_leaderboard(episode_id: int, player_name: Optional[str]) -> Dict[str, Any]:
     # Validate episode_id dynamically
     episodes = await get_episodes_data()
     valid_episode_ids = [e.id for e in episodes]
@@ -545,23 +1141,17 @@ async def get_episode_leaderboard(episode_id: int, player_name: Optional[str] =
     if episode_id not in valid_episode_ids:
         raise HTTPException(status_code=400, detail="Geçersiz bölüm ID")
     
-    collection = db.episode_scores
+    collection = read_collection("episode_scores")
     
     # Get top 50 for this episode
     cursor = collection.find({"episode_id": episode_id}).sort("score", -1).limit(50)
     entries = await cursor.to_list(length=50)
     
     # Get total count
-    total = await collection.count_documents({"episode_id": episode_id})
+    total = await count_players(collection, {"episode_id": episode_id}, board_counter("episode_scores", episode_id))
     
     # Format entries
-    formatted = []
-    for i, entry in enumerate(entries):
-        formatted.append({
-            "rank": i + 1,
-            "player_name": entry.get("player_name", "Anonim"),
-            "score": entry.get("score", 0)
-        })
+    formatted = format_leaderboard_entries(entries)
     
     # Find player rank
     player_rank = None
@@ -579,34 +1169,22 @@ async def get_episode_leaderboard(episode_id: int, player_name: Optional[str] =
             })
             player_rank = higher_count + 1
     
-    return LeaderboardResponse(
-        entries=formatted,
-        player_rank=player_rank,
-        player_score=player_score,
-        total_players=total
-    )
+    return leaderboard_body(formatted, player_rank, player_score, total)
 
 @api_router.get("/leaderboard/mixed", response_model=LeaderboardResponse)
 async def get_mixed_leaderboard(player_name: Optional[str] = None):
     """Get mixed mode leaderboard"""
-    collection = db.mixed_scores
+    collection = read_collection("mixed_scores")
     
     # Get top 50
     cursor = collection.find().sort("score", -1).limit(50)
     entries = await cursor.to_list(length=50)
     
     # Get total count
-    total = await collection.count_documents({})
+    total = await count_players(collection, {}, board_counter("mixed_scores"))
     
     # Format entries
-    formatted = []
-    for i, entry in enumerate(entries):
-        formatted.append({
-            "rank": i + 1,
-            "player_name": entry.get("player_name", "Anonim"),
-            "score": entry.get("score", 0),
-            "questions_answered": entry.get("questions_answered", 0)
-        })
+    formatted = format_leaderboard_entries(entries, ("questions_answered",))
     
     # Find player rank
     player_rank = None
@@ -618,34 +1196,386 @@ async def get_mixed_leaderboard(player_name: Optional[str] = None):
             higher_count = await collection.count_documents({"score": {"$gt": player_score}})
             player_rank = higher_count + 1
     
-    return LeaderboardResponse(
-        entries=formatted,
-        player_rank=player_rank,
-        player_score=player_score,
-        total_players=total
+    return ORJSONResponse(leaderboard_body(formatted, player_rank, player_score, total))
+
+@api_router.get("/leaderboard/daily", response_model=LeaderboardResponse)
+async def get_daily_leaderboard(day: Optional[str] = None, player_name: Optional[str] = None):
+    """Get daily challenge leaderboard (today unless `day` is given)"""
+    if day is None:
+        day = daily.today().isoformat()
+    collection = read_collection("daily_scores")
+    
+    # Get top 50 for this day
+    cursor = collection.find({"day": day}).sort("score", -1).limit(50)
+    entries = await cursor.to_list(length=50)
+    
+    # Get total count
+    total = await count_players(collection, {"day": day}, board_counter("daily_scores", day))
+    
+    # Format entries
+    formatted = format_leaderboard_entries(entries)
+    
+    # Find player rank
+    player_rank = None
+    player_score = None
+    if player_name:
+        player_entry = await collection.find_one({"player_name": player_name, "day": day})
+        if player_entry:
+            player_score = player_entry.get("score", 0)
+            higher_count = await collection.count_documents({"day": day, "score": {"$gt": player_score}})
+            player_rank = higher_count + 1
+    
+    return ORJSONResponse(leaderboard_body(formatted, player_rank, player_score, total))
+
+# Group (friends) leaderboards: one $in query for the group, global ranks from the
+# in-memory rank index (see rank_index.py), responses cached briefly per group.
+# The index keeps a board's top RANK_INDEX_MAX_SCORES scores; ranks below them are counted
+rank_index = RankIndex(
+    max_age=float(os.environ.get("RANK_INDEX_MAX_AGE", "30")),
+    max_scores=int(os.environ.get("RANK_INDEX_MAX_SCORES", "100000")),
+)
+group_leaderboards = TTLCache(maxsize=1024, ttl=float(os.environ.get("GROUP_LEADERBOARD_TTL", "10")))
+
+async def group_board(board: str, day: Optional[str]) -> Tuple[str, Dict[str, Any], tuple]:
+    """Collection, filter and extra entry fields of a board: general, mixed, daily or an episode id"""
+    if board == "general":
+        return "global_scores", {}, ("episodes_completed",)
+    if board == "mixed":
+        return "mixed_scores", {}, ("questions_answered",)
+    if board == "daily":
+        return "daily_scores", {"day": day or daily.today().isoformat()}, ()
+    if board.isdigit() and int(board) in {e.id for e in await get_episodes_data()}:
+        return "episode_scores", {"episode_id": int(board)}, ()
+    raise HTTPException(status_code=400, detail="Geçersiz sıralama")
+
+@api_router.post("/leaderboard/{board}/group", response_model=GroupLeaderboardResponse)
+async def get_group_leaderboard(board: str, request: GroupLeaderboardRequest):
+    """Rank a group of players (e.g. friends) on a board, with their global ranks"""
+    collection_name, filter, extra_fields = await group_board(board, request.day)
+    names = sorted(set(request.player_names))
+    board_key = (collection_name, tuple(filter.items()))
+    cache_key = (board_key, hashlib.sha256("\n".join(names).encode("utf-8")).hexdigest())
+    cached = group_leaderboards.get(cache_key)
+    if cached is not None:
+        return Response(cached, media_type="application/json")
+
+    collection = read_collection(collection_name)
+
+    async def load_scores():
+        # The top of the board, sorted on its score index, so building the rank array only checks the order
+        limit = rank_index.max_scores + 1 if rank_index.max_scores is not None else 0
+        cursor = collection.find(filter, {"_id": 0, "score": 1}).sort("score", -1).limit(limit)
+        return [doc.get("score", 0) for doc in await cursor.to_list(length=None)][::-1]
+
+    projection = {"_id": 0, "player_name": 1, "score": 1, **{field: 1 for field in extra_fields}}
+    ranks, members = await asyncio.gather(
+        rank_index.get(board_key, load_scores),
+        collection.find({**filter, "player_name": {"$in": names}}, projection).to_list(length=len(names)),
     )
+    members.sort(key=lambda doc: (-doc.get("score", 0), doc["player_name"]))
+    entries = format_leaderboard_entries(members, extra_fields)
+    for entry in entries:
+        entry["global_rank"] = ranks.rank(entry["score"])
+    # Below the top the index keeps: one count per distinct score
+    below = sorted({entry["score"] for entry in entries if entry["global_rank"] is None})
+    higher = await asyncio.gather(*(
+        collection.count_documents({**filter, "score": {"$gt": score}}) for score in below
+    ))
+    counted = dict(zip(below, higher))
+    for entry in entries:
+        if entry["global_rank"] is None:
+            entry["global_rank"] = counted[entry["score"]] + 1
+    total = ranks.total
+    if total is None:
+        scope = filter.get("episode_id", filter.get("day"))
+        total = await count_players(collection, filter, board_counter(collection_name, scope))
+    ranked = {entry["player_name"] for entry in entries}
+    response = ORJSONResponse({
+        "entries": entries,
+        "unranked": [name for name in names if name not in ranked],
+        "total_players": max(total, len(entries)),
+    })
+    # Cached encoded: repeated requests for the group cost no serialization
+    group_leaderboards[cache_key] = response.body
+    return response
 
 @api_router.get("/player/{player_name}/stats")
 async def get_player_stats(player_name: str):
     """Get player statistics"""
     # Get episode scores
-    episode_cursor = db.episode_scores.find({"player_name": player_name})
+    episode_cursor = read_collection("episode_scores").find({"player_name": player_name})
     episode_scores = await episode_cursor.to_list(length=100)
     
     # Get mixed score
-    mixed_score = await db.mixed_scores.find_one({"player_name": player_name})
+    mixed_score = await read_collection("mixed_scores").find_one({"player_name": player_name})
     
     # Get global score
-    global_score = await db.global_scores.find_one({"player_name": player_name})
+    global_score = await read_collection("global_scores").find_one({"player_name": player_name})
     
-    return {
+    return ORJSONResponse({
         "player_name": player_name,
         "global_score": global_score.get("score", 0) if global_score else 0,
         "episodes_completed": len(episode_scores),
         "episode_scores": {s["episode_id"]: s["score"] for s in episode_scores},
         "mixed_best_score": mixed_score.get("score", 0) if mixed_score else 0
+    })
+
+@api_router.get("/player/{player_name}/history")
+async def get_player_history(player_name: str, days: int = 30):
+    """Per-day rollups of the player's runs over the last `days` days, and their latest runs
+
+    Rollups are refreshed by the run_rollup job; the latest runs cover what they do not include yet.
+    """
+    days = max(1, min(days, RUN_HISTORY_TTL_DAYS))
+    since = (daily.today() - timedelta(days=days - 1)).isoformat()
+    rollups, latest = await asyncio.gather(
+        read_collection("run_rollups").find({"player": player_name, "day": {"$gte": since}}).sort("day", 1).to_list(length=None),
+        read_collection("runs").find({"player": player_name}).sort("ts", -1).limit(RUN_HISTORY_LATEST).to_list(length=None),
+    )
+    return ORJSONResponse({
+        "player_name": player_name,
+        "days": [summarize_rollup(doc) for doc in rollups],
+        "latest_runs": [summarize_run(doc) for doc in latest],
+    })
+
+# === ANSWER ANALYTICS ===
+
+# Per-question tallies of this instance, flushed to answer_stats by the answer_stats_flush job
+answer_stats = AnswerStats()
+
+@api_router.post("/analytics/answers")
+async def ingest_answers(data: AnswerBatch):
+    """Record a batch of answer events; they reach answer_stats with the next flush"""
+    questions_data = await get_questions_data()
+    accepted = answer_stats.record(data.events, get_option_keys(questions_data))
+    return {"accepted": accepted, "dropped": len(data.events) - accepted}
+
+async def flush_answer_stats():
+    return await answer_stats.flush(db.answer_stats)
+
+# === BACKGROUND JOBS ===
+
+LEADERBOARD_SNAPSHOT_SIZE = 50
+LEADERBOARD_SNAPSHOT_TTL = int(os.environ.get("LEADERBOARD_SNAPSHOT_TTL", str(30 * 24 * 3600)))
+BULK_WRITE_CHUNK = 1000
+
+async def bulk_write_chunked(collection, operations: List[UpdateOne]) -> int:
+    for start in range(0, len(operations), BULK_WRITE_CHUNK):
+        await collection.bulk_write(operations[start:start + BULK_WRITE_CHUNK], ordered=False)
+    return len(operations)
+
+RUN_ROLLUP_DAYS = int(os.environ.get("RUN_ROLLUP_DAYS", "2"))
+
+async def rollup_runs():
+    """Recompute the per-day run rollups of the last RUN_ROLLUP_DAYS days (Europe/Istanbul) from raw runs"""
+    operations = []
+    for day in days_back(daily.today(), RUN_ROLLUP_DAYS):
+        operations += await rollup_day(db.runs, day)
+    return await bulk_write_chunked(db.run_rollups, operations)
+
+async def reload_sheets_content() -> MappedSnapshot:
+    """Refetch both sheets and swap the new content in
+
+    The sheets are parsed and built in the build pool, so requests keep being
+    served from the old snapshot meanwhile, and a failed fetch leaves it in
+    place. The swap is a single assignment. Unchanged content keeps the old
+    snapshot, so the payloads and indexes derived from it stay cached.
+    """
+    global _sheets_snapshot
+    snapshot = check_content(MappedSnapshot.from_bytes(await fetch_content(), path="sheets"))
+    if _sheets_snapshot is not None and _sheets_snapshot.digest == snapshot.digest:
+        snapshot = _sheets_snapshot
+    _sheets_snapshot = snapshot
+    return snapshot
+
+async def reconcile_global_scores():
+    """Recompute global scores from episode bests and fix the ones that drifted"""
+    totals = await db.episode_scores.aggregate([
+        {"$group": {"_id": "$player_name", "score": {"$sum": "$score"}, "episodes_completed": {"$sum": 1}}}
+    ]).to_list(length=None)
+    current = {
+        doc["player_name"]: doc
+        for doc in await db.global_scores.find(
+            {}, {"player_name": 1, "score": 1, "episodes_completed": 1}
+        ).to_list(length=None)
+    }
+    operations = []
+    for total in totals:
+        doc = current.get(total["_id"], {})
+        if doc.get("score") != total["score"] or doc.get("episodes_completed") != total["episodes_completed"]:
+            operations.append(UpdateOne(
+                {"player_name": total["_id"]},
+                {"$set": {
+                    "score": total["score"],
+                    "episodes_completed": total["episodes_completed"],
+                    "timestamp": datetime.utcnow(),
+                }},
+                upsert=True,
+            ))
+    fixed = await bulk_write_chunked(db.global_scores, operations)
+    if fixed:
+        logger.info(f"Reconciled {fixed} global scores")
+
+async def snapshot_leaderboards():
+    """Store the current top entries of the general, mixed and daily boards"""
+    today = daily.today().isoformat()
+    boards = [
+        ("general", read_collection("global_scores"), {}, ("episodes_completed",)),
+        ("mixed", read_collection("mixed_scores"), {}, ()),
+        (f"daily:{today}", read_collection("daily_scores"), {"day": today}, ()),
+    ]
+    taken_at = datetime.utcnow()
+    documents = []
+    for board, collection, filter, extra_fields in boards:
+        entries = await collection.find(filter).sort("score", -1).limit(LEADERBOARD_SNAPSHOT_SIZE).to_list(
+            length=LEADERBOARD_SNAPSHOT_SIZE
+        )
+        documents.append({
+            "board": board,
+            "taken_at": taken_at,
+            "entries": format_leaderboard_entries(entries, extra_fields),
+        })
+    await db.leaderboard_snapshots.insert_many(documents)
+
+async def resync_counters():
+    """Recount the players on every board and overwrite the leaderboard counters"""
+    today = daily.today()
+    counts = {
+        board_counter("global_scores"): await db.global_scores.count_documents({}),
+        board_counter("mixed_scores"): await db.mixed_scores.count_documents({}),
+    }
+    for row in await db.episode_scores.aggregate([
+        {"$group": {"_id": "$episode_id", "players": {"$sum": 1}}}
+    ]).to_list(length=None):
+        counts[board_counter("episode_scores", row["_id"])] = row["players"]
+    for day in (today, today - timedelta(days=1)):
+        counts[board_counter("daily_scores", day.isoformat())] = await db.daily_scores.count_documents(
+            {"day": day.isoformat()}
+        )
+    await bulk_write_chunked(db.counters, [
+        UpdateOne({"_id": name}, {"$set": {"value": value}}, upsert=True) for name, value in counts.items()
+    ])
+
+def schedule_jobs(scheduler: Scheduler):
+    """Register the app's periodic jobs; singleton ones run on one instance of the fleet"""
+    if CONTENT_SOURCE != "mongo" and snapshot_reader is None:
+        # Refresh in the background, so requests never wait for Google Sheets
+        scheduler.every(
+            "content_refresh", float(os.environ.get("CONTENT_REFRESH_INTERVAL", "240")),
+            reload_sheets_content, jitter=10.0, timeout=60.0,
+        )
+    # Build tomorrow's daily challenge just before midnight, so the first request is a cache hit
+    scheduler.cron(
+        "daily_warm", os.environ.get("DAILY_WARM_CRON", "58 23 * * *"),
+        lambda: warm_daily_quiz(daily.today() + timedelta(days=1)),
+        tz="Europe/Istanbul", timeout=60.0,
+    )
+    scheduler.every(
+        "global_score_reconcile", float(os.environ.get("GLOBAL_SCORE_RECONCILE_INTERVAL", "3600")),
+        reconcile_global_scores, jitter=60.0, timeout=300.0, singleton=True,
+    )
+    scheduler.every(
+        "leaderboard_snapshot", float(os.environ.get("LEADERBOARD_SNAPSHOT_INTERVAL", "3600")),
+        snapshot_leaderboards, jitter=60.0, timeout=120.0, singleton=True,
+    )
+    scheduler.every(
+        "counter_resync", float(os.environ.get("COUNTER_RESYNC_INTERVAL", "900")),
+        resync_counters, run_at_start=True, jitter=30.0, timeout=120.0, singleton=True,
+    )
+    scheduler.every(
+        "run_rollup", float(os.environ.get("RUN_ROLLUP_INTERVAL", "600")),
+        rollup_runs, jitter=30.0, timeout=300.0, singleton=True,
+    )
+    # Every instance flushes its own answer tallies
+    scheduler.every(
+        "answer_stats_flush", float(os.environ.get("ANSWER_STATS_FLUSH_INTERVAL", "10")),
+        flush_answer_stats, timeout=30.0,
+    )
+
+# === ADMIN ENDPOINTS ===
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN or x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Yetkisiz erişim")
+
+@api_router.post("/admin/content/refresh", dependencies=[Depends(require_admin)])
+async def refresh_content():
+    """Refresh content from Google Sheets now (fleet-wide in CONTENT_SOURCE=mongo mode)"""
+    if content_sync is not None:
+        refreshed_here = await content_sync.request_refresh()
+        return {
+            "success": True,
+            "leader": refreshed_here,
+            "version": content_sync.version,
+        }
+    
+    if snapshot_reader is not None:
+        # Snapshots are refreshed by content_refresher.py
+        return {"success": True, "leader": False, "version": get_content_version()}
+    
+    # Single instance: swap in fresh content (the old copy serves until then)
+    try:
+        await reload_sheets_content()
+    except Exception as e:
+        logger.error(f"Content refresh failed: {e}")
+        raise HTTPException(status_code=502, detail="İçerik yenilenemedi")
+    return {"success": True, "leader": True, "version": get_content_version(), "build": content_builds.as_dict()}
+
+@api_router.get("/admin/mongo", dependencies=[Depends(require_admin)])
+async def get_mongo_metrics():
+    """MongoDB client settings and connection pool metrics of this instance"""
+    return {
+        "settings": mongo_settings.as_dict(),
+        "pools": {name: metrics.as_dict() for name, metrics in pool_metrics.items()},
+        "run_history": run_log.metrics(),
+        "rank_index": rank_index.metrics(),
+    }
+
+@api_router.get("/admin/load", dependencies=[Depends(require_admin)])
+async def get_load_metrics():
+    """Active, queued and rejected requests per route budget, rate limit and traffic capture counters"""
+    return {
+        "budgets": route_limits.metrics(),
+        "rate_limits": rate_limiter.metrics(),
+        "traffic_capture": traffic_capture.metrics() if traffic_capture is not None else None,
+    }
+
+@api_router.get("/admin/analytics/questions", dependencies=[Depends(require_admin)])
+async def get_answer_stats(episode_id: Optional[int] = None):
+    """Aggregated answer stats per question, in sheet order (as of the last flush of each instance)"""
+    questions_data = await get_questions_data()
+    if episode_id is not None and episode_id not in questions_data:
+        raise HTTPException(status_code=404, detail="Bölüm bulunamadı")
+    episode_ids = [episode_id] if episode_id is not None else sorted(questions_data)
+    questions = [q for e in episode_ids for q in questions_data[e]]
+    docs = await read_collection("answer_stats").find(
+        {"_id": {"$in": [q["id"] for q in questions]}}
+    ).to_list(length=None)
+    by_id = {doc["_id"]: doc for doc in docs}
+    return {
+        "time_histogram_bounds_ms": histogram_bounds(),
+        "pending": answer_stats.metrics(),
+        "questions": [
+            {"id": q["id"], "episode_id": q["episode_id"], "text": q["text"], "difficulty": q["difficulty"],
+             "correct_option": q["correct_answer"],
+             **summarize_answers(by_id.get(q["id"]), {k: t for k, t in q["options"].items() if t})}
+            for q in questions
+        ],
     }
 
+@api_router.get("/admin/jobs", dependencies=[Depends(require_admin)])
+async def get_jobs():
+    """Metrics of this instance's scheduled jobs"""
+    return {"jobs": scheduler.metrics() if scheduler is not None else {}}
+
+@api_router.post("/admin/jobs/{name}/run", dependencies=[Depends(require_admin)])
+async def run_job(name: str):
+    """Run a scheduled job now (singleton jobs still run on the leader only)"""
+    if scheduler is None or name not in scheduler.jobs:
+        raise HTTPException(status_code=404, detail="Görev bulunamadı")
+    scheduler.trigger(name)
+    return {"success": True, "job": name}
+
 # Legacy endpoint for backward compatibility
 @api_router.post("/leaderboard")
 async def legacy_save_score(data: dict):
@@ -657,24 +1587,29 @@ async def legacy_save_score(data: dict):
     return await submit_episode_score(EpisodeScoreSubmit(
         episode_id=episode_id,
         player_name=player_name,
-        score=score
+        score=score,
+        run_id=data.get("run_id")
     ))
 
 @api_router.get("/leaderboard/{episode_id}")
 async def legacy_get_leaderboard(episode_id: int, player_name: Optional[str] = None):
     """Legacy endpoint - redirects to episode leaderboard"""
-    result = await get_episode_leaderboard(episode_id, player_name)
+    result = await episode_leaderboard(episode_id, player_name)
     # Convert to old format
-    return {
-        "top_10": result.entries[:10],
-        "player_rank": result.player_rank,
-        "player_entry": {"score": result.player_score} if result.player_score else None,
-        "total_players": result.total_players
-    }
+    return ORJSONResponse({
+        "top_10": result["entries"][:10],
+        "player_rank": result["player_rank"],
+        "player_entry": {"score": result["player_score"]} if result["player_score"] else None,
+        "total_players": result["total_players"]
+    })
 
 # Include router and setup CORS
 app.include_router(api_router)
 
+# Innermost, so 503 and 429 rejections still carry CORS headers; rate limits
+# first, so flooding clients do not take route budget slots
+app.add_middleware(LoadSheddingMiddleware, limits=route_limits)
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter, rules=RATE_LIMITED_ROUTES)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -682,18 +1617,143 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(TracingMiddleware)
+# Opt-in capture of sanitized traffic for local replay (see capture.py);
+# outermost, so captured timings include every middleware
+traffic_capture = capture_from_env()
+if traffic_capture is not None:
+    app.add_middleware(CaptureMiddleware, capture=traffic_capture)
+
+# Indexes the app needs; created in the background on startup when missing
+INDEXES = {
+    "episode_scores": [
+        IndexModel([("player_name", 1), ("episode_id", 1)], unique=True),
+        IndexModel([("episode_id", 1), ("score", -1)]),
+    ],
+    "mixed_scores": [
+        IndexModel("player_name", unique=True),
+        IndexModel([("score", -1)]),
+    ],
+    "global_scores": [
+        IndexModel("player_name", unique=True),
+        IndexModel([("score", -1)]),
+    ],
+    "daily_scores": [
+        IndexModel([("player_name", 1), ("day", 1)], unique=True),
+        IndexModel([("day", 1), ("score", -1)]),
+    ],
+    "leaderboard_snapshots": [
+        IndexModel([("board", 1), ("taken_at", -1)]),
+        IndexModel("taken_at", expireAfterSeconds=LEADERBOARD_SNAPSHOT_TTL),
+    ],
+    "score_runs": [
+        IndexModel("created_at", expireAfterSeconds=SCORE_RUN_TTL),
+    ],
+    "daily_quizzes": [
+        IndexModel("created_at", expireAfterSeconds=DAILY_QUIZ_TTL),
+    ],
+    "rate_limits": [
+        IndexModel("expires_at", expireAfterSeconds=0),
+    ],
+    "runs": [
+        IndexModel([("player", 1), ("ts", -1)]),
+    ],
+    "run_rollups": [
+        IndexModel([("player", 1), ("day", 1)]),
+    ],
+    # Versions published by CONTENT_SOURCE=mongo instances (see content_sync.py)
+    "content_snapshots": [
+        IndexModel("version", unique=True),
+    ],
+}
+# Collections created with options before their indexes
+COLLECTIONS = {"runs": runs_collection_options(RUN_HISTORY_TTL_DAYS)}
+
+READY_PING_TIMEOUT = float(os.environ.get("READY_PING_TIMEOUT", "2"))
+content_ready = False
+
+async def warm_content():
+    """Load content before the first request needs it (both sheets fetched concurrently)"""
+    try:
+        if content_sync is not None:
+            await content_sync.start(scheduler)
+        elif snapshot_reader is None:
+            await reload_sheets_content()
+    except Exception as e:
+        # Requests fall back to loading content themselves
+        logger.error(f"Content warm-up failed: {e}")
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and its event loop responds"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: content has been loaded and MongoDB answers a ping"""
+    global content_ready
+    # Sticky: once content has loaded, a Sheets outage must not take every instance out of rotation
+    content_ready = content_ready or get_content_version() is not None
+    try:
+        await asyncio.wait_for(db.command("ping"), timeout=READY_PING_TIMEOUT)
+        mongo_ready = True
+    except Exception as e:
+        logger.warning(f"Readiness: MongoDB ping failed: {e}")
+        mongo_ready = False
+    ready = content_ready and mongo_ready
+    return JSONResponse({
+        "status": "ready" if ready else "not_ready",
+        "checks": {"content": content_ready, "mongo": mongo_ready},
+        "content_version": get_content_version(),
+        "indexes": index_migration.as_dict() if index_migration is not None else None,
+    }, status_code=200 if ready else 503)
 
 @app.on_event("startup")
 async def startup_db_client():
+    global content_sync, scheduler, index_migration, content_warmup
     logger.info("Starting up - connecting to MongoDB")
-    # Create indexes
-    await db.episode_scores.create_index([("player_name", 1), ("episode_id", 1)], unique=True)
-    await db.episode_scores.create_index([("episode_id", 1), ("score", -1)])
-    await db.mixed_scores.create_index("player_name", unique=True)
-    await db.mixed_scores.create_index([("score", -1)])
-    await db.global_scores.create_index("player_name", unique=True)
-    await db.global_scores.create_index([("score", -1)])
+    # Nothing here waits on MongoDB or Google Sheets: the app serves right away
+    # and /readyz reports when content is loaded
+    index_migration = IndexMigration(db, INDEXES, COLLECTIONS)
+    startup_tasks.append(asyncio.create_task(index_migration.run()))
+    
+    scheduler = Scheduler(db.leases)
+    if CONTENT_SOURCE == "mongo":
+        content_sync = ContentSync(
+            db, fetch_content,
+            poll_interval=float(os.environ.get("CONTENT_POLL_INTERVAL", "5")),
+            refresh_interval=float(os.environ.get("CONTENT_REFRESH_INTERVAL", "300")),
+            use_change_stream=os.environ.get("CONTENT_CHANGE_STREAM") == "1",
+            ready=lambda: index_migration.done,
+        )
+    content_warmup = asyncio.create_task(warm_content())
+    startup_tasks.append(content_warmup)
+    schedule_jobs(scheduler)
+    scheduler.start()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in startup_tasks:
+        task.cancel()
+    await asyncio.gather(*startup_tasks, return_exceptions=True)
+    startup_tasks.clear()
+    if scheduler is not None:
+        await scheduler.stop()
+    try:
+        await flush_answer_stats()
+    except Exception as e:
+        logger.warning(f"Final answer stats flush failed: {e}")
+    try:
+        await run_log.close()
+    except Exception as e:
+        logger.warning(f"Final run history insert failed, {run_log.pending} runs lost: {e}")
+    if content_sync is not None:
+        await content_sync.stop()
+    content_builds.shutdown()
+    await tracer.shutdown()
+    if traffic_capture is not None:
+        traffic_capture.close()
     client.close()
+    if read_client is not None:
+        read_client.close()
@@ -0,0 +1,276 @@
+"""Versioned, read-only content snapshots shared between worker processes.
+
+A snapshot file holds the episode list and every question of one content
+version. Questions are stored as individual UTF-8 JSON records behind an
+offset table, so workers ``mmap`` the file and decode only the questions they
+serve; the pages live once in the OS page cache no matter how many workers map
+them.
+
+Layout::
+
+    b"TBDSNAP1" | uint32 header length | header JSON | pad to 8
+    | uint64 offsets[count + 1] | question records
+
+The header carries ``version`` (monotonic), ``digest`` (content hash),
+``episodes`` and ``episode_index`` (episode id -> [first question, count]).
+``publish_snapshot`` (or ``write_snapshot``) publishes a new file and then
+atomically replaces the ``CURRENT`` pointer; ``SnapshotReader`` notices the new
+pointer and swaps. Buffers built elsewhere (see ``content_build.py``) carry
+version 0 until ``restamp_snapshot`` gives them their published version.
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TBDSNAP1"
+POINTER = "CURRENT"
+KEEP_SNAPSHOTS = 3
+
+
+def content_digest(episodes: List[Dict[str, Any]], questions_by_episode: Dict[int, List[Dict]]) -> str:
+    """Stable hash of the built content, independent of dict ordering."""
+    h = hashlib.sha256()
+    h.update(json.dumps(episodes, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    for episode_id in sorted(questions_by_episode):
+        for q in questions_by_episode[episode_id]:
+            h.update(json.dumps(q, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def encode_snapshot(version: int, episodes: List[Dict[str, Any]],
+                    questions_by_episode: Dict[int, List[Dict]], digest: Optional[str] = None) -> bytes:
+    """Serialize one content version into the snapshot layout."""
+    records: List[bytes] = []
+    episode_index: Dict[str, List[int]] = {}
+    for episode_id in sorted(questions_by_episode):
+        questions = questions_by_episode[episode_id]
+        episode_index[str(episode_id)] = [len(records), len(questions)]
+        records.extend(json.dumps(q, ensure_ascii=False, separators=(",", ":")).encode("utf-8") for q in questions)
+
+    header = json.dumps({
+        "version": version,
+        "digest": digest or content_digest(episodes, questions_by_episode),
+        "created_at": time.time(),
+        "episodes": episodes,
+        "episode_index": episode_index,
+        "count": len(records),
+    }, ensure_ascii=False).encode("utf-8")
+
+    prefix_len = len(MAGIC) + 4 + len(header)
+    padding = b"\0" * (-prefix_len % 8)
+    offsets = [0]
+    for record in records:
+        offsets.append(offsets[-1] + len(record))
+    return b"".join([
+        MAGIC, struct.pack("<I", len(header)), header, padding,
+        struct.pack(f"<{len(offsets)}Q", *offsets),
+        *records,
+    ])
+
+
+class QuestionSlice(Sequence):
+    """Lazily decoded, read-only view of consecutive questions in a snapshot."""
+
+    __slots__ = ("_snapshot", "_start", "_count")
+
+    def __init__(self, snapshot: "MappedSnapshot", start: int, count: int):
+        self._snapshot = snapshot
+        self._start = start
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return self._snapshot.question(self._start + index)
+
+
+class MappedSnapshot:
+    """One snapshot file mapped read-only into this process."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._load(memoryview(self._mm))
+
+    @classmethod
+    def from_bytes(cls, data: bytes, path: str = "<memory>") -> "MappedSnapshot":
+        """Wrap an in-memory snapshot buffer with the same layout."""
+        snapshot = cls.__new__(cls)
+        snapshot.path = path
+        snapshot._mm = None
+        snapshot._load(memoryview(data))
+        return snapshot
+
+    def _load(self, buf: memoryview):
+        if bytes(buf[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{self.path} is not a content snapshot")
+        (header_len,) = struct.unpack_from("<I", buf, len(MAGIC))
+        header_start = len(MAGIC) + 4
+        header = json.loads(bytes(buf[header_start:header_start + header_len]))
+        offsets_start = header_start + header_len
+        offsets_start += -offsets_start % 8
+        count = header["count"]
+        self._buf = buf
+        self._offsets = buf[offsets_start:offsets_start + (count + 1) * 8].cast("Q")
+        self._data_start = offsets_start + (count + 1) * 8
+        self.version: int = header["version"]
+        self.digest: str = header["digest"]
+        self.created_at: float = header["created_at"]
+        self.episodes: List[Dict[str, Any]] = header["episodes"]
+        self.count: int = count
+        self._episode_index = {int(k): v for k, v in header["episode_index"].items()}
+        self._questions_by_episode: Optional[Dict[int, QuestionSlice]] = None
+
+    def question(self, index: int) -> Dict:
+        start = self._data_start + self._offsets[index]
+        end = self._data_start + self._offsets[index + 1]
+        return json.loads(bytes(self._buf[start:end]))
+
+    def questions_by_episode(self) -> Dict[int, QuestionSlice]:
+        if self._questions_by_episode is None:
+            self._questions_by_episode = {
+                episode_id: QuestionSlice(self, start, count)
+                for episode_id, (start, count) in self._episode_index.items()
+            }
+        return self._questions_by_episode
+
+
+def check_content(snapshot: MappedSnapshot) -> MappedSnapshot:
+    """Reject content without episodes or questions: a broken Sheets response must not replace good content."""
+    if not snapshot.episodes or not snapshot.count:
+        raise ValueError("Sheets returned no episodes or questions")
+    return snapshot
+
+
+def _read_pointer(directory: Path) -> Optional[str]:
+    try:
+        return (directory / POINTER).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def current_version(directory: str) -> int:
+    name = _read_pointer(Path(directory))
+    if not name:
+        return 0
+    return int(name.split("-")[1].split(".")[0])
+
+
+def restamp_snapshot(data: bytes, version: int) -> bytes:
+    """Return the snapshot buffer with its header version replaced."""
+    (header_len,) = struct.unpack_from("<I", data, len(MAGIC))
+    header_start = len(MAGIC) + 4
+    header = json.loads(data[header_start:header_start + header_len])
+    body_start = header_start + header_len
+    body_start += -body_start % 8
+    header["version"] = version
+    encoded = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    padding = b"\0" * (-(header_start + len(encoded)) % 8)
+    return b"".join([MAGIC, struct.pack("<I", len(encoded)), encoded, padding, memoryview(data)[body_start:]])
+
+
+def publish_snapshot(directory: str, data: bytes) -> Optional[str]:
+    """Publish a built snapshot buffer unless the content is unchanged; return its path."""
+    directory_path = Path(directory)
+    directory_path.mkdir(parents=True, exist_ok=True)
+    digest = MappedSnapshot.from_bytes(data).digest
+
+    current_name = _read_pointer(directory_path)
+    if current_name:
+        try:
+            if MappedSnapshot(str(directory_path / current_name)).digest == digest:
+                return None
+        except (OSError, ValueError):
+            pass
+
+    version = current_version(directory) + 1
+    name = f"content-{version:08d}.snap"
+    data = restamp_snapshot(data, version)
+    _atomic_write(directory_path / name, data)
+    _atomic_write(directory_path / POINTER, name.encode("ascii"))
+    logger.info(f"Published content snapshot {name} ({len(data)} bytes, digest {digest})")
+
+    # Workers that still map an older file keep their mapping after unlink
+    for old in sorted(directory_path.glob("content-*.snap"))[:-KEEP_SNAPSHOTS]:
+        old.unlink(missing_ok=True)
+    return str(directory_path / name)
+
+
+def write_snapshot(directory: str, episodes: List[Dict[str, Any]],
+                   questions_by_episode: Dict[int, List[Dict]]) -> Optional[str]:
+    """Publish a new snapshot unless the content is unchanged; return its path."""
+    return publish_snapshot(directory, encode_snapshot(0, episodes, questions_by_episode))
+
+
+def _atomic_write(path: Path, data: bytes):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class SnapshotReader:
+    """Follow the ``CURRENT`` pointer of a snapshot directory.
+
+    ``current()`` stats the pointer at most once per ``check_interval`` seconds
+    and swaps in a newly published snapshot; requests that already hold the old
+    one keep using it until they finish.
+    """
+
+    def __init__(self, directory: str, check_interval: float = 1.0):
+        self.directory = Path(directory)
+        self.check_interval = check_interval
+        self._snapshot: Optional[MappedSnapshot] = None
+        self._pointer_mtime = 0
+        self._next_check = 0.0
+
+    def current(self) -> Optional[MappedSnapshot]:
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            self._refresh()
+        return self._snapshot
+
+    def _refresh(self):
+        try:
+            mtime = (self.directory / POINTER).stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._pointer_mtime:
+            return
+        name = _read_pointer(self.directory)
+        if not name or (self._snapshot and Path(self._snapshot.path).name == name):
+            self._pointer_mtime = mtime
+            return
+        try:
+            snapshot = MappedSnapshot(str(self.directory / name))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not map content snapshot {name}: {e}")
+            return
+        self._snapshot = snapshot
+        self._pointer_mtime = mtime
+        logger.info(f"Using content snapshot v{snapshot.version} ({snapshot.count} questions)")
@@ -0,0 +1,451 @@
+"""Lightweight request tracing.
+
+One trace is opened per HTTP request by ``TracingMiddleware``; code below it
+opens child spans with ``span(name, **attributes)``. Finished traces are handed
+to a pluggable exporter (JSON lines file or OTLP/HTTP JSON). When tracing is
+disabled or a request is not sampled, ``span()`` returns a shared no-op context
+manager, so instrumented code pays one context variable lookup.
+"""
+import asyncio
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Set
+
+import httpx
+from fastapi.routing import APIRoute
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "mark_ns")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.mark_ns: Optional[int] = None
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ms": round(((self.end_ns or self.start_ns) - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+        }
+
+
+class Trace:
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Span] = []
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _ActiveSpan:
+    __slots__ = ("_span", "_token")
+
+    def __init__(self, span: Span):
+        self._span = span
+        self._token = None
+
+    def __enter__(self) -> Span:
+        self._token = _current_span.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        self._span.end_ns = time.time_ns()
+        if exc_type is not None:
+            self._span.attributes["error"] = exc_type.__name__
+        _current_span.reset(self._token)
+        return False
+
+
+def span(name: str, **attributes):
+    """Open a child span of the current span; no-op outside a sampled trace."""
+    parent = _current_span.get()
+    if parent is None:
+        return _NOOP
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    parent.trace.spans.append(child)
+    return _ActiveSpan(child)
+
+
+def record_span(name: str, start_ns: int, end_ns: int, **attributes):
+    """Attach an already-measured interval to the current trace."""
+    parent = _current_span.get()
+    if parent is None:
+        return
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    child.start_ns = start_ns
+    child.end_ns = end_ns
+    parent.trace.spans.append(child)
+
+
+def traced(name: str):
+    """Decorator form of ``span`` for sync and async functions."""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# === EXPORTERS ===
+
+class JsonLinesExporter:
+    """Append one JSON object per span to a local file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        lines = "".join(json.dumps(s.to_dict(), ensure_ascii=False, default=str) + "\n" for s in spans)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+
+    async def shutdown(self):
+        pass
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpHttpExporter:
+    """Batch spans and POST them as OTLP/HTTP JSON (``/v1/traces``)."""
+
+    def __init__(self, endpoint: str, service_name: str = "tasacak-backend",
+                 max_batch: int = 512, flush_interval: float = 1.0, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.transport = transport
+        self._buffer: List[Span] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        # Running flushes: referenced until done (the loop only keeps weak references), awaited on shutdown
+        self._tasks: Set[asyncio.Task] = set()
+        self._closing = False
+
+    def _start(self, coro) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def export(self, spans: List[Span]):
+        self._buffer.extend(spans)
+        if len(self._buffer) >= self.max_batch:
+            self._start(self.flush())
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = self._start(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        deadline = time.monotonic() + self.flush_interval
+        # Short sleeps, so shutdown does not wait out the interval
+        while not self._closing and time.monotonic() < deadline:
+            await asyncio.sleep(min(0.05, self.flush_interval))
+        await self.flush()
+
+    def payload(self, spans: List[Span]) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": self.service_name}}
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": "tasacak.tracing"},
+                    "spans": [{
+                        "traceId": s.trace.trace_id,
+                        "spanId": s.span_id,
+                        "parentSpanId": s.parent_id or "",
+                        "name": s.name,
+                        "kind": 2 if s.parent_id is None else 1,
+                        "startTimeUnixNano": str(s.start_ns),
+                        "endTimeUnixNano": str(s.end_ns or s.start_ns),
+                        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+                    } for s in spans],
+                }],
+            }]
+        }
+
+    async def flush(self):
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        try:
+            async with httpx.AsyncClient(timeout=5.0, transport=self.transport) as http_client:
+                response = await http_client.post(self.endpoint, json=self.payload(batch))
+                response.raise_for_status()
+        except Exception as e:
+            logger.warning(f"Dropping {len(batch)} spans, OTLP export failed: {e}")
+
+    async def shutdown(self):
+        self._closing = True
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush()
+
+
+# === TRACER ===
+
+class Tracer:
+    def __init__(self, exporter=None, sample_rate: float = 1.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None and self.sample_rate > 0
+
+    def start_trace(self, name: str, **attributes):
+        """Open the root span of a new trace, honouring the sample rate."""
+        if not self.enabled or (self.sample_rate < 1.0 and random.random() >= self.sample_rate):
+            return _NOOP
+        trace = Trace()
+        root = Span(trace, name, None, attributes)
+        trace.spans.append(root)
+        return _RootSpan(self, root)
+
+    def finish(self, trace: Trace):
+        try:
+            self.exporter.export(trace.spans)
+        except Exception as e:
+            logger.warning(f"Trace export failed: {e}")
+
+    async def shutdown(self):
+        if self.exporter is not None:
+            await self.exporter.shutdown()
+
+
+class _RootSpan(_ActiveSpan):
+    __slots__ = ("_tracer",)
+
+    def __init__(self, tracer: Tracer, root: Span):
+        super().__init__(root)
+        self._tracer = tracer
+
+    def __exit__(self, exc_type, exc, tb):
+        super().__exit__(exc_type, exc, tb)
+        self._tracer.finish(self._span.trace)
+        return False
+
+
+def tracer_from_env() -> Tracer:
+    """Build the tracer from ``TRACE_EXPORTER`` (jsonl|otlp) and ``TRACE_SAMPLE_RATE``."""
+    kind = os.environ.get("TRACE_EXPORTER", "").lower()
+    sample_rate = float(os.environ.get("TRACE_SAMPLE_RATE", "1.0"))
+    if kind == "jsonl":
+        exporter = JsonLinesExporter(os.environ.get("TRACE_FILE", "traces.jsonl"))
+    elif kind == "otlp":
+        exporter = OtlpHttpExporter(os.environ.get("OTLP_ENDPOINT", "http://localhost:4318/v1/traces"))
+    else:
+        exporter = None
+    return Tracer(exporter, sample_rate)
+
+
+tracer = tracer_from_env()
+
+
+# === ASGI / FASTAPI INTEGRATION ===
+
+class TracingMiddleware:
+    """Open one trace per HTTP request."""
+
+    def __init__(self, app, tracer: Tracer = tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        with self.tracer.start_trace(f"{scope['method']} {scope['path']}") as root:
+            if root is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    root.set("http.status_code", message["status"])
+                elif message["type"] == "http.response.body":
+                    root.set("http.response_bytes", root.attributes.get("http.response_bytes", 0) + len(message.get("body", b"")))
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+class TracedRoute(APIRoute):
+    """Route class that splits handler time into ``endpoint`` and ``serialize_response`` spans."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        # include_router() re-registers routes with the already wrapped endpoint
+        if asyncio.iscoroutinefunction(endpoint) and not getattr(endpoint, "_traced_endpoint", False):
+            original = endpoint
+
+            @functools.wraps(original)
+            async def endpoint(*args, **kw):
+                route_span = _current_span.get()
+                with span("endpoint"):
+                    result = await original(*args, **kw)
+                if route_span is not None:
+                    route_span.mark_ns = time.time_ns()
+                return result
+            endpoint._traced_endpoint = True
+
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        route_path = self.path
+
+        async def traced_handler(request):
+            with span("route", route=route_path) as route_span:
+                response = await handler(request)
+                if route_span is not None and route_span.mark_ns is not None:
+                    record_span("serialize_response", route_span.mark_ns, time.time_ns(),
+                                bytes=len(getattr(response, "body", b"") or b""))
+                return response
+
+        return traced_handler
+
+
+def traced_database(database):
+    """Wrap a Motor database so every collection call records a span."""
+    return _TracedDatabase(database)
+
+
+_ASYNC_COLLECTION_METHODS = frozenset({
+    "find_one", "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+    "delete_one", "delete_many", "count_documents", "estimated_document_count",
+    "find_one_and_update", "find_one_and_replace", "find_one_and_delete",
+    "bulk_write", "create_index", "create_indexes", "index_information", "distinct", "drop",
+})
+
+
+class _TracedCursor:
+    def __init__(self, cursor, name: str):
+        self._cursor = cursor
+        self._name = name
+
+    def __getattr__(self, attr):
+        value = getattr(self._cursor, attr)
+        if attr in ("sort", "limit", "skip", "batch_size", "hint"):
+            @functools.wraps(value)
+            def chain(*args, **kwargs):
+                value(*args, **kwargs)
+                return self
+            return chain
+        return value
+
+    async def to_list(self, length=None):
+        with span(self._name) as s:
+            result = await self._cursor.to_list(length=length)
+            if s is not None:
+                s.set("db.documents", len(result))
+            return result
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        # One span for the whole iteration, recorded when it ends: a span made current
+        # here would leak into the loop body, which runs between the yields
+        start_ns = time.time_ns()
+        count = 0
+        try:
+            async for doc in self._cursor:
+                count += 1
+                yield doc
+        finally:
+            record_span(self._name, start_ns, time.time_ns(), **{"db.documents": count})
+
+
+class _TracedCollection:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, attr):
+        value = getattr(self._collection, attr)
+        name = f"mongo.{self._collection.name}.{attr}"
+        if attr in _ASYNC_COLLECTION_METHODS:
+            @functools.wraps(value)
+            async def call(*args, **kwargs):
+                with span(name):
+                    return await value(*args, **kwargs)
+            return call
+        if attr in ("find", "aggregate"):
+            @functools.wraps(value)
+            def cursor(*args, **kwargs):
+                return _TracedCursor(value(*args, **kwargs), name)
+            return cursor
+        return value
+
+
+class _TracedDatabase:
+    def __init__(self, database):
+        self._database = database
+
+    def __getattr__(self, attr):
+        if attr.startswith("_") or hasattr(type(self._database), attr):
+            return getattr(self._database, attr)
+        return self[attr]
+
+    def __getitem__(self, name):
+        return _TracedCollection(self._database[name])
+
+    def get_collection(self, name, **kwargs):
+        return _TracedCollection(self._database.get_collection(name, **kwargs))
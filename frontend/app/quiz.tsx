@@ -18,6 +18,8 @@ import {
   getMixedQuiz,
   submitEpisodeScore,
   submitMixedScore,
+  recordAnswer,
+  flushAnswers,
   getSettings,
   QuizResponse,
   Question,
@@ -153,6 +155,7 @@ export default function QuizScreen() {
 
   const handleTimeout = () => {
     if (answerState !== 'none') return;
+    if (quiz) recordAnswer(quiz.questions[currentIndex], null, Date.now() - questionStartTime.current);
     setAnswerState('wrong');
     handleWrongAnswer();
   };
@@ -169,6 +172,7 @@ export default function QuizScreen() {
     const normalizedSelected = String(optionId).trim().toUpperCase();
     const normalizedCorrect = String(question.correct_option).trim().toUpperCase();
     const isCorrect = normalizedSelected === normalizedCorrect;
+    recordAnswer(question, normalizedSelected, timeTaken * 1000);
     
     console.log('[Quiz] Answer:', { selected: normalizedSelected, correct: normalizedCorrect, isCorrect });
     
@@ -277,6 +281,7 @@ export default function QuizScreen() {
 
   const endGame = async () => {
     if (timerRef.current) clearInterval(timerRef.current);
+    flushAnswers();
     
     console.log('[Quiz] endGame called, score:', score, 'mode:', mode);
     
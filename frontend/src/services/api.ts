@@ -7,6 +7,7 @@ const API_URL = process.env.EXPO_PUBLIC_BACKEND_URL || 'https://deniztest.emerge
 const STORAGE_KEYS = {
   USERNAME: '@denizquiz_username',
   SETTINGS: '@denizquiz_settings',
+  CONTENT_BUNDLE: '@denizquiz_content_bundle',
 };
 
 // === TYPES ===
@@ -65,6 +66,15 @@ export interface PlayerStats {
   mixed_best_score: number;
 }
 
+// Offline copy of all episodes and questions (see /api/content/bundle).
+// Question rows follow `fields`: id, episode_id, text, a, b, c, d, correct, difficulty, points
+export interface ContentBundle {
+  version: string;
+  episodes: Episode[];
+  fields: string[];
+  questions: any[][];
+}
+
 export interface Settings {
   soundEnabled: boolean;
   vibrationEnabled: boolean;
@@ -205,50 +215,93 @@ export async function getEpisodeQuiz(episodeId: number): Promise<QuizResponse> {
   return normalizeQuizResponse(data);
 }
 
+// === OFFLINE CONTENT ===
+
+export async function getStoredContentBundle(): Promise<ContentBundle | null> {
+  try {
+    const stored = await AsyncStorage.getItem(STORAGE_KEYS.CONTENT_BUNDLE);
+    if (stored) {
+      return JSON.parse(stored);
+    }
+  } catch {}
+  return null;
+}
+
+// Fetch the content bundle, asking only for the changes since the stored version
+export async function syncContentBundle(): Promise<ContentBundle | null> {
+  const stored = await getStoredContentBundle();
+  let url = `${API_URL}/api/content/bundle`;
+  if (stored) url += `?since=${encodeURIComponent(stored.version)}`;
+
+  try {
+    const response = await fetch(url);
+    if (response.status === 304) return stored;
+    if (!response.ok) return stored;
+
+    const data = await response.json();
+    let bundle: ContentBundle;
+    if (data.base && stored && data.base === stored.version) {
+      const rows = new Map<string, any[]>(stored.questions.map((row) => [row[0], row]));
+      for (const row of [...data.added, ...data.changed]) rows.set(row[0], row);
+      for (const id of data.removed) rows.delete(id);
+      bundle = { version: data.version, episodes: data.episodes, fields: data.fields, questions: [...rows.values()] };
+    } else {
+      bundle = { version: data.version, episodes: data.episodes, fields: data.fields, questions: data.questions };
+    }
+    await AsyncStorage.setItem(STORAGE_KEYS.CONTENT_BUNDLE, JSON.stringify(bundle));
+    return bundle;
+  } catch (error) {
+    console.log('[API] Content bundle sync failed:', error);
+    return stored;
+  }
+}
+
+// Mixed mode from the offline bundle: every question, shuffled (like /api/quiz/mixed,
+// locked episodes included)
+function mixedQuizFromBundle(bundle: ContentBundle): QuizResponse {
+  const rows = [...bundle.questions];
+  for (let i = rows.length - 1; i > 0; i--) {
+    const j = Math.floor(Math.random() * (i + 1));
+    [rows[i], rows[j]] = [rows[j], rows[i]];
+  }
+  const questions = rows.map((row) => ({
+    id: row[0],
+    text: row[2],
+    options: ['A', 'B', 'C', 'D'].map((id, i) => ({ id, text: row[3 + i] })).filter((opt) => opt.text),
+    correct_option: row[7],
+    difficulty: row[8],
+    points: row[9],
+  }));
+  return normalizeQuizResponse({ episode_id: null, episode_name: 'Karışık Mod', questions, mode: 'mixed' });
+}
+
 export async function getMixedQuiz(): Promise<QuizResponse> {
   // Try new endpoint first
   let response = await fetch(`${API_URL}/api/quiz/mixed`);
   
   if (!response.ok) {
-    // Fallback: fetch all episodes and combine questions
-    console.log('[API] Mixed endpoint not found, using fallback...');
-    const episodes = await getEpisodes();
-    const allQuestions: any[] = [];
-    
-    for (const ep of episodes.slice(0, 5)) { // Limit to first 5 episodes for performance
-      try {
-        const quiz = await getEpisodeQuiz(ep.id);
-        allQuestions.push(...quiz.questions);
-      } catch (e) {
-        console.log(`[API] Could not fetch episode ${ep.id}`);
-      }
-    }
-    
-    // Shuffle questions
-    for (let i = allQuestions.length - 1; i > 0; i--) {
-      const j = Math.floor(Math.random() * (i + 1));
-      [allQuestions[i], allQuestions[j]] = [allQuestions[j], allQuestions[i]];
-    }
-    
-    return {
-      episode_id: null,
-      episode_name: 'Karışık Mod',
-      questions: allQuestions,
-      total_questions: allQuestions.length,
-      max_possible_score: allQuestions.reduce((sum, q) => sum + q.points + 5, 0),
-      mode: 'mixed'
-    };
+    // Fallback: build the quiz from the offline content bundle
+    console.log('[API] Mixed endpoint not found, using content bundle...');
+    const bundle = await syncContentBundle();
+    if (!bundle) throw new Error('Quiz yüklenemedi');
+    return mixedQuizFromBundle(bundle);
   }
   
   const data = await response.json();
   return normalizeQuizResponse(data);
 }
 
+// Identifies one score submission, so the server ignores retries of it
+function newRunId(): string {
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+}
+
 export async function submitEpisodeScore(
   episodeId: number,
   score: number,
   correctCount: number,
-  speedBonus: number
+  speedBonus: number,
+  runId: string = newRunId()
 ): Promise<{ success: boolean; is_new_record: boolean; best_score: number }> {
   const username = await getUsername();
   if (!username) throw new Error('Kullanıcı adı bulunamadı');
@@ -262,7 +315,8 @@ export async function submitEpisodeScore(
       episode_id: episodeId,
       score,
       correct_count: correctCount,
-      speed_bonus: speedBonus
+      speed_bonus: speedBonus,
+      run_id: runId
     })
   });
   
@@ -277,7 +331,8 @@ export async function submitEpisodeScore(
         score,
         correct_count: correctCount,
         speed_bonus: speedBonus,
-        episode_id: episodeId
+        episode_id: episodeId,
+        run_id: runId
       })
     });
   }
@@ -299,7 +354,8 @@ export async function submitMixedScore(
   score: number,
   correctCount: number,
   speedBonus: number,
-  questionsAnswered: number
+  questionsAnswered: number,
+  runId: string = newRunId()
 ): Promise<{ success: boolean; is_new_record: boolean; best_score: number }> {
   const username = await getUsername();
   if (!username) throw new Error('Kullanıcı adı bulunamadı');
@@ -313,7 +369,8 @@ export async function submitMixedScore(
       score,
       correct_count: correctCount,
       speed_bonus: speedBonus,
-      questions_answered: questionsAnswered
+      questions_answered: questionsAnswered,
+      run_id: runId
     })
   });
   
@@ -328,7 +385,8 @@ export async function submitMixedScore(
         score,
         correct_count: correctCount,
         speed_bonus: speedBonus,
-        questions_answered: questionsAnswered
+        questions_answered: questionsAnswered,
+        run_id: runId
       })
     });
   }
@@ -346,6 +404,41 @@ export async function submitMixedScore(
   }
 }
 
+// === ANSWER ANALYTICS ===
+
+// Answers are sent in batches; analytics are best effort and never block the quiz
+const ANSWER_BATCH_SIZE = 25;
+let pendingAnswers: { question_id: string; option: string | null; correct: boolean; time_ms: number }[] = [];
+
+export function recordAnswer(question: Question, optionId: string | null, timeMs: number): void {
+  // Option ids are shuffled per quiz, so the server gets the option's text
+  const option = optionId === null ? null : question.options.find((o) => o.id === optionId)?.text ?? null;
+  pendingAnswers.push({
+    question_id: question.id,
+    option,
+    correct: optionId !== null && optionId === question.correct_option,
+    time_ms: Math.max(0, Math.round(timeMs)),
+  });
+  if (pendingAnswers.length >= ANSWER_BATCH_SIZE) {
+    flushAnswers();
+  }
+}
+
+export async function flushAnswers(): Promise<void> {
+  if (pendingAnswers.length === 0) return;
+  const events = pendingAnswers;
+  pendingAnswers = [];
+  try {
+    await fetch(`${API_URL}/api/analytics/answers`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ events }),
+    });
+  } catch (e) {
+    console.warn('[API] Answer analytics not sent:', e);
+  }
+}
+
 export async function getGeneralLeaderboard(): Promise<LeaderboardResponse> {
   const username = await getUsername();
   
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Measure sustained answer analytics ingest on one core, and its memory.
+
+Runs the app in-process against the fake MongoDB, with a question bank of
+``--episodes`` x ``--questions-per-episode`` questions. For ``--duration``
+seconds, clients post ``POST /api/analytics/answers`` batches of
+``--batch-size`` random events, one after the other, as fast as the single
+event loop serves them. Tallies are flushed every ``--flush-interval`` seconds.
+The report gives events per second (client included), the MongoDB operations
+of all flushes and the memory the pending tallies can take at most: every
+question, option and time bucket hit between two flushes.
+
+    python perf/answer_ingest.py --duration 10 --batch-size 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PERF_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(PERF_DIR))
+os.environ.setdefault("MONGO_URL", "mongodb://127.0.0.1:1")
+os.environ.setdefault("DB_NAME", "perf")
+os.environ.setdefault("CONTENT_BUILD_MODE", "inline")
+
+import logging  # noqa: E402
+
+logging.disable(logging.WARNING)
+
+import httpx  # noqa: E402
+
+import content_gen  # noqa: E402
+import fake_mongo  # noqa: E402
+import server  # noqa: E402
+from answer_stats import AnswerStats  # noqa: E402
+
+
+def make_batches(questions, count: int, size: int, seed: int):
+    rng = random.Random(seed)
+    batches = []
+    for _ in range(count):
+        events = []
+        for _ in range(size):
+            q = rng.choice(questions)
+            option = rng.choice([None, *filter(None, q["options"].values())])
+            events.append({
+                "question_id": q["id"], "option": option,
+                "correct": option == q["options"].get(q["correct_answer"]), "time_ms": rng.randint(300, 25000),
+            })
+        batches.append(json.dumps({"events": events}).encode())
+    return batches
+
+
+async def run(args):
+    server.forget_sheets_content()
+    episodes_csv, questions_csv = content_gen.generate(args.episodes, args.questions_per_episode)
+
+    async def fetch(gid):
+        return episodes_csv if gid == server.EPISODES_GID else questions_csv
+
+    server.fetch_csv_from_sheets = fetch
+    server.db = fake_mongo.FakeDatabase(latency=args.mongo_latency_ms / 1000)
+    server.answer_stats = AnswerStats()
+    questions_data = await server.get_questions_data()
+    questions = [q for e in sorted(questions_data) for q in questions_data[e]]
+    batches = make_batches(questions, 200, args.batch_size, args.seed)
+    server.get_option_keys(questions_data)  # built once per content version
+
+    events = 0
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://ingest") as http:
+        start = last_flush = time.perf_counter()
+        cpu = time.process_time()
+        i = 0
+        while time.perf_counter() - start < args.duration:
+            response = await http.post("/api/analytics/answers", content=batches[i % len(batches)],
+                                       headers={"Content-Type": "application/json"})
+            events += response.json()["accepted"]
+            i += 1
+            if time.perf_counter() - last_flush >= args.flush_interval:
+                await server.flush_answer_stats()
+                last_flush = time.perf_counter()
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu
+    await server.flush_answer_stats()
+    return {
+        "events_per_s": round(events / elapsed),
+        "cpu_us_per_event": round(cpu / events * 1e6, 1),
+        "requests": i,
+        "questions": len(questions),
+        "flush_ops": server.db.ops.get("answer_stats.bulk_write", 0),
+        "stats_documents": await server.db.answer_stats.count_documents({}),
+        "flushed_events": server.answer_stats.flushed_events,
+        "max_tallies_kib": round(full_tallies_bytes(questions, questions_data) / 1024),
+    }
+
+
+def full_tallies_bytes(questions, questions_data) -> int:
+    """Memory of the largest possible tallies: every question, option and histogram bucket hit."""
+    events = [
+        server.AnswerEvent(question_id=q["id"], option=text, correct=True, time_ms=t)
+        for q in questions for text in [None, *filter(None, q["options"].values())]
+        for t in (500, 1500, 2500, 4000, 6000, 10000, 15000, 25000, 40000)
+    ]
+    option_keys = server.get_option_keys(questions_data)
+    tracemalloc.start()
+    stats = AnswerStats()
+    stats.record(events, option_keys)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--episodes", type=int, default=14)
+    parser.add_argument("--questions-per-episode", type=int, default=60)
+    parser.add_argument("--flush-interval", type=float, default=2.0)
+    parser.add_argument("--mongo-latency-ms", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    for key, value in result.items():
+        print(f"{key:<20} {value}")
+
+
+if __name__ == "__main__":
+    main()
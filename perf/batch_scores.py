@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Compare replaying N offline runs as N score submissions with one
+``POST /api/score/batch``.
+
+Runs the app in-process against the fake MongoDB with ``--mongo-latency-ms``
+per operation. For each batch size, the same results (episode and mixed runs
+of a few players, over a pre-filled leaderboard) are submitted once one by
+one, as the app replays them today, and once as a batch on a fresh database.
+Prints wall time and MongoDB operations for each.
+
+    python perf/batch_scores.py --sizes 10 50 200 --mongo-latency-ms 2
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PERF_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(PERF_DIR))
+os.environ.setdefault("MONGO_URL", "mongodb://127.0.0.1:1")
+os.environ.setdefault("DB_NAME", "perf")
+# The one-by-one replay exceeds the per-player limits on purpose
+os.environ.setdefault("RATE_LIMITS", "off")
+
+import logging  # noqa: E402
+
+logging.disable(logging.WARNING)
+
+import httpx  # noqa: E402
+
+import fake_mongo  # noqa: E402
+import server  # noqa: E402
+
+
+def make_items(count: int, players: int, seed: int):
+    rng = random.Random(seed)
+    items = []
+    for _ in range(count):
+        player = f"oyuncu_{rng.randrange(players)}"
+        if rng.random() < 0.8:
+            items.append({"mode": "episode", "player_name": player, "episode_id": rng.randint(1, 14),
+                          "score": rng.randint(0, 800), "correct_count": rng.randint(0, 25)})
+        else:
+            items.append({"mode": "mixed", "player_name": player, "score": rng.randint(0, 3000),
+                          "questions_answered": rng.randint(5, 60)})
+    return items
+
+
+async def prefill(database, leaderboard_players: int):
+    rng = random.Random(1)
+    await database.episode_scores.insert_many([
+        {"player_name": f"oyuncu_{i}", "episode_id": e, "score": rng.randint(0, 800)}
+        for i in range(leaderboard_players) for e in range(1, 4)
+    ])
+
+
+async def run(mode: str, items, args):
+    database = fake_mongo.FakeDatabase(latency=args.mongo_latency_ms / 1000)
+    await prefill(database, args.leaderboard_players)
+    database.ops.clear()
+    server.db = database
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        start = time.perf_counter()
+        if mode == "sequential":
+            for item in items:
+                path = f"/api/score/{item['mode']}"
+                (await http.post(path, json={k: v for k, v in item.items() if k != "mode"})).raise_for_status()
+        else:
+            (await http.post("/api/score/batch", json={"items": items})).raise_for_status()
+        elapsed = (time.perf_counter() - start) * 1000
+    return {"ms": round(elapsed, 1), "mongo_ops": database.total_ops()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--players", type=int, default=3, help="players the results belong to")
+    parser.add_argument("--leaderboard-players", type=int, default=2000)
+    parser.add_argument("--mongo-latency-ms", type=float, default=2.0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        items = make_items(size, args.players, seed=size)
+        results[size] = {mode: asyncio.run(run(mode, items, args)) for mode in ("sequential", "batch")}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'results':>8} {'sequential ms':>14} {'ops':>6} {'batch ms':>9} {'ops':>5} {'speedup':>8}")
+    for size, r in results.items():
+        s, b = r["sequential"], r["batch"]
+        print(f"{size:>8} {s['ms']:>14} {s['mongo_ops']:>6} {b['ms']:>9} {b['mongo_ops']:>5} "
+              f"{s['ms'] / b['ms']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Chaos test: inject MongoDB latency and check that cached routes stay fast.
+
+Runs the app in-process against the fake MongoDB. Every operation is slowed
+by ``--mongo-latency-ms`` plus up to ``--mongo-jitter-ms``, behind a pool of
+``--pool-size`` connections. Requests arrive open loop at ``--rate`` per
+second, whether or not earlier ones have finished, as real clients do. The mix
+covers episode lists, quizzes, score submissions and leaderboards. The run is
+repeated with the route budgets disabled ("unlimited") and enabled ("limited").
+
+For each route group the report lists completed and rejected (503) requests and
+the p50/p99 latency of the completed ones. It also gives the peak number of
+requests in flight.
+
+    python perf/chaos_latency.py --rate 400 --duration 5 --mongo-latency-ms 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+PERF_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(PERF_DIR))
+os.environ.setdefault("MONGO_URL", "mongodb://127.0.0.1:1")
+os.environ.setdefault("DB_NAME", "perf")
+# Every simulated player shares one client IP
+os.environ.setdefault("RATE_LIMITS", "off")
+
+import logging  # noqa: E402
+
+logging.disable(logging.WARNING)
+
+import httpx  # noqa: E402
+
+import content_gen  # noqa: E402
+import fake_mongo  # noqa: E402
+from loadgen import percentile  # noqa: E402
+import server  # noqa: E402
+
+# (group, weight, request builder)
+MIX = [
+    ("cached", 30, lambda rng: ("GET", "/api/episodes", None)),
+    ("cached", 30, lambda rng: ("GET", f"/api/quiz/episode/{rng.randint(1, 14)}?count=25", None)),
+    ("scores", 25, lambda rng: ("POST", "/api/score/episode", {
+        "player_name": f"oyuncu_{rng.randrange(1000)}", "episode_id": rng.randint(1, 14), "score": rng.randint(0, 800),
+    })),
+    ("leaderboard", 15, lambda rng: ("GET", f"/api/leaderboard/general?player_name=oyuncu_{rng.randrange(1000)}", None)),
+]
+
+
+async def run(mode: str, args) -> Dict[str, object]:
+    server.forget_sheets_content()
+    server.db = fake_mongo.FakeDatabase(
+        latency=args.mongo_latency_ms / 1000, jitter=args.mongo_jitter_ms / 1000, pool_size=args.pool_size,
+    )
+    episodes_csv, questions_csv = content_gen.generate(14, 60)
+
+    async def fetch(gid):
+        return episodes_csv if gid == server.EPISODES_GID else questions_csv
+
+    server.fetch_csv_from_sheets = fetch
+    saved = {name: (b.limit, b.queue_size) for name, b in server.route_limits.budgets.items()}
+    if mode == "unlimited":
+        server.route_limits.configure(",".join(f"{name}=1000000:0" for name in saved))
+
+    samples: Dict[str, List[Tuple[float, int]]] = defaultdict(list)
+    in_flight = peak = 0
+    transport = httpx.ASGITransport(app=server.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://chaos", timeout=120) as http:
+            await http.get("/api/quiz/episode/1")  # load content
+
+            async def one(group, method, path, body):
+                nonlocal in_flight, peak
+                in_flight += 1
+                peak = max(peak, in_flight)
+                start = time.perf_counter()
+                response = await http.request(method, path, json=body)
+                samples[group].append(((time.perf_counter() - start) * 1000, response.status_code))
+                in_flight -= 1
+
+            rng = random.Random(args.seed)
+            weights = [m[1] for m in MIX]
+            tasks = []
+            start = time.perf_counter()
+            for i in range(int(args.rate * args.duration)):
+                delay = start + i / args.rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                group, _, build = rng.choices(MIX, weights)[0]
+                tasks.append(asyncio.create_task(one(group, *build(rng))))
+            await asyncio.gather(*tasks)
+    finally:
+        server.route_limits.configure(",".join(f"{n}={l}:{q}" for n, (l, q) in saved.items()))
+
+    report = {"peak_in_flight": peak}
+    for group, values in sorted(samples.items()):
+        ok = sorted(latency for latency, status in values if status < 500)
+        report[group] = {
+            "completed": len(ok),
+            "rejected": sum(1 for _, status in values if status == 503),
+            "p50_ms": round(percentile(ok, 50), 1),
+            "p99_ms": round(percentile(ok, 99), 1),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=400, help="requests per second (open loop)")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--mongo-latency-ms", type=float, default=200)
+    parser.add_argument("--mongo-jitter-ms", type=float, default=100)
+    parser.add_argument("--pool-size", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    results = {mode: asyncio.run(run(mode, args)) for mode in ("unlimited", "limited")}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'budgets':<10} {'group':<12} {'done':>6} {'503':>6} {'p50 ms':>9} {'p99 ms':>9}")
+    for mode, report in results.items():
+        for group in ("cached", "leaderboard", "scores"):
+            r = report[group]
+            print(f"{mode:<10} {group:<12} {r['completed']:>6} {r['rejected']:>6} {r['p50_ms']:>9} {r['p99_ms']:>9}")
+        print(f"{mode:<10} peak in flight: {report['peak_in_flight']}")
+
+
+if __name__ == "__main__":
+    main()
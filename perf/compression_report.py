@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Wire bytes and CPU per request for each response encoding.
+
+Runs the app in-process against generated content and the in-process Mongo
+stand-in, requests each route with ``Accept-Encoding`` set to identity, gzip
+and br, and reports the raw (undecoded) body size and process CPU time per
+request. Episodes come from the precompressed cache, quizzes are compressed on
+the fly.
+
+    python perf/compression_report.py --requests 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PERF_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(PERF_DIR))
+os.environ.setdefault("MONGO_URL", "mongodb://127.0.0.1:1")
+os.environ.setdefault("DB_NAME", "perf")
+# Every simulated player shares one client IP
+os.environ.setdefault("RATE_LIMITS", "off")
+
+import logging  # noqa: E402
+
+logging.disable(logging.WARNING)
+
+import httpx  # noqa: E402
+
+import content_gen  # noqa: E402
+import fake_mongo  # noqa: E402
+import server  # noqa: E402
+from compression import supported_encodings  # noqa: E402
+from content_build import build_snapshot  # noqa: E402
+from snapshot import MappedSnapshot  # noqa: E402
+
+ROUTES = [
+    "/api/episodes",
+    "/api/quiz/episode/1",
+    "/api/quiz/mixed",
+    "/api/leaderboard/general",
+    "/api/leaderboard/episode/1",
+]
+
+
+async def measure(http_client, path: str, encoding: str, requests: int):
+    headers = {"Accept-Encoding": encoding}
+    wire_bytes = 0
+    cpu_start = time.process_time()
+    for _ in range(requests):
+        async with http_client.stream("GET", path, headers=headers) as response:
+            raw = b"".join([chunk async for chunk in response.aiter_raw()])
+            wire_bytes += len(raw)
+            served = response.headers.get("content-encoding", "identity")
+    cpu = time.process_time() - cpu_start
+    return {
+        "content_encoding": served,
+        "wire_bytes": wire_bytes // requests,
+        "cpu_ms_per_request": round(cpu / requests * 1000, 3),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--questions-per-episode", type=int, default=60)
+    args = parser.parse_args()
+
+    episodes_csv, questions_csv = content_gen.generate(14, args.questions_per_episode)
+    server._sheets_snapshot = MappedSnapshot.from_bytes(build_snapshot(episodes_csv, questions_csv))
+    fake_mongo.install(server)
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://perf") as http_client:
+        for i in range(300):
+            await http_client.post("/api/score/episode", json={
+                "player_name": f"oyuncu_{i}", "episode_id": 1 + i % 14, "score": (i * 37) % 900,
+            })
+
+        report = {}
+        for path in ROUTES:
+            report[path] = {}
+            for encoding in ("identity",) + supported_encodings():
+                report[path][encoding] = await measure(http_client, path, encoding, args.requests)
+            identity = report[path]["identity"]
+            for encoding, row in report[path].items():
+                row["ratio"] = round(row["wire_bytes"] / identity["wire_bytes"], 3) if identity["wire_bytes"] else 1.0
+                row["extra_cpu_ms"] = round(row["cpu_ms_per_request"] - identity["cpu_ms_per_request"], 3)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,50 @@
+"""
+Deterministic episode and question CSV generator.
+
+The column names and value formats match the production sheet, including
+quoted fields with commas and Turkish characters, so `parse_csv` and the
+builders see realistic input.
+"""
+import random
+from typing import Tuple
+
+DIFFICULTIES = ["kolay", "orta", "zor"]
+DIFFICULTY_WEIGHTS = [0.4, 0.4, 0.2]
+WORDS = [
+    "deniz", "Karadeniz", "fırtına", "balıkçı", "kıyı", "dalga", "liman", "tekne",
+    "Şükrü", "Gülsüm", "Çağlar", "ağ", "hamsi", "köy", "yayla", "çay", "öğretmen",
+    "düğün", "ıssız", "gece", "sabah", "kavga", "sır", "mektup", "yağmur",
+]
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def episodes_csv(episodes: int = 14, locked_every: int = 0) -> str:
+    lines = ["episode_id,episode_name,is_locked,description"]
+    for episode_id in range(1, episodes + 1):
+        locked = "kilitli" if locked_every and episode_id % locked_every == 0 else "açık"
+        lines.append(f'{episode_id},"{episode_id}. Bölüm",{locked},"Bölüm {episode_id}, Karadeniz kıyısında"')
+    return "\n".join(lines) + "\n"
+
+
+def questions_csv(episodes: int = 14, questions_per_episode: int = 60, seed: int = 42) -> str:
+    rng = random.Random(seed)
+    lines = ["question_id,episode_id,question,option_a,option_b,option_c,option_d,correct_answer,difficulty"]
+    for episode_id in range(1, episodes + 1):
+        for i in range(questions_per_episode):
+            options = [_sentence(rng, rng.randint(1, 4)) for _ in range(4)]
+            difficulty = rng.choices(DIFFICULTIES, DIFFICULTY_WEIGHTS)[0]
+            text = _sentence(rng, rng.randint(6, 16))
+            lines.append(
+                f'{episode_id}-{i},{episode_id},"{text}, {rng.choice(WORDS)} ne yaptı?",'
+                + ",".join(f'"{o}"' for o in options)
+                + f",{rng.choice('ABCD')},{difficulty}"
+            )
+    return "\n".join(lines) + "\n"
+
+
+def generate(episodes: int = 14, questions_per_episode: int = 60, seed: int = 42) -> Tuple[str, str]:
+    """Return ``(episodes_csv, questions_csv)`` for the given size."""
+    return episodes_csv(episodes), questions_csv(episodes, questions_per_episode, seed)
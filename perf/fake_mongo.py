@@ -0,0 +1,670 @@
+"""
+In-process stand-in for the parts of Motor the backend uses.
+
+Collections keep documents in memory, enforce unique indexes and support the
+filter/update operators the server issues. Every operation yields to the event
+loop (optionally after an injected ``latency``) and is counted in ``ops`` so
+tests and benchmarks can assert on round trips.
+"""
+import asyncio
+import copy
+import random
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+_MISSING = object()
+
+
+def _get(doc: Dict, key: str):
+    value: Any = doc
+    for part in key.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _set(doc: Dict, key: str, value: Any):
+    parts = key.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _compare(value, op: str, arg) -> bool:
+    if value is _MISSING or value is None:
+        return False
+    try:
+        if op == "$gt":
+            return value > arg
+        if op == "$gte":
+            return value >= arg
+        if op == "$lt":
+            return value < arg
+        if op == "$lte":
+            return value <= arg
+    except TypeError:
+        return False
+    raise NotImplementedError(op)
+
+
+def matches(doc: Dict, query: Optional[Dict]) -> bool:
+    for key, cond in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in cond):
+                return False
+            continue
+        if key == "$and":
+            if not all(matches(doc, sub) for sub in cond):
+                return False
+            continue
+        value = _get(doc, key)
+        if isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+            for op, arg in cond.items():
+                if op == "$in":
+                    if value is _MISSING or value not in arg:
+                        return False
+                elif op == "$nin":
+                    if value is not _MISSING and value in arg:
+                        return False
+                elif op == "$ne":
+                    if value is not _MISSING and value == arg:
+                        return False
+                elif op == "$exists":
+                    if (value is not _MISSING) != bool(arg):
+                        return False
+                elif not _compare(value, op, arg):
+                    return False
+        elif value is _MISSING:
+            if cond is not None:
+                return False
+        elif value != cond:
+            return False
+    return True
+
+
+def _apply_update(doc: Dict, update: Dict, inserting: bool):
+    for op, fields in update.items():
+        if op == "$set":
+            for key, value in fields.items():
+                _set(doc, key, copy.deepcopy(value))
+        elif op == "$setOnInsert":
+            if inserting:
+                for key, value in fields.items():
+                    _set(doc, key, copy.deepcopy(value))
+        elif op == "$inc":
+            for key, value in fields.items():
+                current = _get(doc, key)
+                _set(doc, key, (0 if current is _MISSING else current) + value)
+        elif op == "$max":
+            for key, value in fields.items():
+                current = _get(doc, key)
+                if current is _MISSING or value > current:
+                    _set(doc, key, value)
+        elif op == "$min":
+            for key, value in fields.items():
+                current = _get(doc, key)
+                if current is _MISSING or value < current:
+                    _set(doc, key, value)
+        elif op == "$bit":
+            for key, spec in fields.items():
+                current = _get(doc, key)
+                value = 0 if current is _MISSING else int(current)
+                for bit_op, operand in spec.items():
+                    value = {"and": value & operand, "or": value | operand, "xor": value ^ operand}[bit_op]
+                _set(doc, key, value)
+        elif op == "$unset":
+            for key in fields:
+                parts = key.split(".")
+                target = _get(doc, ".".join(parts[:-1])) if len(parts) > 1 else doc
+                if isinstance(target, dict):
+                    target.pop(parts[-1], None)
+        else:
+            raise NotImplementedError(op)
+
+
+def _project(doc: Dict, projection) -> Dict:
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    if isinstance(projection, (list, tuple)):
+        projection = {k: 1 for k in projection}
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if include:
+        result = {k: doc[k] for k in include if k in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+    for k, v in projection.items():
+        if not v:
+            doc.pop(k, None)
+    return doc
+
+
+def _sort_docs(docs: List[Dict], spec: List[Tuple[str, int]]):
+    """Stable multi-key sort; missing and null values order first, as in MongoDB."""
+    for field, direction in reversed(spec):
+        def key(doc, field=field):
+            value = _get(doc, field)
+            if value is _MISSING or value is None:
+                return (0, 0)
+            return (1, value)
+        docs.sort(key=key, reverse=direction < 0)
+
+
+def _normalize_sort(key_or_list, direction=None) -> List[Tuple[str, int]]:
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    return [(k, d) for k, d in key_or_list]
+
+
+def _set_in(query: Optional[Dict]) -> Optional[Dict]:
+    """``query`` with its top-level ``$in`` lists as sets, so large ``$in`` lists are not scanned per document"""
+    if not query:
+        return query
+    prepared = {}
+    for key, cond in query.items():
+        if isinstance(cond, dict) and isinstance(cond.get("$in"), (list, tuple)):
+            try:
+                cond = {**cond, "$in": frozenset(cond["$in"])}
+            except TypeError:  # unhashable values: keep the list
+                pass
+        prepared[key] = cond
+    return prepared
+
+
+class FakeCursor:
+    def __init__(self, collection: "FakeCollection", query, projection):
+        self._collection = collection
+        self._query = _set_in(query)
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = _normalize_sort(key_or_list, direction)
+        return self
+
+    def skip(self, n: int):
+        self._skip = n
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def batch_size(self, n: int):
+        return self
+
+    def _results(self) -> List[Dict]:
+        docs = [d for d in self._collection.docs if matches(d, self._query)]
+        if self._sort:
+            _sort_docs(docs, self._sort)
+        docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        return [_project(d, self._projection) for d in docs]
+
+    async def to_list(self, length=None):
+        await self._collection.database._op(f"{self._collection.name}.find")
+        docs = self._results()
+        return docs[:length] if length else docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        await self._collection.database._op(f"{self._collection.name}.find")
+        for doc in self._results():
+            yield doc
+
+
+class FakeAggregateCursor:
+    """Supports the small set of stages the server uses."""
+
+    def __init__(self, collection: "FakeCollection", pipeline: List[Dict]):
+        self._collection = collection
+        self._pipeline = pipeline
+
+    def _results(self) -> List[Dict]:
+        docs = [copy.deepcopy(d) for d in self._collection.docs]
+        for stage in self._pipeline:
+            (name, arg), = stage.items()
+            if name == "$match":
+                docs = [d for d in docs if matches(d, arg)]
+            elif name == "$sort":
+                _sort_docs(docs, list(arg.items()))
+            elif name == "$limit":
+                docs = docs[:arg]
+            elif name == "$skip":
+                docs = docs[arg:]
+            elif name == "$project":
+                docs = [_project(d, arg) for d in docs]
+            elif name == "$group":
+                docs = self._group(docs, arg)
+            elif name == "$count":
+                docs = [{arg: len(docs)}] if docs else []
+            else:
+                raise NotImplementedError(name)
+        return docs
+
+    @staticmethod
+    def _value(doc, expr):
+        if isinstance(expr, str) and expr.startswith("$"):
+            value = _get(doc, expr[1:])
+            return None if value is _MISSING else value
+        return expr
+
+    def _group(self, docs, spec):
+        groups: Dict[Any, Dict] = {}
+        for doc in docs:
+            key_expr = spec["_id"]
+            if isinstance(key_expr, dict):
+                key = tuple((k, self._value(doc, v)) for k, v in key_expr.items())
+                group_id = dict(key)
+            else:
+                key = group_id = self._value(doc, key_expr)
+            out = groups.get(key)
+            if out is None:
+                out = groups[key] = {"_id": group_id}
+                for field, acc in spec.items():
+                    if field != "_id":
+                        (op, _), = acc.items()
+                        out[field] = {"$sum": 0, "$max": None, "$min": None, "$avg": [0, 0], "$push": []}[op]
+            for field, acc in spec.items():
+                if field == "_id":
+                    continue
+                (op, expr), = acc.items()
+                value = self._value(doc, expr)
+                if op == "$sum":
+                    out[field] += value or 0
+                elif op == "$max":
+                    out[field] = value if out[field] is None or (value is not None and value > out[field]) else out[field]
+                elif op == "$min":
+                    out[field] = value if out[field] is None or (value is not None and value < out[field]) else out[field]
+                elif op == "$avg":
+                    out[field] = [out[field][0] + (value or 0), out[field][1] + 1]
+                elif op == "$push":
+                    out[field].append(value)
+                else:
+                    raise NotImplementedError(op)
+        results = list(groups.values())
+        for out in results:
+            for field, acc in spec.items():
+                if field != "_id" and "$avg" in acc:
+                    total, n = out[field]
+                    out[field] = total / n if n else None
+        return results
+
+    async def to_list(self, length=None):
+        await self._collection.database._op(f"{self._collection.name}.aggregate")
+        docs = self._results()
+        return docs[:length] if length else docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        await self._collection.database._op(f"{self._collection.name}.aggregate")
+        for doc in self._results():
+            yield doc
+
+
+class FakeCollection:
+    def __init__(self, database: "FakeDatabase", name: str):
+        self.database = database
+        self.name = name
+        self.docs: List[Dict] = []
+        self.indexes: Dict[str, Dict[str, Any]] = {"_id_": {"key": [("_id", 1)], "unique": True}}
+        # Documents by _id, for {"_id": value} queries; rebuilt after deletes
+        self._ids: Dict[Any, Dict] = {}
+
+    def _by_id(self, query) -> Any:
+        """The document matched by an ``{"_id": value}`` query, None if none; _MISSING for other queries."""
+        if not isinstance(query, dict) or len(query) != 1 or "_id" not in query:
+            return _MISSING
+        value = query["_id"]
+        if isinstance(value, (dict, list)):
+            return _MISSING
+        return self._ids.get(value)
+
+    def _reindex(self):
+        # In place: replica views share this dict along with the documents
+        self._ids.clear()
+        self._ids.update((doc["_id"], doc) for doc in self.docs)
+
+    def _check_unique(self, candidate: Dict, ignore: Optional[Dict] = None):
+        for name, index in self.indexes.items():
+            if not index.get("unique") or name == "_id_":
+                continue
+            fields = [f for f, _ in index["key"]]
+            values = [_get(candidate, f) for f in fields]
+            for doc in self.docs:
+                if doc is ignore:
+                    continue
+                if [_get(doc, f) for f in fields] == values:
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {name}")
+        if ignore is None and self._by_id({"_id": candidate["_id"]}) is not None:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_")
+
+    def _insert(self, doc: Dict) -> Any:
+        doc = copy.deepcopy(doc)
+        doc.setdefault("_id", ObjectId())
+        self._check_unique(doc)
+        self.docs.append(doc)
+        self._ids[doc["_id"]] = doc
+        return doc["_id"]
+
+    def _find(self, query) -> Optional[Dict]:
+        doc = self._by_id(query)
+        if doc is not _MISSING:
+            return doc
+        for doc in self.docs:
+            if matches(doc, query):
+                return doc
+        return None
+
+    def _update(self, query, update, upsert: bool, many: bool = False) -> UpdateResult:
+        doc = self._by_id(query)
+        if doc is not _MISSING:
+            targets = [doc] if doc is not None else []
+        else:
+            targets = [d for d in self.docs if matches(d, query)]
+        if not many:
+            targets = targets[:1]
+        if not targets:
+            if not upsert:
+                return UpdateResult({"n": 0, "nModified": 0}, True)
+            doc = {k: v for k, v in (query or {}).items() if not k.startswith("$") and not isinstance(v, dict)}
+            if "$set" not in update and "$setOnInsert" not in update and not any(k.startswith("$") for k in update):
+                doc.update(update)
+            else:
+                _apply_update(doc, update, inserting=True)
+            inserted_id = self._insert(doc)
+            return UpdateResult({"n": 1, "nModified": 0, "upserted": inserted_id}, True)
+        modified = 0
+        for target in targets:
+            updated = copy.deepcopy(target)
+            if any(k.startswith("$") for k in update):
+                _apply_update(updated, update, inserting=False)
+            else:
+                updated = dict(update, _id=target["_id"])
+            self._check_unique(updated, ignore=target)
+            if updated != target:
+                modified += 1
+            target.clear()
+            target.update(updated)
+        return UpdateResult({"n": len(targets), "nModified": modified}, True)
+
+    async def find_one(self, filter=None, projection=None, sort=None, **kwargs):
+        await self.database._op(f"{self.name}.find_one")
+        doc = self._by_id(filter)
+        if doc is not _MISSING:
+            return _project(doc, projection) if doc is not None else None
+        docs = [d for d in self.docs if matches(d, filter)]
+        if sort:
+            _sort_docs(docs, _normalize_sort(sort))
+        return _project(docs[0], projection) if docs else None
+
+    def find(self, filter=None, projection=None, **kwargs) -> FakeCursor:
+        cursor = FakeCursor(self, filter, projection)
+        if kwargs.get("sort"):
+            cursor.sort(kwargs["sort"])
+        if kwargs.get("limit"):
+            cursor.limit(kwargs["limit"])
+        return cursor
+
+    def aggregate(self, pipeline, **kwargs) -> FakeAggregateCursor:
+        return FakeAggregateCursor(self, pipeline)
+
+    async def count_documents(self, filter, **kwargs) -> int:
+        await self.database._op(f"{self.name}.count_documents")
+        return sum(1 for d in self.docs if matches(d, filter))
+
+    async def estimated_document_count(self, **kwargs) -> int:
+        await self.database._op(f"{self.name}.estimated_document_count")
+        return len(self.docs)
+
+    async def distinct(self, key, filter=None, **kwargs):
+        await self.database._op(f"{self.name}.distinct")
+        values = []
+        for doc in self.docs:
+            if matches(doc, filter):
+                value = _get(doc, key)
+                if value is not _MISSING and value not in values:
+                    values.append(value)
+        return values
+
+    async def insert_one(self, document, **kwargs) -> InsertOneResult:
+        await self.database._op(f"{self.name}.insert_one")
+        inserted_id = self._insert(document)
+        document.setdefault("_id", inserted_id)
+        return InsertOneResult(inserted_id, True)
+
+    async def insert_many(self, documents, ordered: bool = True, **kwargs) -> InsertManyResult:
+        await self.database._op(f"{self.name}.insert_many")
+        ids, errors = [], []
+        for i, document in enumerate(documents):
+            try:
+                ids.append(self._insert(document))
+            except DuplicateKeyError as e:
+                errors.append({"index": i, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(ids)})
+        return InsertManyResult(ids, True)
+
+    async def update_one(self, filter, update, upsert: bool = False, **kwargs) -> UpdateResult:
+        await self.database._op(f"{self.name}.update_one")
+        return self._update(filter, update, upsert)
+
+    async def update_many(self, filter, update, upsert: bool = False, **kwargs) -> UpdateResult:
+        await self.database._op(f"{self.name}.update_many")
+        return self._update(filter, update, upsert, many=True)
+
+    async def replace_one(self, filter, replacement, upsert: bool = False, **kwargs) -> UpdateResult:
+        await self.database._op(f"{self.name}.replace_one")
+        return self._update(filter, replacement, upsert)
+
+    async def find_one_and_update(self, filter, update, upsert: bool = False,
+                                  return_document: bool = False, projection=None, **kwargs):
+        await self.database._op(f"{self.name}.find_one_and_update")
+        before = self._find(filter)
+        before_copy = copy.deepcopy(before) if before is not None else None
+        result = self._update(filter, update, upsert)
+        if return_document:
+            after = self._find({"_id": result.upserted_id}) if result.upserted_id is not None else before
+            return _project(after, projection) if after is not None else None
+        return _project(before_copy, projection) if before_copy is not None else None
+
+    async def delete_one(self, filter, **kwargs) -> DeleteResult:
+        await self.database._op(f"{self.name}.delete_one")
+        doc = self._find(filter)
+        if doc is not None:
+            self.docs.remove(doc)
+            self._ids.pop(doc["_id"], None)
+        return DeleteResult({"n": 1 if doc is not None else 0}, True)
+
+    async def delete_many(self, filter, **kwargs) -> DeleteResult:
+        await self.database._op(f"{self.name}.delete_many")
+        before = len(self.docs)
+        self.docs[:] = [d for d in self.docs if not matches(d, filter)]
+        self._reindex()
+        return DeleteResult({"n": before - len(self.docs)}, True)
+
+    async def bulk_write(self, requests, ordered: bool = True, **kwargs) -> BulkWriteResult:
+        await self.database._op(f"{self.name}.bulk_write")
+        counts = {"nInserted": 0, "nMatched": 0, "nModified": 0, "nUpserted": 0, "nRemoved": 0, "upserted": []}
+        errors = []
+        for i, request in enumerate(requests):
+            kind = type(request).__name__
+            try:
+                if kind == "InsertOne":
+                    self._insert(request._doc)
+                    counts["nInserted"] += 1
+                elif kind in ("UpdateOne", "UpdateMany", "ReplaceOne"):
+                    result = self._update(request._filter, request._doc, request._upsert, many=kind == "UpdateMany")
+                    if result.upserted_id is not None:
+                        counts["nUpserted"] += 1
+                        counts["upserted"].append({"index": i, "_id": result.upserted_id})
+                    else:
+                        counts["nMatched"] += result.matched_count
+                        counts["nModified"] += result.modified_count
+                elif kind in ("DeleteOne", "DeleteMany"):
+                    matched = [d for d in self.docs if matches(d, request._filter)]
+                    for doc in matched[:1] if kind == "DeleteOne" else matched:
+                        self.docs.remove(doc)
+                        self._ids.pop(doc["_id"], None)
+                        counts["nRemoved"] += 1
+                else:
+                    raise NotImplementedError(kind)
+            except DuplicateKeyError as e:
+                errors.append({"index": i, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError(dict(counts, writeErrors=errors))
+        return BulkWriteResult(counts, True)
+
+    async def create_index(self, keys, unique: bool = False, name: Optional[str] = None, **kwargs) -> str:
+        await self.database._op(f"{self.name}.create_index")
+        key = _normalize_sort(keys, 1)
+        name = name or "_".join(f"{f}_{d}" for f, d in key)
+        self.indexes[name] = dict({"key": key, "unique": unique}, **kwargs)
+        return name
+
+    async def create_indexes(self, indexes, **kwargs) -> List[str]:
+        await self.database._op(f"{self.name}.create_indexes")
+        names = []
+        for model in indexes:
+            spec = dict(model.document)
+            key = list(spec.pop("key").items())
+            name = spec.pop("name")
+            self.indexes[name] = dict({"key": key, "unique": spec.pop("unique", False)}, **spec)
+            names.append(name)
+        return names
+
+    async def index_information(self) -> Dict[str, Dict[str, Any]]:
+        await self.database._op(f"{self.name}.index_information")
+        return copy.deepcopy(self.indexes)
+
+    async def drop(self):
+        await self.database._op(f"{self.name}.drop")
+        self.docs.clear()
+        self._ids.clear()
+
+    def with_options(self, **kwargs) -> "FakeCollection":
+        return self
+
+
+_WRITE_METHODS = frozenset({
+    "insert_one", "insert_many", "update_one", "update_many", "replace_one", "delete_one", "delete_many",
+    "bulk_write", "find_one_and_update", "find_one_and_replace", "find_one_and_delete",
+})
+
+
+class FakeDatabase:
+    """In-memory database.
+
+    ``pool_size`` bounds concurrent operations like a driver connection pool;
+    ``write_latency`` is added to writes (e.g. waiting for a majority write
+    concern). ``replica()`` returns another client's view of the same data with
+    its own pool.
+    """
+
+    def __init__(self, name: str = "fake", latency: float = 0.0, jitter: float = 0.0,
+                 pool_size: Optional[int] = None, write_latency: float = 0.0):
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.write_latency = write_latency
+        self.ops: Counter = Counter()
+        self.pool_size = pool_size
+        self._pool = asyncio.Semaphore(pool_size) if pool_size else None
+        self._collections: Dict[str, FakeCollection] = {}
+        self._source: Optional["FakeDatabase"] = None
+
+    async def _op(self, name: str):
+        self.ops[name] += 1
+        delay = self.latency + (random.random() * self.jitter if self.jitter else 0.0)
+        if self.write_latency and name.rpartition(".")[2] in _WRITE_METHODS:
+            delay += self.write_latency
+        if self._pool is None:
+            await asyncio.sleep(delay)
+            return
+        async with self._pool:
+            await asyncio.sleep(delay)
+
+    def replica(self, pool_size: Optional[int] = None) -> "FakeDatabase":
+        view = FakeDatabase(self.name, self.latency, self.jitter, pool_size, self.write_latency)
+        view.ops = self.ops
+        view._source = self
+        return view
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = FakeCollection(self, name)
+            if self._source is not None:
+                source = self._source[name]
+                collection.docs, collection.indexes, collection._ids = source.docs, source.indexes, source._ids
+        return collection
+
+    def get_collection(self, name: str, **kwargs) -> FakeCollection:
+        return self[name]
+
+    async def command(self, command, *args, **kwargs):
+        await self._op(f"command.{command if isinstance(command, str) else next(iter(command))}")
+        return {"ok": 1.0}
+
+    async def list_collection_names(self, **kwargs) -> List[str]:
+        await self._op("list_collection_names")
+        return list(self._collections)
+
+    async def create_collection(self, name: str, **kwargs) -> FakeCollection:
+        await self._op("create_collection")
+        return self[name]
+
+    def total_ops(self) -> int:
+        return sum(self.ops.values())
+
+
+class FakeClient:
+    """Minimal ``AsyncIOMotorClient`` replacement."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self._databases: Dict[str, FakeDatabase] = {}
+
+    def __getitem__(self, name: str) -> FakeDatabase:
+        database = self._databases.get(name)
+        if database is None:
+            database = self._databases[name] = FakeDatabase(name, self.latency, self.jitter)
+        return database
+
+    def get_database(self, name: str, **kwargs) -> FakeDatabase:
+        return self[name]
+
+    def close(self):
+        pass
+
+
+def install(server_module, latency: float = 0.0, jitter: float = 0.0) -> FakeDatabase:
+    """Point an imported ``server`` module at a fresh in-process database."""
+    fake_client = FakeClient(latency, jitter)
+    database = fake_client[server_module.os.environ["DB_NAME"]]
+    server_module.client = fake_client
+    server_module.db = server_module.traced_database(database) if server_module.tracer.enabled else database
+    return database
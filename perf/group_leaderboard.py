@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Latency of ``POST /api/leaderboard/{board}/group`` by group size, against the
+per-player lookups a client needs without it.
+
+Runs the app in-process against the fake MongoDB with ``--mongo-latency-ms``
+per operation, on a general board of ``--board-players`` players. For each
+group size, random groups of players are ranked:
+
+- per player: one ``GET /api/leaderboard/general?player_name=`` per member,
+  ``--client-concurrency`` at a time (a browser's connections per host), as a
+  client would rank its friends today
+- cold: the group endpoint while the rank index is empty (first request of
+  the board since the last ``RANK_INDEX_MAX_AGE`` seconds)
+- warm: the group endpoint with the rank index loaded, a new group each time
+- cached: the same group again, within ``GROUP_LEADERBOARD_TTL``
+
+The fake MongoDB scans its documents in Python, so the per-player figures
+include far more CPU than a real server would spend; the MongoDB operation
+counts are exact.
+
+    python perf/group_leaderboard.py --sizes 10 100 500 --board-players 20000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PERF_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(PERF_DIR))
+os.environ.setdefault("MONGO_URL", "mongodb://127.0.0.1:1")
+os.environ.setdefault("DB_NAME", "perf")
+os.environ.setdefault("RATE_LIMITS", "off")
+
+import logging  # noqa: E402
+
+logging.disable(logging.WARNING)
+
+import httpx  # noqa: E402
+
+import fake_mongo  # noqa: E402
+import server  # noqa: E402
+
+
+async def timed(coro):
+    start = time.perf_counter()
+    await coro
+    return (time.perf_counter() - start) * 1000
+
+
+async def measure(http, database, size: int, args):
+    rng = random.Random(size)
+    groups = [[f"oyuncu_{rng.randrange(args.board_players)}" for _ in range(size)] for _ in range(args.repeat)]
+
+    async def group(names):
+        (await http.post("/api/leaderboard/general/group", json={"player_names": names})).raise_for_status()
+
+    connections = asyncio.Semaphore(args.client_concurrency)
+
+    async def lookup(name):
+        async with connections:
+            (await http.get("/api/leaderboard/general", params={"player_name": name})).raise_for_status()
+
+    async def per_player(names):
+        await asyncio.gather(*map(lookup, names))
+
+    result = {}
+    for mode in ("per_player", "cold", "warm", "cached"):
+        times, ops = [], 0
+        for names in groups[:args.per_player_repeat] if mode == "per_player" else groups:
+            if mode == "cold":
+                server.rank_index.clear()
+            server.group_leaderboards.clear()
+            if mode == "cached":
+                await group(names)
+            before = database.total_ops()
+            times.append(await timed(per_player(names) if mode == "per_player" else group(names)))
+            ops = database.total_ops() - before
+        result[mode] = {"p50_ms": round(statistics.median(times), 1), "mongo_ops": ops}
+    return result
+
+
+async def run(args):
+    server.forget_sheets_content()
+    rng = random.Random(1)
+    database = fake_mongo.FakeDatabase(latency=args.mongo_latency_ms / 1000)
+    await database.global_scores.insert_many([
+        {"player_name": f"oyuncu_{i}", "score": rng.randint(0, 20000), "episodes_completed": rng.randint(1, 14)}
+        for i in range(args.board_players)
+    ])
+    await database.counters.insert_one({"_id": "global_scores", "value": args.board_players})
+    server.db = database
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+        return {size: await measure(http, database, size, args) for size in args.sizes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--board-players", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--per-player-repeat", type=int, default=1)
+    parser.add_argument("--client-concurrency", type=int, default=6)
+    parser.add_argument("--mongo-latency-ms", type=float, default=2.0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    modes = ("per_player", "cold", "warm", "cached")
+    print(f"{'group':>6} " + " ".join(f"{mode + ' ms':>14} {'ops':>5}" for mode in modes))
+    for size, r in results.items():
+        print(f"{size:>6} " + " ".join(f"{r[m]['p50_ms']:>14} {r[m]['mongo_ops']:>5}" for m in modes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Hermetic load test for the backend.
+
+Starts a local Sheets stub with generated content, runs the FastAPI app under
+uvicorn in a background thread against either a local MongoDB (--mongo-url) or
+the in-process stand-in from fake_mongo.py, and replays a realistic mix of quiz
+fetches, score submits and leaderboard reads from an asyncio load generator.
+
+Prints per-route throughput and p50/p95/p99 latency as JSON and exits non-zero
+when a route regresses against the committed baseline.
+
+    python perf/loadgen.py --duration 10 --concurrency 16
+    python perf/loadgen.py --update-baseline
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+PERF_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(PERF_DIR))
+
+import httpx  # noqa: E402
+
+import content_gen  # noqa: E402
+from sheets_stub import SheetsStub, read_csvs  # noqa: E402
+
+DEFAULT_BASELINE = PERF_DIR / "baseline.json"
+
+# (route label, weight, request builder)
+RequestSpec = Tuple[str, str, Optional[dict]]
+
+
+def build_mix(episodes: int, players: int) -> List[Tuple[str, int, Callable[[random.Random], RequestSpec]]]:
+    def player(rng):
+        return f"oyuncu_{rng.randrange(players)}"
+
+    def episode(rng):
+        return rng.randint(1, episodes)
+
+    return [
+        ("GET /api/episodes", 10, lambda rng: ("GET", "/api/episodes", None)),
+        ("GET /api/quiz/episode/{id}", 25, lambda rng: ("GET", f"/api/quiz/episode/{episode(rng)}?count=25", None)),
+        ("GET /api/quiz/mixed", 3, lambda rng: ("GET", "/api/quiz/mixed", None)),
+        ("POST /api/score/episode", 20, lambda rng: ("POST", "/api/score/episode", {
+            "player_name": player(rng), "episode_id": episode(rng),
+            "score": rng.randint(0, 800), "correct_count": rng.randint(0, 25), "speed_bonus": rng.randint(0, 125),
+        })),
+        ("POST /api/score/mixed", 5, lambda rng: ("POST", "/api/score/mixed", {
+            "player_name": player(rng), "score": rng.randint(0, 3000),
+            "correct_count": rng.randint(0, 100), "speed_bonus": rng.randint(0, 500),
+            "questions_answered": rng.randint(1, 120),
+        })),
+        ("GET /api/leaderboard/general", 15, lambda rng: ("GET", f"/api/leaderboard/general?player_name={player(rng)}", None)),
+        ("GET /api/leaderboard/episode/{id}", 12, lambda rng: ("GET", f"/api/leaderboard/episode/{episode(rng)}?player_name={player(rng)}", None)),
+        ("GET /api/leaderboard/mixed", 5, lambda rng: ("GET", f"/api/leaderboard/mixed?player_name={player(rng)}", None)),
+        ("GET /api/player/{name}/stats", 5, lambda rng: ("GET", f"/api/player/{player(rng)}/stats", None)),
+    ]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples: Dict[str, List[Tuple[float, int]]], elapsed: float) -> Dict[str, Dict[str, float]]:
+    report = {}
+    for route, values in sorted(samples.items()):
+        latencies = sorted(v[0] for v in values)
+        report[route] = {
+            "requests": len(values),
+            "errors": sum(1 for v in values if v[1] >= 500 or v[1] == 0),
+            "throughput_rps": round(len(values) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+        }
+    return report
+
+
+def compare(report: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """Return human-readable regressions of p95 latency or throughput beyond ``tolerance``."""
+    regressions = []
+    for route, base in baseline.items():
+        current = report.get(route)
+        if current is None:
+            regressions.append(f"{route}: missing from run")
+            continue
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance) and current["p95_ms"] - base["p95_ms"] > 1.0:
+            regressions.append(f"{route}: p95 {current['p95_ms']}ms > baseline {base['p95_ms']}ms")
+        if current["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{route}: throughput {current['throughput_rps']}/s < baseline {base['throughput_rps']}/s")
+        if current["errors"] > base.get("errors", 0):
+            regressions.append(f"{route}: {current['errors']} errors")
+    return regressions
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class AppServer:
+    """Run the backend under uvicorn in a daemon thread."""
+
+    def __init__(self, app, port: int):
+        import uvicorn
+        self.port = port
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"))
+        self._thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "AppServer":
+        self._thread.start()
+        deadline = time.time() + 15
+        while not self.server.started:
+            if time.time() > deadline or not self._thread.is_alive():
+                raise RuntimeError("uvicorn did not start")
+            time.sleep(0.05)
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        self._thread.join(timeout=10)
+
+
+def start_stack(args) -> Tuple[SheetsStub, AppServer, object]:
+    """Start the Sheets stub and the app; return ``(stub, app_server, server_module)``."""
+    if getattr(args, "csv_dir", None):
+        csvs = read_csvs(args.csv_dir)
+    else:
+        csvs = content_gen.generate(args.episodes, args.questions_per_episode, args.seed)
+    stub = SheetsStub(*csvs).start()
+    os.environ["SHEETS_BASE_URL"] = stub.base_url
+    os.environ["MONGO_URL"] = args.mongo_url or "mongodb://127.0.0.1:1"
+    os.environ["DB_NAME"] = args.db_name
+    # Every simulated player shares one client IP
+    os.environ.setdefault("RATE_LIMITS", "off")
+
+    import server
+    if not args.mongo_url:
+        import fake_mongo
+        fake_mongo.install(server, latency=args.mongo_latency_ms / 1000)
+
+    app_server = AppServer(server.app, free_port()).start()
+    return stub, app_server, server
+
+
+async def run_load(base_url: str, args) -> Tuple[Dict[str, List[Tuple[float, int]]], float]:
+    mix = build_mix(args.episodes, args.players)
+    labels = [m[0] for m in mix]
+    weights = [m[1] for m in mix]
+    builders = {m[0]: m[2] for m in mix}
+    samples: Dict[str, List[Tuple[float, int]]] = defaultdict(list)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as http_client:
+        # Warm the content cache so the first quiz does not measure the Sheets download
+        (await http_client.get("/api/quiz/episode/1")).raise_for_status()
+
+        deadline = time.perf_counter() + args.duration
+
+        async def worker(worker_id: int):
+            rng = random.Random(args.seed * 1000 + worker_id)
+            while time.perf_counter() < deadline:
+                label = rng.choices(labels, weights)[0]
+                method, path, body = builders[label](rng)
+                start = time.perf_counter()
+                try:
+                    response = await http_client.request(method, path, json=body)
+                    status = response.status_code
+                except httpx.HTTPError:
+                    status = 0
+                samples[label].append(((time.perf_counter() - start) * 1000, status))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+        return samples, time.perf_counter() - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--episodes", type=int, default=14)
+    parser.add_argument("--questions-per-episode", type=int, default=60)
+    parser.add_argument("--players", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mongo-url", default=None, help="local mongod; default is the in-process stand-in")
+    parser.add_argument("--mongo-latency-ms", type=float, default=0.0, help="injected latency for the stand-in")
+    parser.add_argument("--db-name", default="tasacak_perf")
+    parser.add_argument("--out", default=None, help="write the JSON report here as well")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative regression")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    stub, app_server, _ = start_stack(args)
+    try:
+        samples, elapsed = asyncio.run(run_load(app_server.base_url, args))
+    finally:
+        app_server.stop()
+        stub.stop()
+
+    report = summarize(samples, elapsed)
+    output = {
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "baseline", "update_baseline")},
+        "total_requests": sum(r["requests"] for r in report.values()),
+        "throughput_rps": round(sum(r["requests"] for r in report.values()) / elapsed, 1),
+        "routes": report,
+    }
+    print(json.dumps(output, indent=2))
+    if args.out:
+        Path(args.out).write_text(json.dumps(output, indent=2) + "\n")
+
+    if args.update_baseline:
+        Path(args.baseline).write_text(json.dumps(report, indent=2) + "\n")
+        return 0
+
+    if Path(args.baseline).exists():
+        regressions = compare(report, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
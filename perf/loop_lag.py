@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Measure event-loop lag while content is refreshed from a large sheet.
+
+Runs the app in-process with a stubbed Google Sheets fetch serving
+``--questions`` question rows. A ticker wakes up every ``--tick-ms`` and
+records how late it woke, while a client keeps requesting ``/api/episodes``
+(an in-memory route). Then a content refresh runs, with the build in each
+``CONTENT_BUILD_MODE``:
+
+- inline:  parse and build on the event loop, as before
+- thread:  in the default thread pool (shares the GIL with the loop)
+- process: in the worker process of ``ContentBuildPool``
+
+Each mode first refreshes once untimed (spawning the worker, warming caches),
+then reports the timed refresh's duration, the loop lag during it and the
+latency of the requests that overlapped it.
+
+    python perf/loop_lag.py --questions 100000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PERF_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(PERF_DIR))
+os.environ.setdefault("MONGO_URL", "mongodb://127.0.0.1:1")
+os.environ.setdefault("DB_NAME", "perf")
+
+import logging  # noqa: E402
+
+logging.disable(logging.WARNING)
+
+import httpx  # noqa: E402
+
+import content_gen  # noqa: E402
+from loadgen import percentile  # noqa: E402
+import server  # noqa: E402
+from content_build import ContentBuildPool  # noqa: E402
+
+MODES = ("inline", "thread", "process")
+
+
+async def measure(mode: str, episodes_csv: bytes, questions_csv: bytes, tick_ms: float):
+    server.forget_sheets_content()
+    server.content_builds = ContentBuildPool(mode)
+    state = {"questions": questions_csv}
+
+    async def fetch(gid):
+        return episodes_csv if gid == server.EPISODES_GID else state["questions"]
+
+    server.fetch_csv_from_sheets = fetch
+    try:
+        await server.reload_sheets_content()  # untimed warm-up
+        # Change one row so the timed refresh swaps in a new snapshot
+        state["questions"] = questions_csv.replace("Şükrü".encode(), "Şükran".encode(), 1)
+
+        lags, latencies = [], []
+        done = asyncio.Event()
+
+        async def ticker():
+            interval = tick_ms / 1000
+            while not done.is_set():
+                start = time.perf_counter()
+                await asyncio.sleep(interval)
+                lags.append((time.perf_counter() - start - interval) * 1000)
+
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://lag") as http:
+            async def client():
+                while not done.is_set():
+                    start = time.perf_counter()
+                    (await http.get("/api/episodes")).raise_for_status()
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    await asyncio.sleep(0.002)
+
+            background = [asyncio.create_task(ticker()), asyncio.create_task(client())]
+            await asyncio.sleep(0.2)
+            lags.clear()
+            latencies.clear()
+            start = time.perf_counter()
+            before = server.current_snapshot()
+            await server.reload_sheets_content()
+            refresh_ms = (time.perf_counter() - start) * 1000
+            assert server.current_snapshot() is not before
+            done.set()
+            await asyncio.gather(*background)
+    finally:
+        server.content_builds.shutdown()
+
+    lags.sort()
+    latencies.sort()
+    return {
+        "refresh_ms": round(refresh_ms, 1),
+        "lag_p99_ms": round(percentile(lags, 99), 1),
+        "lag_max_ms": round(lags[-1], 1) if lags else 0.0,
+        "requests": len(latencies),
+        "request_p99_ms": round(percentile(latencies, 99), 1),
+        "request_max_ms": round(latencies[-1], 1) if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=100_000, help="question rows in the sheet")
+    parser.add_argument("--tick-ms", type=float, default=5.0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    per_episode = -(-args.questions // 14)
+    # Bytes, as the real Sheets fetch returns them
+    episodes_csv, questions_csv = (csv.encode() for csv in content_gen.generate(14, per_episode))
+    results = {mode: asyncio.run(measure(mode, episodes_csv, questions_csv, args.tick_ms)) for mode in MODES}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{14 * per_episode} question rows, {len(questions_csv) // 1024} KiB")
+    print(f"{'mode':<8} {'refresh':>9} {'lag p99':>8} {'lag max':>8} {'reqs':>6} {'req p99':>8} {'req max':>8}   (ms)")
+    for mode, r in results.items():
+        print(f"{mode:<8} {r['refresh_ms']:>9} {r['lag_p99_ms']:>8} {r['lag_max_ms']:>8} {r['requests']:>6} "
+              f"{r['request_p99_ms']:>8} {r['request_max_ms']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the pure hot functions in backend/server.py.
+
+Each benchmark runs over generated inputs of increasing size and records the
+best-of-N wall time and the tracemalloc peak of a single run. Results are
+written to perf/results/<commit>.json so two commits can be compared:
+
+    python perf/microbench.py                      # run, store, print
+    python perf/microbench.py --sizes 100 1000 --only parse_csv
+    python perf/microbench.py --compare perf/results/<old>.json perf/results/<new>.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import timeit
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+PERF_DIR = Path(__file__).resolve().parent
+RESULTS_DIR = PERF_DIR / "results"
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(PERF_DIR))
+os.environ.setdefault("MONGO_URL", "mongodb://127.0.0.1:1")
+os.environ.setdefault("DB_NAME", "perf")
+
+import logging  # noqa: E402
+
+logging.disable(logging.WARNING)
+
+import content_gen  # noqa: E402
+import sampler  # noqa: E402
+import server  # noqa: E402
+
+
+def _questions_csv(size: int) -> str:
+    return content_gen.questions_csv(episodes=14, questions_per_episode=max(1, size // 14))
+
+
+def _bank(size: int) -> List[Dict]:
+    rows = server.parse_csv(_questions_csv(size))
+    return [q for qs in server.build_questions(rows).values() for q in qs]
+
+
+def _index(size: int) -> Tuple["sampler.QuestionIndex", random.Random]:
+    return sampler.QuestionIndex(_bank(size)), random.Random(size)
+
+
+QUIZ_MIX = {"kolay": 10, "orta": 10, "zor": 5}
+
+
+def _score_docs(size: int) -> List[Dict]:
+    rng = random.Random(size)
+    docs = [{"player_name": f"oyuncu_{i}", "score": rng.randint(0, 10000), "episodes_completed": rng.randint(1, 14)}
+            for i in range(size)]
+    docs.sort(key=lambda d: d["score"], reverse=True)
+    return docs
+
+
+# name -> (setup(size) -> state, run(state))
+BENCHMARKS: Dict[str, Tuple[Callable[[int], Any], Callable[[Any], Any]]] = {
+    "parse_csv": (_questions_csv, server.parse_csv),
+    "build_questions": (lambda size: server.parse_csv(_questions_csv(size)), server.build_questions),
+    "transform_question": (_bank, lambda bank: [server.transform_question(q) for q in bank]),
+    "build_question_index": (_bank, sampler.QuestionIndex),
+    # Sampling 25 questions: stratified O(k) sampler vs. random.sample over a copy of the bank
+    "sample_stratified_25": (_index, lambda state: sampler.sample(state[0], 25, state[1], QUIZ_MIX)),
+    "sample_curve_25": (_index, lambda state: sampler.sample(state[0], 25, state[1], curve="ramp")),
+    "random_sample_25": (_bank, lambda bank: random.sample(list(bank), 25)),
+    "max_possible_score": (
+        lambda size: [server.transform_question(q) for q in _bank(size)],
+        server.max_possible_score,
+    ),
+    "format_leaderboard_entries": (
+        _score_docs,
+        lambda docs: server.format_leaderboard_entries(docs, ("episodes_completed",)),
+    ),
+}
+
+
+def measure(run: Callable[[Any], Any], state: Any, repeat: int) -> Dict[str, float]:
+    timer = timeit.Timer(lambda: run(state))
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    run(state)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"time_ms": round(best * 1000, 4), "peak_kib": round(peak / 1024, 1)}
+
+
+def git_revision() -> str:
+    try:
+        sha = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+        dirty = subprocess.call(["git", "diff", "--quiet", "HEAD", "--", "backend"], cwd=ROOT) != 0
+        return f"{sha}-dirty" if dirty else sha
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_all(sizes: List[int], only: List[str], repeat: int) -> Dict[str, Any]:
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for name, (setup, run) in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        results[name] = {}
+        for size in sizes:
+            state = setup(size)
+            results[name][str(size)] = measure(run, state, repeat)
+            print(f"{name:<28} n={size:<7} {results[name][str(size)]}", file=sys.stderr)
+    return {
+        "commit": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> str:
+    lines = [f"{'benchmark':<28} {'n':>7} {'time old→new (ms)':>26} {'ratio':>7} {'peak old→new (KiB)':>26}"]
+    for name, sizes in new["results"].items():
+        for size, current in sizes.items():
+            before = old["results"].get(name, {}).get(size)
+            if before is None:
+                continue
+            ratio = current["time_ms"] / before["time_ms"] if before["time_ms"] else float("inf")
+            lines.append(
+                f"{name:<28} {size:>7} {before['time_ms']:>12.3f} → {current['time_ms']:<11.3f} {ratio:>7.2f}"
+                f" {before['peak_kib']:>12.1f} → {current['peak_kib']:<11.1f}"
+            )
+    return f"{old['commit']} → {new['commit']}\n" + "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--only", nargs="*", default=[], choices=sorted(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", default=None, help="default: perf/results/<commit>.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args()
+
+    if args.compare:
+        old, new = (json.loads(Path(p).read_text()) for p in args.compare)
+        print(compare(old, new))
+        return
+
+    report = run_all(args.sizes, args.only, args.repeat)
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{report['commit']}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2) + "\n")
+    print(json.dumps(report, indent=2))
+    print(f"Saved to {out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Burst test: do leaderboard reads queue behind score writes for MongoDB
+connections?
+
+Runs the app in-process against the fake MongoDB. The fake bounds concurrent
+operations like a driver pool (``--pool-size``) and adds ``--write-latency-ms``
+to writes, as a majority write concern does. A burst of score submissions
+then runs alongside a steady stream of leaderboard and stats reads. Two
+configurations get the same number of connections in total:
+
+- shared: one pool for everything (the default client)
+- split:  ``--read-pool-size`` of those connections in a separate read pool,
+          as ``MONGO_READ_POOL_SIZE`` configures
+
+Prints p50/p99 latency of reads and writes for each.
+
+    python perf/pool_burst.py --writers 200 --readers 8 --pool-size 20 --read-pool-size 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+PERF_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(PERF_DIR))
+os.environ.setdefault("MONGO_URL", "mongodb://127.0.0.1:1")
+os.environ.setdefault("DB_NAME", "perf")
+# Every simulated player shares one client IP
+os.environ.setdefault("RATE_LIMITS", "off")
+
+import logging  # noqa: E402
+
+logging.disable(logging.WARNING)
+
+import httpx  # noqa: E402
+
+import fake_mongo  # noqa: E402
+from loadgen import percentile  # noqa: E402
+import server  # noqa: E402
+
+READ_ROUTES = ("/api/leaderboard/general", "/api/leaderboard/mixed", "/api/player/{player}/stats")
+
+
+async def seed(database, players: int):
+    rng = random.Random(7)
+    await database.global_scores.insert_many([
+        {"player_name": f"oyuncu_{i}", "score": rng.randint(0, 8000), "episodes_completed": 5}
+        for i in range(players)
+    ])
+    await database.mixed_scores.insert_many([
+        {"player_name": f"oyuncu_{i}", "score": rng.randint(0, 3000)} for i in range(players)
+    ])
+
+
+async def burst(mode: str, args) -> Dict[str, Dict[str, float]]:
+    write_pool = args.pool_size - args.read_pool_size if mode == "split" else args.pool_size
+    database = fake_mongo.FakeDatabase(latency=args.latency_ms / 1000, pool_size=write_pool,
+                                       write_latency=args.write_latency_ms / 1000)
+    await seed(database, args.players)
+    server.db = database
+    server.read_db = database.replica(pool_size=args.read_pool_size) if mode == "split" else None
+
+    samples: Dict[str, List[float]] = {"read": [], "write": []}
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as http:
+        done = asyncio.Event()
+
+        async def reader(i: int):
+            rng = random.Random(i)
+            while not done.is_set():
+                path = rng.choice(READ_ROUTES).format(player=f"oyuncu_{rng.randrange(args.players)}")
+                start = time.perf_counter()
+                response = await http.get(path)
+                samples["read"].append((time.perf_counter() - start) * 1000)
+                response.raise_for_status()
+
+        async def writer(i: int):
+            start = time.perf_counter()
+            response = await http.post("/api/score/episode", json={
+                "player_name": f"oyuncu_{i % args.players}", "episode_id": 1 + i % 14, "score": 100 + i,
+            })
+            samples["write"].append((time.perf_counter() - start) * 1000)
+            response.raise_for_status()
+
+        readers = [asyncio.create_task(reader(i)) for i in range(args.readers)]
+        await asyncio.sleep(0.2)  # steady state before the burst
+        await asyncio.gather(*(writer(i) for i in range(args.writers)))
+        done.set()
+        await asyncio.gather(*readers)
+
+    report = {}
+    for kind, values in samples.items():
+        values.sort()
+        report[kind] = {"requests": len(values), "p50_ms": round(percentile(values, 50), 1),
+                        "p99_ms": round(percentile(values, 99), 1)}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=200, help="score submissions in the burst")
+    parser.add_argument("--readers", type=int, default=8, help="concurrent leaderboard readers")
+    parser.add_argument("--players", type=int, default=2000)
+    parser.add_argument("--pool-size", type=int, default=20, help="connections in total")
+    parser.add_argument("--read-pool-size", type=int, default=5, help="of which reads get in split mode")
+    parser.add_argument("--latency-ms", type=float, default=1.0)
+    parser.add_argument("--write-latency-ms", type=float, default=20.0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    results = {mode: asyncio.run(burst(mode, args)) for mode in ("shared", "split")}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'pool':<8} {'reads':>7} {'read p50':>9} {'read p99':>9} {'write p50':>10} {'write p99':>10}   (ms)")
+    for mode, r in results.items():
+        print(f"{mode:<8} {r['read']['requests']:>7} {r['read']['p50_ms']:>9} {r['read']['p99_ms']:>9} "
+              f"{r['write']['p50_ms']:>10} {r['write']['p99_ms']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Flood the score endpoints and check that legitimate players are unaffected.
+
+Runs the app in-process against the fake MongoDB (``--mongo-latency-ms`` per
+operation, ``--pool-size`` connections). Legitimate players, each on their own
+IP, submit scores open loop at ``--rate`` per second. Meanwhile a flood of
+``--flood-rate`` requests per second comes from two attackers: one client IP
+posing as ever new players, and one player name spread over ever new IPs.
+The run is repeated with the rate limits off and on.
+
+For legitimate and flood requests alike, the report lists the responses by
+status and the p50/p99 latency of the successful ones. It also gives the
+MongoDB operations of the run.
+
+    python perf/rate_flood.py --rate 50 --flood-rate 1000 --duration 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+PERF_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(PERF_DIR))
+os.environ.setdefault("MONGO_URL", "mongodb://127.0.0.1:1")
+os.environ.setdefault("DB_NAME", "perf")
+
+import logging  # noqa: E402
+
+logging.disable(logging.WARNING)
+
+import httpx  # noqa: E402
+
+import fake_mongo  # noqa: E402
+from loadgen import percentile  # noqa: E402
+import server  # noqa: E402
+
+
+def flood_request(i: int) -> Tuple[str, str]:
+    if i % 2:
+        return f"bot_{i}", "10.9.9.9"
+    return "bot", f"10.8.{i // 250 % 250}.{i % 250}"
+
+
+async def run(mode: str, args) -> Dict[str, object]:
+    server.db = fake_mongo.FakeDatabase(latency=args.mongo_latency_ms / 1000, pool_size=args.pool_size)
+    server.rate_limiter.reset()
+    server.rate_limiter.ip_header = "x-forwarded-for"
+    saved = dict(server.rate_limiter.limits)
+    if mode == "off":
+        server.rate_limiter.configure("off")
+
+    samples: Dict[str, List[Tuple[float, int]]] = defaultdict(list)
+    transport = httpx.ASGITransport(app=server.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://flood", timeout=120) as http:
+            async def one(group, player, ip):
+                start = time.perf_counter()
+                response = await http.post("/api/score/episode", headers={"X-Forwarded-For": ip}, json={
+                    "player_name": player, "episode_id": 1, "score": 100,
+                })
+                samples[group].append(((time.perf_counter() - start) * 1000, response.status_code))
+
+            async def arrivals(group, rate, build):
+                tasks = []
+                start = time.perf_counter()
+                for i in range(int(rate * args.duration)):
+                    delay = start + i / rate - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    tasks.append(asyncio.create_task(one(group, *build(i))))
+                await asyncio.gather(*tasks)
+
+            await asyncio.gather(
+                arrivals("legitimate", args.rate, lambda i: (f"oyuncu_{i}", f"10.0.{i // 250 % 250}.{i % 250}")),
+                arrivals("flood", args.flood_rate, flood_request),
+            )
+    finally:
+        server.rate_limiter.limits = saved
+        server.rate_limiter.ip_header = None
+
+    report = {"mongo_ops": server.db.total_ops()}
+    for group, values in sorted(samples.items()):
+        ok = sorted(latency for latency, status in values if status == 200)
+        report[group] = {
+            "statuses": dict(Counter(status for _, status in values)),
+            "p50_ms": round(percentile(ok, 50), 1),
+            "p99_ms": round(percentile(ok, 99), 1),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=50, help="legitimate submissions per second")
+    parser.add_argument("--flood-rate", type=float, default=1000, help="flood requests per second")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--mongo-latency-ms", type=float, default=3.0)
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    results = {mode: asyncio.run(run(mode, args)) for mode in ("off", "on")}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'limits':<7} {'group':<11} {'200':>6} {'429':>6} {'503':>6} {'p50 ms':>9} {'p99 ms':>9}")
+    for mode, report in results.items():
+        for group in ("legitimate", "flood"):
+            r = report[group]
+            s = r["statuses"]
+            print(f"{mode:<7} {group:<11} {s.get(200, 0):>6} {s.get(429, 0):>6} {s.get(503, 0):>6} "
+                  f"{r['p50_ms']:>9} {r['p99_ms']:>9}")
+        print(f"{mode:<7} mongo ops: {report['mongo_ops']}")
+
+
+if __name__ == "__main__":
+    main()
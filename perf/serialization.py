@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Serialization time per route: FastAPI's default path against the direct responses.
+
+The default path is what the routes did before: validate the returned value
+against the route's ``response_model``, ``jsonable_encoder``, then stdlib
+``json`` in ``JSONResponse`` (the leaderboards also built a
+``LeaderboardResponse`` first). The direct path is what they do now:
+``ORJSONResponse`` on plain data, or ``model_dump_json`` for the quizzes.
+Both encode the same generated payloads; the script checks that they decode
+to the same JSON, Turkish names and datetimes included, and reports the
+best-of-``--repeat`` time per response.
+
+    python perf/serialization.py --repeat 5
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PERF_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(PERF_DIR))
+os.environ.setdefault("MONGO_URL", "mongodb://127.0.0.1:1")
+os.environ.setdefault("DB_NAME", "perf")
+
+import logging  # noqa: E402
+
+logging.disable(logging.WARNING)
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+
+import content_gen  # noqa: E402
+import seed_data  # noqa: E402
+import server  # noqa: E402
+
+
+def route_field(path: str, method: str = "GET"):
+    route = next(r for r in server.app.routes if getattr(r, "path", None) == path and method in r.methods)
+    return route.secure_cloned_response_field
+
+
+def default_path(field, content) -> bytes:
+    if field is None:
+        return JSONResponse(jsonable_encoder(content)).body
+    # serialize_response never suspends for async routes: step it without an event loop's overhead
+    try:
+        serialize_response(field=field, response_content=content).send(None)
+    except StopIteration as done:
+        return JSONResponse(done.value).body
+    raise RuntimeError("serialize_response suspended")
+
+
+def player(rng: random.Random, i: int) -> str:
+    return f"{rng.choice(seed_data.NAMES)}_{i}"
+
+
+def payloads(rng: random.Random):
+    """``(route, field, default path content, direct path callable)`` per route."""
+    questions = server.build_questions(server.parse_csv(content_gen.questions_csv(episodes=14, questions_per_episode=60)))
+
+    def quiz(episode_id, picked):
+        return server.QuizResponse(
+            episode_id=episode_id, episode_name="Karışık Mod" if episode_id is None else "Çöpçatanlar",
+            questions=[server.transform_question(q, rng) for q in picked], total_questions=len(picked),
+            max_possible_score=sum(q["points"] + 5 for q in picked), mode="mixed" if episode_id is None else "episode",
+            content_version="3f9a2c1d",
+        )
+
+    episode_quiz = quiz(1, questions[1][:25])
+    mixed_quiz = quiz(None, [q for qs in questions.values() for q in qs])
+
+    scores = sorted((rng.randint(0, 5000) for _ in range(50)), reverse=True)
+    board = server.format_leaderboard_entries(
+        [{"player_name": player(rng, i), "score": s, "episodes_completed": rng.randint(1, 14)} for i, s in enumerate(scores)],
+        ("episodes_completed",),
+    )
+    group = server.format_leaderboard_entries(
+        [{"player_name": player(rng, i), "score": s, "episodes_completed": 3}
+         for i, s in enumerate(sorted((rng.randint(0, 5000) for _ in range(500)), reverse=True))],
+        ("episodes_completed",),
+    )
+    for entry in group:
+        entry["global_rank"] = entry["rank"] * 40
+    group_body = {"entries": group, "unranked": [], "total_players": 20000}
+
+    stats = {"player_name": "Şükrü_7", "global_score": 4210, "episodes_completed": 14,
+             "episode_scores": {e: rng.randint(0, 600) for e in range(1, 15)}, "mixed_best_score": 1380}
+    now = datetime(2026, 3, 1, 21, 0)
+    history = {
+        "player_name": "Şükrü_7",
+        "days": [{"day": (now - timedelta(days=d)).date().isoformat(), "runs": 4, "avg_score": 212.5, "best": 410,
+                  "modes": {"episode": {"runs": 3, "avg_score": 150.0, "best": 300}}} for d in range(30)],
+        "latest_runs": [{"ts": now - timedelta(minutes=7 * n, microseconds=n * 1000), "mode": "episode", "score": 200 + n,
+                         "correct_count": 12, "speed_bonus": 25, "episode_id": 1 + n % 14} for n in range(20)],
+    }
+    legacy = {"top_10": board[:10], "player_rank": 812, "player_entry": {"score": 1450}, "total_players": 100000}
+
+    return [
+        ("GET /api/quiz/episode/{id} (25)", route_field("/api/quiz/episode/{episode_id}"), episode_quiz,
+         lambda: server.model_response(episode_quiz).body),
+        ("GET /api/quiz/mixed (840)", route_field("/api/quiz/mixed"), mixed_quiz,
+         lambda: server.model_response(mixed_quiz).body),
+        ("GET /api/leaderboard/general (50)", route_field("/api/leaderboard/general"),
+         lambda: server.LeaderboardResponse(entries=board, player_rank=812, player_score=1450, total_players=100000),
+         lambda: ORJSONResponse(server.leaderboard_body(board, 812, 1450, 100000)).body),
+        ("POST /api/leaderboard/{board}/group (500)", route_field("/api/leaderboard/{board}/group", "POST"),
+         lambda: server.GroupLeaderboardResponse(**group_body), lambda: ORJSONResponse(group_body).body),
+        ("GET /api/player/{name}/stats", None, stats, lambda: ORJSONResponse(stats).body),
+        ("GET /api/player/{name}/history", None, history, lambda: ORJSONResponse(history).body),
+        ("GET /api/leaderboard/{episode_id} (legacy)", None, legacy, lambda: ORJSONResponse(legacy).body),
+    ]
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    routes = payloads(rng)
+    results = {}
+    for name, field, content, direct in routes:
+        def default():
+            return default_path(field, content() if callable(content) else content)
+
+        if json.loads(default()) != json.loads(direct()):
+            raise AssertionError(f"{name}: the direct response differs")
+        number = max(1, args.iterations // max(1, len(direct()) // 1000))
+        before = min(timeit.repeat(default, number=number, repeat=args.repeat)) / number
+        after = min(timeit.repeat(direct, number=number, repeat=args.repeat)) / number
+        results[name] = {
+            "bytes": len(direct()),
+            "default_us": round(before * 1e6, 1),
+            "direct_us": round(after * 1e6, 1),
+            "speedup": round(before / after, 1),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=2000, help="encodings per timing of a 1 KB response")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'route':<44} {'bytes':>8} {'default us':>11} {'direct us':>10} {'speedup':>8}")
+    for name, r in results.items():
+        print(f"{name:<44} {r['bytes']:>8} {r['default_us']:>11} {r['direct_us']:>10} {r['speedup']:>7}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Google Sheets CSV export.
+
+Serves generated episode and question CSVs on
+``/spreadsheets/d/<sheet_id>/export?format=csv&gid=<gid>``. Point the backend
+at it with ``SHEETS_BASE_URL=http://127.0.0.1:<port>``.
+
+    python perf/sheets_stub.py --port 8765 --episodes 14 --questions-per-episode 200
+    python perf/sheets_stub.py --csv-dir /tmp/sheets   # CSVs written by seed_data.py
+"""
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import content_gen
+
+EPISODES_GID = "0"
+QUESTIONS_GID = "1459380949"
+
+
+def read_csvs(directory: str) -> Tuple[str, str]:
+    """``(episodes_csv, questions_csv)`` from ``episodes.csv`` and ``questions.csv`` in ``directory``."""
+    return tuple(Path(directory, name).read_text(encoding="utf-8") for name in ("episodes.csv", "questions.csv"))
+
+
+class SheetsStub:
+    """Threaded HTTP server holding one CSV body per gid."""
+
+    def __init__(self, episodes_csv: str, questions_csv: str, host: str = "127.0.0.1", port: int = 0):
+        self.bodies: Dict[str, bytes] = {
+            EPISODES_GID: episodes_csv.encode("utf-8"),
+            QUESTIONS_GID: questions_csv.encode("utf-8"),
+        }
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                gid = parse_qs(url.query).get("gid", [""])[0]
+                body = stub.bodies.get(gid)
+                stub.requests += 1
+                if not url.path.endswith("/export") or body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/csv; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def set_content(self, episodes_csv: str, questions_csv: str):
+        self.bodies[EPISODES_GID] = episodes_csv.encode("utf-8")
+        self.bodies[QUESTIONS_GID] = questions_csv.encode("utf-8")
+
+    def start(self) -> "SheetsStub":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--episodes", type=int, default=14)
+    parser.add_argument("--questions-per-episode", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--csv-dir", help="serve episodes.csv and questions.csv from here instead")
+    args = parser.parse_args()
+
+    if args.csv_dir:
+        csvs = read_csvs(args.csv_dir)
+    else:
+        csvs = content_gen.generate(args.episodes, args.questions_per_episode, args.seed)
+    stub = SheetsStub(*csvs, host=args.host, port=args.port)
+    print(f"Serving Sheets stub on {stub.base_url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Measure question-bank memory per worker: per-worker heap copy vs shared snapshot.
+
+Starts N worker processes (1, 4 and 16 by default) for each mode and keeps them
+alive together, so shared pages are split between them in PSS:
+
+- heap:     every worker parses the questions CSV and holds its own bank,
+            as each uvicorn worker does with its TTLCache today
+- snapshot: every worker maps the snapshot published by content_refresher
+            and decodes every question once, as a mixed quiz does
+
+Reports RSS and PSS (proportional set size) growth over the imported-but-empty
+process, per worker and in total.
+
+    python perf/snapshot_memory.py --questions-per-episode 700
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PERF_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(PERF_DIR))
+
+import content_gen  # noqa: E402
+
+WORKER = r"""
+import json, os, sys
+sys.path.insert(0, {backend!r})
+import logging
+logging.disable(logging.WARNING)
+import server
+
+def memory_kib():
+    values = {{}}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0][:-1].lower()] = int(parts[1])
+    return values
+
+before = memory_kib()
+if {mode!r} == "heap":
+    with open({csv_path!r}, encoding="utf-8") as f:
+        bank = server.build_questions(server.parse_csv(f.read()))
+    touched = sum(len(q["text"]) for qs in bank.values() for q in qs)
+else:
+    snapshot = server.snapshot_reader.current()
+    touched = sum(len(q["text"]) for qs in snapshot.questions_by_episode().values() for q in qs)
+print(json.dumps({{"before": before, "touched": touched}}), flush=True)
+sys.stdin.readline()
+print(json.dumps(memory_kib()), flush=True)
+"""
+
+
+def run_mode(mode: str, workers: int, csv_path: str, snapshot_dir: str):
+    env = dict(os.environ, MONGO_URL="mongodb://127.0.0.1:1", DB_NAME="perf")
+    if mode == "snapshot":
+        env["CONTENT_SNAPSHOT_DIR"] = snapshot_dir
+    code = WORKER.format(backend=str(ROOT / "backend"), mode=mode, csv_path=csv_path)
+    procs = [subprocess.Popen([sys.executable, "-c", code], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                              env=env, text=True) for _ in range(workers)]
+    befores = [json.loads(p.stdout.readline())["before"] for p in procs]
+    afters = []
+    for p in procs:
+        p.stdin.write("\n")
+        p.stdin.flush()
+    for p in procs:
+        afters.append(json.loads(p.stdout.readline()))
+        p.wait()
+    rss = [a["rss"] - b["rss"] for a, b in zip(afters, befores)]
+    pss = [a["pss"] - b["pss"] for a, b in zip(afters, befores)]
+    return {
+        "workers": workers,
+        "rss_growth_per_worker_mib": round(sum(rss) / workers / 1024, 1),
+        "pss_growth_per_worker_mib": round(sum(pss) / workers / 1024, 1),
+        "pss_growth_total_mib": round(sum(pss) / 1024, 1),
+        "sheets_requests_per_5min": 2 * workers if mode == "heap" else 2,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--episodes", type=int, default=14)
+    parser.add_argument("--questions-per-episode", type=int, default=700)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    os.environ.update(MONGO_URL="mongodb://127.0.0.1:1", DB_NAME="perf")
+    import server
+    from snapshot import write_snapshot
+
+    episodes_csv, questions_csv = content_gen.generate(args.episodes, args.questions_per_episode)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "questions.csv")
+        Path(csv_path).write_text(questions_csv, encoding="utf-8")
+        snapshot_dir = os.path.join(tmp, "snapshots")
+        episodes = [e.model_dump() for e in server.build_episodes(server.parse_csv(episodes_csv))]
+        path = write_snapshot(snapshot_dir, episodes, server.build_questions(server.parse_csv(questions_csv)))
+
+        report = {
+            "questions": args.episodes * args.questions_per_episode,
+            "questions_csv_mib": round(len(questions_csv.encode("utf-8")) / 2**20, 2),
+            "snapshot_file_mib": round(os.path.getsize(path) / 2**20, 2),
+            "heap": [run_mode("heap", n, csv_path, snapshot_dir) for n in args.workers],
+            "snapshot": [run_mode("snapshot", n, csv_path, snapshot_dir) for n in args.workers],
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Measure cold start: how long until the app serves, is ready, and answers its
+first quiz.
+
+Runs the app in-process against the fake MongoDB (``--mongo-latency-ms`` per
+round trip, ``--index-build-ms`` extra per index creation call, as for a large
+collection) and a stubbed Google Sheets fetch (``--sheets-latency-ms`` per
+sheet). Two startups are compared:
+
+- blocking:   the previous startup, awaiting every ``create_index`` in turn and
+              loading content lazily on the first request
+- background: the current startup, with the index migration and the content
+              warm-up running after the app starts serving
+
+The first quiz request is sent as soon as startup returns.
+
+    python perf/startup_bench.py --mongo-latency-ms 5 --index-build-ms 500 --sheets-latency-ms 800
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PERF_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(PERF_DIR))
+os.environ.setdefault("MONGO_URL", "mongodb://127.0.0.1:1")
+os.environ.setdefault("DB_NAME", "perf")
+
+import logging  # noqa: E402
+
+logging.disable(logging.WARNING)
+
+import httpx  # noqa: E402
+
+import content_gen  # noqa: E402
+import fake_mongo  # noqa: E402
+import server  # noqa: E402
+
+
+def _slow_index_builds(delay: float):
+    create_index, create_indexes = fake_mongo.FakeCollection.create_index, fake_mongo.FakeCollection.create_indexes
+
+    async def slow_create_index(self, *args, **kwargs):
+        await asyncio.sleep(delay)
+        return await create_index(self, *args, **kwargs)
+
+    async def slow_create_indexes(self, indexes, **kwargs):
+        await asyncio.sleep(delay)
+        return await create_indexes(self, indexes, **kwargs)
+
+    fake_mongo.FakeCollection.create_index = slow_create_index
+    fake_mongo.FakeCollection.create_indexes = slow_create_indexes
+
+
+async def blocking_startup():
+    """The startup this replaced: every index in turn, content on first request"""
+    for collection, models in server.INDEXES.items():
+        for model in models:
+            spec = dict(model.document)
+            keys = list(spec.pop("key").items())
+            spec.pop("name")
+            await server.db[collection].create_index(keys, **spec)
+
+
+async def measure(mode: str, args) -> dict:
+    server.forget_sheets_content()
+    server.content_ready = False
+    server.content_warmup = None
+    server.db = fake_mongo.FakeDatabase(latency=args.mongo_latency_ms / 1000)
+    episodes_csv, questions_csv = content_gen.generate(episodes=14, questions_per_episode=args.questions_per_episode)
+
+    async def fetch(gid):
+        await asyncio.sleep(args.sheets_latency_ms / 1000)
+        return episodes_csv if gid == server.EPISODES_GID else questions_csv
+
+    server.fetch_csv_from_sheets = fetch
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        start = time.perf_counter()
+        if mode == "blocking":
+            await blocking_startup()
+        else:
+            await server.startup_db_client()
+        serving = time.perf_counter()
+
+        async def first_quiz():
+            response = await http.get("/api/quiz/mixed", params={"count": 20})
+            assert response.status_code == 200, response.text
+            return time.perf_counter()
+
+        async def until(check):
+            while not await check():
+                await asyncio.sleep(0.005)
+            return time.perf_counter()
+
+        async def is_ready():
+            return (await http.get("/readyz")).status_code == 200
+
+        async def indexes_done():
+            return server.index_migration.done
+
+        if mode == "blocking":
+            quiz = await first_quiz()
+            ready = indexes = serving
+        else:
+            quiz, ready, indexes = await asyncio.gather(first_quiz(), until(is_ready), until(indexes_done))
+            await server.shutdown_db_client()
+
+    def ms(t):
+        return round((t - start) * 1000, 1)
+
+    return {"mode": mode, "serving_ms": ms(serving), "ready_ms": ms(ready),
+            "first_quiz_ms": ms(quiz), "indexes_ms": ms(indexes)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-latency-ms", type=float, default=5)
+    parser.add_argument("--index-build-ms", type=float, default=500)
+    parser.add_argument("--sheets-latency-ms", type=float, default=800)
+    parser.add_argument("--questions-per-episode", type=int, default=60)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    _slow_index_builds(args.index_build_ms / 1000)
+    results = [asyncio.run(measure(mode, args)) for mode in ("blocking", "background")]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'startup':<12} {'serving':>10} {'ready':>10} {'1st quiz':>10} {'indexes':>10}   (ms after start)")
+    for r in results:
+        print(f"{r['mode']:<12} {r['serving_ms']:>10} {r['ready_ms']:>10} {r['first_quiz_ms']:>10} {r['indexes_ms']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Measure the per-request cost of tracing.
+
+Runs cached quiz/episode requests in-process (no Sheets, no Mongo) with
+tracing off, sampled at 10% and sampled at 100%, and prints mean latency per
+scenario as JSON.
+
+    python perf/trace_overhead.py --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "perf")
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+import tracing  # noqa: E402
+from content_build import build_episodes  # noqa: E402
+from snapshot import MappedSnapshot, encode_snapshot  # noqa: E402
+
+
+def prefill_cache(questions_per_episode: int = 60):
+    rows = []
+    difficulties = ["kolay", "orta", "zor"]
+    for episode_id in range(1, 15):
+        for i in range(questions_per_episode):
+            rows.append({
+                "episode_id": str(episode_id),
+                "question_id": f"{episode_id}-{i}",
+                "question": f"Bölüm {episode_id} soru {i}: Şükrü nereye gitti?",
+                "option_a": "İstanbul", "option_b": "Trabzon", "option_c": "Rize", "option_d": "Ordu",
+                "correct_answer": "A",
+                "difficulty": difficulties[i % 3],
+            })
+    server._sheets_snapshot = MappedSnapshot.from_bytes(
+        encode_snapshot(0, build_episodes([]), server.build_questions(rows))
+    )
+
+
+async def run_scenario(requests: int) -> float:
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://perf") as http_client:
+        for _ in range(50):
+            await http_client.get("/api/quiz/episode/1")
+        start = time.perf_counter()
+        for i in range(requests):
+            path = "/api/episodes" if i % 2 else "/api/quiz/episode/1"
+            response = await http_client.get(path)
+            response.raise_for_status()
+        return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    prefill_cache()
+    trace_file = tempfile.NamedTemporaryFile(suffix=".jsonl", delete=False).name
+    scenarios = {
+        "off": None,
+        "sampled_10pct": 0.1,
+        "sampled_100pct": 1.0,
+    }
+    results = {}
+    for name, rate in scenarios.items():
+        server.tracer.exporter = tracing.JsonLinesExporter(trace_file) if rate else None
+        server.tracer.sample_rate = rate or 0.0
+        results[name] = {"mean_us_per_request": round(await run_scenario(args.requests), 1)}
+
+    base = results["off"]["mean_us_per_request"]
+    for name in results:
+        results[name]["overhead_pct"] = round((results[name]["mean_us_per_request"] / base - 1) * 100, 1)
+    with open(trace_file, encoding="utf-8") as f:
+        results["spans_written"] = sum(1 for _ in f)
+    os.unlink(trace_file)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from starlette.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT / "perf"))
+
+os.environ.setdefault("MONGO_URL", "mongodb://127.0.0.1:1")
+os.environ.setdefault("DB_NAME", "tasacak_test")
+
+
+@pytest.fixture(autouse=True)
+def fresh_rate_limits():
+    """Every test starts with full rate limit buckets"""
+    import server
+    server.rate_limiter.reset()
+
+
+@pytest.fixture(autouse=True)
+def fresh_run_log(monkeypatch):
+    """Runs buffered by one test are not written into the next test's database"""
+    import server
+    from run_history import RunLog
+    monkeypatch.setattr(server, "run_log", RunLog(lambda: server.db.runs))
+
+
+class SheetsContent:
+    """Generated Sheets content, served to the app in place of Google Sheets
+
+    ``fetches`` lists the sheet gids fetched; ``delay`` slows every fetch down.
+    """
+
+    def __init__(self, monkeypatch, delay: float = 0.0):
+        import server
+        self.server = server
+        self.delay = delay
+        self.episodes = self.questions = ""
+        self.fetches = []
+        monkeypatch.setattr(server, "fetch_csv_from_sheets", self.fetch)
+
+    async def fetch(self, gid):
+        self.fetches.append(gid)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self.episodes if gid == self.server.EPISODES_GID else self.questions
+
+    def generate(self, episodes: int = 2, questions_per_episode: int = 5, seed: int = 42) -> "SheetsContent":
+        """Replace the content; the app loads it again on its next request"""
+        import content_gen
+        self.server.forget_sheets_content()
+        self.episodes, self.questions = content_gen.generate(episodes, questions_per_episode, seed)
+        return self
+
+
+@pytest.fixture
+def sheets(monkeypatch):
+    """Generated content: 2 episodes of 5 questions, or ``sheets.generate(...)``"""
+    import server
+    content = SheetsContent(monkeypatch).generate()
+    yield content
+    server.forget_sheets_content()
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """A fresh fake MongoDB as the app's database"""
+    import fake_mongo
+    import server
+    database = fake_mongo.FakeDatabase()
+    monkeypatch.setattr(server, "db", database)
+    return database
+
+
+@pytest.fixture
+def client(sheets, database):
+    """The app on generated content and a fresh fake MongoDB"""
+    import server
+    return TestClient(server.app)
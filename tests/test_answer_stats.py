@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+import server
+from answer_stats import AnswerStats
+
+
+@pytest.fixture
+def client(client, monkeypatch):
+    monkeypatch.setattr(server, "answer_stats", AnswerStats())
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "secret")
+    return client
+
+
+def test_answers_are_aggregated_in_memory_and_flushed_with_inc(client):
+    quiz = client.get("/api/quiz/episode/1?count=5").json()["questions"]
+    question = quiz[0]
+    chosen = {o["id"]: o["text"] for o in question["options"]}
+    right, wrong = chosen[question["correct_option"]], next(t for k, t in chosen.items() if k != question["correct_option"])
+    events = [
+        {"question_id": question["id"], "option": right, "correct": True, "time_ms": 1500},
+        {"question_id": question["id"], "option": wrong, "correct": False, "time_ms": 4000},
+        {"question_id": question["id"], "option": None, "correct": False, "time_ms": 90000},
+        {"question_id": "unknown", "option": right, "correct": True, "time_ms": 10},
+    ]
+    assert client.post("/api/analytics/answers", json={"events": events}).json() == {"accepted": 3, "dropped": 1}
+    assert client.post("/api/analytics/answers", json={"events": events[:2]}).json()["accepted"] == 2
+    assert server.db.total_ops() == 0
+
+    assert asyncio.run(server.flush_answer_stats()) == 1
+    assert dict(server.db.ops) == {"answer_stats.bulk_write": 1}
+    client.post("/api/analytics/answers", json={"events": events[:1]})
+    asyncio.run(server.flush_answer_stats())
+    assert asyncio.run(server.flush_answer_stats()) == 0  # nothing new
+
+    assert client.get("/api/admin/analytics/questions").status_code == 403
+    stats = client.get("/api/admin/analytics/questions?episode_id=1", headers={"X-Admin-Token": "secret"}).json()
+    entry = next(q for q in stats["questions"] if q["id"] == question["id"])
+    assert entry["answers"] == 6 and entry["correct_rate"] == 0.5
+    counts = {o["text"]: o["count"] for o in entry["options"]}
+    assert counts[right] == 3 and counts[wrong] == 2 and entry["unanswered"] == 1
+    # 1.5 s three times, 4 s twice, and the overlong answer in the open bucket, counted as 60 s
+    assert entry["avg_time_ms"] == round((3 * 1500 + 2 * 4000 + 60000) / 6)
+    assert entry["time_histogram"][1] == 3 and entry["time_histogram"][3] == 2 and entry["time_histogram"][-1] == 1
+    assert sum(q["answers"] for q in stats["questions"]) == 6
+
+
+def test_failed_flush_keeps_the_counts(client):
+    question_id = client.get("/api/quiz/episode/1?count=1").json()["questions"][0]["id"]
+    event = {"question_id": question_id, "correct": True, "time_ms": 500}
+    client.post("/api/analytics/answers", json={"events": [event] * 3})
+
+    async def broken(*args, **kwargs):
+        raise ConnectionError("mongo down")
+
+    collection = server.db.answer_stats
+    collection.bulk_write, working = broken, collection.bulk_write
+    with pytest.raises(ConnectionError):
+        asyncio.run(server.flush_answer_stats())
+    client.post("/api/analytics/answers", json={"events": [event] * 2})
+    collection.bulk_write = working
+    asyncio.run(server.flush_answer_stats())
+    doc = asyncio.run(collection.find_one({"_id": question_id}))
+    assert doc["answers"] == 5 and doc["correct"] == 5
+    assert server.answer_stats.metrics()["failed_flushes"] == 1
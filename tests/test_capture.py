@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+import httpx
+from starlette.testclient import TestClient
+
+import server
+from capture import CaptureMiddleware, TrafficCapture
+from replay import capture_files, compare, load_capture, replay, summarize
+
+
+def captured_client(monkeypatch, capture):
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "secret")
+    return TestClient(CaptureMiddleware(server.app, capture))
+
+
+def test_capture_is_sanitized_and_replays(sheets, database, monkeypatch, tmp_path):
+    capture = TrafficCapture(str(tmp_path), salt="test")
+    client = captured_client(monkeypatch, capture)
+    run = {"player_name": "Şükrü", "episode_id": 1, "score": 120, "run_id": "run-1", "question_ids": ["1-0"]}
+    assert client.post("/api/score/episode", json=run).status_code == 200
+    client.get("/api/leaderboard/general", params={"player_name": "Şükrü"})
+    client.get("/api/player/Şükrü/stats")
+    client.get("/api/admin/load", headers={"X-Admin-Token": "secret"})
+    client.get("/api/yok")
+    capture.close()
+
+    text = (tmp_path / "capture.jsonl").read_text(encoding="utf-8")
+    assert "Şükrü" not in text and "run-1" not in text and "secret" not in text
+    entries = load_capture(str(tmp_path))
+    assert [e["route"] for e in entries] == [
+        "/api/score/episode", "/api/leaderboard/general", "/api/player/{player_name}/stats",
+    ]
+    pseudonym = capture.pseudonym("Şükrü")
+    score, board, stats = entries
+    assert score["body"]["player_name"] == pseudonym and score["body"]["question_ids"] == ["1-0"]
+    assert score["shape"] == {"player_name": "str", "episode_id": "int", "score": "int", "run_id": "str",
+                              "question_ids": [1, "str"]}
+    assert board["query"] == f"player_name={pseudonym}" and stats["path"] == f"/api/player/{pseudonym}/stats"
+    assert all(e["status"] == 200 and e["response_bytes"] > 0 and e["duration_ms"] > 0 for e in entries)
+
+    # Replayed in-process, as fast as possible: the same routes answer the same way
+    transport = httpx.ASGITransport(app=server.app)
+    samples, elapsed = asyncio.run(replay("http://replay", entries, speed=0, max_in_flight=4, transport=transport))
+    report = summarize(samples, elapsed)
+    assert {route: r["statuses"] for route, r in report.items()} == {
+        "POST /api/score/episode": {"200": 1},
+        "GET /api/leaderboard/general": {"200": 1},
+        "GET /api/player/{player_name}/stats": {"200": 1},
+    }
+    assert asyncio.run(server.db.episode_scores.find_one({"player_name": pseudonym})) is not None
+
+
+def test_capture_rotates_and_replay_reads_oldest_first(tmp_path):
+    capture = TrafficCapture(str(tmp_path), max_bytes=400, backups=3)
+    for i in range(40):
+        capture.record({"ts": float(i), "method": "GET", "route": "/api/episodes", "path": "/api/episodes",
+                        "query": "", "status": 200, "duration_ms": 1.0, "response_bytes": 10})
+    capture.close()
+    files = capture_files(str(tmp_path))
+    assert [f.rsplit("/", 1)[1] for f in files] == ["capture.jsonl.3", "capture.jsonl.2", "capture.jsonl.1",
+                                                    "capture.jsonl"]
+    timestamps = [json.loads(line)["ts"] for f in files for line in open(f, encoding="utf-8")]
+    assert timestamps == sorted(timestamps) and timestamps[-1] == 39.0 and len(timestamps) < 40
+
+
+def test_compare_flags_shifted_distributions_only():
+    def run(latencies):
+        return summarize({"GET /api/episodes": [(ms, 200) for ms in latencies]}, 1.0)
+
+    base = run([10 + i % 7 for i in range(200)])
+    rows, regressions = compare(base, run([10 + (i * 3) % 7 for i in range(200)]), 0.2, 0.01)
+    assert regressions == [] and rows[0]["ks"] < rows[0]["ks_critical"]
+    rows, regressions = compare(base, run([30 + i % 7 for i in range(200)]), 0.2, 0.01)
+    assert rows[0]["ks"] == 1.0 and len(regressions) == 1
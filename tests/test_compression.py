@@ -0,0 +1,89 @@
+import asyncio
+import gzip
+import json
+
+import brotli
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response
+from starlette.requests import Request
+from starlette.testclient import TestClient
+
+from compression import (PRECOMPRESSED_LEVELS, CompressionMiddleware, PrecompressedBody, compress, negotiate,
+                         precompressed_response)
+
+
+def test_negotiate_picks_the_preferred_supported_encoding():
+    assert negotiate(None) is None and negotiate("") is None
+    assert negotiate("gzip, deflate, br") == "br"
+    assert negotiate("gzip;q=1.0, br;q=0.5") == "gzip"
+    assert negotiate("br;q=0, gzip") == "gzip"
+    assert negotiate("identity, deflate") is None
+    assert negotiate("*") == "br" and negotiate("*;q=0") is None
+    assert negotiate("GZIP;q=bad, br;q=0.1") == "br"
+
+
+def test_middleware_compresses_large_uncompressed_json_only():
+    large = {"players": [f"Şükrü_{i}" for i in range(500)]}
+    app = FastAPI()
+
+    @app.get("/large")
+    async def large_json():
+        return large
+
+    @app.get("/small")
+    async def small_json():
+        return {"ok": True}
+
+    @app.get("/text")
+    async def text():
+        return PlainTextResponse("ğ" * 2000)
+
+    @app.get("/binary")
+    async def binary():
+        return Response(b"\0" * 4000, media_type="application/octet-stream")
+
+    @app.get("/encoded")
+    async def encoded():
+        return Response(gzip.compress(json.dumps(large).encode()), media_type="application/json",
+                        headers={"Content-Encoding": "gzip"})
+
+    client = TestClient(CompressionMiddleware(app))
+    response = client.get("/large", headers={"Accept-Encoding": "br"})
+    assert response.headers["content-encoding"] == "br" and "Accept-Encoding" in response.headers["vary"]
+    assert response.json() == large
+    assert int(response.headers["content-length"]) < len(json.dumps(large, ensure_ascii=False).encode())
+    assert client.get("/large", headers={"Accept-Encoding": "gzip"}).headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in client.get("/large", headers={"Accept-Encoding": "identity"}).headers
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "br"}).headers
+    assert client.get("/text", headers={"Accept-Encoding": "gzip"}).headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in client.get("/binary", headers={"Accept-Encoding": "gzip"}).headers
+    # Already encoded: passed through once, not compressed again
+    again = client.get("/encoded", headers={"Accept-Encoding": "br"})
+    assert again.headers["content-encoding"] == "gzip" and again.json() == large
+
+
+def request(accept_encoding):
+    return Request({"type": "http", "method": "GET", "path": "/", "query_string": b"",
+                    "headers": [(b"accept-encoding", accept_encoding.encode())]})
+
+
+def test_precompressed_body_compresses_densely_off_the_event_loop():
+    identity = json.dumps([{"text": f"Soru {i}: Temel mi, Dursun mu?"} for i in range(2000)],
+                          ensure_ascii=False).encode("utf-8")
+    body = PrecompressedBody(identity)
+
+    async def scenario():
+        first = precompressed_response(request("br"), body)
+        # Served at once with the on-the-fly level; the dense variant is compressed in a thread
+        assert first.headers["content-encoding"] == "br" and first.body == compress(identity, "br")
+        assert precompressed_response(request("br"), body).body == first.body
+        await body.wait()
+        return precompressed_response(request("br"), body)
+
+    dense = asyncio.run(scenario())
+    assert dense.body == compress(identity, "br", PRECOMPRESSED_LEVELS["br"]) != compress(identity, "br")
+    assert brotli.decompress(dense.body) == identity and dense.headers["vary"] == "Accept-Encoding"
+    # Without an event loop (build scripts) the dense variant is made directly
+    assert gzip.decompress(PrecompressedBody(identity).encoded("gzip")) == identity
+    plain = precompressed_response(request("identity"), body)
+    assert plain.body == identity and "content-encoding" not in plain.headers
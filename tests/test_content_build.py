@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+import content_gen
+import server
+from content_build import ContentBuildPool, build_questions, build_snapshot
+from snapshot import MappedSnapshot, current_version, encode_snapshot, publish_snapshot, restamp_snapshot
+
+
+def test_worker_process_builds_the_same_snapshot():
+    episodes_csv, questions_csv = content_gen.generate(episodes=14, questions_per_episode=20)
+    pool = ContentBuildPool("process")
+    try:
+        data = asyncio.run(pool.build(episodes_csv, questions_csv))
+    finally:
+        pool.shutdown()
+    inline = MappedSnapshot.from_bytes(build_snapshot(episodes_csv, questions_csv))
+    built = MappedSnapshot.from_bytes(data)
+    assert (pool.builds, pool.fallbacks) == (1, 0)
+    assert built.digest == inline.digest and built.count == 14 * 20
+    assert built.questions_by_episode()[3][0] == inline.questions_by_episode()[3][0]
+
+    restamped = MappedSnapshot.from_bytes(restamp_snapshot(data, 42))
+    assert (restamped.version, restamped.digest) == (42, built.digest)
+    assert list(restamped.questions_by_episode()[14]) == list(built.questions_by_episode()[14])
+
+
+def test_publish_skips_unchanged_content(tmp_path):
+    data = build_snapshot(*content_gen.generate(episodes=2, questions_per_episode=5))
+    first = publish_snapshot(str(tmp_path), data)
+    assert MappedSnapshot(first).version == 1
+    assert publish_snapshot(str(tmp_path), data) is None
+
+
+def test_refresher_does_not_publish_empty_content(monkeypatch, tmp_path):
+    import content_refresher
+
+    good = build_snapshot(*content_gen.generate(episodes=2, questions_per_episode=5))
+    first = publish_snapshot(str(tmp_path), good)
+
+    async def empty_fetch():
+        return encode_snapshot(0, [], {})
+
+    monkeypatch.setattr(content_refresher, "fetch_content", empty_fetch)
+    with pytest.raises(ValueError):
+        asyncio.run(content_refresher.refresh_once(str(tmp_path)))
+    assert current_version(str(tmp_path)) == 1 and MappedSnapshot(first).count == 10
+
+
+def test_reload_swaps_snapshot_and_loads_once(monkeypatch):
+    server.forget_sheets_content()
+    state = {"questions_per_episode": 10, "fetches": 0}
+
+    async def fake_fetch(gid):
+        state["fetches"] += 1
+        if state.get("down"):
+            raise RuntimeError("Sheets is down")
+        episodes_csv, questions_csv = content_gen.generate(episodes=14, questions_per_episode=state["questions_per_episode"])
+        return episodes_csv if gid == server.EPISODES_GID else questions_csv
+
+    monkeypatch.setattr(server, "fetch_csv_from_sheets", fake_fetch)
+    monkeypatch.setattr(server, "content_builds", ContentBuildPool("thread"))
+
+    async def scenario():
+        # Concurrent requests on a cold cache share one load
+        results = await asyncio.gather(*(server.get_questions_data() for _ in range(10)))
+        assert state["fetches"] == 2
+        first = server.current_snapshot()
+        assert all(len(r[1]) == 10 for r in results)
+
+        assert await server.reload_sheets_content() is first  # unchanged content keeps its objects
+
+        state["questions_per_episode"] = 12
+        second = await server.reload_sheets_content()
+        assert second is not first and server.current_snapshot() is second
+        assert len((await server.get_questions_data())[1]) == 12
+
+        state["down"] = True
+        with pytest.raises(RuntimeError):
+            await server.reload_sheets_content()
+        assert server.current_snapshot() is second
+        # Through the outage requests keep being served from it, without fetching
+        fetches, episodes = state["fetches"], await server.get_episodes_data()
+        assert len((await server.get_questions_data())[1]) == 12 and state["fetches"] == fetches
+        assert await server.get_episodes_data() is episodes
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        server.forget_sheets_content()
+
+
+def test_rows_with_the_same_text_get_distinct_stable_ids():
+    rows = [
+        {"episode_id": "1", "question": "Temel nereye gitti?", "a": "Trabzon", "b": "Rize", "correct": "A"},
+        {"episode_id": "1", "question": "Temel nereye gitti?", "a": "Ordu", "b": "Giresun", "correct": "B"},
+        {"episode_id": "1", "question": "Dursun ne yaptı?", "a": "Uyudu", "b": "Koştu", "correct": "A"},
+    ]
+    ids = [q["id"] for q in build_questions(rows)[1]]
+    assert len(set(ids)) == 3 and ids[1] == f"{ids[0]}-2"
+    # Same sheet, same ids: content versions and bundle deltas depend on it
+    assert [q["id"] for q in build_questions(rows)[1]] == ids
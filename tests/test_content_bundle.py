@@ -0,0 +1,65 @@
+import pytest
+from starlette.testclient import TestClient
+
+import server
+from content_bundle import BundleBuilder
+
+
+@pytest.fixture
+def content(sheets, monkeypatch):
+    monkeypatch.setattr(server, "bundle_builder", BundleBuilder())
+    return sheets.generate(episodes=14, questions_per_episode=30)
+
+
+def rows_by_id(bundle):
+    return {row[0]: row for row in bundle["questions"]}
+
+
+def test_full_bundle_and_unchanged_since(content):
+    client = TestClient(server.app)
+    response = client.get("/api/content/bundle")
+    assert response.status_code == 200
+    bundle = response.json()
+    assert bundle["base"] is None
+    assert len(bundle["episodes"]) == 14
+    assert len(bundle["questions"]) == 14 * 30
+    assert bundle["fields"][0] == "id"
+    assert response.headers["x-content-version"] == bundle["version"]
+
+    same = client.get("/api/content/bundle", params={"since": bundle["version"]})
+    assert same.status_code == 304
+
+    unknown = client.get("/api/content/bundle", params={"since": "0000000000000000"})
+    assert unknown.status_code == 200
+    assert unknown.json()["base"] is None
+
+
+def test_delta_against_previous_version(content):
+    client = TestClient(server.app)
+    old = client.get("/api/content/bundle").json()
+
+    header, *lines = content.questions.splitlines()
+    changed_line = lines[0].replace(',"', ',"Düzeltilmiş soru: ', 1)
+    removed_id = lines[-1].split(",")[0]
+    content.questions = "\n".join([header, changed_line] + lines[1:-1])
+    server.forget_sheets_content()
+
+    response = client.get("/api/content/bundle", params={"since": old["version"]})
+    assert response.status_code == 200
+    delta = response.json()
+    assert delta["base"] == old["version"]
+    assert delta["version"] != old["version"]
+    assert "questions" not in delta
+    assert delta["added"] == []
+    assert delta["removed"] == [removed_id]
+    assert len(delta["changed"]) == 1
+    assert delta["changed"][0][2].startswith("Düzeltilmiş soru")
+
+    # Applying the delta gives the same rows as a full bundle of the new version
+    rows = rows_by_id(old)
+    for row in delta["added"] + delta["changed"]:
+        rows[row[0]] = row
+    for question_id in delta["removed"]:
+        del rows[question_id]
+    full = client.get("/api/content/bundle").json()
+    assert rows == rows_by_id(full)
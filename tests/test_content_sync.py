@@ -0,0 +1,123 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import content_gen
+import fake_mongo
+from content_build import build_snapshot
+from content_sync import ContentSync
+from lease import MongoLease
+from snapshot import encode_snapshot
+
+
+def test_lease_acquire_renew_and_expiry():
+    database = fake_mongo.FakeDatabase()
+    first = MongoLease(database.leases, "job", ttl=0.2, holder="a")
+    second = MongoLease(database.leases, "job", ttl=0.2, holder="b")
+
+    async def scenario():
+        assert await first.acquire() and not await second.acquire()
+        taken = first.document["expires_at"]
+        await asyncio.sleep(0.05)
+        # Renewed by its holder, still refused to the other instance
+        assert await first.acquire() and first.document["expires_at"] > taken
+        assert not await second.acquire()
+        await asyncio.sleep(0.3)
+        # Expired: the other instance takes over and the first one notices
+        assert await second.acquire() and not await first.acquire()
+        assert (first.held, second.held) == (False, True)
+        await second.release()
+        lease = await database.leases.find_one({"_id": "job"})
+        assert lease["holder"] == "b" and lease["expires_at"] <= datetime.utcnow()
+        assert await first.acquire()
+
+    asyncio.run(scenario())
+
+
+def test_refresh_publishes_changes_and_rejects_empty_content():
+    database = fake_mongo.FakeDatabase()
+    asyncio.run(database.content_snapshots.create_index("version", unique=True))
+    state = {"data": build_snapshot(*content_gen.generate(episodes=2, questions_per_episode=5))}
+
+    async def build():
+        return state["data"]
+
+    leader = ContentSync(database, build)
+    follower = ContentSync(database, build)
+
+    async def scenario():
+        await leader.tick()
+        assert leader.version == 1 and await follower.check_version() and follower.current.count == 10
+        # Unchanged content is not published again
+        assert not await leader.refresh()
+
+        # An empty Sheets response fails the refresh; everyone keeps version 1
+        state["data"] = encode_snapshot(0, [], {})
+        with pytest.raises(ValueError):
+            await leader.refresh()
+        assert await database.content_snapshots.count_documents({}) == 1
+        assert leader.current.count == 10 and not await follower.check_version()
+
+    asyncio.run(scenario())
+
+
+def test_nothing_is_published_before_the_indexes_exist():
+    database = fake_mongo.FakeDatabase()
+    indexes = {"ready": False}
+
+    async def build():
+        return build_snapshot(*content_gen.generate(episodes=2, questions_per_episode=5))
+
+    sync = ContentSync(database, build, ready=lambda: indexes["ready"])
+
+    async def scenario():
+        await sync.tick()
+        assert not await sync.request_refresh()
+        assert await database.content_snapshots.count_documents({}) == 0
+        indexes["ready"] = True
+        await sync.tick()
+        return sync.version
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_leader_backs_off_while_sheets_is_down_and_keeps_its_lease_through_a_slow_refresh():
+    database = fake_mongo.FakeDatabase()
+    state = {"fetches": 0, "down": True, "delay": 0.0}
+
+    async def build():
+        state["fetches"] += 1
+        await asyncio.sleep(state["delay"])
+        if state["down"]:
+            raise RuntimeError("Sheets is down")
+        return build_snapshot(*content_gen.generate(episodes=2, questions_per_episode=5))
+
+    leader = ContentSync(database, build, poll_interval=0.05, retry_interval=0.3)
+    other = ContentSync(database, build, poll_interval=0.05)
+    leader.lease.holder, other.lease.holder = "leader", "other"
+    leader.lease.ttl = 0.15
+
+    async def scenario():
+        # Failed fetches are retried after retry_interval, not on every poll
+        with pytest.raises(RuntimeError):
+            await leader.tick()
+        for _ in range(5):
+            await leader.tick()
+        assert state["fetches"] == 1
+        await asyncio.sleep(0.3)
+        with pytest.raises(RuntimeError):
+            await leader.tick()
+        assert state["fetches"] == 2
+
+        # A refresh longer than the lease TTL (0.15 s) keeps the lease: nobody else leads meanwhile
+        state.update(down=False, delay=0.5)
+        await asyncio.sleep(0.3)
+        refresh = asyncio.create_task(leader.tick())
+        for _ in range(8):
+            await asyncio.sleep(0.07)
+            assert not await other.lease.acquire()
+        await refresh
+        assert leader.version == 1 and state["fetches"] == 3
+
+    asyncio.run(scenario())
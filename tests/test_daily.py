@@ -0,0 +1,78 @@
+import asyncio
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import httpx
+import pytest
+from starlette.testclient import TestClient
+
+import daily
+import server
+
+
+@pytest.fixture
+def app(sheets, database, monkeypatch):
+    # Slow fetches, so concurrent first requests overlap
+    sheets.generate(episodes=4, questions_per_episode=30).delay = 0.01
+    monkeypatch.setattr(server, "daily_quizzes", daily.DailyQuizCache())
+    return server.app
+
+
+def test_concurrent_first_requests_build_once(app, monkeypatch):
+    built = []
+    original = server.sample_questions
+
+    def counting(*args, **kwargs):
+        built.append(1)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(server, "sample_questions", counting)
+
+    async def burst():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await asyncio.gather(*(http.get("/api/quiz/daily") for _ in range(20)))
+
+    responses = asyncio.run(burst())
+    assert {r.status_code for r in responses} == {200}
+    assert len({r.content for r in responses}) == 1
+    assert built == [1]
+
+    quiz = responses[0].json()
+    assert quiz["mode"] == "daily"
+    assert quiz["day"] == daily.today().isoformat()
+    assert quiz["total_questions"] == server.DAILY_QUESTION_COUNT
+
+
+def test_daily_leaderboard_keeps_best_score(app):
+    http = TestClient(app)
+    for player, score in [("deniz", 120), ("ada", 300), ("deniz", 80), ("deniz", 350)]:
+        assert http.post("/api/score/daily", json={"player_name": player, "score": score}).status_code == 200
+
+    board = http.get("/api/leaderboard/daily", params={"player_name": "ada"}).json()
+    assert [(e["player_name"], e["score"]) for e in board["entries"]] == [("deniz", 350), ("ada", 300)]
+    assert board["player_rank"] == 2
+    assert board["total_players"] == 2
+
+    old_day = (daily.today() - timedelta(days=3)).isoformat()
+    late = http.post("/api/score/daily", json={"player_name": "ada", "score": 1, "day": old_day})
+    assert late.status_code == 400
+
+
+def test_day_follows_istanbul_time():
+    utc_evening = datetime(2026, 3, 10, 22, 30, tzinfo=ZoneInfo("UTC"))
+    assert daily.today(utc_evening).isoformat() == "2026-03-11"
+
+
+def test_content_refresh_keeps_the_days_quiz(app, sheets, monkeypatch):
+    http = TestClient(app)
+    first = http.get("/api/quiz/daily")
+    assert first.status_code == 200
+
+    # New content mid-day, on this instance and on a fresh one
+    sheets.generate(episodes=4, questions_per_episode=30, seed=99)
+    assert http.get("/api/episodes").status_code == 200
+    assert server.get_content_version() != first.json()["content_version"]
+    assert http.get("/api/quiz/daily").content == first.content
+    monkeypatch.setattr(server, "daily_quizzes", daily.DailyQuizCache())
+    assert http.get("/api/quiz/daily").content == first.content
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+import server
+from cachetools import TTLCache
+from rank_index import RankIndex
+
+
+@pytest.fixture
+def client(client, database, monkeypatch):
+    scores = [{"player_name": f"oyuncu_{i}", "score": (i * 37) % 500, "episodes_completed": 1 + i % 3} for i in range(60)]
+    asyncio.run(database.global_scores.insert_many(scores))
+    asyncio.run(database.episode_scores.insert_many([
+        {"player_name": "a", "episode_id": 1, "score": 200},
+        {"player_name": "b", "episode_id": 1, "score": 200},
+        {"player_name": "c", "episode_id": 1, "score": 100},
+        {"player_name": "a", "episode_id": 2, "score": 900},
+    ]))
+    database.ops.clear()
+    monkeypatch.setattr(server, "rank_index", RankIndex())
+    monkeypatch.setattr(server, "group_leaderboards", TTLCache(maxsize=16, ttl=60))
+    return client
+
+
+def test_group_is_ranked_with_one_in_query_and_global_ranks(client):
+    group = ["oyuncu_3", "oyuncu_40", "oyuncu_12", "oyuncu_3", "yabancı"]
+    body = client.post("/api/leaderboard/general/group", json={"player_names": group}).json()
+    assert [e["player_name"] for e in body["entries"]] == ["oyuncu_40", "oyuncu_12", "oyuncu_3"]
+    assert [e["rank"] for e in body["entries"]] == [1, 2, 3]
+    assert body["unranked"] == ["yabancı"] and body["total_players"] == 60
+    assert dict(server.db.ops) == {"global_scores.find": 2}  # the rank index load and the $in query
+    for entry in body["entries"]:
+        higher = asyncio.run(server.db.global_scores.count_documents({"score": {"$gt": entry["score"]}}))
+        assert entry["global_rank"] == higher + 1
+        assert "episodes_completed" in entry
+
+    # Same group in another order: cached; another group: the rank index is reused
+    assert client.post("/api/leaderboard/general/group", json={"player_names": group[::-1]}).json() == body
+    client.post("/api/leaderboard/general/group", json={"player_names": ["oyuncu_1"]})
+    assert server.db.ops["global_scores.find"] == 3
+
+
+def test_episode_board_ties_and_validation(client):
+    body = client.post("/api/leaderboard/1/group", json={"player_names": ["c", "b", "a"]}).json()
+    assert [(e["player_name"], e["global_rank"]) for e in body["entries"]] == [("a", 1), ("b", 1), ("c", 3)]
+    assert body["total_players"] == 3
+
+    assert client.post("/api/leaderboard/99/group", json={"player_names": ["a"]}).status_code == 400
+    assert client.post("/api/leaderboard/weekly/group", json={"player_names": ["a"]}).status_code == 400
+    too_many = [f"p{i}" for i in range(server.GROUP_LEADERBOARD_LIMIT + 1)]
+    assert client.post("/api/leaderboard/general/group", json={"player_names": too_many}).status_code == 422
+    assert client.post("/api/leaderboard/general/group", json={"player_names": []}).status_code == 422
+
+
+def test_group_reads_are_not_charged_as_score_writes():
+    assert server.route_limits.match("POST", "/api/leaderboard/general/group").name == "leaderboard"
+    assert server.route_limits.match("POST", "/api/leaderboard").name == "scores"
+    rules = [(method, prefix, rule) for method, prefix, rule in server.RATE_LIMITED_ROUTES
+             if "/api/leaderboard/general/group".startswith(prefix)]
+    assert rules[0][2] is None
+
+
+def test_large_board_counts_ranks_below_the_kept_top(client, monkeypatch):
+    monkeypatch.setattr(server, "rank_index", RankIndex(max_scores=20))
+    group = ["oyuncu_40", "oyuncu_2", "oyuncu_1", "oyuncu_15"]
+    body = client.post("/api/leaderboard/general/group", json={"player_names": group}).json()
+    # The index kept the top 20 scores; the three players below them were counted,
+    # and the total came from the board's counter (seeded by one more count)
+    board = server.rank_index._boards[("global_scores", ())]
+    assert len(board.scores) == 20 and not board.complete
+    assert server.db.ops["global_scores.count_documents"] == 3 + 1
+    assert body["total_players"] == 60
+    for entry in body["entries"]:
+        higher = asyncio.run(server.db.global_scores.count_documents({"score": {"$gt": entry["score"]}}))
+        assert entry["global_rank"] == higher + 1
@@ -0,0 +1,70 @@
+import pytest
+
+import server
+from content_build import build_episodes
+from snapshot import MappedSnapshot, encode_snapshot
+
+
+@pytest.fixture
+def client(client, sheets):
+    sheets.generate(episodes=14, questions_per_episode=30)
+    return client
+
+
+def count_calls(monkeypatch, name):
+    calls = []
+    original = getattr(server, name)
+
+    def wrapper(*args, **kwargs):
+        calls.append(1)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(server, name, wrapper)
+    return calls
+
+
+def test_episodes_revalidation_skips_building_and_serialization(client, monkeypatch):
+    first = client.get("/api/episodes")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert etag.startswith('"ep-')
+    assert "must-revalidate" in first.headers["cache-control"]
+    assert len(first.json()) == 14
+
+    # Episode models are built from the content snapshot; both steps are cached per content version
+    built = count_calls(monkeypatch, "Episode")
+    serialized = count_calls(monkeypatch, "serialize_episodes")
+
+    revalidated = client.get("/api/episodes", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+
+    again = client.get("/api/episodes")
+    assert again.status_code == 200
+    assert again.content == first.content
+
+    assert built == []
+    assert serialized == []
+
+
+def test_etag_changes_with_content(client):
+    etag = client.get("/api/episodes").headers["etag"]
+    server.forget_sheets_content()
+    episodes = build_episodes([{"episode_id": "15", "episode_name": "Yeni Bölüm"}])
+    server._sheets_snapshot = MappedSnapshot.from_bytes(encode_snapshot(0, episodes, {}))
+    response = client.get("/api/episodes", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert any(e["name"] == "Yeni Bölüm" for e in response.json())
+
+
+def test_content_version_matches_quiz_metadata(client):
+    version_response = client.get("/api/content/version")
+    version = version_response.json()["version"]
+    assert version
+    assert client.get("/api/content/version", headers={"If-None-Match": version_response.headers["etag"]}).status_code == 304
+
+    quiz = client.get("/api/quiz/episode/1").json()
+    assert quiz["content_version"] == version
+    assert client.get("/api/episodes").headers["x-content-version"] == version
@@ -0,0 +1,98 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+import fake_mongo
+import server
+from idempotency import IdempotencyStore, run_key
+
+
+@pytest.fixture
+def database(database, monkeypatch):
+    database.latency = 0.002
+    monkeypatch.setattr(server, "score_runs", IdempotencyStore())
+    return database
+
+
+def writes(database) -> int:
+    return sum(n for op, n in database.ops.items() if op.rpartition(".")[2] in fake_mongo._WRITE_METHODS)
+
+
+def test_duplicate_bursts_are_processed_once(database):
+    async def submit(player, score, run_id=None):
+        return await server.submit_episode_score(server.EpisodeScoreSubmit(
+            player_name=player, episode_id=3, score=score, run_id=run_id,
+        ))
+
+    async def scenario():
+        await submit("ece", 400)  # creates the board counters
+        database.ops.clear()
+        await submit("ada", 400)  # same path without a run id, for the baseline
+        baseline = database.total_ops()
+        database.ops.clear()
+
+        first = await asyncio.gather(*(submit("deniz", 400, "run-1") for _ in range(20)))
+        # Processed once, plus the claim and the stored response
+        assert database.total_ops() == baseline + 2
+        assert all(r == first[0] for r in first) and first[0]["is_new_record"]
+
+        ops = database.total_ops()
+        again = await asyncio.gather(*(submit("deniz", 400, "run-1") for _ in range(20)))
+        assert again == first and database.total_ops() == ops
+
+        # Another instance (or a restart): one failed claim and one read, no other writes
+        server.score_runs = IdempotencyStore()
+        ops, written = database.total_ops(), writes(database)
+        replay = await asyncio.gather(*(submit("deniz", 400, "run-1") for _ in range(5)))
+        assert replay == first[:5]
+        assert database.total_ops() == ops + 2 and writes(database) == written + 1
+
+        assert (await submit("deniz", 500, "run-2"))["best_score"] == 500
+        assert await database.episode_scores.count_documents({"player_name": "deniz"}) == 1
+        assert server.score_runs.as_dict()["processed"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_failed_submission_releases_its_run(database):
+    async def scenario():
+        data = server.DailyScoreSubmit(player_name="deniz", score=10, day="2001-01-01", run_id="run-1")
+        for _ in range(2):
+            with pytest.raises(HTTPException):
+                await server.submit_daily_score(data)
+        assert await database.score_runs.count_documents({}) == 0
+
+        data.day = None
+        assert (await server.submit_daily_score(data))["best_score"] == 10
+        assert await database.score_runs.count_documents({}) == 1
+
+    asyncio.run(scenario())
+
+
+def test_retry_takes_over_the_claim_of_a_dead_instance(database):
+    server.score_runs = IdempotencyStore(wait_timeout=0.2, stale_after=1.0)
+    key = run_key("episode", "deniz", "run-1")
+
+    async def submit():
+        return await server.submit_episode_score(server.EpisodeScoreSubmit(
+            player_name="deniz", episode_id=3, score=400, run_id="run-1",
+        ))
+
+    async def scenario():
+        # Claimed just now by an instance that is still processing it: the retry waits, then gets a 409
+        await database.score_runs.insert_one({"_id": key, "created_at": datetime.utcnow(),
+                                              "claimed_at": datetime.utcnow()})
+        with pytest.raises(HTTPException) as raised:
+            await submit()
+        assert raised.value.status_code == 409
+
+        # The instance died before storing a response; once the claim is stale the retry processes the run
+        await database.score_runs.update_one({"_id": key}, {"$set": {"claimed_at": datetime.utcnow() - timedelta(seconds=5)}})
+        assert (await submit())["is_new_record"]
+        assert (await database.score_runs.find_one({"_id": key}))["response"]["best_score"] == 400
+        assert server.score_runs.as_dict()["taken_over"] == 1
+        assert await database.episode_scores.count_documents({"player_name": "deniz"}) == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,36 @@
+import asyncio
+import json
+from datetime import datetime
+
+import server
+
+
+def test_direct_responses_keep_the_encoding(client, database):
+    for score in (120, 80):
+        client.post("/api/score/episode", json={"player_name": "Şükrü Çağlayan", "episode_id": 1, "score": score})
+    client.post("/api/score/episode", json={"player_name": "Gülsüm", "episode_id": 1, "score": 60})
+    ts = datetime(2026, 3, 1, 9, 30, 15, 123000)
+    asyncio.run(database.runs.insert_one({"ts": ts, "player": "Gülsüm", "mode": "episode", "score": 60}))
+
+    # UTF-8, not \u escapes, and the same fields as the response models
+    response = client.get("/api/leaderboard/episode/1", params={"player_name": "Gülsüm"})
+    assert response.headers["content-type"] == "application/json"
+    assert "Şükrü Çağlayan".encode("utf-8") in response.content
+    assert response.json() == {
+        "entries": [{"rank": 1, "player_name": "Şükrü Çağlayan", "score": 120},
+                    {"rank": 2, "player_name": "Gülsüm", "score": 60}],
+        "player_rank": 2, "player_score": 60, "total_players": 2,
+    }
+    legacy = client.get("/api/leaderboard/1", params={"player_name": "Gülsüm"}).json()
+    assert legacy == {"top_10": response.json()["entries"], "player_rank": 2, "player_entry": {"score": 60},
+                      "total_players": 2}
+
+    stats = client.get("/api/player/Şükrü Çağlayan/stats").json()
+    assert stats["episode_scores"] == {"1": 120} and stats["global_score"] == 120
+
+    history = client.get("/api/player/Gülsüm/history").json()
+    assert history["latest_runs"][-1]["ts"] == ts.isoformat() == "2026-03-01T09:30:15.123000"
+
+    quiz = client.get("/api/quiz/episode/1", params={"count": 3, "seed": 7})
+    body = json.loads(quiz.content)
+    assert server.QuizResponse.model_validate(body).total_questions == 3 and body["content_version"]
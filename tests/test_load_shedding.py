@@ -0,0 +1,62 @@
+import asyncio
+
+import httpx
+import pytest
+
+import server
+from load_shedding import Overloaded, RouteBudget
+
+
+def test_budget_queues_then_rejects():
+    async def scenario():
+        budget = RouteBudget("scores", limit=1, queue_size=1, queue_timeout=1.0)
+        await budget.acquire()
+        queued = asyncio.create_task(budget.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await budget.acquire()
+        budget.release()
+        await queued  # the slot went to the waiter
+        assert (budget.active, budget.waiting) == (1, 0)
+        budget.release()
+        return budget.as_dict()
+
+    metrics = asyncio.run(scenario())
+    assert (metrics["admitted"], metrics["queued"], metrics["rejected"], metrics["active"]) == (2, 1, 1, 0)
+
+
+def test_queue_timeout_frees_the_queue_slot():
+    async def scenario():
+        budget = RouteBudget("scores", limit=1, queue_size=1, queue_timeout=0.01)
+        await budget.acquire()
+        with pytest.raises(Overloaded):
+            await budget.acquire()
+        budget.release()
+        await budget.acquire()
+        return budget.as_dict()
+
+    metrics = asyncio.run(scenario())
+    assert (metrics["timed_out"], metrics["waiting"], metrics["active"]) == (1, 0, 1)
+
+
+def test_slow_score_writes_are_shed_without_starving_cheap_routes(sheets, database, monkeypatch):
+    sheets.generate(episodes=3, questions_per_episode=10)
+    database.latency = 0.05
+    monkeypatch.setitem(server.route_limits.budgets, "scores", RouteBudget("scores", 2, 2, queue_timeout=5))
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            await http.get("/api/episodes")
+            scores = [asyncio.create_task(http.post("/api/score/episode", json={
+                "player_name": f"p{i}", "episode_id": 1, "score": i,
+            })) for i in range(10)]
+            await asyncio.sleep(0.01)
+            episodes = await http.get("/api/episodes")
+            return episodes, await asyncio.gather(*scores)
+
+    episodes, scores = asyncio.run(scenario())
+    assert episodes.status_code == 200
+    assert sorted(r.status_code for r in scores) == [200] * 4 + [503] * 6
+    rejected = next(r for r in scores if r.status_code == 503)
+    assert rejected.headers["retry-after"] == "1"
@@ -0,0 +1,71 @@
+import asyncio
+import json
+
+import pytest
+from pymongo import WriteConcern
+from pymongo.read_preferences import Nearest, Primary
+
+import fake_mongo
+import server
+from mongo_settings import MongoSettings, PoolMetrics
+
+
+def test_settings_from_env():
+    settings = MongoSettings.from_env({
+        "MONGO_MAX_POOL_SIZE": "40",
+        "MONGO_WAIT_QUEUE_TIMEOUT_MS": "2000",
+        "MONGO_COMPRESSORS": "zstd, zlib",
+        "MONGO_LEADERBOARD_READ_PREFERENCE": "nearest",
+        "MONGO_LEADERBOARD_MAX_STALENESS": "120",
+        "MONGO_SCORE_WRITE_CONCERN": "1",
+        "MONGO_SCORE_JOURNAL": "true",
+    })
+    assert settings.client_options() == {
+        "maxPoolSize": 40, "waitQueueTimeoutMS": 2000, "compressors": "zstd,zlib",
+    }
+    # Unset variables leave the driver defaults and the MONGO_URL options alone
+    assert MongoSettings().client_options() == {}
+    assert MongoSettings(min_pool_size=10).client_options(5) == {"maxPoolSize": 5, "minPoolSize": 5}
+    assert settings.leaderboard_reads() == Nearest(max_staleness=120)
+    assert settings.score_writes() == WriteConcern(w=1, wtimeout=5000, j=True)
+    assert MongoSettings().leaderboard_reads() == Primary()
+
+
+@pytest.mark.parametrize("env", [
+    {"MONGO_MAX_POOL_SIZE": "lots"},
+    {"MONGO_LEADERBOARD_READ_PREFERENCE": "closest"},
+    {"MONGO_LEADERBOARD_MAX_STALENESS": "120"},
+    {"MONGO_LEADERBOARD_READ_PREFERENCE": "secondary", "MONGO_LEADERBOARD_MAX_STALENESS": "30"},
+])
+def test_invalid_settings_fail_at_startup(env):
+    with pytest.raises(ValueError):
+        MongoSettings.from_env(env)
+
+
+def test_pool_metrics_measure_checkout_wait():
+    metrics = PoolMetrics()
+    metrics.connection_created(None)
+    metrics.connection_check_out_started(None)
+    assert metrics.as_dict()["waiting"] == 1
+    metrics.connection_checked_out(None)
+    metrics.connection_checked_in(None)
+    stats = metrics.as_dict()
+    assert (stats["checkouts"], stats["in_use"], stats["waiting"], stats["connections"]) == (1, 0, 0, 1)
+    assert stats["wait_histogram"]["<=1ms"] == 1
+
+
+def test_leaderboard_reads_use_the_read_pool(monkeypatch):
+    database = fake_mongo.FakeDatabase(pool_size=1)
+    reads = database.replica(pool_size=1)
+    monkeypatch.setattr(server, "db", database)
+    monkeypatch.setattr(server, "read_db", reads)
+
+    async def scenario():
+        # Hold the only write connection; the leaderboard still answers
+        async with database._pool:
+            await reads.global_scores.insert_one({"player_name": "deniz", "score": 5, "episodes_completed": 1})
+            await reads.counters.insert_one({"_id": "global_scores", "value": 1})
+            return await asyncio.wait_for(server.get_general_leaderboard("deniz"), timeout=1)
+
+    board = json.loads(asyncio.run(scenario()).body)
+    assert board["player_rank"] == 1 and board["total_players"] == 1
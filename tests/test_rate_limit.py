@@ -0,0 +1,186 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+import fake_mongo
+import server
+from loadgen import percentile
+from rate_limit import RateLimit, RateLimited, RateLimiter, RateLimitMiddleware, TokenBuckets
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_bursts_refills_and_stays_bounded():
+    clock = Clock()
+    buckets = TokenBuckets(maxsize=100, clock=clock)
+    limit = RateLimit(rate=2, burst=5)
+    assert [buckets.take("deniz", limit) for _ in range(5)] == [0.0] * 5
+    assert buckets.take("deniz", limit) == 0.5
+    clock.now += 1.0  # two tokens back
+    assert [buckets.take("deniz", limit) for _ in range(3)] == [0.0, 0.0, 0.5]
+
+    for i in range(1000):
+        buckets.take(f"oyuncu_{i}", limit)
+    assert len(buckets) == 100 and buckets.evicted == 901
+
+
+def test_ip_limits_need_a_known_client_ip():
+    app = FastAPI()
+
+    @app.post("/api/score/episode")
+    async def submit():
+        return {"success": True}
+
+    def client(**options):
+        limiter = RateLimiter({"scores.ip": RateLimit(rate=0.1, burst=2)}, **options)
+        return TestClient(RateLimitMiddleware(app, limiter, [("POST", "/api/score/", "scores")]))
+
+    def statuses(http, forwarded=None, count=3):
+        headers = {"X-Forwarded-For": forwarded} if forwarded else {}
+        return [http.post("/api/score/episode", headers=headers).status_code for _ in range(count)]
+
+    # Behind an ingress every request comes from the proxy: no IP limit without a header setting
+    assert statuses(client(), count=10) == [200] * 10
+    proxied = client(ip_header="X-Forwarded-For")
+    # The last hop is the one our proxy added; anything before it is client-supplied
+    assert statuses(proxied, "1.2.3.4, 10.0.0.1") == [200, 200, 429]
+    assert statuses(proxied, "9.9.9.9, 10.0.0.2") == [200, 200, 429]
+    assert statuses(proxied, "10.0.0.1") == [429] * 3
+    # Without a proxy the socket peer can be trusted instead
+    assert statuses(client(peer_ip=True)) == [200, 200, 429]
+
+
+def test_shared_limits_hold_across_instances():
+    database = fake_mongo.FakeDatabase()
+    limits = {"scores.player": RateLimit(rate=0.1, burst=4)}  # 10 per 60 s window
+    instances = [RateLimiter(limits, collection=lambda: database.rate_limits) for _ in range(3)]
+
+    async def scenario():
+        admitted = 0
+        for i in range(30):
+            try:
+                await instances[i % 3].check("scores.player", "deniz")
+                admitted += 1
+            except RateLimited:
+                pass
+        return admitted
+
+    assert asyncio.run(scenario()) == 10
+    # Once blocked locally, rejections cost no MongoDB operations
+    ops = database.total_ops()
+    for limiter in instances:
+        try:
+            asyncio.run(limiter.check("scores.player", "deniz"))
+        except RateLimited:
+            pass
+    assert database.total_ops() == ops
+
+
+def test_flood_leaves_legitimate_players_unaffected(monkeypatch):
+    database = fake_mongo.FakeDatabase(latency=0.003, pool_size=4)
+    monkeypatch.setattr(server, "db", database)
+    monkeypatch.setattr(server.rate_limiter, "ip_header", "x-forwarded-for")
+    limits = {"scores.ip": RateLimit(rate=5, burst=20), "scores.player": RateLimit(rate=0.2, burst=5)}
+    monkeypatch.setattr(server.rate_limiter, "limits", limits)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://flood") as http:
+            async def submit(player, ip, path="/api/score/episode"):
+                start = time.perf_counter()
+                response = await http.post(path, headers={"X-Forwarded-For": ip},
+                                           json={"player_name": player, "episode_id": 1, "score": 100})
+                return response.status_code, (time.perf_counter() - start) * 1000
+
+            async def legitimate(rounds):
+                latencies = []
+                for i in range(rounds):
+                    results = await asyncio.gather(*(submit(f"oyuncu_{i}_{p}", f"10.0.1.{p}") for p in range(4)))
+                    assert all(status == 200 for status, _ in results), results
+                    latencies.extend(latency for _, latency in results)
+                return sorted(latencies)
+
+            async def flood(statuses, rate=800):
+                # Open loop: one client IP posing as many players, and one player spread over many IPs
+                pending, i, start = [], 0, time.monotonic()
+                while not done.is_set():
+                    i += 1
+                    bot = submit(f"bot_{i}", "10.9.9.9") if i % 2 else submit("bot", f"10.8.{i // 250 % 250}.{i % 250}")
+                    pending.append(asyncio.create_task(bot))
+                    await asyncio.sleep(1 / rate)
+                statuses.extend(status for status, _ in await asyncio.gather(*pending))
+                return time.monotonic() - start
+
+            baseline = await legitimate(10)
+            done, statuses = asyncio.Event(), []
+            flooding = asyncio.create_task(flood(statuses))
+            await asyncio.sleep(0.05)
+            during = await legitimate(10)
+            done.set()
+            return baseline, during, statuses, await flooding
+
+    baseline, during, statuses, elapsed = asyncio.run(scenario())
+    admitted = statuses.count(200)
+    # Both buckets start full and keep refilling while the flood lasts
+    bound = sum(limit.burst + limit.rate * elapsed for limit in limits.values())
+    assert admitted <= bound + 2
+    assert statuses.count(429) == len(statuses) - admitted and len(statuses) > 100
+    assert percentile(during, 50) < 2 * percentile(baseline, 50) + 10
+
+
+def test_many_keys_are_charged_all_or_nothing():
+    database = fake_mongo.FakeDatabase()
+    limits = {"score_batch.player": RateLimit(rate=0.01, burst=2)}  # 2.6 per 60 s window, shared
+    local = RateLimiter(limits, clock=Clock())
+    shared = RateLimiter(limits, collection=lambda: database.rate_limits, clock=Clock())
+    players = [f"oyuncu_{i}" for i in range(50)]
+
+    async def scenario():
+        # Locally: "deniz" is out of tokens, so nobody else is charged either
+        for _ in range(2):
+            await local.check("score_batch.player", "deniz")
+        with pytest.raises(RateLimited):
+            await local.check_all("score_batch.player", players + ["deniz"])
+        await local.check_all("score_batch.player", players)
+        await local.check_all("score_batch.player", players)
+
+        # Shared store: one bulk write and one read for all 50 players
+        database.ops.clear()
+        await shared.check_all("score_batch.player", players)
+        assert database.total_ops() == 2
+        # Over the fleet-wide allowance for one player: every count is taken back
+        for _ in range(2):
+            await shared.check("score_batch.player", "deniz")
+        other = RateLimiter(limits, collection=lambda: database.rate_limits, clock=Clock())
+        with pytest.raises(RateLimited):
+            await other.check_all("score_batch.player", players[:10] + ["deniz"])
+        counts = {d["_id"].split(":")[1]: d["n"] for d in await database.rate_limits.find().to_list(length=None)}
+        assert counts["deniz"] == 2 and all(counts[p] == 1 for p in players)
+        # ...and the other players keep their local tokens too
+        await other.check_all("score_batch.player", players[:10])
+        assert other.buckets.peek("score_batch.player:oyuncu_0", limits["score_batch.player"]) == 0
+
+    asyncio.run(scenario())
+
+
+def test_partly_limited_batch_charges_nobody(client, monkeypatch):
+    monkeypatch.setattr(server.rate_limiter, "limits", {"score_batch.player": RateLimit(rate=0.01, burst=1)})
+
+    def batch(*players):
+        items = [{"mode": "mixed", "player_name": p, "score": 10} for p in players]
+        return client.post("/api/score/batch", json={"items": items}).status_code
+
+    assert batch("deniz") == 200
+    assert batch("ada", "can", "deniz") == 429
+    assert batch("ada", "can") == 200
+    assert batch("ada") == 429
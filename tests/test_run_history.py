@@ -0,0 +1,82 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from starlette.testclient import TestClient
+
+import daily
+import server
+from run_history import RunLog, day_bounds
+
+
+def test_runs_are_appended_off_the_request_path(database):
+    async def scenario():
+        for score in (100, 300, 200):
+            await server.submit_episode_score(server.EpisodeScoreSubmit(
+                player_name="deniz", episode_id=2, score=score, run_id=f"run-{score}",
+            ))
+        # A retried run is not recorded twice
+        await server.submit_episode_score(server.EpisodeScoreSubmit(
+            player_name="deniz", episode_id=2, score=300, run_id="run-300",
+        ))
+        await server.submit_mixed_score(server.MixedScoreSubmit(player_name="deniz", score=50, questions_answered=4))
+        assert "runs.insert_many" not in database.ops
+        assert server.run_log.pending == 4
+        await server.run_log.flush()
+        return await database.runs.find().to_list(length=None)
+
+    runs = asyncio.run(scenario())
+    assert database.ops["runs.insert_many"] == 1
+    assert [(r["mode"], r["score"]) for r in runs] == [("episode", 100), ("episode", 300), ("episode", 200), ("mixed", 50)]
+    assert runs[0]["player"] == "deniz" and runs[0]["episode_id"] == 2 and runs[3]["questions_answered"] == 4
+
+
+def test_run_log_writes_in_batches_and_stays_bounded():
+    class Flaky:
+        def __init__(self):
+            self.down = True
+            self.batches = []
+
+        async def insert_many(self, docs, ordered=True):
+            if self.down:
+                raise ConnectionError("mongo down")
+            self.batches.append([doc["n"] for doc in docs])
+
+    collection = Flaky()
+    log = RunLog(lambda: collection, max_batch=3, flush_interval=0.01, max_buffer=5)
+
+    async def scenario():
+        for n in range(7):
+            log.append({"n": n})
+        await asyncio.sleep(0.05)
+        collection.down = False
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    # The two oldest were dropped while MongoDB was down; the rest went in order
+    assert collection.batches == [[2, 3, 4], [5, 6]]
+    assert log.metrics()["dropped"] == 2 and log.pending == 0
+
+
+def test_history_reads_rollups_and_latest_runs(database):
+    today = daily.today()
+    start, _ = day_bounds(today)
+    runs = [
+        {"ts": start - timedelta(hours=5), "player": "deniz", "mode": "episode", "score": 100},  # yesterday
+        {"ts": start - timedelta(hours=4), "player": "deniz", "mode": "mixed", "score": 40},
+        {"ts": start + timedelta(minutes=1), "player": "deniz", "mode": "episode", "score": 300},
+        {"ts": start + timedelta(minutes=2), "player": "deniz", "mode": "episode", "score": 200},
+        {"ts": start + timedelta(minutes=3), "player": "ada", "mode": "daily", "score": 80},
+    ]
+    asyncio.run(database.runs.insert_many(runs))
+    assert asyncio.run(server.rollup_runs()) == 3  # deniz twice, ada once
+    assert asyncio.run(server.rollup_runs()) == 3  # idempotent
+    assert asyncio.run(database.run_rollups.count_documents({})) == 3
+
+    database.ops.clear()
+    history = TestClient(server.app).get("/api/player/deniz/history?days=7").json()
+    assert database.ops == {"run_rollups.find": 1, "runs.find": 1}
+    yesterday, current = history["days"]
+    assert yesterday["day"] == (today - timedelta(days=1)).isoformat()
+    assert (yesterday["runs"], yesterday["avg_score"], yesterday["best"]) == (2, 70.0, 100)
+    assert current["modes"] == {"episode": {"runs": 2, "avg_score": 250.0, "best": 300}}
+    assert [run["score"] for run in history["latest_runs"]] == [200, 300, 40, 100]
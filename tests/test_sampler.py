@@ -0,0 +1,83 @@
+import random
+from collections import Counter
+
+import pytest
+
+from sampler import ChainedQuestions, QuestionIndex, curve_slots, parse_mix, sample
+
+
+def bank(kolay, orta, zor, prefix="q"):
+    difficulties = ["kolay"] * kolay + ["orta"] * orta + ["zor"] * zor
+    return [{"id": f"{prefix}{i}", "difficulty": d} for i, d in enumerate(difficulties)]
+
+
+def mix_of(questions):
+    return Counter(q["difficulty"] for q in questions)
+
+
+def test_target_mix_is_met():
+    index = QuestionIndex(bank(40, 40, 40))
+    picked = sample(index, 25, random.Random(1), parse_mix("kolay:10,orta:10,zor:5"))
+    assert mix_of(picked) == {"kolay": 10, "orta": 10, "zor": 5}
+    assert len({q["id"] for q in picked}) == 25
+
+
+def test_small_bucket_falls_back_to_nearest_difficulty():
+    index = QuestionIndex(bank(3, 30, 1))
+    picked = sample(index, 25, random.Random(1), {"kolay": 10, "orta": 10, "zor": 5})
+    assert len(picked) == 25
+    assert len({q["id"] for q in picked}) == 25
+    assert mix_of(picked) == {"kolay": 3, "orta": 21, "zor": 1}
+
+
+def test_never_returns_more_than_the_bank():
+    index = QuestionIndex(bank(2, 2, 2))
+    picked = sample(index, 25, random.Random(1), {"kolay": 10, "orta": 10, "zor": 5})
+    assert sorted(q["id"] for q in picked) == sorted(q["id"] for q in index.questions)
+
+
+def test_default_mix_follows_bank_proportions():
+    index = QuestionIndex(bank(100, 200, 100))
+    assert mix_of(sample(index, 20, random.Random(3))) == {"kolay": 5, "orta": 10, "zor": 5}
+
+
+def test_seed_reproduces_quiz():
+    index = QuestionIndex(bank(50, 50, 50))
+    first = sample(index, 25, random.Random(42), curve="ramp")
+    again = sample(index, 25, random.Random(42), curve="ramp")
+    other = sample(index, 25, random.Random(43), curve="ramp")
+    assert first == again
+    assert first != other
+
+
+def test_ramp_curve_orders_easy_to_hard():
+    index = QuestionIndex(bank(50, 50, 50))
+    picked = sample(index, 24, random.Random(7), curve="ramp")
+    rank = {"kolay": 0, "orta": 1, "zor": 2}
+    first_half = sum(rank[q["difficulty"]] for q in picked[:12])
+    second_half = sum(rank[q["difficulty"]] for q in picked[12:])
+    assert first_half < second_half
+    assert [q["difficulty"] for q in picked] == curve_slots("ramp", 24)
+
+
+def test_chained_questions_span_episodes():
+    chained = ChainedQuestions([bank(1, 1, 0, "a"), [], bank(0, 0, 2, "b")])
+    assert len(chained) == 4
+    assert [q["id"] for q in chained] == ["a0", "a1", "b0", "b1"]
+    assert mix_of(sample(QuestionIndex(chained), 4, random.Random(1))) == {"kolay": 1, "orta": 1, "zor": 2}
+
+
+@pytest.mark.parametrize("value", ["kolay", "kolay:x", "kolay:-1", "imkansiz:3", "", "kolay:0,zor:0"])
+def test_invalid_mix(value):
+    with pytest.raises(ValueError):
+        parse_mix(value)
+
+
+def test_quiz_routes_reject_empty_requests(client, sheets):
+    sheets.generate(episodes=2, questions_per_episode=10)
+    for path in ("/api/quiz/episode/1", "/api/quiz/mixed"):
+        for params in ({"count": 0}, {"count": -1}, {"mix": "kolay:0,orta:0"}, {"mix": ""}):
+            assert client.get(path, params=params).status_code == 400, (path, params)
+    # Without count, mixed mode is the whole bank
+    assert client.get("/api/quiz/mixed").json()["total_questions"] == 20
+    assert client.get("/api/quiz/mixed", params={"count": 1}).json()["total_questions"] == 1
@@ -0,0 +1,129 @@
+import asyncio
+import json
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+import fake_mongo
+import server
+from scheduler import Cron, Scheduler
+
+
+def test_cron_next_after():
+    istanbul = ZoneInfo("Europe/Istanbul")
+    cron = Cron("58 23 * * *", tz="Europe/Istanbul")
+    assert cron.next_after(datetime(2026, 3, 10, 12, 0, tzinfo=istanbul)) == datetime(2026, 3, 10, 23, 58, tzinfo=istanbul)
+    assert cron.next_after(datetime(2026, 3, 10, 23, 58, tzinfo=istanbul)).day == 11
+
+    # Day of month OR weekday when both are restricted: the 1st, or any Monday
+    either = Cron("0 9 1 * 1")
+    utc = ZoneInfo("UTC")
+    assert either.next_after(datetime(2026, 3, 3, tzinfo=utc)) == datetime(2026, 3, 9, 9, 0, tzinfo=utc)
+    assert either.next_after(datetime(2026, 3, 30, 10, 0, tzinfo=utc)) == datetime(2026, 4, 1, 9, 0, tzinfo=utc)
+
+    with pytest.raises(ValueError):
+        Cron("61 * * * *")
+
+
+def test_interval_job_metrics_and_timeout():
+    async def scenario():
+        scheduler = Scheduler()
+        calls = []
+
+        async def quick():
+            calls.append(1)
+
+        async def slow():
+            await asyncio.sleep(1)
+
+        async def broken():
+            raise RuntimeError("boom")
+
+        scheduler.every("quick", 0.02, quick, run_at_start=True)
+        scheduler.every("slow", 0.02, slow, run_at_start=True, timeout=0.01)
+        scheduler.every("broken", 10, broken, run_at_start=True)
+        scheduler.start()
+        await asyncio.sleep(0.1)
+        await scheduler.stop()
+        return scheduler.metrics(), len(calls)
+
+    metrics, calls = asyncio.run(scenario())
+    assert calls >= 3 and metrics["quick"]["runs"] == calls
+    assert metrics["quick"]["failures"] == 0 and metrics["quick"]["avg_duration_ms"] is not None
+    assert metrics["slow"]["timeouts"] >= 1 and not metrics["slow"]["running"]
+    assert metrics["broken"] == {**metrics["broken"], "runs": 1, "failures": 1, "last_error": "boom"}
+
+
+def test_singleton_job_runs_on_one_instance():
+    async def scenario():
+        database = fake_mongo.FakeDatabase()
+        ran = []
+        schedulers = [Scheduler(database.leases, holder=f"instance-{i}") for i in range(3)]
+        for i, scheduler in enumerate(schedulers):
+            async def job(i=i):
+                ran.append(i)
+            scheduler.every("reconcile", 0.05, job, run_at_start=True, singleton=True)
+            scheduler.start()
+        await asyncio.sleep(0.18)
+        for scheduler in schedulers:
+            await scheduler.stop()
+        lease = await database.leases.find_one({"_id": "job:reconcile"})
+        return ran, lease
+
+    ran, lease = asyncio.run(scenario())
+    assert len(set(ran)) == 1 and len(ran) >= 2
+    assert lease["holder"] == f"instance-{ran[0]}"
+    assert lease["expires_at"] <= datetime.utcnow()  # released on stop
+
+
+def test_maintenance_jobs_repair_drift(monkeypatch):
+    database = fake_mongo.FakeDatabase()
+    monkeypatch.setattr(server, "db", database)
+
+    async def scenario():
+        await database.episode_scores.insert_many([
+            {"player_name": "deniz", "episode_id": 1, "score": 100},
+            {"player_name": "deniz", "episode_id": 2, "score": 50},
+            {"player_name": "ada", "episode_id": 1, "score": 70},
+        ])
+        await database.global_scores.insert_one({"player_name": "deniz", "score": 10, "episodes_completed": 1})
+        await database.counters.insert_one({"_id": "episode_scores:1", "value": 9})
+
+        await server.reconcile_global_scores()
+        await server.resync_counters()
+        await server.snapshot_leaderboards()
+        scores = {d["player_name"]: (d["score"], d["episodes_completed"])
+                  for d in await database.global_scores.find().to_list(None)}
+        counters = {d["_id"]: d["value"] for d in await database.counters.find().to_list(None)}
+        snapshot = await database.leaderboard_snapshots.find_one({"board": "general"})
+        return scores, counters, snapshot
+
+    scores, counters, snapshot = asyncio.run(scenario())
+    assert scores == {"deniz": (150, 2), "ada": (70, 1)}
+    assert counters["episode_scores:1"] == 2
+    assert counters["episode_scores:2"] == 1
+    assert counters["global_scores"] == 2
+    assert [e["player_name"] for e in snapshot["entries"]] == ["deniz", "ada"]
+
+
+def test_first_new_player_seeds_the_counter_from_the_board(monkeypatch):
+    database = fake_mongo.FakeDatabase()
+    monkeypatch.setattr(server, "db", database)
+    monkeypatch.setattr(server, "read_db", None)
+
+    async def scenario():
+        # Players from before the counters existed; no resync has run yet
+        await database.mixed_scores.insert_many([{"player_name": f"p{i}", "score": i} for i in range(100)])
+        await server.submit_mixed_score(server.MixedScoreSubmit(player_name="yeni", score=5))
+        await server.submit_score_batch(server.BatchScoreSubmit(items=[
+            {"mode": "mixed", "player_name": "yeni2", "score": 5},
+            {"mode": "episode", "player_name": "yeni2", "episode_id": 1, "score": 5},
+        ]))
+        board = await server.get_mixed_leaderboard()
+        counters = {d["_id"]: d["value"] for d in await database.counters.find().to_list(None)}
+        return board, counters
+
+    board, counters = asyncio.run(scenario())
+    assert json.loads(board.body)["total_players"] == 102
+    assert counters == {"mixed_scores": 102, "episode_scores:1": 1, "global_scores": 1}
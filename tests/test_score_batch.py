@@ -0,0 +1,128 @@
+import asyncio
+import random
+
+import fake_mongo
+import server
+from tracing import Tracer, traced_database
+
+
+def random_items(count: int, seed: int = 3):
+    rng = random.Random(seed)
+    items = []
+    for _ in range(count):
+        player = f"oyuncu_{rng.randrange(4)}"
+        if rng.random() < 0.7:
+            items.append({"mode": "episode", "player_name": player, "episode_id": rng.randint(1, 3), "score": rng.randint(0, 500)})
+        else:
+            items.append({"mode": "mixed", "player_name": player, "score": rng.randint(0, 500), "questions_answered": 9})
+    return items
+
+
+async def seed(database):
+    await database.episode_scores.insert_one({"player_name": "oyuncu_0", "episode_id": 1, "score": 300})
+    await database.global_scores.insert_one({"player_name": "oyuncu_0", "score": 300, "episodes_completed": 1})
+    await database.counters.insert_many([
+        {"_id": "episode_scores:1", "value": 1}, {"_id": "episode_scores:2", "value": 0},
+        {"_id": "episode_scores:3", "value": 0}, {"_id": "global_scores", "value": 1}, {"_id": "mixed_scores", "value": 0},
+    ])
+
+
+async def state(database):
+    boards = {}
+    for name in ("episode_scores", "mixed_scores", "global_scores"):
+        docs = await database[name].find().to_list(length=None)
+        boards[name] = sorted((d["player_name"], d.get("episode_id"), d["score"], d.get("episodes_completed")) for d in docs)
+    boards["counters"] = sorted((d["_id"], d["value"]) for d in await database.counters.find().to_list(length=None))
+    return boards
+
+
+def test_batch_matches_sequential_submissions(monkeypatch):
+    items = random_items(60)
+    # One by one, these would exceed the per-player limits
+    monkeypatch.setattr(server.rate_limiter, "limits", {})
+
+    async def sequential():
+        database = fake_mongo.FakeDatabase()
+        monkeypatch.setattr(server, "db", database)
+        await seed(database)
+        results = []
+        for item in items:
+            if item["mode"] == "episode":
+                response = await server.submit_episode_score(server.EpisodeScoreSubmit(**item))
+            else:
+                response = await server.submit_mixed_score(server.MixedScoreSubmit(**item))
+            results.append({"is_new_record": response["is_new_record"], "best_score": response["best_score"]})
+        return results, await state(database), database.total_ops()
+
+    async def batched():
+        database = fake_mongo.FakeDatabase()
+        monkeypatch.setattr(server, "db", database)
+        await seed(database)
+        database.ops.clear()
+        response = await server.submit_score_batch(server.BatchScoreSubmit(items=items))
+        return response["results"], await state(database), dict(database.ops)
+
+    expected, expected_state, sequential_ops = asyncio.run(sequential())
+    results, batch_state, ops = asyncio.run(batched())
+    assert results == expected
+    assert batch_state == expected_state
+    assert sum(n for op, n in ops.items() if op.endswith("bulk_write")) == 4  # episodes, mixed, global, counters
+    assert sum(ops.values()) < sequential_ops / 20
+
+
+def test_batch_validation(client):
+    missing_episode = client.post("/api/score/batch", json={"items": [{"mode": "episode", "player_name": "deniz", "score": 5}]})
+    assert missing_episode.status_code == 400
+    too_many = [{"mode": "mixed", "player_name": "deniz", "score": 5}] * (server.BATCH_SCORE_LIMIT + 1)
+    assert client.post("/api/score/batch", json={"items": too_many}).status_code == 422
+    assert client.post("/api/score/batch", json={"items": []}).status_code == 422
+
+
+def test_batch_keeps_a_higher_score_inserted_meanwhile(database, monkeypatch):
+    bulk_write = database.episode_scores.bulk_write
+
+    async def racing_bulk_write(operations, **kwargs):
+        # Another instance inserts both keys between the batch's read and its write
+        if not database.episode_scores.docs:
+            await database.episode_scores.insert_many([
+                {"player_name": "deniz", "episode_id": 1, "score": 900, "correct_count": 9},
+                {"player_name": "deniz", "episode_id": 2, "score": 10, "correct_count": 1},
+            ])
+        return await bulk_write(operations, **kwargs)
+
+    monkeypatch.setattr(database.episode_scores, "bulk_write", racing_bulk_write)
+    asyncio.run(server.submit_score_batch(server.BatchScoreSubmit(items=[
+        {"mode": "episode", "player_name": "deniz", "episode_id": 1, "score": 500, "correct_count": 5},
+        {"mode": "episode", "player_name": "deniz", "episode_id": 2, "score": 300, "correct_count": 3},
+    ])))
+    docs = asyncio.run(database.episode_scores.find().sort("episode_id", 1).to_list(length=None))
+    assert [(d["score"], d["correct_count"]) for d in docs] == [(900, 9), (300, 3)]
+    assert asyncio.run(database.global_scores.find_one({"player_name": "deniz"}))["score"] == 1200
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+
+def test_batch_runs_with_tracing(monkeypatch):
+    items = random_items(20)
+    monkeypatch.setattr(server.rate_limiter, "limits", {})
+    exporter = ListExporter()
+
+    async def run(database):
+        monkeypatch.setattr(server, "db", database)
+        await seed(database)
+        with Tracer(exporter).start_trace("POST /api/score/batch"):
+            return (await server.submit_score_batch(server.BatchScoreSubmit(items=items)))["results"]
+
+    plain, traced = fake_mongo.FakeDatabase(), fake_mongo.FakeDatabase()
+    expected = asyncio.run(run(plain))
+    exporter.spans.clear()
+    # Every cursor and collection call of the batch goes through the tracing wrappers
+    assert asyncio.run(run(traced_database(traced))) == expected
+    assert asyncio.run(state(traced)) == asyncio.run(state(plain))
+    assert "mongo.episode_scores.find" in {s.name for s in exporter.spans}
@@ -0,0 +1,38 @@
+import asyncio
+
+import content_build
+import fake_mongo
+from seed_data import Dataset, load
+
+
+def test_seed_is_deterministic_and_boards_are_consistent():
+    a, b, c = Dataset(300, seed=5), Dataset(300, seed=5), Dataset(300, seed=6)
+    batches = list(a.batches(100))
+    list(b.batches(37))  # the batch size does not change the data
+    list(c.batches(100))
+    assert a.checksum == b.checksum and c.checksum != a.checksum
+
+    database = fake_mongo.FakeDatabase()
+    inserted = asyncio.run(load(database, Dataset(300, seed=5), batch_size=100, concurrency=3))
+    assert inserted["global_scores"] == 300 and inserted["episode_scores"] == sum(
+        len(docs) for name, docs in batches if name == "episode_scores")
+    assert database.ops["episode_scores.insert_many"] == -(-inserted["episode_scores"] // 100)
+
+    episodes = asyncio.run(database.episode_scores.find().to_list(length=None))
+    for player in asyncio.run(database.global_scores.find().to_list(length=None)):
+        own = [d for d in episodes if d["player_name"] == player["player_name"]]
+        assert player["score"] == sum(d["score"] for d in own)
+        assert player["episodes_completed"] == len(own)
+        # Players go through the episodes in order
+        assert sorted(d["episode_id"] for d in own) == list(range(1, len(own) + 1))
+    for doc in episodes:
+        assert doc["score"] >= doc["speed_bonus"] + 10 * doc["correct_count"] and doc["correct_count"] <= 25
+    counters = {d["_id"]: d["value"] for d in asyncio.run(database.counters.find().to_list(length=None))}
+    assert counters["global_scores"] == 300
+    assert counters["episode_scores:1"] == 300
+    assert counters["mixed_scores"] == asyncio.run(database.mixed_scores.count_documents({}))
+
+    # The CSVs have the same episodes as the boards
+    episodes_csv, questions_csv = Dataset(300, episodes=14, seed=5).csvs(questions_per_episode=3)
+    assert [e["id"] for e in content_build.build_episodes(content_build.parse_csv(episodes_csv))] == list(range(1, 15))
+    assert sorted(content_build.build_questions(content_build.parse_csv(questions_csv))) == list(range(1, 15))
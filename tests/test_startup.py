@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+import pytest
+from pymongo import IndexModel
+from starlette.testclient import TestClient
+
+import fake_mongo
+import server
+from indexes import ensure_indexes
+
+
+@pytest.fixture
+def slow_sheets(sheets, database, monkeypatch):
+    sheets.generate(episodes=3, questions_per_episode=20).delay = 0.3
+    database.latency = 0.05
+    monkeypatch.setattr(server, "content_ready", False)
+    return sheets.fetches
+
+
+def test_index_migration_only_creates_missing_indexes():
+    database = fake_mongo.FakeDatabase()
+
+    async def scenario():
+        await database.scores.create_index([("player_name", 1)], unique=True)
+        await database.other.create_index([("day", 1)])
+        wanted = {
+            "scores": [IndexModel("player_name", unique=True), IndexModel([("score", -1)])],
+            "other": [IndexModel("day", unique=True)],
+        }
+        first = await ensure_indexes(database, wanted)
+        database.ops.clear()
+        second = await ensure_indexes(database, wanted)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == {"created": ["scores.score_-1"], "existing": ["scores.player_name_1"], "conflicts": ["other.day_1"]}
+    assert second["created"] == []
+    assert set(database.ops) == {"scores.index_information", "other.index_information"}
+
+
+def test_startup_serves_before_content_and_indexes_are_ready(slow_sheets):
+    started = time.perf_counter()
+    with TestClient(server.app) as http:
+        assert time.perf_counter() - started < 0.2
+        assert http.get("/healthz").status_code == 200
+        not_ready = http.get("/readyz")
+        assert not_ready.status_code == 503
+        assert not_ready.json()["checks"] == {"content": False, "mongo": True}
+
+        # The first quiz waits for the warm-up instead of fetching the sheets again
+        assert http.get("/api/quiz/mixed", params={"count": 5}).status_code == 200
+        assert sorted(slow_sheets) == sorted([server.EPISODES_GID, server.QUESTIONS_GID])
+
+        ready = http.get("/readyz").json()
+        assert ready["status"] == "ready"
+        assert ready["indexes"]["status"] == "done"
+        assert ready["indexes"]["created"] == sum(len(m) for m in server.INDEXES.values())
@@ -0,0 +1,69 @@
+import asyncio
+import json
+
+import httpx
+from fastapi import APIRouter, FastAPI
+from starlette.testclient import TestClient
+
+import fake_mongo
+from tracing import JsonLinesExporter, OtlpHttpExporter, Tracer, TracedRoute, TracingMiddleware, span, traced_database
+
+
+def test_requests_and_cursors_are_traced(tmp_path):
+    database = fake_mongo.FakeDatabase()
+    asyncio.run(database.scores.insert_many([{"player_name": f"p{i}", "score": i} for i in range(5)]))
+    db = traced_database(database)
+    router = APIRouter(route_class=TracedRoute)
+
+    @router.get("/board")
+    async def board():
+        top = await db.scores.find().sort("score", -1).limit(3).to_list(length=3)
+        names = []
+        async for doc in db.scores.find({"score": {"$gte": 3}}):
+            # The loop body runs under the route, not under the cursor span
+            with span("row"):
+                names.append(doc["player_name"])
+        return {"top": [d["score"] for d in top], "names": names}
+
+    app = FastAPI()
+    app.include_router(router)
+    tracer = Tracer(JsonLinesExporter(str(tmp_path / "traces.jsonl")))
+    response = TestClient(TracingMiddleware(app, tracer)).get("/board")
+    assert response.json() == {"top": [4, 3, 2], "names": ["p3", "p4"]}
+
+    spans = [json.loads(line) for line in (tmp_path / "traces.jsonl").read_text().splitlines()]
+    by_name = {}
+    for s in spans:
+        by_name.setdefault(s["name"], []).append(s)
+    root, = by_name["GET /board"]
+    assert root["parent_id"] is None and root["attributes"]["http.status_code"] == 200
+    assert {s["trace_id"] for s in spans} == {root["trace_id"]}
+    endpoint, = by_name["endpoint"]
+    finds = by_name["mongo.scores.find"]
+    assert [f["attributes"]["db.documents"] for f in finds] == [3, 2]
+    assert {f["parent_id"] for f in finds} == {endpoint["span_id"]}
+    assert {r["parent_id"] for r in by_name["row"]} == {endpoint["span_id"]}
+
+
+def test_otlp_exporter_flushes_every_batch_on_shutdown():
+    posted = []
+
+    def handler(request):
+        posted.extend(s["name"] for s in json.loads(request.content)["resourceSpans"][0]["scopeSpans"][0]["spans"])
+        return httpx.Response(200)
+
+    exporter = OtlpHttpExporter("http://collector/v1/traces", max_batch=2, flush_interval=60,
+                                transport=httpx.MockTransport(handler))
+    tracer = Tracer(exporter)
+
+    async def scenario():
+        for i in range(5):
+            with tracer.start_trace(f"request-{i}"):
+                pass
+        # Full batches are in flight, the last span waits for the interval
+        assert exporter._tasks
+        await asyncio.wait_for(tracer.shutdown(), timeout=5)
+        assert not exporter._tasks
+
+    asyncio.run(scenario())
+    assert sorted(posted) == [f"request-{i}" for i in range(5)]
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+import server
+from seen import SeenSet, SeenStore, field_name, seen_update
+
+
+@pytest.fixture
+def client(client, sheets, monkeypatch):
+    sheets.generate(episodes=3, questions_per_episode=40)
+    monkeypatch.setattr(server, "seen_store", SeenStore())
+    return client
+
+
+def play(client, episode_id, player="deniz"):
+    quiz = client.get(f"/api/quiz/episode/{episode_id}",
+                      params={"unseen": "true", "player_name": player, "count": 10}).json()
+    ids = [q["id"] for q in quiz["questions"]]
+    response = client.post("/api/score/episode", json={
+        "player_name": player, "episode_id": episode_id, "score": 100,
+        "question_ids": ids, "content_version": quiz["content_version"],
+    })
+    assert response.status_code == 200
+    return ids
+
+
+def test_replays_prefer_unseen_questions(client):
+    seen = []
+    for _ in range(4):
+        ids = play(client, 1)
+        assert not set(ids) & set(seen)
+        seen.extend(ids)
+    # The episode has 40 questions; the fifth run has to repeat some
+    assert len(set(play(client, 1))) == 10
+
+
+def seen_bits(database, player="deniz"):
+    doc = asyncio.run(database.seen_sets.find_one({"_id": player}))
+    # Words are stored as signed 64-bit integers
+    return sum(bin(w & (2 ** 64 - 1)).count("1") for w in doc[field_name(server.get_content_version())].values())
+
+
+def test_seen_set_is_stored_apart_from_scores(client, database, monkeypatch):
+    play(client, 1)
+    database.ops.clear()
+    ids = play(client, 2)
+    assert database.ops["seen_sets.update_one"] == 1 and seen_bits(database) == 20
+    # Leaderboard documents carry no bitmap
+    doc = asyncio.run(database.global_scores.find_one({"player_name": "deniz"}))
+    assert not [key for key in doc if key.startswith("seen_")]
+
+    # A fresh instance (empty cache) sees the same set from MongoDB
+    monkeypatch.setattr(server, "seen_store", SeenStore())
+    quiz = client.get("/api/quiz/episode/2", params={"unseen": "true", "player_name": "deniz", "count": 10}).json()
+    assert not {q["id"] for q in quiz["questions"]} & set(ids)
+
+
+def test_mixed_only_players_keep_a_seen_set(client, database):
+    quiz = client.get("/api/quiz/mixed", params={"unseen": "true", "player_name": "ece", "count": 10}).json()
+    ids = [q["id"] for q in quiz["questions"]]
+    assert client.post("/api/score/mixed", json={
+        "player_name": "ece", "score": 100, "questions_answered": 10,
+        "question_ids": ids, "content_version": quiz["content_version"],
+    }).status_code == 200
+    assert seen_bits(database, "ece") == 10
+    response = client.post("/api/score/batch", json={"items": [{
+        "mode": "mixed", "player_name": "can", "score": 50, "questions_answered": 10, "question_ids": ids[:4],
+    }]})
+    assert response.status_code == 200 and seen_bits(database, "can") == 4
+
+
+def test_bitmap_round_trip():
+    positions = [0, 63, 64, 127, 9999]
+    update = seen_update("v1", positions, stale_fields=["seen_v0"])
+    words = {key.split(".")[1]: int(spec["or"]) for key, spec in update["$bit"].items()}
+    assert update["$unset"] == {"seen_v0": ""}
+    restored = SeenSet.from_words("v1", 10000, words)
+    assert [p for p in range(10000) if p in restored] == positions
+    assert len(restored.bits) == 1250
+    assert field_name("v1") == "seen_v1"